@@ -16,7 +16,8 @@ import os
 PROJECT_ROOT = Path("/opt/airflow")
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from src.workflows.due_diligence_graph import run_workflow
+# Project modules are imported inside the task callables: the scheduler re-parses
+# this file every few seconds and must not pay for langgraph/openai imports
 
 # ============================================================================
 # DAG Configuration
@@ -99,8 +100,18 @@ def run_agentic_workflow_for_all(**context):
     if not company_ids:
         raise ValueError("No companies found in XCom!")
     
-    # Set auto-approve for automated runs
-    os.environ['HITL_AUTO_APPROVE'] = 'true'
+    # Flagged companies go to the HITL review queue (approve / reject on the MCP
+    # server) and pause there instead of blocking the run; the paused runs need
+    # durable checkpoints to resume. HITL_AUTO_APPROVE=true still approves all.
+    os.environ.setdefault('HITL_MODE', 'queue')
+    os.environ.setdefault('CHECKPOINT_STORAGE', 'sqlite')
+
+    from src.workflows.due_diligence_graph import run_workflow
+    from src.utils.usage import BudgetPolicy, UsageSummary, daily_usage
+
+    # Warm the in-process payload catalog once per worker (PAYLOAD_PRELOAD=eager|lazy)
+    from src.tools.payload_catalog import preload_payload_catalog
+    preload_payload_catalog(payload_dir="/opt/airflow/data/payloads")
     
     # Test mode: Process only first N companies (to avoid long runs during testing)
     test_limit = int(os.getenv('DAG_TEST_LIMIT', '50'))
@@ -110,45 +121,115 @@ def run_agentic_workflow_for_all(**context):
     print(f"Processing (TEST MODE): {len(companies_to_process)} companies")
     print(f"   Set DAG_TEST_LIMIT=52 to process all companies")
     print(f"   Companies: {', '.join(companies_to_process)}\n")
-    
+
+    # Per-company results are journaled (append-only, fsync'd) as each company
+    # finishes; a retry of this task skips companies that already succeeded
+    # for this execution date and the summary is assembled from the journal
+    from src.utils.result_journal import ResultJournal
+    journal = ResultJournal.for_run(
+        'orbit_agentic_dashboard', context['execution_date'],
+        directory=Path(os.getenv('RESULT_JOURNAL_DIR', '/opt/airflow/data/journal'))
+    )
+    already_done = journal.succeeded()
+    pending_companies = [c for c in companies_to_process if c not in already_done]
+    if already_done:
+        print(f"♻️  Journal {journal.path}: {len(companies_to_process) - len(pending_companies)} companies "
+              f"already succeeded, {len(pending_companies)} left\n")
+
     # Track results
     results = {
         'total_available': len(company_ids),
         'total_processed': len(companies_to_process),
-        'successful': 0,
-        'failed': 0,
-        'hitl_triggered': 0,
-        'companies': []
     }
+
+    # TOKEN_BUDGET_PER_RUN / TOKEN_BUDGET_PER_DAY make run_workflow degrade to
+    # cheaper generation instead of overspending; the DAG run's usage is
+    # summed from the journal below
+    budget = BudgetPolicy.from_env()
+
+    # Pre-generation risk triage (RISK_TRIAGE): scan payload risk fields and
+    # retrieved risk chunks for every company before any dashboard is
+    # generated (batch or per company). Flagged companies are queued for
+    # review right away and processed first, so their HITL reviews start
+    # while the rest generate
+    triage = {}
+    from src.workflows.hitl_queue import hitl_mode
+    from src.workflows.risk_triage import prioritize, queue_for_review, triage_companies, triage_enabled
+    if triage_enabled() and pending_companies:
+        import asyncio
+        triage = asyncio.run(triage_companies(pending_companies))
+        pending_companies = prioritize(pending_companies, triage)
+        flagged = [c for c in pending_companies if triage[c].flagged]
+        results['triage_flagged'] = flagged
+        print(f"🔎 Risk triage: {len(flagged)}/{len(pending_companies)} companies flagged"
+              + (f" (processed first: {', '.join(flagged)})" if flagged else "") + "\n")
+        if flagged and hitl_mode() == 'queue':
+            for company_id in flagged:
+                queue_for_review(f"{context['run_id']}:{company_id}", triage[company_id])
+            print(f"📥 Queued {len(flagged)} early reviews (generation continues): /hitl/reviews\n")
+
+    # Batch mode (DASHBOARD_BATCH_MODE=true): generate every dashboard through one
+    # offline batch job first; workflows then only evaluate / check risks. Companies
+    # whose batch requests failed are generated synchronously by their workflow.
+    batch = None
+    from src.utils.batch_generation import batch_mode_enabled
+    if batch_mode_enabled() and pending_companies:
+        import asyncio
+        from src.utils.batch_generation import run_batch
+        batch = asyncio.run(run_batch(pending_companies, save=False))
+        results['batch'] = {
+            'batch_id': batch.batch_id,
+            'status': batch.status,
+            'processor': batch.processor,
+            'requests': batch.requests,
+            'failed': batch.failed
+        }
     
-    # Run workflow for each company
-    for idx, company_id in enumerate(companies_to_process, 1):
+    # Run workflow for each company not yet journaled as successful
+    for idx, company_id in enumerate(pending_companies, 1):
         print(f"\n{'='*60}")
-        print(f"[{idx}/{len(companies_to_process)}] {company_id.upper()}")
+        print(f"[{idx}/{len(pending_companies)}] {company_id.upper()}")
         print(f"{'='*60}")
         
         try:
-            # Run the agentic workflow
-            final_state = run_workflow(company_id)
+            # Run the agentic workflow. The run id is stable across task
+            # retries, so with CHECKPOINT_STORAGE=sqlite a retry resumes each
+            # company after its last completed node instead of regenerating
+            final_state = run_workflow(
+                company_id,
+                run_id=f"{context['run_id']}:{company_id}",
+                batch_dashboards=batch.for_company(company_id) if batch else None,
+                risk_triage=triage[company_id].model_dump() if company_id in triage else None
+            )
             
-            # Record success
-            results['successful'] += 1
-            if final_state.get('hitl_required'):
-                results['hitl_triggered'] += 1
-            
-            results['companies'].append({
-                'company_id': company_id,
-                'status': 'success',
+            # Record success (or a run paused for HITL review: a retry of
+            # this task re-checks it and resumes it once it has been decided)
+            company_usage = UsageSummary.model_validate(final_state.get('usage') or {})
+
+            if final_state.get('hitl_pending'):
+                journal.append(company_id, 'pending_review', {
+                    'risk_keywords': final_state.get('risk_keywords', []),
+                    'run_id': final_state.get('run_id'),
+                    'usage': company_usage.model_dump()
+                })
+                print(f"⏸️  {company_id}: AWAITING HITL REVIEW ({', '.join(final_state.get('risk_keywords', []))})")
+                continue
+
+            journal.append(company_id, 'success', {
                 'risk_detected': final_state.get('risk_detected', False),
                 'hitl_required': final_state.get('hitl_required', False),
                 'hitl_approved': final_state.get('hitl_approved', False),
                 'recommendation': 'APPROVED' if final_state.get('hitl_approved') else 'REJECTED',
-                'execution_path': ' -> '.join(final_state.get('execution_path', []))
+                'execution_path': ' -> '.join(final_state.get('execution_path', [])),
+                'run_id': final_state.get('run_id'),
+                'usage': company_usage.model_dump(),
+                'budget_notes': final_state.get('budget_notes', [])
             })
             
             print(f"✅ {company_id}: SUCCESS")
             print(f"   Risk: {final_state.get('risk_detected')}")
             print(f"   Branch: {'HITL' if final_state.get('hitl_required') else 'Auto-Approve'}")
+            print(f"   Tokens: {company_usage.total_tokens} (~${company_usage.cost_usd:.4f})")
             
         except Exception as e:
             print(f"❌ {company_id}: FAILED")
@@ -157,13 +238,37 @@ def run_agentic_workflow_for_all(**context):
             import traceback
             traceback.print_exc()
             
-            results['failed'] += 1
-            results['companies'].append({
-                'company_id': company_id,
-                'status': 'failed',
+            journal.append(company_id, 'failed', {
                 'error': str(e)[:500]  # Truncate long errors
             })
+
+    # Summary over every company of this execution date, including those
+    # completed by earlier attempts of this task
+    results.update(journal.summary(companies_to_process))
+    dag_usage = UsageSummary.model_validate(results['usage'])
     
+    # Score the dashboards directory (rule-based rubric, one pass) to track quality per run
+    try:
+        from src.agents.evaluation_agent import score_dashboard_dir
+        quality = score_dashboard_dir(
+            dashboard_dir="/opt/airflow/data/dashboards",
+            payload_dir="/opt/airflow/data/payloads"
+        )
+        results['quality'] = {
+            'dashboards_scored': quality['count'],
+            'seconds': quality['seconds'],
+            'by_method': quality['summary'],
+        }
+    except Exception as e:
+        print(f"⚠️  Dashboard scoring failed: {e}")
+
+    results['budget'] = {
+        'run_tokens': budget.run_tokens,
+        'day_tokens': budget.day_tokens,
+        'day_used': daily_usage().total_tokens,
+        'degraded_companies': [c['company_id'] for c in results['companies'] if c.get('budget_notes')],
+    }
+
     # Save results summary
     results_file = Path("/opt/airflow/data/agentic_dag_results.json")
     
@@ -183,7 +288,11 @@ def run_agentic_workflow_for_all(**context):
     print(f"Processed:      {results['total_processed']}/{results['total_available']}")
     print(f"Successful:     {results['successful']}")
     print(f"Failed:         {results['failed']}")
+    print(f"Pending Review: {results['pending_review']}")
+    print(f"From journal:   {len(companies_to_process) - len(pending_companies)} (earlier attempts)")
     print(f"HITL Triggered: {results['hitl_triggered']}")
+    print(f"Tokens:         {dag_usage.total_tokens} (~${dag_usage.cost_usd:.4f})")
+    print(f"Degraded:       {len(results['budget']['degraded_companies'])} companies (token budget)")
     print(f"Success Rate:   {results['successful']/results['total_processed']*100:.1f}%")
     print(f"Results:        {results_file}")
     print(f"{'='*60}\n")
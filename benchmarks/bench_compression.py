@@ -0,0 +1,161 @@
+"""
+Benchmark: extractive chunk compression on the committed dashboards
+
+For every company with a RAG dashboard under data/dashboards and chunks in
+the local corpus (SPARSE_INDEX_PATH, exported with
+`python -m src.tools.sparse_index export`), retrieves the seven section
+queries offline (BM25, no API calls), runs dedup + compression and reports:
+
+- tokens:    retrieved-context tokens before / after compression
+- retention: share of the facts that the existing dashboard states and the
+             raw context contains which are still in the compressed context,
+             separately for
+             numeric facts (amounts, years, counts): the compressor never
+                 drops a sentence with a digit, so this is near 100% by
+                 construction and only catches segmentation bugs
+             entities (investors, products, people, places: capitalized
+                 names): the facts the query-overlap filter can drop; this
+                 is the figure that decides whether RAG_COMPRESSION can be on
+                 by default
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_compression.py
+    PYTHONPATH=. python benchmarks/bench_compression.py --chunks data/sparse_index/chunks.jsonl --k 5 --json
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Set
+
+from src.tools.sparse_index import SparseIndex, sparse_index_path
+from src.utils.chunk_compression import compress_sections
+from src.utils.context_builder import count_tokens
+from src.utils.dashboard_generator import RAG_SECTION_QUERIES
+from src.utils.retrieval_postprocess import postprocess_sections
+
+_FACT = re.compile(r"\d[\d,]*(?:\.\d+)?")
+_ENTITY = re.compile(r"[A-Z][A-Za-z0-9&'\-]+(?:[ \t]+[A-Z][A-Za-z0-9&'\-]+)*")
+# A single capitalized word names something only when it is not opening a sentence
+_MID_SENTENCE = re.compile(r"[a-z0-9,;:)][ \t]+$")
+
+# Capitalized words that start sentences or headings rather than name something
+_COMMON_WORDS = {
+    "a", "an", "and", "as", "at", "by", "for", "from", "in", "it", "its", "no", "not", "of", "on", "or",
+    "our", "the", "their", "this", "to", "we", "with", "company", "overview", "section", "summary",
+    "key", "total", "series", "round", "funding", "risks", "growth", "news", "source", "not disclosed",
+}
+
+
+def numeric_facts(text: str) -> Set[str]:
+    """Numbers stated in a text, normalized ('15,000' -> '15000'); single digits are ignored"""
+    facts = {m.group().replace(",", "").rstrip(".") for m in _FACT.finditer(text)}
+    return {f for f in facts if len(f) > 1}
+
+
+def entity_facts(text: str) -> Set[str]:
+    """Capitalized names stated in a text ('Lightspeed Venture Partners', 'Claude'), common words excluded"""
+    entities = set()
+    for m in _ENTITY.finditer(text):
+        entity = m.group().removesuffix("'s")
+        words = entity.split()
+        if len(entity) <= 2 or all(w.lower() in _COMMON_WORDS for w in words):
+            continue
+        if len(words) == 1 and not _MID_SENTENCE.search(text[max(0, m.start() - 3):m.start()]):
+            continue
+        entities.add(entity)
+    return entities
+
+
+def latest_rag_dashboards(dashboard_dir: Path) -> Dict[str, Path]:
+    latest: Dict[str, Path] = {}
+    for path in sorted(dashboard_dir.glob("*_rag_*.md")):
+        company_id = path.name.split("_rag_")[0]
+        latest[company_id] = path  # names sort by timestamp
+    return latest
+
+
+def context_text(section_results: Dict[str, List[Dict]]) -> str:
+    return "\n\n".join(c["text"] for results in section_results.values() for c in results)
+
+
+def run_benchmark(chunks_path: Path, dashboard_dir: Path, k: int) -> dict:
+    index = SparseIndex.load(chunks_path)
+    dashboards = latest_rag_dashboards(dashboard_dir)
+    companies = [c for c in sorted(dashboards) if index.company_chunks(c)]
+    if not companies:
+        raise FileNotFoundError(f"No company has both a RAG dashboard in {dashboard_dir} and chunks in {chunks_path}")
+
+    rows = []
+    for company_id in companies:
+        sections = {s: index.search(company_id, q, k) for s, q in RAG_SECTION_QUERIES.items()}
+        deduped, _ = postprocess_sections(sections)
+        compressed, report = compress_sections(deduped, RAG_SECTION_QUERIES, company_id)
+
+        raw_text, compressed_text = context_text(deduped), context_text(compressed)
+        dashboard = dashboards[company_id].read_text(encoding="utf-8")
+        used = numeric_facts(dashboard) & numeric_facts(raw_text)
+        kept = used & numeric_facts(compressed_text)
+        # Matched as substrings: entity boundaries can differ between dashboard and page text
+        entities = {e for e in entity_facts(dashboard) if e in raw_text}
+        entities_kept = {e for e in entities if e in compressed_text}
+        rows.append({
+            "company_id": company_id,
+            "tokens_before": count_tokens(raw_text),
+            "tokens_after": count_tokens(compressed_text),
+            "facts": len(used),
+            "facts_kept": len(kept),
+            "entities": len(entities),
+            "entities_kept": len(entities_kept),
+            "entities_lost": sorted(entities - entities_kept),
+            "boilerplate_sentences": report.boilerplate,
+        })
+
+    before = sum(r["tokens_before"] for r in rows)
+    after = sum(r["tokens_after"] for r in rows)
+    facts = sum(r["facts"] for r in rows)
+    entities = sum(r["entities"] for r in rows)
+    return {
+        "companies": len(rows),
+        "tokens_before": before,
+        "tokens_after": after,
+        "token_ratio": round(after / before, 3) if before else 1.0,
+        "numeric_retention": round(sum(r["facts_kept"] for r in rows) / facts, 3) if facts else 1.0,
+        "entity_retention": round(sum(r["entities_kept"] for r in rows) / entities, 3) if entities else 1.0,
+        "per_company": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk compression benchmark")
+    parser.add_argument("--chunks", default=str(sparse_index_path()), help="Chunk corpus (JSONL)")
+    parser.add_argument("--dashboards", default="data/dashboards", help="Directory of generated dashboards")
+    parser.add_argument("-k", "--k", type=int, default=5, help="Chunks per section query")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON only")
+    args = parser.parse_args()
+
+    report = run_benchmark(Path(args.chunks), Path(args.dashboards), args.k)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 60)
+    print("CHUNK COMPRESSION BENCHMARK")
+    print("=" * 60)
+    for row in report["per_company"]:
+        print(f"{row['company_id']:<24} {row['tokens_before']:>7} → {row['tokens_after']:>6} tokens   "
+              f"numeric {row['facts_kept']}/{row['facts']}   entities {row['entities_kept']}/{row['entities']}")
+        if row["entities_lost"]:
+            print(f"{'':<24} lost: {', '.join(row['entities_lost'][:8])}")
+    print("-" * 60)
+    print(f"Companies:         {report['companies']}")
+    print(f"Context tokens:    {report['tokens_before']} → {report['tokens_after']} ({report['token_ratio']:.0%})")
+    print(f"Numeric retention: {report['numeric_retention']:.0%}")
+    print(f"Entity retention:  {report['entity_retention']:.0%}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: cold JSON + pydantic validation vs. validated snapshot load
+
+Times three load paths for every payload under data/payloads and prints a
+summary (or a JSON report with --json):
+- cold:          json.load + CompanyPayload(**data)
+- validate_json: CompanyPayload.model_validate_json (what the payload tool uses)
+- snapshot:      load_snapshot (no validators)
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_payload_snapshot.py
+    PYTHONPATH=. python benchmarks/bench_payload_snapshot.py --rounds 20 --json
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from src.models import CompanyPayload
+from src.tools.payload_snapshot import load_snapshot, write_snapshot
+
+
+def cold_load(payload_path: Path) -> CompanyPayload:
+    """Read JSON and run full pydantic validation"""
+    with open(payload_path, "r", encoding="utf-8") as f:
+        return CompanyPayload(**json.load(f))
+
+
+def validate_json_load(payload_path: Path) -> CompanyPayload:
+    """Parse and validate in one pydantic-core pass"""
+    with open(payload_path, "r", encoding="utf-8") as f:
+        return CompanyPayload.model_validate_json(f.read())
+
+
+def _time_pass(load, payload_paths) -> float:
+    start = time.perf_counter()
+    for path in payload_paths:
+        if load(path) is None:
+            raise RuntimeError(f"Load failed for {path.name}")
+    return time.perf_counter() - start
+
+
+def run_benchmark(payload_dir: Path, rounds: int) -> dict:
+    """Time every load path over all payloads for N rounds"""
+    payload_paths = sorted(payload_dir.glob("*.json"))
+    if not payload_paths:
+        raise FileNotFoundError(f"No payloads found in {payload_dir}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_dir = Path(tmp)
+
+        # Build snapshots once (this is what the payload tool does on a miss)
+        for path in payload_paths:
+            write_snapshot(path, cold_load(path), snapshot_dir=snapshot_dir)
+
+        def snapshot_load(path):
+            return load_snapshot(path, snapshot_dir=snapshot_dir)
+
+        timings = {"cold": [], "validate_json": [], "snapshot": []}
+        for _ in range(rounds):
+            timings["cold"].append(_time_pass(cold_load, payload_paths))
+            timings["validate_json"].append(_time_pass(validate_json_load, payload_paths))
+            timings["snapshot"].append(_time_pass(snapshot_load, payload_paths))
+
+    count = len(payload_paths)
+    medians = {name: statistics.median(values) * 1000 for name, values in timings.items()}
+
+    return {
+        "payloads": count,
+        "rounds": rounds,
+        "total_ms": {name: round(ms, 3) for name, ms in medians.items()},
+        "per_payload_ms": {name: round(ms / count, 4) for name, ms in medians.items()},
+        "snapshot_speedup_vs_cold": round(medians["cold"] / medians["snapshot"], 2),
+        "snapshot_speedup_vs_validate_json": round(medians["validate_json"] / medians["snapshot"], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Payload snapshot load benchmark")
+    parser.add_argument("--payload-dir", default="data/payloads", help="Directory of payload JSON files")
+    parser.add_argument("--rounds", type=int, default=10, help="Timed rounds over all payloads")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON only")
+    args = parser.parse_args()
+
+    report = run_benchmark(Path(args.payload_dir), args.rounds)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print("PAYLOAD LOAD BENCHMARK")
+    print(f"{'='*60}")
+    print(f"Payloads: {report['payloads']} (median of {report['rounds']} rounds)\n")
+    for name, total in report["total_ms"].items():
+        print(f"  {name:<15} {total:8.2f} ms  ({report['per_payload_ms'][name]:.4f} ms/payload)")
+    print(f"\nSnapshot speedup vs cold:          {report['snapshot_speedup_vs_cold']}x")
+    print(f"Snapshot speedup vs validate_json: {report['snapshot_speedup_vs_validate_json']}x")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Benchmark: end-to-end pipeline cost against in-process fakes
+
+Runs rag_search_company, the MCP tools (in-process over ASGI) and the full
+run_workflow graph with OpenAI and Pinecone replaced by the fakes in
+benchmarks/fakes.py, so what is measured is the pipeline's own overhead
+plus the configured service latency profile.
+
+Reports (JSON with --json / --output, for diffing between versions):
+- rag_search:   per-call latency
+- mcp_tools:    per-tool latency
+- workflow:     per-node latency and per-company wall time
+- concurrency:  workflow throughput at 1 / 4 / 16 concurrent companies
+- peak_rss_mb:  peak resident set size of the benchmark process
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_pipeline.py
+    PYTHONPATH=. python benchmarks/bench_pipeline.py --companies 16 --llm-latency-ms 400 --json
+    PYTHONPATH=. python benchmarks/bench_pipeline.py --output bench_output.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+from unittest.mock import patch
+
+# The dashboard generator builds its OpenAI client at import time
+os.environ.setdefault("OPENAI_API_KEY", "fake-openai-key")
+os.environ.setdefault("PINECONE_API_KEY", "fake-pinecone-key")
+os.environ["HITL_AUTO_APPROVE"] = "true"
+
+import httpx
+
+from fakes import FakeServiceConfig, install_fakes
+from src.agents.mcp_client import MCPClient
+from src.server.mcp_server import app
+from src.tools.payload_catalog import discover_payload_files
+from src.tools.rag_tool import rag_search_company
+from src.workflows import due_diligence_graph
+
+WORKFLOW_NODES = (
+    "planner_node",
+    "risk_triage_node",
+    "data_generator_node",
+    "evaluator_node",
+    "risk_detector_node",
+    "hitl_node",
+    "auto_approve_node",
+    "final_decision_node",
+)
+
+RAG_QUERIES = (
+    "company overview founding mission vision description headquarters",
+    "funding rounds investors venture capital series A B C valuation",
+    "layoffs challenges issues controversies problems concerns",
+)
+
+
+# ============================================================================
+# Measurement helpers
+# ============================================================================
+
+def latency_stats(samples_s: List[float]) -> dict:
+    """Summary statistics (milliseconds) for a list of durations in seconds"""
+    if not samples_s:
+        return {"count": 0}
+    ms = sorted(s * 1000 for s in samples_s)
+
+    def pct(p):
+        return ms[min(int(round(p / 100 * (len(ms) - 1))), len(ms) - 1)]
+
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(pct(50), 3),
+        "p95_ms": round(pct(95), 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux but bytes on macOS
+    return round((peak if sys.platform == "darwin" else peak * 1024) / 2**20, 1)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+class NodeTimer:
+    """Wraps the workflow node functions to record per-node durations"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        def timed(state):
+            start = time.perf_counter()
+            try:
+                return fn(state)
+            finally:
+                with self._lock:
+                    self.samples[name.replace("_node", "")].append(time.perf_counter() - start)
+        return timed
+
+    @contextlib.contextmanager
+    def installed(self):
+        # Nodes are looked up when the graph is built, so module patches apply
+        with contextlib.ExitStack() as stack:
+            for name in WORKFLOW_NODES:
+                original = getattr(due_diligence_graph, name)
+                stack.enter_context(patch.object(due_diligence_graph, name, self.wrap(name, original)))
+            yield self
+
+
+def in_process_mcp_client() -> MCPClient:
+    """MCP client that calls the FastAPI app over ASGI (no sockets)"""
+    return MCPClient(transport=httpx.ASGITransport(app=app))
+
+
+# ============================================================================
+# Benchmarks
+# ============================================================================
+
+async def bench_rag_search(company_ids: List[str]) -> dict:
+    samples = []
+    for company_id in company_ids:
+        for query in RAG_QUERIES:
+            start = time.perf_counter()
+            await rag_search_company(company_id, query, k=5)
+            samples.append(time.perf_counter() - start)
+    return latency_stats(samples)
+
+
+async def bench_mcp_tools(company_ids: List[str]) -> dict:
+    client = in_process_mcp_client()
+    calls = {
+        "generate_structured_dashboard": lambda cid: {"company_id": cid},
+        "generate_structured_dashboard[sectioned]": lambda cid: {"company_id": cid, "mode": "sectioned"},
+        "generate_structured_dashboard[template]": lambda cid: {"company_id": cid, "mode": "template"},
+        "generate_rag_dashboard": lambda cid: {"company_id": cid},
+    }
+    results = {}
+    for label, params in calls.items():
+        tool = label.split("[")[0]
+        samples = []
+        for company_id in company_ids:
+            start = time.perf_counter()
+            await client.call_tool(tool, params(company_id))
+            samples.append(time.perf_counter() - start)
+        results[label] = latency_stats(samples)
+    return results
+
+
+def run_company(company_id: str) -> float:
+    start = time.perf_counter()
+    due_diligence_graph.run_workflow(company_id)
+    return time.perf_counter() - start
+
+
+def bench_workflow(company_ids: List[str], levels: List[int]) -> dict:
+    timer = NodeTimer()
+    per_company = {}
+    concurrency = {}
+
+    with timer.installed():
+        # Sequential pass: per-node latency and per-company wall time
+        for company_id in company_ids:
+            per_company[company_id] = round(run_company(company_id) * 1000, 3)
+        node_stats = {name: latency_stats(samples) for name, samples in timer.samples.items()}
+
+        for level in levels:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as pool:
+                durations = list(pool.map(run_company, company_ids))
+            wall = time.perf_counter() - start
+            concurrency[str(level)] = {
+                "companies": len(company_ids),
+                "wall_s": round(wall, 4),
+                "companies_per_s": round(len(company_ids) / wall, 3),
+                "company_latency": latency_stats(durations),
+            }
+
+    return {
+        "per_node": node_stats,
+        "per_company_ms": per_company,
+        "company_wall": latency_stats([ms / 1000 for ms in per_company.values()]),
+        "concurrency": concurrency,
+    }
+
+
+def run_suite(args) -> dict:
+    config = FakeServiceConfig(
+        llm_latency_ms=args.llm_latency_ms,
+        llm_jitter_ms=args.llm_jitter_ms,
+        llm_tokens_per_sec=args.llm_tokens_per_sec,
+        completion_tokens=args.completion_tokens,
+        embedding_latency_ms=args.embedding_latency_ms,
+        vector_latency_ms=args.vector_latency_ms,
+        seed=args.seed,
+    )
+    company_ids = sorted(discover_payload_files(Path(args.payload_dir)))[:args.companies]
+    if not company_ids:
+        raise FileNotFoundError(f"No payloads found in {args.payload_dir}")
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as dashboards_dir, \
+            patch.dict(os.environ, {"DASHBOARDS_DIR": dashboards_dir}), \
+            install_fakes(config), \
+            patch.object(due_diligence_graph, "get_mcp_client", in_process_mcp_client), \
+            contextlib.redirect_stdout(io.StringIO()):
+        rag = asyncio.run(bench_rag_search(company_ids))
+        tools = asyncio.run(bench_mcp_tools(company_ids))
+        workflow = bench_workflow(company_ids, levels)
+
+    return {
+        "benchmark": "pipeline",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "companies": company_ids,
+        "fake_services": config.model_dump(),
+        "rag_search": rag,
+        "mcp_tools": tools,
+        "workflow": {k: v for k, v in workflow.items() if k != "concurrency"},
+        "concurrency": workflow["concurrency"],
+        "peak_rss_mb": peak_rss_mb(),
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark with fake OpenAI / Pinecone")
+    parser.add_argument("--payload-dir", default="data/payloads", help="Directory of payload JSON files")
+    parser.add_argument("--companies", type=int, default=8, help="Number of companies to run")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated workflow concurrency levels")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Fake LLM latency (mean)")
+    parser.add_argument("--llm-jitter-ms", type=float, default=10.0, help="Fake LLM latency jitter (+/-)")
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=5000.0, help="Fake LLM generation throughput")
+    parser.add_argument("--completion-tokens", type=int, default=600, help="Tokens per fake completion")
+    parser.add_argument("--embedding-latency-ms", type=float, default=5.0, help="Fake embedding latency (mean)")
+    parser.add_argument("--vector-latency-ms", type=float, default=8.0, help="Fake Pinecone query latency (mean)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for jitter and canned content")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON only")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print(f"PIPELINE BENCHMARK ({report['revision']}, {len(report['companies'])} companies)")
+    print(f"{'='*60}")
+    print(f"rag_search_company      p50 {report['rag_search']['p50_ms']:8.2f} ms   "
+          f"p95 {report['rag_search']['p95_ms']:8.2f} ms")
+    for tool, stats in report["mcp_tools"].items():
+        print(f"{tool:<40} p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms")
+    print("\nWorkflow nodes:")
+    for node, stats in report["workflow"]["per_node"].items():
+        print(f"  {node:<20} p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms   n={stats['count']}")
+    print(f"\nPer-company wall time: p50 {report['workflow']['company_wall']['p50_ms']:.1f} ms")
+    print("\nConcurrency:")
+    for level, stats in report["concurrency"].items():
+        print(f"  c={level:<3} {stats['companies_per_s']:8.2f} companies/s   wall {stats['wall_s']:.2f} s")
+    print(f"\nPeak RSS: {report['peak_rss_mb']} MB   Total: {report['total_seconds']} s")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
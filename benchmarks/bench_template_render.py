@@ -0,0 +1,77 @@
+"""
+Benchmark: deterministic template rendering of structured dashboards
+
+Renders the structured dashboard for every payload under data/payloads with
+the template renderer (no LLM) and reports load and render time (or a JSON
+report with --json).
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_template_render.py
+    PYTHONPATH=. python benchmarks/bench_template_render.py --rounds 20 --json
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from src.tools.payload_catalog import build_payload_catalog
+from src.utils.template_renderer import render_template_dashboard
+
+
+def run_benchmark(payload_dir: str, rounds: int) -> dict:
+    """Load every payload once, then time N render passes over all of them"""
+    start = time.perf_counter()
+    catalog = build_payload_catalog(payload_dir, mode="eager")
+    load_ms = (time.perf_counter() - start) * 1000
+
+    payloads = [catalog.get(company_id) for company_id in catalog.company_ids()]
+    if not payloads:
+        raise FileNotFoundError(f"No payloads found in {payload_dir}")
+
+    timings = []
+    chars = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        dashboards = [render_template_dashboard(payload) for payload in payloads]
+        timings.append(time.perf_counter() - start)
+        chars = sum(len(d) for d in dashboards)
+
+    render_ms = statistics.median(timings) * 1000
+    return {
+        "dashboards": len(payloads),
+        "rounds": rounds,
+        "load_ms": round(load_ms, 3),
+        "render_total_ms": round(render_ms, 3),
+        "render_per_dashboard_ms": round(render_ms / len(payloads), 4),
+        "end_to_end_ms": round(load_ms + render_ms, 3),
+        "output_chars": chars,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Template dashboard render benchmark")
+    parser.add_argument("--payload-dir", default="data/payloads", help="Directory of payload JSON files")
+    parser.add_argument("--rounds", type=int, default=10, help="Timed render passes over all payloads")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON only")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.payload_dir, args.rounds)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print("TEMPLATE DASHBOARD BENCHMARK")
+    print(f"{'='*60}")
+    print(f"Dashboards:      {report['dashboards']} (median of {report['rounds']} rounds)")
+    print(f"Payload load:    {report['load_ms']:8.2f} ms")
+    print(f"Render (all):    {report['render_total_ms']:8.2f} ms  "
+          f"({report['render_per_dashboard_ms']:.4f} ms/dashboard)")
+    print(f"End to end:      {report['end_to_end_ms']:8.2f} ms")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
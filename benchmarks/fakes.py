@@ -0,0 +1,231 @@
+"""
+In-process OpenAI and Pinecone stand-ins for benchmarks
+
+Drop-in fakes for the client surface the pipeline uses:
+- OpenAI: chat.completions.create(...) and embeddings.create(...)
+- Pinecone: Pinecone(api_key).Index(name).query(vector, top_k, filter, ...)
+
+Every call sleeps for a configurable latency (mean + uniform jitter) plus,
+for chat completions, completion_tokens / tokens_per_sec of "generation"
+time, then returns deterministic canned content seeded from the request.
+
+    with install_fakes(FakeServiceConfig(llm_latency_ms=200)):
+        run_workflow("anthropic")
+"""
+
+import hashlib
+import os
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.utils.context_builder import count_tokens
+from src.utils.template_renderer import PE_DASHBOARD_SECTIONS
+
+PAGE_TYPES = ("homepage", "about", "blog", "careers", "news", "product")
+
+_FILLER_WORDS = (
+    "platform customers enterprise growth model revenue team product market "
+    "investors funding expansion partnership launch research safety scale "
+    "adoption pricing developers infrastructure strategy roadmap hiring"
+).split()
+
+
+class FakeServiceConfig(BaseModel):
+    """Latency / throughput profile of the fake remote services"""
+    llm_latency_ms: float = Field(50.0, description="Chat completion time-to-first-token (mean)")
+    llm_jitter_ms: float = Field(10.0, description="Uniform +/- jitter on LLM latency")
+    llm_tokens_per_sec: float = Field(5000.0, description="Chat completion generation throughput")
+    completion_tokens: int = Field(600, description="Tokens in each canned completion")
+    embedding_latency_ms: float = Field(5.0, description="Embedding request latency (mean)")
+    embedding_jitter_ms: float = Field(1.0, description="Uniform +/- jitter on embedding latency")
+    embedding_dim: int = Field(1536, description="Embedding vector size")
+    vector_latency_ms: float = Field(8.0, description="Pinecone query latency (mean)")
+    vector_jitter_ms: float = Field(2.0, description="Uniform +/- jitter on query latency")
+    chunk_tokens: int = Field(120, description="Approximate tokens per canned retrieved chunk")
+    seed: int = Field(0, description="Seed for jitter and canned content")
+
+
+# ============================================================================
+# Helpers
+# ============================================================================
+
+def _seed_for(*parts) -> int:
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+class _Jitter:
+    """Thread-safe seeded latency sampler"""
+
+    def __init__(self, seed: int):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self, mean_ms: float, jitter_ms: float, extra_s: float = 0.0) -> float:
+        with self._lock:
+            delay = max(mean_ms + self._rng.uniform(-jitter_ms, jitter_ms), 0.0) / 1000 + extra_s
+        time.sleep(delay)
+        return delay
+
+
+def canned_text(seed: int, tokens: int, lead: str = "") -> str:
+    """Deterministic filler text of roughly `tokens` tokens"""
+    rng = random.Random(seed)
+    words = [rng.choice(_FILLER_WORDS) for _ in range(max(int(tokens * 0.75), 1))]
+    return f"{lead} {' '.join(words)}".strip() + "."
+
+
+def canned_dashboard(company: str, tokens: int, seed: int) -> str:
+    """Deterministic 8-section dashboard of roughly `tokens` tokens"""
+    per_section = max(tokens // len(PE_DASHBOARD_SECTIONS), 8)
+    sections = [
+        f"## {section}\n{canned_text(_seed_for(seed, section), per_section)}"
+        for section in PE_DASHBOARD_SECTIONS
+    ]
+    return f"# {company} - PE Due Diligence Dashboard\n\n" + "\n\n".join(sections)
+
+
+# ============================================================================
+# Fake OpenAI
+# ============================================================================
+
+class _FakeChatCompletions:
+    def __init__(self, config: FakeServiceConfig, jitter: _Jitter):
+        self._config = config
+        self._jitter = jitter
+
+    def create(self, model: str, messages: List[Dict], max_tokens: Optional[int] = None, **kwargs):
+        prompt = "\n".join(m.get("content") or "" for m in messages)
+        completion_tokens = min(self._config.completion_tokens, max_tokens or self._config.completion_tokens)
+
+        generation_s = completion_tokens / self._config.llm_tokens_per_sec
+        self._jitter.sleep(self._config.llm_latency_ms, self._config.llm_jitter_ms, generation_s)
+
+        seed = _seed_for(self._config.seed, model, prompt[:200])
+        content = canned_dashboard("Company", completion_tokens, seed)
+        return SimpleNamespace(
+            id=f"chatcmpl-fake-{seed % 10**8}",
+            model=model,
+            choices=[SimpleNamespace(
+                index=0,
+                finish_reason="stop",
+                message=SimpleNamespace(role="assistant", content=content)
+            )],
+            usage=SimpleNamespace(
+                prompt_tokens=count_tokens(prompt, model),
+                completion_tokens=completion_tokens,
+                total_tokens=count_tokens(prompt, model) + completion_tokens
+            )
+        )
+
+
+class _FakeEmbeddings:
+    def __init__(self, config: FakeServiceConfig, jitter: _Jitter):
+        self._config = config
+        self._jitter = jitter
+
+    def create(self, model: str, input, **kwargs):
+        self._jitter.sleep(self._config.embedding_latency_ms, self._config.embedding_jitter_ms)
+        inputs = [input] if isinstance(input, str) else list(input)
+        data = []
+        for i, text in enumerate(inputs):
+            rng = random.Random(_seed_for(self._config.seed, model, text))
+            data.append(SimpleNamespace(index=i, embedding=[rng.uniform(-1, 1) for _ in range(self._config.embedding_dim)]))
+        tokens = sum(count_tokens(text) for text in inputs)
+        return SimpleNamespace(data=data, model=model, usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens))
+
+
+class FakeOpenAI:
+    """Stand-in for openai.OpenAI"""
+
+    def __init__(self, config: Optional[FakeServiceConfig] = None, jitter: Optional[_Jitter] = None, **kwargs):
+        config = config or FakeServiceConfig()
+        jitter = jitter or _Jitter(config.seed)
+        self.chat = SimpleNamespace(completions=_FakeChatCompletions(config, jitter))
+        self.embeddings = _FakeEmbeddings(config, jitter)
+
+
+# ============================================================================
+# Fake Pinecone
+# ============================================================================
+
+class FakeIndex:
+    """Stand-in for a Pinecone index handle"""
+
+    def __init__(self, name: str, config: FakeServiceConfig, jitter: _Jitter):
+        self.name = name
+        self._config = config
+        self._jitter = jitter
+
+    def query(self, vector=None, top_k: int = 5, filter: Optional[Dict] = None, include_metadata: bool = True, **kwargs):
+        self._jitter.sleep(self._config.vector_latency_ms, self._config.vector_jitter_ms)
+        company_id = (filter or {}).get("company_id", "unknown")
+        seed = _seed_for(self._config.seed, company_id, round(vector[0], 6) if vector else 0)
+
+        matches = []
+        for rank in range(top_k):
+            page_type = PAGE_TYPES[(seed + rank) % len(PAGE_TYPES)]
+            matches.append({
+                "id": f"{company_id}-{seed % 10**6}-{rank}",
+                "score": round(0.92 - rank * 0.04, 4),
+                "metadata": {
+                    "company_id": company_id,
+                    "page_type": page_type,
+                    "source_file": f"https://{company_id}.com/{page_type}",
+                    "token_count": self._config.chunk_tokens,
+                    "text": canned_text(seed + rank, self._config.chunk_tokens, lead=f"{company_id} {page_type}:"),
+                },
+            })
+        return {"matches": matches, "namespace": ""}
+
+
+class FakePinecone:
+    """Stand-in for pinecone.Pinecone"""
+
+    def __init__(self, config: Optional[FakeServiceConfig] = None, jitter: Optional[_Jitter] = None, **kwargs):
+        self._config = config or FakeServiceConfig()
+        self._jitter = jitter or _Jitter(self._config.seed)
+
+    def Index(self, name: str, **kwargs) -> FakeIndex:
+        return FakeIndex(name, self._config, self._jitter)
+
+
+# ============================================================================
+# Installation
+# ============================================================================
+
+@contextmanager
+def install_fakes(config: Optional[FakeServiceConfig] = None):
+    """
+    Patch the pipeline's OpenAI / Pinecone clients with fakes
+
+    Patches the client classes used by rag_tool and the module-level client
+    used by dashboard_generator, and sets placeholder API keys so the real
+    code paths (key checks included) run unchanged.
+    """
+    from unittest.mock import patch
+
+    config = config or FakeServiceConfig()
+    jitter = _Jitter(config.seed)
+
+    def openai_factory(*args, **kwargs):
+        return FakeOpenAI(config, jitter)
+
+    def pinecone_factory(*args, **kwargs):
+        return FakePinecone(config, jitter)
+
+    with ExitStack() as stack:
+        stack.enter_context(patch.dict(os.environ, {
+            "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "fake-openai-key",
+            "PINECONE_API_KEY": os.getenv("PINECONE_API_KEY") or "fake-pinecone-key",
+        }))
+        stack.enter_context(patch("src.tools.rag_tool.OpenAI", openai_factory))
+        stack.enter_context(patch("src.tools.rag_tool.Pinecone", pinecone_factory))
+        stack.enter_context(patch("src.utils.dashboard_generator.openai_client", FakeOpenAI(config, jitter)))
+        yield config
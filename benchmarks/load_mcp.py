@@ -0,0 +1,265 @@
+"""
+Open-loop load generator for the MCP server
+
+Sends requests to every tool, resource and prompt endpoint at a target
+arrival rate (Poisson or constant), independent of how fast responses come
+back - a slow server gets a growing backlog instead of a politely reduced
+request rate. Latency is measured from each request's scheduled send time,
+so queueing inside the client is counted (no coordinated omission).
+
+/health is polled throughout the run to record the server's event-loop lag
+(see src/server/loop_monitor.py), which shows whether blocking work in async
+endpoints is starving other requests.
+
+Report (JSON with --json / --output): per-endpoint count, error rate,
+throughput and p50/p95/p99/max latency, plus event-loop lag samples.
+
+Usage:
+    # Against a running server (e.g. backed by benchmarks/standin_server.py)
+    PYTHONPATH=. python benchmarks/load_mcp.py --base-url http://localhost:9000 --rps 20 --duration 30
+
+    # In-process over ASGI with the fake OpenAI / Pinecone clients
+    PYTHONPATH=. python benchmarks/load_mcp.py --in-process --rps 20 --duration 10 --json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+# Default endpoint mix: (name, method, path, json body factory key, weight)
+ENDPOINT_MIX = {
+    "GET /": ("GET", "/", None, 1),
+    "GET /resource/ai50/companies": ("GET", "/resource/ai50/companies", None, 2),
+    "GET /prompt/pe-dashboard": ("GET", "/prompt/pe-dashboard", None, 2),
+    "POST /tool/generate_structured_dashboard": ("POST", "/tool/generate_structured_dashboard", "llm", 3),
+    "POST /tool/generate_structured_dashboard[template]": ("POST", "/tool/generate_structured_dashboard", "template", 3),
+    "POST /tool/generate_rag_dashboard": ("POST", "/tool/generate_rag_dashboard", "rag", 2),
+}
+
+
+def percentile(sorted_ms: List[float], p: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    return sorted_ms[min(int(round(p / 100 * (len(sorted_ms) - 1))), len(sorted_ms) - 1)]
+
+
+class LoadResult:
+    """Collects per-endpoint outcomes"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.dropped = 0
+        self.lag_samples: List[dict] = []
+
+    def record(self, endpoint: str, latency_s: float, status: str, ok: bool):
+        self.latencies[endpoint].append(latency_s * 1000)
+        self.statuses[endpoint][status] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def report(self, duration_s: float) -> dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            ms = sorted(samples)
+            endpoints[endpoint] = {
+                "requests": len(ms),
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / len(ms), 4),
+                "throughput_rps": round(len(ms) / duration_s, 3),
+                "p50_ms": round(percentile(ms, 50), 2),
+                "p95_ms": round(percentile(ms, 95), 2),
+                "p99_ms": round(percentile(ms, 99), 2),
+                "max_ms": round(ms[-1], 2),
+                "statuses": dict(self.statuses[endpoint]),
+            }
+
+        lag_p99 = [s["p99_ms"] for s in self.lag_samples if "p99_ms" in s]
+        lag_max = [s["max_window_ms"] for s in self.lag_samples if "max_window_ms" in s]
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "endpoints": endpoints,
+            "totals": {
+                "requests": total,
+                "errors": sum(self.errors.values()),
+                "dropped": self.dropped,
+                "throughput_rps": round(total / duration_s, 3),
+            },
+            "event_loop_lag": {
+                "polls": len(self.lag_samples),
+                "worst_p99_ms": max(lag_p99) if lag_p99 else None,
+                "worst_max_ms": max(lag_max) if lag_max else None,
+                "samples": self.lag_samples,
+            },
+        }
+
+
+async def fire(client: httpx.AsyncClient, endpoint: str, spec: Tuple, company_ids: List[str],
+               scheduled: float, result: LoadResult, rng: random.Random, timeout: float):
+    method, path, body_kind, _ = spec
+    body = None
+    if body_kind:
+        body = {"company_id": rng.choice(company_ids)}
+        if body_kind in ("llm", "template"):
+            body["mode"] = body_kind
+
+    try:
+        response = await client.request(method, path, json=body, timeout=timeout)
+        ok = response.status_code < 400
+        status = str(response.status_code)
+    except Exception as e:
+        ok, status = False, type(e).__name__
+
+    # Latency from the scheduled send time, not the actual one
+    result.record(endpoint, time.perf_counter() - scheduled, status, ok)
+
+
+async def poll_health(client: httpx.AsyncClient, result: LoadResult, stop: asyncio.Event, interval_s: float):
+    start = time.perf_counter()
+    while not stop.is_set():
+        sent = time.perf_counter()
+        try:
+            response = await client.get("/health", timeout=30)
+            lag = response.json().get("event_loop_lag", {})
+            result.lag_samples.append({
+                "t_s": round(sent - start, 2),
+                "health_ms": round((time.perf_counter() - sent) * 1000, 2),
+                **{k: v for k, v in lag.items() if k in ("p99_ms", "max_window_ms", "last_ms")},
+            })
+        except Exception as e:
+            result.lag_samples.append({"t_s": round(sent - start, 2), "error": type(e).__name__})
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), timeout=interval_s)
+
+
+async def run_load(client: httpx.AsyncClient, rps: float, duration_s: float, mix: Dict[str, Tuple],
+                   arrival: str = "poisson", max_in_flight: int = 1000, seed: int = 0,
+                   timeout: float = 120.0, health_interval_s: float = 0.5) -> dict:
+    """
+    Drive the endpoint mix open-loop at `rps` for `duration_s` seconds
+
+    Arrivals beyond `max_in_flight` outstanding requests are counted as
+    dropped rather than delayed, so the offered rate stays fixed.
+    """
+    rng = random.Random(seed)
+    result = LoadResult()
+
+    companies = (await client.get("/resource/ai50/companies", timeout=timeout)).json()["company_ids"]
+    names = list(mix)
+    weights = [mix[name][3] for name in names]
+
+    stop = asyncio.Event()
+    poller = asyncio.create_task(poll_health(client, result, stop, health_interval_s))
+    tasks = set()
+
+    start = time.perf_counter()
+    next_at = start
+    while next_at < start + duration_s:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if len(tasks) >= max_in_flight:
+            result.dropped += 1
+        else:
+            endpoint = rng.choices(names, weights)[0]
+            task = asyncio.create_task(fire(client, endpoint, mix[endpoint], companies, next_at, result, rng, timeout))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        next_at += rng.expovariate(rps) if arrival == "poisson" else 1.0 / rps
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await poller
+
+    report = result.report(elapsed)
+    report["config"] = {"target_rps": rps, "duration_s": duration_s, "arrival": arrival,
+                        "max_in_flight": max_in_flight, "seed": seed}
+    report["elapsed_s"] = round(elapsed, 3)
+    return report
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+async def main_async(args) -> dict:
+    mix = {name: spec for name, spec in ENDPOINT_MIX.items()
+           if not args.endpoints or any(e in name for e in args.endpoints.split(","))}
+
+    if not args.in_process:
+        limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits) as client:
+            return await run_load(client, args.rps, args.duration, mix, args.arrival,
+                                  args.max_in_flight, args.seed, args.timeout)
+
+    # In-process: real MCP app over ASGI with the fake OpenAI / Pinecone clients
+    from fakes import FakeServiceConfig, install_fakes
+    from src.server.mcp_server import app, loop_monitor
+
+    config = FakeServiceConfig(llm_latency_ms=args.fake_llm_latency_ms)
+    with install_fakes(config), contextlib.redirect_stdout(io.StringIO()):
+        loop_monitor.start()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://mcp") as client:
+                return await run_load(client, args.rps, args.duration, mix, args.arrival,
+                                      args.max_in_flight, args.seed, args.timeout)
+        finally:
+            await loop_monitor.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the MCP server")
+    parser.add_argument("--base-url", default=os.getenv("MCP_BASE_URL", "http://localhost:9000"))
+    parser.add_argument("--in-process", action="store_true", help="Drive the app over ASGI with fake services")
+    parser.add_argument("--rps", type=float, default=10.0, help="Target arrival rate (requests/second)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of arrivals")
+    parser.add_argument("--arrival", choices=["poisson", "constant"], default="poisson")
+    parser.add_argument("--endpoints", default="", help="Comma-separated substrings to filter the endpoint mix")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Outstanding request cap (excess is dropped)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout (seconds)")
+    parser.add_argument("--fake-llm-latency-ms", type=float, default=200.0, help="Fake LLM latency for --in-process")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON only")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "fake-openai-key")
+    report = asyncio.run(main_async(args))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\n{'='*96}")
+    print(f"MCP LOAD TEST  target {args.rps} rps ({args.arrival}) for {args.duration}s  "
+          f"→ {report['totals']['throughput_rps']} rps achieved, {report['totals']['dropped']} dropped")
+    print(f"{'='*96}")
+    print(f"{'endpoint':<52}{'n':>6}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<52}{stats['requests']:>6}{stats['error_rate'] * 100:>7.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}")
+    lag = report["event_loop_lag"]
+    print(f"\nEvent-loop lag: worst p99 {lag['worst_p99_ms']} ms, worst max {lag['worst_max_ms']} ms "
+          f"over {lag['polls']} /health polls")
+    print(f"{'='*96}\n")
+
+
+if __name__ == "__main__":
+    main()
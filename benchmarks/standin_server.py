@@ -0,0 +1,322 @@
+"""
+Local OpenAI- and Pinecone-compatible stand-in server for load testing
+
+Speaks enough of the HTTP APIs used by dashboard_generator and rag_tool for
+the real SDK clients (including their retry logic) to run against it:
+- POST /v1/chat/completions   (JSON or SSE streaming with "stream": true)
+- POST /v1/embeddings
+- POST /query                 (Pinecone data-plane index query)
+
+Behaviour is scripted, not random:
+- latency per endpoint from a fixed / uniform / normal / lognormal profile
+- chat generation time from completion tokens / tokens-per-second
+- 429 injection (every Nth request and/or a probability) with retry-after
+- deterministic canned content (same request -> same response)
+
+Control endpoints: GET /_stats (request / 429 counters), GET|PUT /_config.
+
+Usage:
+    PYTHONPATH=. python benchmarks/standin_server.py --port 9100 --llm-p50-ms 600 --rate-limit-every 20
+
+    export OPENAI_BASE_URL=http://localhost:9100/v1
+    export PINECONE_INDEX_HOST=http://localhost:9100
+    export OPENAI_API_KEY=standin PINECONE_API_KEY=standin
+    python src/server/mcp_server.py
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from typing import Literal
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from fakes import PAGE_TYPES, _seed_for, canned_dashboard, canned_text
+from src.utils.context_builder import count_tokens
+
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+class LatencyProfile(BaseModel):
+    """Latency distribution for one endpoint"""
+    distribution: Literal["fixed", "uniform", "normal", "lognormal"] = Field("lognormal", description="Shape")
+    p50_ms: float = Field(..., description="Median latency")
+    spread_ms: float = Field(0.0, description="Jitter: uniform half-width, normal stddev, or lognormal p50→p84 gap")
+
+    def sample(self, rng: random.Random) -> float:
+        """Sample a latency in seconds"""
+        if self.distribution == "fixed" or self.spread_ms <= 0:
+            ms = self.p50_ms
+        elif self.distribution == "uniform":
+            ms = rng.uniform(self.p50_ms - self.spread_ms, self.p50_ms + self.spread_ms)
+        elif self.distribution == "normal":
+            ms = rng.gauss(self.p50_ms, self.spread_ms)
+        else:
+            sigma = math.log1p(self.spread_ms / max(self.p50_ms, 1e-9))
+            ms = rng.lognormvariate(math.log(max(self.p50_ms, 1e-9)), sigma)
+        return max(ms, 0.0) / 1000
+
+
+class StandInConfig(BaseModel):
+    """Scripted behaviour of the stand-in server"""
+    chat_latency: LatencyProfile = Field(default_factory=lambda: LatencyProfile(p50_ms=400, spread_ms=150))
+    embedding_latency: LatencyProfile = Field(default_factory=lambda: LatencyProfile(p50_ms=40, spread_ms=15))
+    query_latency: LatencyProfile = Field(default_factory=lambda: LatencyProfile(p50_ms=30, spread_ms=10))
+    tokens_per_sec: float = Field(120.0, description="Chat generation throughput")
+    completion_tokens: int = Field(700, description="Tokens per canned completion (capped by max_tokens)")
+    stream_chunk_tokens: int = Field(8, description="Tokens per streamed chunk")
+    embedding_dim: int = Field(1536, description="Embedding vector size")
+    chunk_tokens: int = Field(120, description="Approximate tokens per canned retrieved chunk")
+    rate_limit_every: int = Field(0, description="Return 429 on every Nth request per endpoint (0 = off)")
+    rate_limit_probability: float = Field(0.0, description="Probability of a 429 on any request")
+    retry_after_s: float = Field(1.0, description="retry-after header value on 429 responses")
+    seed: int = Field(0, description="Seed for latency sampling, 429 draws and canned content")
+
+
+app = FastAPI(title="OpenAI / Pinecone stand-in", version="1.0.0")
+
+_config = StandInConfig()
+_rng = random.Random(_config.seed)
+_lock = threading.Lock()
+_requests: Counter = Counter()
+_rate_limited: Counter = Counter()
+
+
+def configure(config: StandInConfig) -> None:
+    """Replace the server config and reset counters and the RNG"""
+    global _config, _rng
+    with _lock:
+        _config = config
+        _rng = random.Random(config.seed)
+        _requests.clear()
+        _rate_limited.clear()
+
+
+def _draw(endpoint: str, profile: LatencyProfile):
+    """Count the request and return (latency_s, rate_limited)"""
+    with _lock:
+        _requests[endpoint] += 1
+        latency = profile.sample(_rng)
+        limited = (
+            (_config.rate_limit_every and _requests[endpoint] % _config.rate_limit_every == 0)
+            or _rng.random() < _config.rate_limit_probability
+        )
+        if limited:
+            _rate_limited[endpoint] += 1
+    return latency, bool(limited)
+
+
+def _rate_limit_response(kind: str) -> JSONResponse:
+    headers = {"retry-after": f"{_config.retry_after_s:g}", "x-ratelimit-remaining-requests": "0"}
+    if kind == "pinecone":
+        body = {"error": {"code": "RESOURCE_EXHAUSTED", "message": "Request rate limit exceeded (stand-in)"}, "status": 429}
+    else:
+        body = {"error": {"message": "Rate limit reached (stand-in)", "type": "requests",
+                          "param": None, "code": "rate_limit_exceeded"}}
+    return JSONResponse(status_code=429, content=body, headers=headers)
+
+
+# ============================================================================
+# OpenAI-compatible endpoints
+# ============================================================================
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "gpt-4o-mini")
+    messages = body.get("messages", [])
+    prompt = "\n".join(str(m.get("content") or "") for m in messages)
+
+    latency, limited = _draw("chat", _config.chat_latency)
+    await asyncio.sleep(latency)
+    if limited:
+        return _rate_limit_response("openai")
+
+    completion_tokens = min(_config.completion_tokens, body.get("max_tokens") or _config.completion_tokens)
+    seed = _seed_for(_config.seed, model, prompt[:200])
+    content = canned_dashboard("Company", completion_tokens, seed)
+    prompt_tokens = count_tokens(prompt, model)
+    completion_id = f"chatcmpl-standin-{seed % 10**10}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(completion_tokens / _config.tokens_per_sec)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+    async def events():
+        words = content.split(" ")
+        step = max(int(_config.stream_chunk_tokens * 0.75), 1)
+        delay = _config.stream_chunk_tokens / _config.tokens_per_sec
+
+        def chunk(delta, finish_reason=None, usage=None):
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else [],
+                       "usage": usage}
+            return f"data: {json.dumps(payload)}\n\n"
+
+        yield chunk({"role": "assistant", "content": ""})
+        for start in range(0, len(words), step):
+            await asyncio.sleep(delay)
+            text = " ".join(words[start:start + step])
+            yield chunk({"content": text if start == 0 else f" {text}"})
+        yield chunk({}, finish_reason="stop")
+        if include_usage:
+            yield chunk({}, usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                                   "total_tokens": prompt_tokens + completion_tokens})
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    model = body.get("model", "text-embedding-3-small")
+    inputs = body.get("input", "")
+    inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+
+    latency, limited = _draw("embeddings", _config.embedding_latency)
+    await asyncio.sleep(latency)
+    if limited:
+        return _rate_limit_response("openai")
+
+    data = []
+    for i, text in enumerate(inputs):
+        rng = random.Random(_seed_for(_config.seed, model, text))
+        data.append({"object": "embedding", "index": i,
+                     "embedding": [round(rng.uniform(-1, 1), 6) for _ in range(_config.embedding_dim)]})
+    tokens = sum(count_tokens(str(text)) for text in inputs)
+    return {"object": "list", "data": data, "model": model,
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+
+# ============================================================================
+# Pinecone-compatible endpoint
+# ============================================================================
+
+@app.post("/query")
+async def query(request: Request):
+    body = await request.json()
+    top_k = int(body.get("topK", 5))
+    company_id = (body.get("filter") or {}).get("company_id", "unknown")
+    if isinstance(company_id, dict):
+        company_id = company_id.get("$eq", "unknown")
+    vector = body.get("vector") or [0.0]
+
+    latency, limited = _draw("query", _config.query_latency)
+    await asyncio.sleep(latency)
+    if limited:
+        return _rate_limit_response("pinecone")
+
+    seed = _seed_for(_config.seed, company_id, round(vector[0], 6))
+    matches = []
+    for rank in range(top_k):
+        page_type = PAGE_TYPES[(seed + rank) % len(PAGE_TYPES)]
+        match = {"id": f"{company_id}-{seed % 10**6}-{rank}", "score": round(0.92 - rank * 0.04, 4)}
+        if body.get("includeMetadata", False):
+            match["metadata"] = {
+                "company_id": company_id,
+                "page_type": page_type,
+                "source_file": f"https://{company_id}.com/{page_type}",
+                "token_count": _config.chunk_tokens,
+                "text": canned_text(seed + rank, _config.chunk_tokens, lead=f"{company_id} {page_type}:"),
+            }
+        matches.append(match)
+    return {"matches": matches, "namespace": body.get("namespace", ""), "usage": {"readUnits": 1}}
+
+
+# ============================================================================
+# Control endpoints
+# ============================================================================
+
+@app.get("/_stats")
+async def stats():
+    with _lock:
+        return {"requests": dict(_requests), "rate_limited": dict(_rate_limited)}
+
+
+@app.get("/_config", response_model=StandInConfig)
+async def get_config():
+    return _config
+
+
+@app.put("/_config", response_model=StandInConfig)
+async def put_config(config: StandInConfig):
+    configure(config)
+    return _config
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "server": "stand-in"}
+
+
+# ============================================================================
+# Main
+# ============================================================================
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI / Pinecone stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--distribution", default="lognormal", choices=["fixed", "uniform", "normal", "lognormal"])
+    parser.add_argument("--llm-p50-ms", type=float, default=400.0, help="Chat time-to-first-token median")
+    parser.add_argument("--llm-spread-ms", type=float, default=150.0)
+    parser.add_argument("--embedding-p50-ms", type=float, default=40.0)
+    parser.add_argument("--query-p50-ms", type=float, default=30.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=120.0)
+    parser.add_argument("--completion-tokens", type=int, default=700)
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="429 on every Nth request per endpoint")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument("--retry-after-s", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configure(StandInConfig(
+        chat_latency=LatencyProfile(distribution=args.distribution, p50_ms=args.llm_p50_ms, spread_ms=args.llm_spread_ms),
+        embedding_latency=LatencyProfile(distribution=args.distribution, p50_ms=args.embedding_p50_ms,
+                                         spread_ms=args.embedding_p50_ms / 3),
+        query_latency=LatencyProfile(distribution=args.distribution, p50_ms=args.query_p50_ms,
+                                     spread_ms=args.query_p50_ms / 3),
+        tokens_per_sec=args.tokens_per_sec,
+        completion_tokens=args.completion_tokens,
+        rate_limit_every=args.rate_limit_every,
+        rate_limit_probability=args.rate_limit_probability,
+        retry_after_s=args.retry_after_s,
+        seed=args.seed,
+    ))
+
+    print(f"\n{'='*60}")
+    print("🧪 OpenAI / Pinecone stand-in server")
+    print(f"{'='*60}")
+    print(f"  OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    print(f"  PINECONE_INDEX_HOST=http://{args.host}:{args.port}")
+    print(f"{'='*60}\n")
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,350 @@
-def evaluate_dashboards(rag_md: str, structured_md: str):
+"""
+Rule-Based Dashboard Evaluator
+
+Scores generated dashboards on three rubric dimensions (0-3 each):
+- schema:        all 8 section headings present, in order, Disclosure Gaps last
+- provenance:    source links / source markers cited in the dashboard
+- hallucination: share of numeric claims ($, %, counts, years) that can be
+                 found in the company payload (higher = fewer unsupported claims)
+
+"Not disclosed." density is reported alongside the scores.
+
+Text features are extracted once per dashboard into a feature matrix and all
+scores are computed on the matrix at once, so a whole directory of dashboards
+is scored in one pass:
+
+    python -m src.agents.evaluation_agent data/dashboards --json
+"""
+
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.models import CompanyPayload
+from src.utils.template_renderer import PE_DASHBOARD_SECTIONS
+
+# Feature matrix columns
+FEATURES = (
+    "sections_present",
+    "sections_in_order",
+    "gaps_last",
+    "not_disclosed",
+    "words",
+    "links",
+    "numeric_claims",
+    "unsupported_claims",
+    "payload_checked",
+)
+_COL = {name: i for i, name in enumerate(FEATURES)}
+
+SCORE_DIMENSIONS = ("schema", "provenance", "hallucination")
+
+# Bare numbers at or below this value (section numbers, small counts) are not claims
+MIN_BARE_CLAIM = 10
+# Relative tolerance when matching a claim against payload numbers
+CLAIM_TOLERANCE = 0.01
+
+_MULTIPLIERS = {
+    "k": 1e3, "thousand": 1e3,
+    "m": 1e6, "million": 1e6,
+    "b": 1e9, "billion": 1e9,
+    "t": 1e12, "trillion": 1e12,
+}
+
+
+# ============================================================================
+# Compiled Patterns
+# ============================================================================
+
+def _section_pattern(section: str) -> re.Pattern:
+    title = re.escape(section.split(". ", 1)[1]).replace(r"\&", "(?:&|and)")
+    return re.compile(rf"^#{{1,4}}\s*(?:\d+\.\s*)?{title}", re.IGNORECASE | re.MULTILINE)
+
+
+_SECTION_PATTERNS = [_section_pattern(section) for section in PE_DASHBOARD_SECTIONS]
+_URL = re.compile(r"https?://[^\s)>\]]+")
+_SOURCE_MARKER = re.compile(r"\[Source:[^\]]*\]", re.IGNORECASE)
+_NOT_DISCLOSED = re.compile(r"not (?:publicly )?disclosed", re.IGNORECASE)
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(
+    r"(?<![\w.])\$?(\d{1,3}(?:,\d{3})+|\d+)(\.\d+)?\s*"
+    r"(%|[KMBT]\b|thousand\b|million\b|billion\b|trillion\b)?",
+    re.IGNORECASE
+)
+# Generation metadata lines and reporting windows ("last 30 days") are not claims
+_METADATA_LINE = re.compile(r"^\*\*(?:Generated|Status)\*\*.*$", re.MULTILINE)
+_TIME_WINDOW = re.compile(r"\b(?:last|past|previous)\s+\d+\s+(?:days|weeks|months|years)\b", re.IGNORECASE)
+_DASHBOARD_FILENAME = re.compile(r"^(?P<company>.+?)_(?P<method>structured|rag)_")
+
+
+# ============================================================================
+# Numeric Claims
+# ============================================================================
+
+def _numbers_in_text(text: str, skip_small: bool = True) -> List[float]:
+    """Numeric values in text, scaled by K/M/B/T and million/billion suffixes"""
+    values = []
+    for match in _NUMBER.finditer(text):
+        whole, fraction, unit = match.groups()
+        value = float(whole.replace(",", "") + (fraction or ""))
+        if unit and unit.lower() in _MULTIPLIERS:
+            value *= _MULTIPLIERS[unit.lower()]
+        elif skip_small and value <= MIN_BARE_CLAIM:
+            continue
+        values.append(value)
+    return values
+
+
+def payload_numbers(payload: CompanyPayload) -> np.ndarray:
+    """Sorted array of every number stated anywhere in a payload"""
+    values: List[float] = []
+
+    def walk(node, key=""):
+        if isinstance(node, dict):
+            for k, v in node.items():
+                walk(v, k)
+        elif isinstance(node, list):
+            values.append(float(len(node)))
+            for item in node:
+                walk(item, key)
+        elif isinstance(node, bool) or node is None:
+            return
+        elif isinstance(node, (int, float)):
+            values.append(float(node))
+            if key.endswith("_numeric"):
+                # *_numeric fields are in millions USD
+                values.append(float(node) * 1e6)
+        elif isinstance(node, str):
+            values.extend(_numbers_in_text(node, skip_small=False))
+
+    walk(payload.model_dump(mode="json"))
+    return np.unique(np.asarray(values, dtype=np.float64))
+
+
+def count_unsupported(claims: np.ndarray, supported: np.ndarray) -> int:
+    """Number of claims with no payload value within CLAIM_TOLERANCE"""
+    if claims.size == 0:
+        return 0
+    if supported.size == 0:
+        return int(claims.size)
+
+    # Nearest payload value on either side of each claim
+    idx = np.searchsorted(supported, claims)
+    lower = supported[np.clip(idx - 1, 0, supported.size - 1)]
+    upper = supported[np.clip(idx, 0, supported.size - 1)]
+    nearest = np.minimum(np.abs(claims - lower), np.abs(claims - upper))
+    return int(np.count_nonzero(nearest > CLAIM_TOLERANCE * np.abs(claims)))
+
+
+# ============================================================================
+# Features & Scores
+# ============================================================================
+
+def extract_features(markdown: str, supported: Optional[np.ndarray] = None) -> np.ndarray:
     """
-    Stub evaluator: always prefers structured dashboard.
-    Replace with rubric-based logic or an LLM call.
+    Feature row for one dashboard (see FEATURES for column order)
+
+    Args:
+        markdown: Dashboard markdown
+        supported: payload_numbers() of the company, or None to skip the
+                   numeric claim check
     """
+    markdown = markdown or ""
+    positions = []
+    for pattern in _SECTION_PATTERNS:
+        match = pattern.search(markdown)
+        positions.append(match.start() if match else -1)
+    found = [p for p in positions if p >= 0]
+
+    claims_text = _TIME_WINDOW.sub("", _METADATA_LINE.sub("", markdown))
+    claims = np.asarray(_numbers_in_text(claims_text), dtype=np.float64)
+
+    row = np.zeros(len(FEATURES), dtype=np.float64)
+    row[_COL["sections_present"]] = len(found)
+    row[_COL["sections_in_order"]] = float(found == sorted(found))
+    row[_COL["gaps_last"]] = float(bool(found) and positions[-1] == max(found))
+    row[_COL["not_disclosed"]] = len(_NOT_DISCLOSED.findall(markdown))
+    row[_COL["words"]] = len(_WORD.findall(markdown))
+    row[_COL["links"]] = len(_URL.findall(markdown)) + len(_SOURCE_MARKER.findall(markdown))
+    row[_COL["numeric_claims"]] = claims.size
+    if supported is not None:
+        row[_COL["unsupported_claims"]] = count_unsupported(claims, supported)
+        row[_COL["payload_checked"]] = 1.0
+    return row
+
+
+def score_features(features: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Rubric scores (0-3) for a feature matrix of shape (n_dashboards, len(FEATURES))
+
+    Hallucination is NaN for rows whose payload was not available.
+    """
+    features = np.atleast_2d(features)
+    col = lambda name: features[:, _COL[name]]
+
+    n_sections = len(PE_DASHBOARD_SECTIONS)
+    schema = 3.0 * col("sections_present") / n_sections
+    schema -= 0.5 * (1.0 - col("sections_in_order")) + 0.5 * (1.0 - col("gaps_last"))
+    schema = np.clip(schema, 0.0, 3.0)
+
+    provenance = np.clip(np.log2(1.0 + col("links")), 0.0, 3.0)
+
+    claims = col("numeric_claims")
+    supported_share = np.divide(
+        claims - col("unsupported_claims"), claims,
+        out=np.ones_like(claims), where=claims > 0
+    )
+    hallucination = np.where(col("payload_checked") > 0, 3.0 * supported_share, np.nan)
+
+    return {
+        "schema": schema,
+        "provenance": provenance,
+        "hallucination": hallucination,
+        "not_disclosed_density": col("not_disclosed") / np.maximum(col("sections_present"), 1.0),
+        "total": schema + provenance + np.nan_to_num(hallucination, nan=0.0),
+    }
+
+
+def _row_scores(scores: Dict[str, np.ndarray], i: int) -> Dict[str, Optional[float]]:
+    return {
+        name: (None if np.isnan(values[i]) else round(float(values[i]), 2))
+        for name, values in scores.items()
+    }
+
+
+def _row_features(features: np.ndarray, i: int) -> Dict[str, int]:
+    return {name: int(features[i, j]) for j, name in enumerate(FEATURES)}
+
+
+# ============================================================================
+# Public API
+# ============================================================================
+
+def evaluate_dashboards(rag_md: str, structured_md: str, payload: Optional[CompanyPayload] = None):
+    """
+    Score the RAG and structured dashboards for one company
+
+    Args:
+        rag_md: RAG dashboard markdown
+        structured_md: Structured dashboard markdown
+        payload: Company payload used to check numeric claims (optional)
+
+    Returns:
+        Dict with 'winner', per-dashboard 'scores' and raw 'features'
+    """
+    supported = payload_numbers(payload) if payload is not None else None
+    features = np.vstack([
+        extract_features(rag_md, supported),
+        extract_features(structured_md, supported),
+    ])
+    scores = score_features(features)
+
+    names = ("rag", "structured")
+    # Ties go to the structured dashboard (grounded in the payload)
+    winner = "rag" if scores["total"][0] > scores["total"][1] else "structured"
+
+    return {
+        "winner": winner,
+        "scores": {name: _row_scores(scores, i) for i, name in enumerate(names)},
+        "features": {name: _row_features(features, i) for i, name in enumerate(names)},
+    }
+
+
+def score_dashboard_dir(dashboard_dir: str = "data/dashboards", payload_dir: str = "data/payloads") -> dict:
+    """
+    Score every dashboard in a directory in one pass
+
+    Dashboards are matched to payloads by the '<company_id>_<method>_...md'
+    filename written by DashboardGenerator.save_dashboard.
+
+    Returns:
+        Dict with per-dashboard 'dashboards' rows and a per-method 'summary'
+    """
+    from src.tools.payload_catalog import discover_payload_files, load_payload_file
+
+    start = time.perf_counter()
+    paths = sorted(Path(dashboard_dir).glob("*.md"))
+    payload_files = discover_payload_files(Path(payload_dir))
+    supported_by_company: Dict[str, Optional[np.ndarray]] = {}
+
+    rows = []
+    meta = []
+    for path in paths:
+        match = _DASHBOARD_FILENAME.match(path.name)
+        company_id, method = (match.group("company"), match.group("method")) if match else (path.stem, "unknown")
+
+        if company_id not in supported_by_company:
+            supported = None
+            if company_id in payload_files:
+                try:
+                    supported = payload_numbers(load_payload_file(payload_files[company_id]))
+                except Exception:
+                    supported = None
+            supported_by_company[company_id] = supported
+
+        rows.append(extract_features(path.read_text(encoding="utf-8"), supported_by_company[company_id]))
+        meta.append((path.name, company_id, method))
+
+    features = np.vstack(rows) if rows else np.zeros((0, len(FEATURES)))
+    scores = score_features(features)
+
+    dashboards = [
+        {"file": name, "company_id": company_id, "method": method,
+         "scores": _row_scores(scores, i), "features": _row_features(features, i)}
+        for i, (name, company_id, method) in enumerate(meta)
+    ]
+
+    methods = np.asarray([m[2] for m in meta])
+    summary = {}
+    for method in sorted(set(methods.tolist())):
+        mask = methods == method
+        summary[method] = {
+            "count": int(mask.sum()),
+            **{
+                f"mean_{name}": (None if np.all(np.isnan(values[mask])) else round(float(np.nanmean(values[mask])), 2))
+                for name, values in scores.items()
+            },
+        }
+
     return {
-        "winner": "structured",
-        "scores": {
-            "rag": {"factual": 2, "schema": 2, "provenance": 1, "hallucination": 1, "readability": 1},
-            "structured": {"factual": 3, "schema": 2, "provenance": 2, "hallucination": 2, "readability": 1},
-        },
-    }
\ No newline at end of file
+        "dashboard_dir": str(dashboard_dir),
+        "count": len(dashboards),
+        "seconds": round(time.perf_counter() - start, 4),
+        "summary": summary,
+        "dashboards": dashboards,
+    }
+
+
+def main():
+    """Command-line interface: score a directory of dashboards"""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Rule-based dashboard evaluator")
+    parser.add_argument("dashboard_dir", nargs="?", default="data/dashboards", help="Directory of dashboard .md files")
+    parser.add_argument("--payload-dir", default="data/payloads", help="Directory of payload JSON files")
+    parser.add_argument("--json", action="store_true", help="Print the full JSON report")
+    args = parser.parse_args()
+
+    report = score_dashboard_dir(args.dashboard_dir, args.payload_dir)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\n{'='*60}")
+    print("DASHBOARD EVALUATION")
+    print(f"{'='*60}")
+    print(f"Scored {report['count']} dashboards in {report['seconds'] * 1000:.1f} ms\n")
+    for method, stats in report["summary"].items():
+        print(f"  {method:<12} n={stats['count']:<4} schema={stats['mean_schema']}  "
+              f"provenance={stats['mean_provenance']}  hallucination={stats['mean_hallucination']}  "
+              f"not_disclosed/section={stats['mean_not_disclosed_density']}")
+    print(f"{'='*60}\n")
+
+
+if __name__ == "__main__":
+    main()
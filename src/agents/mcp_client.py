@@ -0,0 +1,118 @@
+"""
+Lab 15 — MCP Client
+
+Lightweight HTTP client for the MCP server's tools and resources, shared by
+the supervisor agent and the LangGraph workflow. Kept free of LangChain /
+LLM imports so the workflow and DAG stay cheap to import.
+"""
+
+import os
+import json
+import httpx
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from src.utils.tracing import inject_headers, span
+
+
+# ============================================================
+# MCP Client
+# ============================================================
+
+class MCPClient:
+    """Client for consuming MCP server tools"""
+
+    def __init__(
+        self,
+        config_path: str = "config/mcp_config.json",
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Initialize MCP client with configuration
+
+        Args:
+            config_path: Path to the MCP config JSON
+            transport: Optional httpx transport (e.g. httpx.ASGITransport(app=app)
+                       to call an in-process server in tests and benchmarks)
+        """
+        self.config = self._load_config(config_path)
+        self.base_url = os.getenv("MCP_BASE_URL", self.config.get("base_url", "http://localhost:9000"))
+        self.enabled = self.config.get("agent_config", {}).get("enable_mcp", True)
+        self.timeout = self.config.get("security", {}).get("timeout", 30)
+        self.transport = transport
+
+    def _load_config(self, config_path: str) -> Dict[str, Any]:
+        """Load MCP configuration from JSON file"""
+        path = Path(config_path)
+        if path.exists():
+            with open(path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    async def call_tool(self, tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Call an MCP tool endpoint
+
+        Args:
+            tool_name: Name of the tool (e.g., 'generate_structured_dashboard')
+            params: Tool parameters
+
+        Returns:
+            Tool response
+        """
+        if not self.enabled:
+            raise ValueError("MCP is disabled in configuration")
+
+        # Get tool endpoint from config
+        tool_config = self.config.get("endpoints", {}).get("tools", {}).get(tool_name, {})
+        if not tool_config:
+            raise ValueError(f"Tool '{tool_name}' not found in MCP config")
+
+        url = f"{self.base_url}{tool_config['url']}"
+        method = tool_config.get("method", "POST")
+
+        # Make HTTP request (trace context travels in the headers)
+        with span("mcp.call_tool", kind="client", tool=tool_name, company_id=params.get("company_id")) as call_span:
+            async with httpx.AsyncClient(timeout=self.timeout, transport=self.transport) as client:
+                if method == "POST":
+                    response = await client.post(url, json=params, headers=inject_headers())
+                else:
+                    response = await client.get(url, params=params, headers=inject_headers())
+
+                call_span.set_attribute("http_status", response.status_code)
+                response.raise_for_status()
+                return response.json()
+
+    async def get_resource(self, resource_name: str) -> Dict[str, Any]:
+        """Get an MCP resource"""
+        resource_config = self.config.get("endpoints", {}).get("resources", {}).get(resource_name, {})
+        if not resource_config:
+            raise ValueError(f"Resource '{resource_name}' not found in MCP config")
+
+        url = f"{self.base_url}{resource_config['url']}"
+
+        with span("mcp.get_resource", kind="client", resource=resource_name):
+            async with httpx.AsyncClient(timeout=self.timeout, transport=self.transport) as client:
+                response = await client.get(url, headers=inject_headers())
+                response.raise_for_status()
+                return response.json()
+
+    async def health_check(self) -> bool:
+        """Check if MCP server is healthy"""
+        try:
+            async with httpx.AsyncClient(timeout=5, transport=self.transport) as client:
+                response = await client.get(f"{self.base_url}/health")
+                return response.status_code == 200
+        except:
+            return False
+
+
+# Global MCP client instance
+_mcp_client = None
+
+def get_mcp_client() -> MCPClient:
+    """Get or create MCP client singleton"""
+    global _mcp_client
+    if _mcp_client is None:
+        _mcp_client = MCPClient()
+    return _mcp_client
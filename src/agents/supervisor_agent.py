@@ -14,9 +14,7 @@ Uses LangChain's create_react_agent with structured ReAct logging.
 import os
 import json
 import asyncio
-import httpx
 from datetime import date
-from pathlib import Path
 from typing import Optional, Dict, Any
 from dotenv import load_dotenv
 
@@ -35,91 +33,34 @@ except ImportError:
 from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.rate_limiters import BaseRateLimiter
 
 from src.tools.payload_tool import get_latest_structured_payload
 from src.tools.rag_tool import rag_search_company
 from src.tools.risk_logger import report_layoff_signal, LayoffSignal
 from src.utils.react_logger import ReActLogger
+from src.agents.mcp_client import MCPClient, get_mcp_client
+from src.utils.usage import UsageSummary, merge_usage, track_usage
+from src.utils.rate_limiter import get_openai_limiter, openai_http_client
 
 # Load environment
 load_dotenv()
 
 
 # ============================================================
-# MCP Client
+# Rate Limiting
 # ============================================================
 
-class MCPClient:
-    """Client for consuming MCP server tools"""
-
-    def __init__(self, config_path: str = "config/mcp_config.json"):
-        """Initialize MCP client with configuration"""
-        self.config = self._load_config(config_path)
-        self.base_url = os.getenv("MCP_BASE_URL", self.config.get("base_url", "http://localhost:9000"))
-        self.enabled = self.config.get("agent_config", {}).get("enable_mcp", True)
-        self.timeout = self.config.get("security", {}).get("timeout", 30)
-
-    def _load_config(self, config_path: str) -> Dict[str, Any]:
-        """Load MCP configuration from JSON file"""
-        path = Path(config_path)
-        if path.exists():
-            with open(path, 'r') as f:
-                return json.load(f)
-        return {}
-
-    async def call_tool(self, tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Call an MCP tool endpoint
+class SharedOpenAIRateLimiter(BaseRateLimiter):
+    """LangChain adapter over the process-wide OpenAI limiter (request slots only)"""
 
-        Args:
-            tool_name: Name of the tool (e.g., 'generate_structured_dashboard')
-            params: Tool parameters
+    def acquire(self, *, blocking: bool = True) -> bool:
+        get_openai_limiter().acquire_sync()
+        return True
 
-        Returns:
-            Tool response
-        """
-        if not self.enabled:
-            raise ValueError("MCP is disabled in configuration")
-
-        # Get tool endpoint from config
-        tool_config = self.config.get("endpoints", {}).get("tools", {}).get(tool_name, {})
-        if not tool_config:
-            raise ValueError(f"Tool '{tool_name}' not found in MCP config")
-
-        url = f"{self.base_url}{tool_config['url']}"
-        method = tool_config.get("method", "POST")
-
-        # Make HTTP request
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            if method == "POST":
-                response = await client.post(url, json=params)
-            else:
-                response = await client.get(url, params=params)
-
-            response.raise_for_status()
-            return response.json()
-
-    async def get_resource(self, resource_name: str) -> Dict[str, Any]:
-        """Get an MCP resource"""
-        resource_config = self.config.get("endpoints", {}).get("resources", {}).get(resource_name, {})
-        if not resource_config:
-            raise ValueError(f"Resource '{resource_name}' not found in MCP config")
-
-        url = f"{self.base_url}{resource_config['url']}"
-
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.json()
-
-    async def health_check(self) -> bool:
-        """Check if MCP server is healthy"""
-        try:
-            async with httpx.AsyncClient(timeout=5) as client:
-                response = await client.get(f"{self.base_url}/health")
-                return response.status_code == 200
-        except:
-            return False
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        await get_openai_limiter().acquire()
+        return True
 
 
 # ============================================================
@@ -159,7 +100,8 @@ def search_company_docs(query_input: str) -> str:
             return "Error: Input must be in format 'company_id|query'"
 
         company_id, query = parts
-        results = asyncio.run(rag_search_company(company_id.strip(), query.strip()))
+        # Risk queries are keyword lists: hybrid search catches exact terms dense search misses
+        results = asyncio.run(rag_search_company(company_id.strip(), query.strip(), mode="hybrid"))
 
         if not results:
             return f"No results found for query '{query}' in company '{company_id}'"
@@ -211,17 +153,6 @@ def log_risk_signal(risk_data: str) -> str:
 # MCP Tool Wrappers (Lab 15)
 # ============================================================
 
-# Global MCP client instance
-_mcp_client = None
-
-def get_mcp_client() -> MCPClient:
-    """Get or create MCP client singleton"""
-    global _mcp_client
-    if _mcp_client is None:
-        _mcp_client = MCPClient()
-    return _mcp_client
-
-
 @tool
 def generate_structured_dashboard_mcp(company_id: str) -> str:
     """Generate a structured PE dashboard via MCP server.
@@ -238,6 +169,7 @@ def generate_structured_dashboard_mcp(company_id: str) -> str:
             "generate_structured_dashboard",
             {"company_id": company_id}
         ))
+        merge_usage(result.get("usage"))
         return f"Dashboard generated for {company_id}:\n\n{result.get('markdown', 'No content')[:500]}..."
     except Exception as e:
         return f"Error generating structured dashboard via MCP: {str(e)}"
@@ -259,6 +191,7 @@ def generate_rag_dashboard_mcp(company_id: str) -> str:
             "generate_rag_dashboard",
             {"company_id": company_id}
         ))
+        merge_usage(result.get("usage"))
         return f"RAG Dashboard generated for {company_id}:\n\n{result.get('markdown', 'No content')[:500]}..."
     except Exception as e:
         return f"Error generating RAG dashboard via MCP: {str(e)}"
@@ -301,7 +234,14 @@ class DueDiligenceSupervisorAgent:
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found in environment")
 
-        self.llm = ChatOpenAI(model=model, temperature=0, api_key=api_key)
+        # Shares RPM/TPM budgets and rate-limit header feedback with dashboard generation
+        self.llm = ChatOpenAI(
+            model=model,
+            temperature=0,
+            api_key=api_key,
+            http_client=openai_http_client(),
+            rate_limiter=SharedOpenAIRateLimiter()
+        )
         self.react_logger = ReActLogger(run_id=run_id)
         self.enable_mcp = enable_mcp
 
@@ -345,6 +285,11 @@ class DueDiligenceSupervisorAgent:
         Returns:
             Final answer/summary
         """
+        # Embedding / completion usage from local tools and MCP responses
+        with track_usage() as usage:
+            return self._run(company_id, task, usage)
+
+    def _run(self, company_id: str, task: Optional[str], usage: UsageSummary) -> str:
         print(f"\n{'='*60}")
         print(f"EXECUTING DUE DILIGENCE FOR: {company_id}")
         print(f"{'='*60}\n")
@@ -428,7 +373,11 @@ class DueDiligenceSupervisorAgent:
 Recommendation: {"Review risk signals before proceeding" if "layoff" in search_result.lower() else "Proceed with standard diligence process"}
 """
 
-        self.react_logger.log_final_answer(final_answer, company_id=company_id)
+        self.react_logger.log_final_answer(
+            final_answer,
+            company_id=company_id,
+            metadata={"usage": usage.model_dump()}
+        )
 
         print(f"\n{'='*60}")
         print(f"FINAL ANSWER:")
@@ -438,7 +387,8 @@ Recommendation: {"Review risk signals before proceeding" if "layoff" in search_r
 
         # Print trace summary
         summary = self.react_logger.get_trace_summary()
-        print(f"📊 Trace Summary: {summary}\n")
+        print(f"📊 Trace Summary: {summary}")
+        print(f"🪙 Token Usage: {usage.total_tokens} tokens (~${usage.cost_usd:.4f})\n")
 
         return final_answer
 
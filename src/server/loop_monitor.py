@@ -0,0 +1,77 @@
+"""
+Event Loop Lag Monitor
+
+A background task that repeatedly sleeps for a fixed interval and records
+how late it wakes up. The overshoot is the time the event loop spent busy
+with other work - e.g. a blocking LLM or Pinecone call made from an async
+endpoint - during which no other request (including /health) could run.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+
+class EventLoopLagMonitor:
+    """Samples event-loop scheduling lag on the running loop"""
+
+    def __init__(self, interval_s: float = 0.1, window: int = 600):
+        """
+        Args:
+            interval_s: Sleep interval between samples
+            window: Number of recent samples kept for percentiles
+        """
+        self.interval_s = interval_s
+        self._samples = deque(maxlen=window)
+        self._max_lag_s = 0.0
+        self._count = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start sampling on the current event loop"""
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            lag = max(time.perf_counter() - expected, 0.0)
+            self._samples.append(lag)
+            self._count += 1
+            self._max_lag_s = max(self._max_lag_s, lag)
+
+    def snapshot(self) -> dict:
+        """Lag statistics in milliseconds over the recent window"""
+        samples = sorted(self._samples)
+        if not samples:
+            return {"running": self.running, "samples": 0}
+
+        def pct(p):
+            return round(samples[min(int(p / 100 * len(samples)), len(samples) - 1)] * 1000, 3)
+
+        return {
+            "running": self.running,
+            "samples": self._count,
+            "interval_ms": self.interval_s * 1000,
+            "last_ms": round(self._samples[-1] * 1000, 3),
+            "p50_ms": pct(50),
+            "p99_ms": pct(99),
+            "max_window_ms": round(samples[-1] * 1000, 3),
+            "max_ms": round(self._max_lag_s * 1000, 3),
+        }
@@ -5,6 +5,7 @@ Model Context Protocol (MCP) server exposing dashboard generation as:
 - Tools: Dashboard generation endpoints
 - Resources: Company data endpoints
 - Prompts: Dashboard template endpoints
+- HITL review queue: approve / reject flagged companies (paused workflows)
 
 Compliant with MCP specification for agent consumption.
 """
@@ -13,18 +14,30 @@ import os
 import json
 import asyncio
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 from dotenv import load_dotenv
 
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
 
-from src.utils.dashboard_generator import DashboardGenerator
+from src.utils.dashboard_generator import GENERATION_FLIGHT, DashboardGenerator
+from src.utils.template_renderer import PE_DASHBOARD_PROMPT_TEMPLATE, PE_DASHBOARD_SECTIONS
+from src.tools.payload_catalog import get_payload_catalog, preload_payload_catalog
+from src.server.loop_monitor import EventLoopLagMonitor
+from src.utils.metrics import CONTENT_TYPE, RequestMetricsMiddleware, render_metrics
+from src.utils.tracing import TracingMiddleware
+from src.utils.profiling import profile_tool
+from src.utils.usage import UsageSummary, track_usage
+from src.utils.rate_limiter import get_openai_limiter
+from src.workflows.hitl_queue import ReviewItem, get_review_queue
 
 # Load environment
 load_dotenv()
 
+# Event-loop lag monitor (reported by /health)
+loop_monitor = EventLoopLagMonitor(interval_s=float(os.getenv("LOOP_LAG_INTERVAL_MS", "100")) / 1000)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="PE Dashboard MCP Server",
@@ -32,6 +45,20 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Per-endpoint latency / in-flight / error metrics (served at /metrics)
+app.add_middleware(RequestMetricsMiddleware, paths=[
+    "/",
+    "/resource/ai50/companies",
+    "/tool/generate_structured_dashboard",
+    "/tool/generate_rag_dashboard",
+    "/prompt/pe-dashboard",
+    "/health",
+    "/metrics",
+])
+
+# Server spans joined to the caller's trace via W3C traceparent (TRACING_ENABLED)
+app.add_middleware(TracingMiddleware)
+
 
 # ============================================================================
 # Pydantic Models
@@ -46,6 +73,15 @@ class CompanyIdList(BaseModel):
 class DashboardRequest(BaseModel):
     """Request model for dashboard generation"""
     company_id: str = Field(..., description="Company identifier (e.g., 'anthropic')")
+    mode: Literal["llm", "sectioned", "template", "enriched"] = Field(
+        "llm",
+        description="Structured generation mode: 'llm' (LLM synthesis), 'sectioned' (one concurrent "
+                    "LLM call per section), 'template' (no LLM), or 'enriched' (template + LLM executive summary)"
+    )
+    model: Optional[str] = Field(
+        None,
+        description="OpenAI model override (e.g. a cheaper model when the caller is near its token budget)"
+    )
 
 
 class DashboardResponse(BaseModel):
@@ -53,7 +89,9 @@ class DashboardResponse(BaseModel):
     company_id: str = Field(..., description="Company identifier")
     markdown: str = Field(..., description="Generated dashboard in Markdown format")
     method: str = Field(..., description="Generation method (structured or RAG)")
+    mode: str = Field("llm", description="Generation mode used (llm, sectioned, template or enriched)")
     generated_at: str = Field(..., description="Timestamp of generation")
+    usage: UsageSummary = Field(default_factory=UsageSummary, description="LLM / embedding token usage and estimated cost")
 
 
 class PromptResponse(BaseModel):
@@ -65,6 +103,19 @@ class PromptResponse(BaseModel):
     sections: List[str] = Field(..., description="List of dashboard sections")
 
 
+class ReviewDecisionRequest(BaseModel):
+    """Reviewer decision on a paused (HITL) workflow"""
+    reviewer: Optional[str] = Field(None, description="Who made the decision")
+    note: Optional[str] = Field(None, description="Rationale recorded with the decision")
+
+
+class ReviewDecisionResponse(BaseModel):
+    """Recorded decision and whether the workflow is being resumed by this server"""
+    review: ReviewItem
+    resuming: bool = Field(..., description="True when a paused run resumes in the background (durable checkpoints); "
+                                            "a run still generating applies the decision when it reaches HITL")
+
+
 class MCPInfo(BaseModel):
     """MCP server information"""
     name: str
@@ -81,6 +132,10 @@ class MCPInfo(BaseModel):
 
 def load_company_ids() -> List[str]:
     """Load company IDs from Forbes AI 50 seed data"""
+    catalog = get_payload_catalog()
+    if catalog is not None and len(catalog):
+        return catalog.company_ids()
+
     seed_paths = [
         Path("data/forbes_ai50_seed.json"),
         Path("../pe-dashboard-ai50/data/forbes_ai50_seed.json"),
@@ -112,6 +167,27 @@ def load_company_ids() -> List[str]:
     return ["anthropic", "openai", "cohere", "huggingface", "replicate"]
 
 
+# ============================================================================
+# Startup
+# ============================================================================
+
+@app.on_event("startup")
+async def preload_payloads():
+    """Preload company payloads into the in-memory catalog (PAYLOAD_PRELOAD)"""
+    await asyncio.to_thread(preload_payload_catalog)
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    """Start sampling event-loop lag"""
+    loop_monitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await loop_monitor.stop()
+
+
 # ============================================================================
 # MCP Server Info Endpoint
 # ============================================================================
@@ -161,15 +237,17 @@ async def get_companies():
 # ============================================================================
 
 @app.post("/tool/generate_structured_dashboard", response_model=DashboardResponse)
+@profile_tool
 async def generate_structured_dashboard(request: DashboardRequest):
     """
     Tool: Generate structured dashboard from payload
 
     Uses pre-assembled company payloads from Assignment 2 to generate
-    a comprehensive 8-section PE dashboard.
+    a comprehensive 8-section PE dashboard. With mode='template' the
+    dashboard is rendered straight from the payload without an LLM call.
 
     Args:
-        request: DashboardRequest with company_id
+        request: DashboardRequest with company_id and generation mode
 
     Returns:
         DashboardResponse with Markdown dashboard
@@ -178,13 +256,20 @@ async def generate_structured_dashboard(request: DashboardRequest):
         from datetime import datetime
 
         # Generate dashboard
-        markdown = await DashboardGenerator.generate_structured_dashboard(request.company_id)
+        with track_usage() as usage:
+            markdown = await DashboardGenerator.generate_structured_dashboard(
+                request.company_id,
+                model=request.model or "gpt-4o-mini",
+                mode=request.mode
+            )
 
         return DashboardResponse(
             company_id=request.company_id,
             markdown=markdown,
             method="structured",
-            generated_at=datetime.utcnow().isoformat()
+            mode=request.mode,
+            generated_at=datetime.utcnow().isoformat(),
+            usage=usage
         )
 
     except FileNotFoundError as e:
@@ -200,6 +285,7 @@ async def generate_structured_dashboard(request: DashboardRequest):
 
 
 @app.post("/tool/generate_rag_dashboard", response_model=DashboardResponse)
+@profile_tool
 async def generate_rag_dashboard(request: DashboardRequest):
     """
     Tool: Generate RAG-based dashboard from vector DB
@@ -217,13 +303,18 @@ async def generate_rag_dashboard(request: DashboardRequest):
         from datetime import datetime
 
         # Generate dashboard
-        markdown = await DashboardGenerator.generate_rag_dashboard(request.company_id)
+        with track_usage() as usage:
+            markdown = await DashboardGenerator.generate_rag_dashboard(
+                request.company_id,
+                model=request.model or "gpt-4o-mini"
+            )
 
         return DashboardResponse(
             company_id=request.company_id,
             markdown=markdown,
             method="RAG",
-            generated_at=datetime.utcnow().isoformat()
+            generated_at=datetime.utcnow().isoformat(),
+            usage=usage
         )
 
     except Exception as e:
@@ -247,84 +338,99 @@ async def get_pe_dashboard_prompt():
     Returns:
         PromptResponse with template and section list
     """
-    sections = [
-        "1. Company Overview",
-        "2. Business Model and GTM",
-        "3. Funding & Investor Profile",
-        "4. Growth Momentum",
-        "5. Visibility & Market Sentiment",
-        "6. Risks and Challenges",
-        "7. Outlook",
-        "8. Disclosure Gaps"
-    ]
-
-    template = """# {company_name} - PE Due Diligence Dashboard
-
-## 1. Company Overview
-- Founded: {founded_year}
-- Headquarters: {location}
-- Website: {website}
-- Description: {description}
-- Leadership: {leadership}
-
-## 2. Business Model and GTM
-- Business Model: {business_model}
-- Target Customers: {target_customers}
-- Pricing: {pricing_model}
-- Products/Services: {products}
-
-## 3. Funding & Investor Profile
-- Total Funding: {total_funding}
-- Last Round: {last_round}
-- Valuation: {valuation}
-- Key Investors: {investors}
-
-## 4. Growth Momentum
-- Headcount: {headcount} (Growth: {growth_rate})
-- Office Locations: {locations}
-- Partnerships: {partnerships}
-- Product Launches: {launches}
-
-## 5. Visibility & Market Sentiment
-- News Mentions: {news_mentions}
-- Sentiment: {sentiment}
-- Awards: {awards}
-
-## 6. Risks and Challenges
-{identified_risks}
-
-## 7. Outlook
-- Opportunities: {opportunities}
-- Strategic Initiatives: {initiatives}
-
-## 8. Disclosure Gaps
-List of information not publicly disclosed:
-{disclosure_gaps}
-
----
-**Rules**:
-- Use literal "Not disclosed." for missing fields
-- Never invent ARR/MRR/valuation/customer counts
-- Always include Disclosure Gaps section
-"""
-
     return PromptResponse(
         id="pe-dashboard",
         name="PE Due Diligence Dashboard Template",
         description="8-section dashboard template for private equity due diligence on Forbes AI 50 companies",
-        template=template,
-        sections=sections
+        template=PE_DASHBOARD_PROMPT_TEMPLATE,
+        sections=PE_DASHBOARD_SECTIONS
     )
 
 
 # ============================================================================
-# Health Check
+# HITL Review Endpoints
+# ============================================================================
+
+# Background resumes, kept referenced until they finish
+_resume_tasks: set = set()
+
+
+def resume_on_decision() -> bool:
+    """Resume decided runs here: needs checkpoints this process can read (CHECKPOINT_STORAGE=sqlite)"""
+    return (os.getenv("HITL_RESUME_ON_DECISION", "true").lower() == "true"
+            and os.getenv("CHECKPOINT_STORAGE", "memory").lower() == "sqlite")
+
+
+def _resume_done(task: asyncio.Task) -> None:
+    _resume_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️  Resuming workflow failed: {task.exception()}")
+
+
+async def _decide(run_id: str, approved: bool, request: ReviewDecisionRequest) -> ReviewDecisionResponse:
+    try:
+        review = get_review_queue().decide(run_id, approved, request.reviewer, request.note)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No review for run '{run_id}'")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    resuming = resume_on_decision()
+    if resuming:
+        from src.workflows.hitl_queue import resume_run
+        task = asyncio.create_task(asyncio.to_thread(resume_run, run_id))
+        _resume_tasks.add(task)
+        task.add_done_callback(_resume_done)
+    return ReviewDecisionResponse(review=review, resuming=resuming)
+
+
+@app.get("/hitl/reviews", response_model=List[ReviewItem])
+async def list_reviews(status: Optional[Literal["pending", "approved", "rejected"]] = None):
+    """Review queue items (oldest first), optionally filtered by status"""
+    return get_review_queue().list(status)
+
+
+@app.get("/hitl/reviews/{run_id}", response_model=ReviewItem)
+async def get_review(run_id: str):
+    """One review item: company, risk keywords, dashboard files and decision"""
+    review = get_review_queue().get(run_id)
+    if review is None:
+        raise HTTPException(status_code=404, detail=f"No review for run '{run_id}'")
+    return review
+
+
+@app.post("/hitl/reviews/{run_id}/approve", response_model=ReviewDecisionResponse)
+async def approve_review(run_id: str, request: ReviewDecisionRequest = ReviewDecisionRequest()):
+    """Approve a flagged company; its paused workflow resumes with the decision"""
+    return await _decide(run_id, True, request)
+
+
+@app.post("/hitl/reviews/{run_id}/reject", response_model=ReviewDecisionResponse)
+async def reject_review(run_id: str, request: ReviewDecisionRequest = ReviewDecisionRequest()):
+    """Reject a flagged company; its paused workflow resumes with the decision"""
+    return await _decide(run_id, False, request)
+
+
+# ============================================================================
+# Health Check & Metrics
 # ============================================================================
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "server": "MCP PE Dashboard"}
+    """Health check endpoint (event-loop lag, in-flight generations, OpenAI rate limiter state)"""
+    return {
+        "status": "healthy",
+        "server": "MCP PE Dashboard",
+        "event_loop_lag": loop_monitor.snapshot(),
+        "generations_in_flight": GENERATION_FLIGHT.in_flight(),
+        "rate_limiter": get_openai_limiter().snapshot()
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics in text exposition format"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
 
 
 # ============================================================================
@@ -348,7 +454,9 @@ if __name__ == "__main__":
     print(f"  - Prompt:     http://{host}:{port}/prompt/pe-dashboard")
     print(f"  - Tool:       http://{host}:{port}/tool/generate_structured_dashboard")
     print(f"  - Tool:       http://{host}:{port}/tool/generate_rag_dashboard")
+    print(f"  - HITL:       http://{host}:{port}/hitl/reviews")
     print(f"  - Health:     http://{host}:{port}/health")
+    print(f"  - Metrics:    http://{host}:{port}/metrics")
     print(f"{'='*60}\n")
 
     uvicorn.run(
@@ -0,0 +1,301 @@
+"""
+In-Memory Payload Catalog
+
+Preloads every company payload under data/payloads at server / worker
+startup so tools never pay file I/O and validation on first touch.
+
+Modes:
+- eager: read all files concurrently (thread pool) and validate them,
+         optionally in a process pool, before serving
+- lazy:  index file paths only; each payload is loaded on first access
+         (for catalogs too large to hold fully in memory up front)
+
+The catalog's company index is fixed at build time and exposed as a
+read-only mapping. Callers get their own deep copy of a payload (a few
+hundred microseconds), so mutating it never leaks into the catalog or
+other callers.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Optional
+
+from src.models import CompanyPayload
+from src.tools.payload_snapshot import (
+    decode_payload,
+    encode_payload,
+    load_snapshot,
+    snapshots_enabled,
+    write_snapshot,
+)
+
+PRELOAD_MODES = ("off", "eager", "lazy")
+
+# Files in the payloads folder that are not company payloads
+EXCLUDE_PATTERNS = ("report", "metadata", "summary", "results", "seed")
+
+
+# ============================================================================
+# Process / file helpers
+# ============================================================================
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (Linux /proc, else peak RSS)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux but bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def discover_payload_files(payload_dir: Path) -> Dict[str, Path]:
+    """Map company_id -> payload file for every company JSON in a directory"""
+    files = {}
+    for path in sorted(Path(payload_dir).glob("*.json")):
+        if any(pattern in path.name.lower() for pattern in EXCLUDE_PATTERNS):
+            continue
+        files[path.stem.replace("_payload", "")] = path
+    return files
+
+
+def _read_bytes(path: Path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _validate_encoded(raw: bytes) -> tuple:
+    """Process-pool worker: validate and return plain data (cheap to ship back)"""
+    return encode_payload(CompanyPayload.model_validate_json(raw))
+
+
+def load_payload_file(path: Path) -> CompanyPayload:
+    """Load one payload file, via its snapshot when enabled and current"""
+    use_snapshots = snapshots_enabled()
+    if use_snapshots:
+        cached = load_snapshot(path)
+        if cached is not None:
+            return cached
+
+    payload = CompanyPayload.model_validate_json(_read_bytes(path))
+    if use_snapshots:
+        write_snapshot(path, payload)
+    return payload
+
+
+# ============================================================================
+# Catalog
+# ============================================================================
+
+class _PayloadView(Mapping):
+    """Read-only mapping over loaded payloads that hands out deep copies"""
+
+    def __init__(self, payloads: Dict[str, CompanyPayload]):
+        self._payloads = payloads
+
+    def __getitem__(self, company_id: str) -> CompanyPayload:
+        return self._payloads[company_id].model_copy(deep=True)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._payloads))
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+
+class PayloadCatalog:
+    """Immutable catalog of validated company payloads (lookups return copies)"""
+
+    def __init__(
+        self,
+        files: Mapping[str, Path],
+        payloads: Optional[Dict[str, CompanyPayload]] = None,
+        mode: str = "eager",
+        stats: Optional[dict] = None
+    ):
+        self._files = MappingProxyType(dict(files))
+        self._payloads: Dict[str, CompanyPayload] = dict(payloads or {})
+        self._lock = threading.Lock()
+        self._company_locks: Dict[str, threading.Lock] = {}
+        self.mode = mode
+        self.stats = stats or {}
+
+    @property
+    def files(self) -> Mapping[str, Path]:
+        """Read-only company_id -> source file index"""
+        return self._files
+
+    @property
+    def payloads(self) -> Mapping[str, CompanyPayload]:
+        """Read-only view of the payloads loaded so far (values are copies)"""
+        return _PayloadView(self._payloads)
+
+    def company_ids(self) -> List[str]:
+        return list(self._files)
+
+    def __contains__(self, company_id: str) -> bool:
+        return company_id in self._files
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def get(self, company_id: str) -> Optional[CompanyPayload]:
+        """
+        Return a copy of the payload for a company, loading it on first use
+        in lazy mode
+
+        Cold loads hold a per-company lock: concurrent first requests for one
+        company load it once, loads of different companies run in parallel.
+
+        Returns:
+            CompanyPayload (the caller's own copy), or None if the company is
+            not in the catalog or its file failed to load.
+        """
+        payload = self._payloads.get(company_id)
+        if payload is None and company_id in self._files:
+            payload = self._load(company_id)
+        return payload.model_copy(deep=True) if payload is not None else None
+
+    def _load(self, company_id: str) -> Optional[CompanyPayload]:
+        with self._lock:
+            company_lock = self._company_locks.setdefault(company_id, threading.Lock())
+        with company_lock:
+            payload = self._payloads.get(company_id)
+            if payload is None:
+                try:
+                    payload = load_payload_file(self._files[company_id])
+                except Exception:
+                    return None
+                self._payloads[company_id] = payload
+        return payload
+
+
+def build_payload_catalog(
+    payload_dir: str = "data/payloads",
+    mode: str = "eager",
+    max_workers: int = 8,
+    use_processes: bool = False
+) -> PayloadCatalog:
+    """
+    Build a payload catalog from a directory of payload JSON files
+
+    Args:
+        payload_dir: Directory containing <company_id>.json payloads
+        mode: 'eager' to load everything now, 'lazy' to load on first access
+        max_workers: Thread (and process) pool size
+        use_processes: Validate in a process pool instead of the I/O threads
+
+    Returns:
+        PayloadCatalog with load statistics in `catalog.stats`
+    """
+    if mode not in ("eager", "lazy"):
+        raise ValueError(f"Unknown preload mode '{mode}' (expected 'eager' or 'lazy')")
+
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+
+    files = discover_payload_files(Path(payload_dir))
+    payloads: Dict[str, CompanyPayload] = {}
+    failed: Dict[str, str] = {}
+
+    if mode == "eager" and files:
+        ids = list(files)
+        with ThreadPoolExecutor(max_workers=max_workers) as io_pool:
+            if use_processes:
+                raw_files = list(io_pool.map(_read_bytes, files.values()))
+                with ProcessPoolExecutor(max_workers=max_workers) as cpu_pool:
+                    futures = [cpu_pool.submit(_validate_encoded, raw) for raw in raw_files]
+                    for company_id, future in zip(ids, futures):
+                        try:
+                            payloads[company_id] = decode_payload(future.result())
+                        except Exception as e:
+                            failed[company_id] = str(e)[:200]
+            else:
+                futures = [io_pool.submit(load_payload_file, files[cid]) for cid in ids]
+                for company_id, future in zip(ids, futures):
+                    try:
+                        payloads[company_id] = future.result()
+                    except Exception as e:
+                        failed[company_id] = str(e)[:200]
+
+    # Failed files stay out of the index so lookups fall back to the tool path
+    files = {cid: path for cid, path in files.items() if cid not in failed}
+
+    stats = {
+        "mode": mode,
+        "payload_dir": str(payload_dir),
+        "companies": len(files),
+        "loaded": len(payloads),
+        "failed": failed,
+        "use_processes": use_processes,
+        "load_seconds": round(time.perf_counter() - start, 4),
+        "rss_mb": round(current_rss_bytes() / 2**20, 1),
+        "rss_delta_mb": round((current_rss_bytes() - rss_before) / 2**20, 1),
+    }
+
+    return PayloadCatalog(files, payloads, mode=mode, stats=stats)
+
+
+# ============================================================================
+# Process-wide catalog
+# ============================================================================
+
+_catalog: Optional[PayloadCatalog] = None
+
+
+def get_payload_catalog() -> Optional[PayloadCatalog]:
+    """Return the process-wide catalog, or None if preloading is off"""
+    return _catalog
+
+
+def set_payload_catalog(catalog: Optional[PayloadCatalog]) -> None:
+    """Install (or clear, with None) the process-wide catalog"""
+    global _catalog
+    _catalog = catalog
+
+
+def preload_payload_catalog(
+    payload_dir: Optional[str] = None,
+    mode: Optional[str] = None
+) -> Optional[PayloadCatalog]:
+    """
+    Build and install the process-wide catalog according to the environment
+
+    Environment:
+        PAYLOAD_PRELOAD: off (default) | eager | lazy
+        PAYLOAD_DIR: payload directory (default: data/payloads)
+        PAYLOAD_PRELOAD_WORKERS: pool size (default: 8)
+        PAYLOAD_PRELOAD_PROCESSES: validate in a process pool (default: false)
+
+    Returns:
+        The installed catalog, or None when preloading is off.
+    """
+    mode = (mode or os.getenv("PAYLOAD_PRELOAD", "off")).lower()
+    if mode not in PRELOAD_MODES:
+        raise ValueError(f"PAYLOAD_PRELOAD must be one of {PRELOAD_MODES}, got '{mode}'")
+    if mode == "off":
+        return None
+
+    catalog = build_payload_catalog(
+        payload_dir=payload_dir or os.getenv("PAYLOAD_DIR", "data/payloads"),
+        mode=mode,
+        max_workers=int(os.getenv("PAYLOAD_PRELOAD_WORKERS", "8")),
+        use_processes=os.getenv("PAYLOAD_PRELOAD_PROCESSES", "false").lower() == "true"
+    )
+    set_payload_catalog(catalog)
+
+    stats = catalog.stats
+    print(
+        f"📦 Payload catalog ({stats['mode']}): {stats['loaded']}/{stats['companies']} loaded "
+        f"in {stats['load_seconds'] * 1000:.1f} ms | RSS {stats['rss_mb']} MB "
+        f"(+{stats['rss_delta_mb']} MB) | failed: {len(stats['failed'])}"
+    )
+    return catalog
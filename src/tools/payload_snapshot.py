@@ -0,0 +1,198 @@
+"""
+Validated Payload Snapshots
+
+Building a CompanyPayload from JSON re-runs pydantic validation over every
+nested FundingRound / Event / LeadershipMember / Product list. A snapshot is
+the already-validated payload stored as plain Python data next to its source
+JSON; loading it rebuilds the model tree through a precompiled per-class plan
+without invoking any validators.
+
+A snapshot is only reused when all of these still match:
+- the snapshot format version and Python version
+- the schema fingerprint of src/models.py (any model change invalidates it)
+- the size and mtime of the source JSON file
+
+Snapshots are a local cache written by this process; never load snapshot
+files from untrusted locations.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+import typing
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, List, Tuple, Type
+
+from pydantic import BaseModel
+
+from src.models import CompanyPayload
+
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_DIRNAME = "_snapshots"
+SNAPSHOT_SUFFIX = ".snap"
+
+# Plan entry kinds: a nested model field, or a list of nested models
+_MODEL = 0
+_MODEL_LIST = 1
+
+_object_setattr = object.__setattr__
+
+
+def snapshots_enabled() -> bool:
+    """Snapshots are opt-in; set PAYLOAD_SNAPSHOTS=true to enable"""
+    return os.getenv("PAYLOAD_SNAPSHOTS", "false").lower() == "true"
+
+
+@lru_cache(maxsize=1)
+def schema_fingerprint() -> str:
+    """
+    Fingerprint of the CompanyPayload schema
+
+    Derived from the full JSON schema (including every nested model), so
+    adding, removing or retyping a field in src/models.py yields a new value.
+    """
+    schema = json.dumps(CompanyPayload.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+
+
+@lru_cache(maxsize=None)
+def _compile_plan(model_cls: Type[BaseModel]) -> Tuple[Tuple[str, int, type], ...]:
+    """
+    Compile the list of fields that hold nested models for a model class
+
+    Scalar fields (str, int, enum values, lists of str, dicts) are stored
+    as-is and need no work on load, so only nested model fields are planned.
+    """
+    plan: List[Tuple[str, int, type]] = []
+    for name, field in model_cls.model_fields.items():
+        annotation = field.annotation
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            plan.append((name, _MODEL, annotation))
+        elif typing.get_origin(annotation) in (list, List) and args \
+                and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            plan.append((name, _MODEL_LIST, args[0]))
+        elif any(isinstance(a, type) and issubclass(a, BaseModel) for a in args):
+            raise TypeError(f"Unsupported snapshot field {model_cls.__name__}.{name}: {annotation}")
+
+    return tuple(plan)
+
+
+def _encode(model: BaseModel) -> tuple:
+    """Flatten a validated model into (field values, fields_set) plain data"""
+    values = dict(model.__dict__)
+    for name, kind, _ in _compile_plan(type(model)):
+        value = values[name]
+        if value is not None:
+            values[name] = _encode(value) if kind == _MODEL else [_encode(v) for v in value]
+    return values, tuple(model.__pydantic_fields_set__)
+
+
+def _decode(model_cls: Type[BaseModel], data: tuple) -> BaseModel:
+    """Rebuild a model from plain data without running validators"""
+    values, fields_set = data
+    for name, kind, sub_cls in _compile_plan(model_cls):
+        value = values[name]
+        if value is not None:
+            values[name] = _decode(sub_cls, value) if kind == _MODEL else [_decode(sub_cls, v) for v in value]
+
+    model = model_cls.__new__(model_cls)
+    _object_setattr(model, "__dict__", values)
+    _object_setattr(model, "__pydantic_fields_set__", set(fields_set))
+    _object_setattr(model, "__pydantic_extra__", None)
+    _object_setattr(model, "__pydantic_private__", None)
+    return model
+
+
+def encode_payload(payload: CompanyPayload) -> tuple:
+    """Plain-data form of a validated payload (picklable, cheap to rebuild)"""
+    return _encode(payload)
+
+
+def decode_payload(data: tuple) -> CompanyPayload:
+    """Rebuild a CompanyPayload from encode_payload() output without validation"""
+    return _decode(CompanyPayload, data)
+
+
+def snapshot_path_for(payload_path: Path, snapshot_dir: Optional[Path] = None) -> Path:
+    """Location of the snapshot for a payload JSON file"""
+    directory = Path(snapshot_dir) if snapshot_dir else Path(payload_path).parent / SNAPSHOT_DIRNAME
+    return directory / f"{Path(payload_path).stem}{SNAPSHOT_SUFFIX}"
+
+
+def _snapshot_header(payload_path: Path) -> dict:
+    """Header identifying the exact source/schema a snapshot was built from"""
+    stat = Path(payload_path).stat()
+    return {
+        "format": SNAPSHOT_FORMAT_VERSION,
+        "python": sys.version_info[:2],
+        "schema": schema_fingerprint(),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def write_snapshot(
+    payload_path: Path,
+    payload: CompanyPayload,
+    snapshot_dir: Optional[Path] = None
+) -> Optional[Path]:
+    """
+    Persist a validated payload as a snapshot
+
+    Args:
+        payload_path: Source JSON file the payload was validated from
+        payload: The validated CompanyPayload
+        snapshot_dir: Optional override for the snapshot directory
+
+    Returns:
+        Path to the snapshot, or None if it could not be written
+        (snapshots are a cache, so failures are never fatal).
+    """
+    try:
+        header = _snapshot_header(payload_path)
+        body = encode_payload(payload)
+        target = snapshot_path_for(payload_path, snapshot_dir)
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file and rename so readers never see a partial file
+        tmp_path = target.with_suffix(f"{SNAPSHOT_SUFFIX}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(body, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, target)
+        return target
+
+    except Exception:
+        return None
+
+
+def load_snapshot(
+    payload_path: Path,
+    snapshot_dir: Optional[Path] = None
+) -> Optional[CompanyPayload]:
+    """
+    Load a snapshot if it is still valid for the given payload file
+
+    The header is read first, so stale snapshots are rejected without
+    deserializing the payload body.
+
+    Returns:
+        The CompanyPayload, or None on a missing / stale / unreadable snapshot.
+    """
+    try:
+        expected = _snapshot_header(payload_path)
+        with open(snapshot_path_for(payload_path, snapshot_dir), "rb") as f:
+            header = pickle.load(f)
+            if header != expected:
+                return None
+            body = pickle.load(f)
+
+        return decode_payload(body)
+
+    except Exception:
+        return None
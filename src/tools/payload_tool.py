@@ -1,9 +1,11 @@
-import json
 from pathlib import Path
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 
 from src.models import CompanyPayload
+from src.tools.payload_snapshot import load_snapshot, write_snapshot, snapshots_enabled
+from src.tools.payload_catalog import get_payload_catalog
+from src.utils.metrics import CATALOG_HITS, CATALOG_MISSES, SNAPSHOT_HITS, SNAPSHOT_MISSES
 
 
 async def get_latest_structured_payload(company_id: str) -> Optional[CompanyPayload]:
@@ -32,6 +34,15 @@ async def get_latest_structured_payload(company_id: str) -> Optional[CompanyPayl
         ValueError: If payload JSON is invalid
     """
 
+    # Serve from the preloaded in-memory catalog when one is installed
+    catalog = get_payload_catalog()
+    if catalog is not None:
+        payload = catalog.get(company_id)
+        if payload is not None:
+            CATALOG_HITS.inc()
+            return payload
+        CATALOG_MISSES.inc()
+
     # Try multiple possible payload locations
     possible_paths = [
         # Assignment 2 structure (from original project)
@@ -56,15 +67,28 @@ async def get_latest_structured_payload(company_id: str) -> Optional[CompanyPayl
             f"Searched: {[str(p) for p in possible_paths]}"
         )
 
-    # Load and parse JSON
+    # Fast path: reuse the validated snapshot if it is current for this file
+    use_snapshots = snapshots_enabled()
+    if use_snapshots:
+        cached = load_snapshot(payload_path)
+        if cached is not None:
+            SNAPSHOT_HITS.inc()
+            return cached
+        SNAPSHOT_MISSES.inc()
+
+    # Load, parse and validate JSON in a single pydantic-core pass
     try:
         with open(payload_path, 'r', encoding='utf-8') as f:
-            payload_data = json.load(f)
-
-        # Validate and return as Pydantic model
-        return CompanyPayload(**payload_data)
+            payload = CompanyPayload.model_validate_json(f.read())
 
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON in payload file {payload_path}: {e}")
+    except ValidationError as e:
+        if any(err.get("type") == "json_invalid" for err in e.errors()):
+            raise ValueError(f"Invalid JSON in payload file {payload_path}: {e}")
+        raise ValueError(f"Error loading payload for {company_id}: {e}")
     except Exception as e:
-        raise ValueError(f"Error loading payload for {company_id}: {e}")
\ No newline at end of file
+        raise ValueError(f"Error loading payload for {company_id}: {e}")
+
+    if use_snapshots:
+        write_snapshot(payload_path, payload)
+
+    return payload
\ No newline at end of file
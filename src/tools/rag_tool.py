@@ -1,13 +1,28 @@
 import os
-from typing import List, Dict
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from openai import OpenAI
 from pydantic import BaseModel, Field
 
+from src.utils.metrics import RAG_CHUNKS_PER_QUERY
+from src.utils.tracing import span
+from src.utils.usage import record_usage
+from src.utils.context_builder import count_tokens
+from src.utils.rate_limiter import get_openai_limiter, openai_http_client
+from src.utils.lazy import lazy_callable
+from src.tools.sparse_index import get_sparse_index, reciprocal_rank_fusion, sparse_index_path
+
 # Load environment variables
 load_dotenv()
 
+# Client classes (SDKs are imported on first call)
+Pinecone = lazy_callable("pinecone", "Pinecone")
+OpenAI = lazy_callable("openai", "OpenAI")
+
+# dense: Pinecone only; sparse: local BM25 only; hybrid: both, merged with RRF
+SEARCH_MODES = ("dense", "sparse", "hybrid")
+
+_warned_no_sparse = False
+
 
 class RAGChunk(BaseModel):
     """Retrieved chunk from vector database"""
@@ -22,13 +37,15 @@ async def rag_search_company(
     query: str,
     k: int = 5,
     index_name: str = "pe-dashboard-ai50",
-    embedding_model: str = "text-embedding-3-small"
+    embedding_model: str = "text-embedding-3-small",
+    mode: Optional[str] = None
 ) -> List[Dict]:
     """
     Tool: rag_search_company
 
     Perform retrieval-augmented search for the specified company and query.
-    Searches Pinecone vector DB created in Assignment 2.
+    Searches Pinecone vector DB created in Assignment 2, optionally combined
+    with the local BM25 index (src.tools.sparse_index).
 
     Args:
         company_id: The canonical company identifier (normalized, lowercase).
@@ -36,6 +53,15 @@ async def rag_search_company(
         k: Number of top results to return (default: 5).
         index_name: Pinecone index name (default: "pe-dashboard-ai50").
         embedding_model: OpenAI embedding model (default: "text-embedding-3-small").
+        mode: 'dense', 'sparse' or 'hybrid' (default: RAG_SEARCH_MODE or 'dense').
+            Hybrid takes k * RAG_HYBRID_CANDIDATES candidates from each backend
+            and fuses them with reciprocal rank fusion ('score' is then the
+            fused score). Without a sparse index, searches fall back to dense.
+
+    Environment:
+        PINECONE_INDEX_HOST: Optional data-plane host for the index (skips the
+            index lookup; also used to point at a local stand-in server).
+        OPENAI_BASE_URL: Read by the OpenAI client to use another endpoint.
 
     Returns:
         A list of chunks with metadata:
@@ -50,6 +76,39 @@ async def rag_search_company(
     Raises:
         ValueError: If API keys are missing or index doesn't exist
     """
+    global _warned_no_sparse
+
+    mode = (mode or os.getenv("RAG_SEARCH_MODE", "dense")).lower()
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}' (expected one of {', '.join(SEARCH_MODES)})")
+
+    sparse = get_sparse_index() if mode != "dense" else None
+    if mode != "dense" and sparse is None:
+        if not _warned_no_sparse:
+            print(f"⚠️  No sparse index at {sparse_index_path()}; {mode} search falls back to dense")
+            _warned_no_sparse = True
+        mode = "dense"
+
+    if mode == "sparse":
+        with span("rag.sparse", company_id=company_id, top_k=k):
+            results = sparse.search(company_id, query, k)
+    elif mode == "hybrid":
+        candidates = k * int(os.getenv("RAG_HYBRID_CANDIDATES", "3"))
+        dense = await _dense_search(company_id, query, candidates, index_name, embedding_model)
+        with span("rag.fusion", company_id=company_id, top_k=k) as fusion_span:
+            keyword = sparse.search(company_id, query, candidates)
+            results = reciprocal_rank_fusion([dense, keyword], k)
+            fusion_span.set_attributes(dense=len(dense), sparse=len(keyword))
+    else:
+        results = await _dense_search(company_id, query, k, index_name, embedding_model)
+
+    RAG_CHUNKS_PER_QUERY.observe(len(results))
+
+    return results
+
+
+async def _dense_search(company_id: str, query: str, k: int, index_name: str, embedding_model: str) -> List[Dict]:
+    """Embedding + Pinecone query filtered to the company"""
 
     # Get API keys from environment
     pinecone_api_key = os.getenv("PINECONE_API_KEY")
@@ -63,18 +122,25 @@ async def rag_search_company(
     # Initialize clients
     try:
         pc = Pinecone(api_key=pinecone_api_key)
-        openai_client = OpenAI(api_key=openai_api_key)
-        index = pc.Index(index_name)
+        openai_client = OpenAI(api_key=openai_api_key, http_client=openai_http_client())
+        index_host = os.getenv("PINECONE_INDEX_HOST")
+        index = pc.Index(index_name, host=index_host) if index_host else pc.Index(index_name)
 
     except Exception as e:
         raise ValueError(f"Failed to connect to Pinecone index '{index_name}': {e}")
 
-    # Generate query embedding
+    # Generate query embedding (after waiting for rate-limit capacity)
+    limiter = get_openai_limiter()
+    estimate = count_tokens(query, embedding_model)
+    await limiter.acquire(estimate)
     try:
-        response = openai_client.embeddings.create(
-            model=embedding_model,
-            input=query
-        )
+        with span("rag.embedding", model=embedding_model, company_id=company_id):
+            response = openai_client.embeddings.create(
+                model=embedding_model,
+                input=query
+            )
+        record_usage(embedding_model, getattr(response, "usage", None))
+        limiter.settle(estimate, getattr(getattr(response, "usage", None), "total_tokens", None))
         query_vector = response.data[0].embedding
 
     except Exception as e:
@@ -82,12 +148,14 @@ async def rag_search_company(
 
     # Search Pinecone with company filter
     try:
-        results = index.query(
-            vector=query_vector,
-            top_k=k,
-            include_metadata=True,
-            filter={'company_id': company_id}  # Filter to specific company
-        )
+        with span("rag.query", index=index_name, top_k=k, company_id=company_id) as query_span:
+            results = index.query(
+                vector=query_vector,
+                top_k=k,
+                include_metadata=True,
+                filter={'company_id': company_id}  # Filter to specific company
+            )
+            query_span.set_attribute("matches", len(results.get('matches', [])))
 
     except Exception as e:
         raise ValueError(f"Pinecone query failed: {e}")
@@ -98,6 +166,7 @@ async def rag_search_company(
         metadata = match.get('metadata', {})
 
         formatted_results.append({
+            'id': match.get('id'),
             'text': metadata.get('text', ''),
             'source_url': metadata.get('source_file', f"https://{company_id}.com"),  # Fallback
             'score': float(match.get('score', 0.0)),
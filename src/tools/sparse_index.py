@@ -0,0 +1,287 @@
+"""
+Local Sparse (BM25) Index for Hybrid Retrieval
+
+Dense search misses exact terms in keyword-heavy queries ("layoffs
+challenges issues controversies ..."). This module keeps an Okapi BM25
+index over the same chunks that are in Pinecone, so rag_search_company can
+run sparse and hybrid searches (see rag_tool.rag_search_company(mode=...)):
+
+- Corpus: a JSONL file of chunks ({"id", "company_id", "text",
+  "source_url", "page_type", "token_count"}), exported from the Pinecone
+  index with `python -m src.tools.sparse_index export`
+- Postings are built per company at load time, so a query only scores
+  the company's own chunks and IDF reflects that company's corpus (the
+  same scope as the dense search's company_id filter)
+- reciprocal_rank_fusion() merges ranked lists from both backends
+
+Configuration (environment):
+    SPARSE_INDEX_PATH=data/sparse_index/chunks.jsonl
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Okapi BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Reciprocal rank fusion constant (Cormack et al.)
+RRF_K = 60
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with we our their they".split()
+)
+
+
+def stem(token: str) -> str:
+    """Light plural stemming so 'layoffs' matches 'layoff' and 'companies' matches 'company'"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(t) for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_key(chunk: Dict) -> str:
+    """Identity used to merge the same chunk across backends (vector id, else text)"""
+    return chunk.get("id") or chunk.get("text", "")
+
+
+# ============================================================================
+# BM25 index
+# ============================================================================
+
+class _CompanyPostings:
+    """Inverted index over one company's chunks"""
+
+    def __init__(self):
+        self.chunks: List[Dict] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[tuple]] = defaultdict(list)  # term -> [(chunk_idx, tf)]
+        self.total_length = 0
+        self.avg_length = 0.0
+
+    def add(self, chunk: Dict) -> None:
+        terms = Counter(tokenize(chunk.get("text", "")))
+        idx = len(self.chunks)
+        self.chunks.append(chunk)
+        length = sum(terms.values())
+        self.lengths.append(length)
+        for term, tf in terms.items():
+            self.postings[term].append((idx, tf))
+        self.total_length += length
+        self.avg_length = self.total_length / len(self.lengths)
+
+    def search(self, query: str, k: int) -> List[tuple]:
+        n = len(self.chunks)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for idx, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[idx] / (self.avg_length or 1))
+                scores[idx] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.chunks[idx], score) for idx, score in ranked]
+
+
+class SparseIndex:
+    """BM25 index with per-company postings"""
+
+    def __init__(self):
+        self._companies: Dict[str, _CompanyPostings] = {}
+
+    def __len__(self) -> int:
+        return sum(len(p.chunks) for p in self._companies.values())
+
+    def companies(self) -> List[str]:
+        return sorted(self._companies)
+
+    def company_chunks(self, company_id: str) -> List[Dict]:
+        postings = self._companies.get(company_id)
+        return list(postings.chunks) if postings is not None else []
+
+    def add(self, chunk: Dict) -> None:
+        """Index one chunk (requires 'company_id' and 'text')"""
+        self._companies.setdefault(chunk["company_id"], _CompanyPostings()).add(chunk)
+
+    def search(self, company_id: str, query: str, k: int = 5) -> List[Dict]:
+        """
+        Top-k chunks of one company by BM25 score
+
+        Returns:
+            Chunks in rag_search_company's result format, 'score' = BM25 score
+        """
+        postings = self._companies.get(company_id)
+        if postings is None:
+            return []
+        return [
+            {
+                "id": chunk.get("id"),
+                "text": chunk.get("text", ""),
+                "source_url": chunk.get("source_url") or f"https://{company_id}.com",
+                "score": score,
+                "metadata": {
+                    "company_id": company_id,
+                    "page_type": chunk.get("page_type"),
+                    "token_count": chunk.get("token_count"),
+                },
+            }
+            for chunk, score in postings.search(query, k)
+        ]
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Dict]) -> "SparseIndex":
+        index = cls()
+        for chunk in chunks:
+            if chunk.get("company_id") and chunk.get("text"):
+                index.add(chunk)
+        return index
+
+    @classmethod
+    def load(cls, path: Path) -> "SparseIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_chunks(json.loads(line) for line in f if line.strip())
+
+
+def write_chunks(chunks: Iterable[Dict], path: Path) -> int:
+    """Write a chunk corpus as JSONL; returns the number of chunks"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk) + "\n")
+            count += 1
+    return count
+
+
+# ============================================================================
+# Process-wide index
+# ============================================================================
+
+_index: Optional[SparseIndex] = None
+_index_path: Optional[Path] = None
+_lock = threading.Lock()
+
+
+def sparse_index_path() -> Path:
+    return Path(os.getenv("SPARSE_INDEX_PATH", "data/sparse_index/chunks.jsonl"))
+
+
+def get_sparse_index() -> Optional[SparseIndex]:
+    """The BM25 index for SPARSE_INDEX_PATH, loaded on first use (None if no corpus exists)"""
+    global _index, _index_path
+    path = sparse_index_path()
+    if _index is not None and _index_path == path:
+        return _index
+    with _lock:
+        if _index is None or _index_path != path:
+            if not path.exists():
+                return None
+            _index = SparseIndex.load(path)
+            _index_path = path
+            print(f"📚 Sparse index loaded: {len(_index)} chunks, {len(_index.companies())} companies")
+    return _index
+
+
+def set_sparse_index(index: Optional[SparseIndex]) -> None:
+    global _index, _index_path
+    _index, _index_path = index, (sparse_index_path() if index is not None else None)
+
+
+# ============================================================================
+# Fusion
+# ============================================================================
+
+def reciprocal_rank_fusion(result_lists: Sequence[Sequence[Dict]], k: int = 5, rrf_k: int = RRF_K) -> List[Dict]:
+    """
+    Merge ranked result lists with reciprocal rank fusion
+
+    Each chunk scores sum(1 / (rrf_k + rank)) over the lists it appears in,
+    so agreement between backends outranks a high rank in only one. Scores
+    of different backends are never compared directly.
+
+    Returns:
+        Top-k chunks (first occurrence kept), 'score' = fused score
+    """
+    fused: Dict[str, float] = defaultdict(float)
+    chunks: Dict[str, Dict] = {}
+    for results in result_lists:
+        for rank, chunk in enumerate(results, 1):
+            key = chunk_key(chunk)
+            fused[key] += 1.0 / (rrf_k + rank)
+            chunks.setdefault(key, chunk)
+
+    ranked = sorted(fused.items(), key=lambda item: -item[1])[:k]
+    return [{**chunks[key], "score": score} for key, score in ranked]
+
+
+# ============================================================================
+# Corpus export
+# ============================================================================
+
+def export_pinecone_chunks(index, batch_size: int = 100) -> Iterable[Dict]:
+    """Every chunk stored in a Pinecone index (index.list() ids, fetched in batches)"""
+    for ids in index.list():
+        ids = list(ids)
+        for start in range(0, len(ids), batch_size):
+            response = index.fetch(ids=ids[start:start + batch_size])
+            vectors = response.get("vectors", {}) if isinstance(response, dict) else response.vectors
+            for vector_id, vector in vectors.items():
+                metadata = (vector.get("metadata") if isinstance(vector, dict) else vector.metadata) or {}
+                yield {
+                    "id": vector_id,
+                    "company_id": metadata.get("company_id"),
+                    "text": metadata.get("text", ""),
+                    "source_url": metadata.get("source_file"),
+                    "page_type": metadata.get("page_type"),
+                    "token_count": metadata.get("token_count"),
+                }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local BM25 index for hybrid retrieval")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Export the Pinecone index's chunks to SPARSE_INDEX_PATH")
+    export.add_argument("--index-name", default=os.getenv("PINECONE_INDEX_NAME", "pe-dashboard-ai50"))
+    search = sub.add_parser("search", help="Query the local index")
+    search.add_argument("company_id")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from pinecone import Pinecone
+        pc = Pinecone(api_key=os.environ["PINECONE_API_KEY"])
+        host = os.getenv("PINECONE_INDEX_HOST")
+        index = pc.Index(args.index_name, host=host) if host else pc.Index(args.index_name)
+        count = write_chunks(export_pinecone_chunks(index), sparse_index_path())
+        print(f"✅ Exported {count} chunks to {sparse_index_path()}")
+        return
+
+    index = get_sparse_index()
+    if index is None:
+        raise SystemExit(f"No sparse index at {sparse_index_path()} (run the export command first)")
+    for result in index.search(args.company_id, args.query, args.k):
+        print(f"{result['score']:8.3f}  {result['text'][:120]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+"""
+Offline Batch Dashboard Generation
+
+For the nightly run nobody needs a dashboard within seconds, so instead of
+one synchronous chat completion per company and method the run can:
+
+1. Prepare: load payloads / retrieve chunks and assemble every prompt
+   (DashboardGenerator.prepare_structured_prompt / prepare_rag_prompt)
+2. Write them as one JSONL job file (OpenAI Batch API request format)
+3. Submit the job through a BatchProcessor and wait for it to finish
+4. Collect the results, save each dashboard (save_dashboard) and hand them
+   to the workflow (run_workflow(..., batch_dashboards=...))
+
+Processors share one interface (submit / status / results / cancel):
+- OpenAIBatchProcessor: OpenAI Batch API (files + batches, 24h window,
+  discounted pricing, separate and much larger rate limits)
+- LocalBatchProcessor:  runs the job in-process through the regular
+  client (rate-limited); output is written in the Batch API format. Used
+  by tests and when no Batch API is available.
+
+A batch still running when BATCH_TIMEOUT_S passes is cancelled, so it is
+not billed on top of the synchronous fallback. Expired and cancelled
+batches keep the output of the requests that finished; it is collected
+like a completed batch's. Requests without a result are reported in
+BatchResult.failed and the workflow regenerates those synchronously.
+
+Configuration (environment):
+    DASHBOARD_BATCH_MODE=false       Nightly DAG uses batch generation
+    BATCH_PROCESSOR=openai           openai | local
+    BATCH_DIR=data/batches           Job, output and manifest files
+    BATCH_POLL_INTERVAL_S=60
+    BATCH_TIMEOUT_S=86400            Then the batch is cancelled
+    BATCH_CANCEL_WAIT_S=600          Wait for a cancelled batch to settle (its partial output)
+    BATCH_PREPARE_CONCURRENCY=8      Concurrent prompt preparations
+
+CLI:
+    python -m src.utils.batch_generation run --companies anthropic,openai --processor local
+    python -m src.utils.batch_generation status <batch_id>
+"""
+
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from pydantic import BaseModel, Field
+
+from src.utils.dashboard_generator import DashboardGenerator, DashboardPrompt
+from src.utils.rate_limiter import estimate_chat_tokens, get_openai_limiter
+from src.utils.usage import UsageSummary, estimate_cost
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+# Terminal statuses whose output file holds the requests that finished
+BATCH_RESULT_STATUSES = ("completed", "expired", "cancelled")
+
+# Batch API requests are billed at half the synchronous price
+BATCH_PRICE_FACTOR = 0.5
+
+METHODS = ("structured", "rag")
+
+
+def batch_mode_enabled() -> bool:
+    return os.getenv("DASHBOARD_BATCH_MODE", "false").lower() == "true"
+
+
+def custom_id_for(company_id: str, method: str) -> str:
+    return f"{company_id}:{method}"
+
+
+# ============================================================================
+# Processors
+# ============================================================================
+
+class BatchProcessor(ABC):
+    """Batch-style interface: submit a JSONL job, poll its status, fetch result lines"""
+
+    name = "base"
+
+    @abstractmethod
+    def submit(self, job_path: Path) -> str:
+        """Submit a job file; returns the batch id"""
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """One of validating | in_progress | finalizing | completed | failed | expired | cancelled"""
+
+    @abstractmethod
+    def results(self, batch_id: str) -> List[dict]:
+        """Output and error lines ({"custom_id", "response": {"status_code", "body"}, "error"})"""
+
+    @abstractmethod
+    def cancel(self, batch_id: str) -> str:
+        """Stop a running batch (no further requests are run or billed); returns its status"""
+
+
+class OpenAIBatchProcessor(BatchProcessor):
+    """OpenAI Batch API"""
+
+    name = "openai"
+
+    def __init__(self, client=None, completion_window: str = "24h"):
+        if client is None:
+            from src.utils.dashboard_generator import openai_client
+            client = openai_client
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, job_path: Path) -> str:
+        with open(job_path, "rb") as f:
+            job_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=job_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+            metadata={"job": job_path.parent.name}
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> List[dict]:
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                text = self.client.files.content(file_id).text
+                lines.extend(json.loads(line) for line in text.splitlines() if line.strip())
+        return lines
+
+    def cancel(self, batch_id: str) -> str:
+        return self.client.batches.cancel(batch_id).status
+
+
+class LocalBatchProcessor(BatchProcessor):
+    """
+    In-process stand-in for the Batch API
+
+    Runs every request through `client` (default: the dashboard generator's
+    OpenAI client) under the shared rate limiter when the job is submitted,
+    and writes the output next to the job in the Batch API output format.
+    """
+
+    name = "local"
+
+    def __init__(self, client=None, max_workers: int = 4):
+        self._client = client
+        self.max_workers = max_workers
+        self._outputs: Dict[str, Path] = {}
+
+    @property
+    def client(self):
+        if self._client is not None:
+            return self._client
+        # Resolved per call so tests / benchmarks can patch the module attribute
+        from src.utils import dashboard_generator
+        return dashboard_generator.openai_client
+
+    def _run_line(self, request: dict) -> dict:
+        body = request["body"]
+        line = {"id": f"batch_req_{uuid4().hex[:12]}", "custom_id": request["custom_id"], "response": None, "error": None}
+        try:
+            get_openai_limiter().acquire_sync(estimate_chat_tokens(body["messages"], body.get("max_tokens", 0), body["model"]))
+            response = self.client.chat.completions.create(**body)
+            payload = response.model_dump() if hasattr(response, "model_dump") else response
+            line["response"] = {"status_code": 200, "body": payload}
+        except Exception as e:
+            line["error"] = {"code": type(e).__name__, "message": str(e)}
+        return line
+
+    def submit(self, job_path: Path) -> str:
+        with open(job_path, "r", encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            lines = list(pool.map(self._run_line, requests))
+
+        batch_id = f"local_{uuid4().hex[:12]}"
+        output_path = job_path.with_name(f"{batch_id}_output.jsonl")
+        with open(output_path, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(json.dumps(line, default=str) + "\n")
+        self._outputs[batch_id] = output_path
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        return "completed" if batch_id in self._outputs else "failed"
+
+    def results(self, batch_id: str) -> List[dict]:
+        with open(self._outputs[batch_id], "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def cancel(self, batch_id: str) -> str:
+        return self.status(batch_id)  # the job already ran in submit()
+
+
+def get_batch_processor(name: Optional[str] = None) -> BatchProcessor:
+    name = (name or os.getenv("BATCH_PROCESSOR", "openai")).lower()
+    if name == "openai":
+        return OpenAIBatchProcessor()
+    if name == "local":
+        return LocalBatchProcessor()
+    raise ValueError(f"Unknown BATCH_PROCESSOR '{name}' (expected 'openai' or 'local')")
+
+
+# ============================================================================
+# Job assembly
+# ============================================================================
+
+class BatchResult(BaseModel):
+    """Outcome of one batch run"""
+    batch_id: Optional[str] = None
+    status: str
+    processor: str
+    job_path: Optional[str] = None
+    requests: int = 0
+    dashboards: Dict[str, Dict[str, str]] = Field(default_factory=dict, description="company_id → method → markdown")
+    usage: Dict[str, UsageSummary] = Field(default_factory=dict, description="company_id → usage")
+    failed: List[str] = Field(default_factory=list, description="custom_ids without a result")
+    saved: List[str] = Field(default_factory=list)
+
+    def for_company(self, company_id: str) -> Optional[dict]:
+        """Batch output for one company in the form run_workflow(batch_dashboards=...) expects"""
+        dashboards = self.dashboards.get(company_id)
+        if not dashboards:
+            return None
+        usage = self.usage.get(company_id) or UsageSummary()
+        return {**dashboards, "usage": usage.model_dump()}
+
+
+async def prepare_prompts(
+    company_ids: Sequence[str],
+    methods: Sequence[str] = METHODS,
+    model: str = "gpt-4o-mini",
+    concurrency: Optional[int] = None
+) -> Tuple[List[DashboardPrompt], List[str]]:
+    """
+    Assemble every prompt for the run (payload loads / retrieval, no LLM calls)
+
+    Returns:
+        (prompts, custom_ids that could not be prepared)
+    """
+    concurrency = concurrency or int(os.getenv("BATCH_PREPARE_CONCURRENCY", "8"))
+    semaphore = asyncio.Semaphore(concurrency)
+    builders = {
+        "structured": DashboardGenerator.prepare_structured_prompt,
+        "rag": DashboardGenerator.prepare_rag_prompt,
+    }
+
+    async def prepare(company_id: str, method: str):
+        async with semaphore:
+            try:
+                return await builders[method](company_id, model)
+            except Exception as e:
+                print(f"⚠️  Could not prepare {method} prompt for {company_id}: {e}")
+                return custom_id_for(company_id, method)
+
+    outcomes = await asyncio.gather(*[prepare(c, m) for c in company_ids for m in methods])
+    prompts = [o for o in outcomes if isinstance(o, DashboardPrompt)]
+    failed = [o for o in outcomes if isinstance(o, str)]
+    return prompts, failed
+
+
+def write_job(prompts: Sequence[DashboardPrompt], job_path: Path) -> int:
+    """Write the prompts that need an LLM call as Batch API request lines"""
+    job_path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with open(job_path, "w", encoding="utf-8") as f:
+        for prompt in prompts:
+            if prompt.fallback is not None:
+                continue
+            f.write(json.dumps({
+                "custom_id": custom_id_for(prompt.company_id, prompt.method),
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": prompt.request_body(),
+            }) + "\n")
+            count += 1
+    return count
+
+
+def wait_for_batch(processor: BatchProcessor, batch_id: str, poll_interval_s: float = 60.0,
+                   timeout_s: float = 86400.0, cancel_wait_s: Optional[float] = None) -> str:
+    """
+    Poll until the batch reaches a terminal status
+
+    A batch still running after `timeout_s` is cancelled, then polled for up
+    to `cancel_wait_s` (default BATCH_CANCEL_WAIT_S) until it settles as
+    'cancelled' with the output of the requests that finished.
+    """
+    cancel_wait_s = cancel_wait_s if cancel_wait_s is not None else float(os.getenv("BATCH_CANCEL_WAIT_S", "600"))
+    deadline = time.monotonic() + timeout_s
+    cancelled = False
+    while True:
+        status = processor.status(batch_id)
+        if status in BATCH_TERMINAL_STATUSES:
+            return status
+        if time.monotonic() >= deadline:
+            if cancelled:
+                return status
+            print(f"⏹️  Batch {batch_id} still {status} after {timeout_s:.0f}s, cancelling")
+            status = processor.cancel(batch_id)
+            if status in BATCH_TERMINAL_STATUSES:
+                return status
+            cancelled = True
+            deadline = time.monotonic() + cancel_wait_s
+        print(f"⏳ Batch {batch_id}: {status}")
+        time.sleep(poll_interval_s)
+
+
+def parse_result_line(line: dict) -> Tuple[Optional[str], Optional[dict], Optional[str]]:
+    """(markdown, usage dict, error) from one Batch API output line"""
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        error = line.get("error") or (response.get("body") or {}).get("error")
+        return None, None, str(error or f"status {response.get('status_code')}")
+    body = response.get("body") or {}
+    try:
+        markdown = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None, None, "malformed response body"
+    return markdown, body.get("usage"), None
+
+
+# ============================================================================
+# Batch run
+# ============================================================================
+
+async def run_batch(
+    company_ids: Sequence[str],
+    methods: Sequence[str] = METHODS,
+    model: str = "gpt-4o-mini",
+    processor: Optional[BatchProcessor] = None,
+    batch_dir: Optional[Path] = None,
+    poll_interval_s: Optional[float] = None,
+    timeout_s: Optional[float] = None,
+    save: bool = True,
+    run_id: Optional[str] = None
+) -> BatchResult:
+    """
+    Generate dashboards for many companies through one batch job
+
+    Args:
+        company_ids: Companies to generate
+        methods: 'structured' and/or 'rag'
+        model: OpenAI model for every request
+        processor: BatchProcessor (default from BATCH_PROCESSOR)
+        batch_dir: Where the job / manifest are written (default BATCH_DIR)
+        save: Save each dashboard with DashboardGenerator.save_dashboard
+        run_id: Optional run id used in saved dashboard filenames
+
+    Returns:
+        BatchResult with dashboards and usage per company
+    """
+    processor = processor or get_batch_processor()
+    poll_interval_s = poll_interval_s if poll_interval_s is not None else float(os.getenv("BATCH_POLL_INTERVAL_S", "60"))
+    timeout_s = timeout_s if timeout_s is not None else float(os.getenv("BATCH_TIMEOUT_S", "86400"))
+    job_dir = Path(batch_dir or os.getenv("BATCH_DIR", "data/batches")) / datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
+    job_path = job_dir / "job.jsonl"
+
+    print(f"📦 Preparing {len(company_ids) * len(methods)} prompts for batch generation...")
+    prompts, failed = await prepare_prompts(company_ids, methods, model)
+    requests = write_job(prompts, job_path)
+
+    result = BatchResult(status="completed", processor=processor.name, job_path=str(job_path),
+                         requests=requests, failed=failed)
+
+    # Dashboards that need no LLM call (payload missing, nothing retrieved)
+    for prompt in prompts:
+        if prompt.fallback is not None:
+            result.dashboards.setdefault(prompt.company_id, {})[prompt.method] = prompt.fallback
+
+    if requests:
+        # Run synchronously in a worker thread: the local processor and polling both block
+        result.batch_id = await asyncio.to_thread(processor.submit, job_path)
+        print(f"🚀 Submitted batch {result.batch_id} ({requests} requests, {processor.name})")
+        _write_manifest(job_dir, result)
+
+        result.status = await asyncio.to_thread(wait_for_batch, processor, result.batch_id, poll_interval_s, timeout_s)
+        # Expired / cancelled batches still carry the requests that finished
+        lines = await asyncio.to_thread(processor.results, result.batch_id) \
+            if result.status in BATCH_RESULT_STATUSES else []
+
+        seen = set()
+        for line in lines:
+            custom_id = line.get("custom_id", "")
+            company_id, _, method = custom_id.rpartition(":")
+            markdown, usage, error = parse_result_line(line)
+            if error is not None:
+                print(f"⚠️  Batch request {custom_id} failed: {error}")
+                continue
+            seen.add(custom_id)
+            result.dashboards.setdefault(company_id, {})[method] = markdown
+            if usage:
+                prompt_tokens = int(usage.get("prompt_tokens") or 0)
+                completion_tokens = int(usage.get("completion_tokens") or 0)
+                result.usage.setdefault(company_id, UsageSummary()).add(
+                    model, prompt_tokens, completion_tokens,
+                    cost_usd=estimate_cost(model, prompt_tokens, completion_tokens) * BATCH_PRICE_FACTOR
+                )
+
+        result.failed.extend(
+            custom_id_for(p.company_id, p.method) for p in prompts
+            if p.fallback is None and custom_id_for(p.company_id, p.method) not in seen
+        )
+
+    # Fan out to disk
+    if save:
+        for company_id, dashboards in result.dashboards.items():
+            for method, markdown in dashboards.items():
+                path = DashboardGenerator.save_dashboard(company_id, markdown, method, run_id)
+                result.saved.append(str(path))
+
+    _write_manifest(job_dir, result)
+    total = UsageSummary()
+    for usage in result.usage.values():
+        total.merge(usage)
+    print(f"✅ Batch {result.batch_id or '(no LLM requests)'}: {result.status}, "
+          f"{sum(len(d) for d in result.dashboards.values())} dashboards / {len(result.failed)} failed, "
+          f"{total.total_tokens} tokens (~${total.cost_usd:.4f})")
+    return result
+
+
+def _write_manifest(job_dir: Path, result: BatchResult) -> None:
+    """Batch id and status next to the job, so a crashed run can be inspected / collected"""
+    job_dir.mkdir(parents=True, exist_ok=True)
+    manifest = result.model_dump(exclude={"dashboards"})
+    with open(job_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline batch dashboard generation")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Prepare, submit and collect a batch")
+    run.add_argument("--companies", required=True, help="Comma-separated company_ids")
+    run.add_argument("--methods", default="structured,rag")
+    run.add_argument("--model", default="gpt-4o-mini")
+    run.add_argument("--processor", choices=["openai", "local"])
+    status = sub.add_parser("status", help="Status of a submitted OpenAI batch")
+    status.add_argument("batch_id")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        print(OpenAIBatchProcessor().status(args.batch_id))
+        return
+
+    result = asyncio.run(run_batch(
+        [c.strip() for c in args.companies.split(",") if c.strip()],
+        methods=[m.strip() for m in args.methods.split(",")],
+        model=args.model,
+        processor=get_batch_processor(args.processor)
+    ))
+    print(json.dumps(result.model_dump(exclude={"dashboards"}), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Extractive Chunk Compression
+
+Retrieved chunks are scraped pages: besides the facts they carry navigation
+text, cookie banners, sign-up prompts and sentences that have nothing to do
+with the section they were retrieved for. This CPU-only stage runs between
+retrieval (and dedup, see retrieval_postprocess) and prompt assembly:
+
+1. Segment each chunk into sentences (and lines, for list / nav text)
+2. Drop boilerplate: sentences matching common banner patterns, and
+   sentences whose fingerprint repeats across several of the company's
+   pages (from the local chunk corpus, see sparse_index, plus the
+   retrieved chunks themselves). A repeated sentence that states a number
+   or matches the query is a repeated fact, not a template: it is kept once
+3. Drop sentences unrelated to the section query: a sentence is kept if
+   it shares a term with the query or states a number (amounts, dates,
+   counts are the facts dashboards are built from)
+4. If the chunk is still over RAG_COMPRESSION_RATIO of its original size,
+   sentences without numbers are cut, lowest query overlap first, until
+   it fits (numeric sentences are never cut; order is preserved)
+
+A chunk always keeps its best sentence, so compression never silently
+removes a retrieved passage. Relevance is lexical (stemmed terms with
+prefix matching so 'founded' matches 'founding'); no model is loaded.
+
+Configuration (environment):
+    RAG_COMPRESSION=false            Opt-in (see below)
+    RAG_COMPRESSION_RATIO=0.5        Target size per chunk (fraction of tokens)
+    RAG_BOILERPLATE_MIN_PAGES=3      Pages a sentence must repeat on to be boilerplate
+
+Measured against the committed dashboards with benchmarks/bench_compression.py.
+Numeric facts survive by construction (step 3); non-numeric facts such as
+investor names, products and risk events survive only if their sentence
+overlaps the query. Compression stays opt-in until the benchmark's entity
+retention shows no loss.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from src.tools.sparse_index import get_sparse_index, tokenize
+from src.utils.context_builder import count_tokens
+from src.utils.metrics import RAG_TOKENS_SAVED
+
+# Sentence boundary: terminal punctuation followed by whitespace and an uppercase
+# letter, digit, quote or bracket (keeps "$7.6B", "e.g. the" and "U.S." intact)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'“(\[])")
+_NUMBER = re.compile(r"\d")
+
+BOILERPLATE_PATTERNS = re.compile(
+    r"\b(cookies?|privacy policy|terms of (use|service)|all rights reserved|skip to (main )?content|"
+    r"sign (up|in)|log ?in|subscribe|newsletter|accept all|back to top|javascript|"
+    r"follow us|share (this|on))\b|©",
+    re.IGNORECASE
+)
+# Pattern matches only count as boilerplate in short sentences
+BOILERPLATE_MAX_WORDS = 25
+
+PREFIX_LENGTH = 5
+
+
+def compression_enabled() -> bool:
+    return os.getenv("RAG_COMPRESSION", "false").lower() == "true"
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of a chunk; line breaks also end a sentence (nav / list text)"""
+    sentences = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            sentences.extend(s.strip() for s in _SENTENCE_END.split(line) if s.strip())
+    return sentences
+
+
+def sentence_fingerprint(sentence: str) -> str:
+    normalized = " ".join(re.findall(r"[a-z0-9]+", sentence.lower()))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def term_keys(text: str) -> Set[str]:
+    """Stemmed terms cut to a prefix, so inflections of a word match"""
+    return {t[:PREFIX_LENGTH] for t in tokenize(text)}
+
+
+def is_pattern_boilerplate(sentence: str) -> bool:
+    return len(sentence.split()) <= BOILERPLATE_MAX_WORDS and BOILERPLATE_PATTERNS.search(sentence) is not None
+
+
+# ============================================================================
+# Boilerplate fingerprints
+# ============================================================================
+
+def repeated_fingerprints(chunks: Iterable[Dict], min_pages: int) -> Set[str]:
+    """Fingerprints of sentences that appear on at least `min_pages` distinct pages"""
+    pages: Dict[str, Set[str]] = defaultdict(set)
+    for chunk in chunks:
+        page = chunk.get("source_url") or chunk.get("id") or chunk.get("text", "")[:64]
+        for sentence in split_sentences(chunk.get("text", "")):
+            pages[sentence_fingerprint(sentence)].add(page)
+    return {fp for fp, seen in pages.items() if len(seen) >= min_pages}
+
+
+_corpus_boilerplate: Dict[Tuple[int, str, int], Set[str]] = {}
+_corpus_lock = threading.Lock()
+
+
+def company_boilerplate(company_id: str, min_pages: int) -> Set[str]:
+    """Repeated-sentence fingerprints from the company's full chunk corpus (cached per index)"""
+    index = get_sparse_index()
+    if index is None:
+        return set()
+    key = (id(index), company_id, min_pages)
+    cached = _corpus_boilerplate.get(key)
+    if cached is None:
+        cached = repeated_fingerprints(index.company_chunks(company_id), min_pages)
+        with _corpus_lock:
+            _corpus_boilerplate[key] = cached
+    return cached
+
+
+# ============================================================================
+# Compression
+# ============================================================================
+
+class CompressionReport(BaseModel):
+    """Token accounting for one company's compressed retrieval results"""
+    tokens_in: int = 0
+    tokens_out: int = 0
+    sentences_in: int = 0
+    sentences_kept: int = 0
+    boilerplate: int = 0
+    unrelated: int = 0
+    over_budget: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+    @property
+    def ratio(self) -> float:
+        return self.tokens_out / self.tokens_in if self.tokens_in else 1.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.tokens_in} → {self.tokens_out} tokens ({self.ratio:.0%}), "
+            f"{self.sentences_kept}/{self.sentences_in} sentences kept "
+            f"({self.boilerplate} boilerplate, {self.unrelated} unrelated, {self.over_budget} over budget)"
+        )
+
+
+def compress_chunk(
+    text: str,
+    query_keys: Set[str],
+    boilerplate: Set[str],
+    target_ratio: float,
+    report: CompressionReport,
+    emitted: Set[str],
+    model: str = "gpt-4o-mini"
+) -> str:
+    """
+    Extract the query-relevant, non-boilerplate sentences of one chunk
+
+    `emitted` collects the repeated sentences already kept (shared across a
+    company's chunks so each is sent once).
+    """
+    sentences = split_sentences(text)
+    tokens_in = count_tokens(text, model)
+    report.sentences_in += len(sentences)
+    report.tokens_in += tokens_in
+
+    scored = []  # (position, sentence, score, tokens, has_number)
+    fallback = None
+    for position, sentence in enumerate(sentences):
+        if is_pattern_boilerplate(sentence):
+            report.boilerplate += 1
+            continue
+        overlap = len(term_keys(sentence) & query_keys)
+        has_number = _NUMBER.search(sentence) is not None
+        fingerprint = sentence_fingerprint(sentence)
+        if fingerprint in boilerplate:
+            # Repeated across pages: template text is dropped, a repeated fact is kept once
+            if not (overlap or has_number) or fingerprint in emitted:
+                report.boilerplate += 1
+                continue
+            emitted.add(fingerprint)
+        candidate = (position, sentence, overlap + (1.0 if has_number else 0.0), count_tokens(sentence, model), has_number)
+        if fallback is None:
+            fallback = candidate
+        if overlap or has_number:
+            scored.append(candidate)
+        else:
+            report.unrelated += 1
+
+    if not scored:
+        if fallback is None:
+            return ""
+        # Nothing matched lexically: keep the passage's opening sentence
+        report.unrelated -= 1
+        scored = [fallback]
+
+    budget = max(int(tokens_in * target_ratio), 1)
+    if sum(c[3] for c in scored) > budget:
+        # Sentences stating numbers are always kept; the rest compete for what remains
+        kept = [c for c in scored if c[4]]
+        used = sum(c[3] for c in kept)
+        for candidate in sorted((c for c in scored if not c[4]), key=lambda c: (-c[2], c[0])):
+            if kept and used + candidate[3] > budget:
+                report.over_budget += 1
+                continue
+            kept.append(candidate)
+            used += candidate[3]
+        scored = sorted(kept, key=lambda c: c[0])
+
+    compressed = " ".join(c[1] for c in scored)
+    report.sentences_kept += len(scored)
+    report.tokens_out += count_tokens(compressed, model)
+    return compressed
+
+
+def compress_sections(
+    section_results: Dict[str, List[Dict]],
+    queries: Dict[str, str],
+    company_id: str,
+    target_ratio: Optional[float] = None,
+    min_pages: Optional[int] = None,
+    model: str = "gpt-4o-mini"
+) -> Tuple[Dict[str, List[Dict]], CompressionReport]:
+    """
+    Compress every retrieved chunk against its section's query
+
+    Args:
+        section_results: section -> chunks (after dedup)
+        queries: section -> retrieval query
+        company_id: Company whose boilerplate fingerprints apply
+        target_ratio: Max kept fraction of each chunk (default RAG_COMPRESSION_RATIO)
+        min_pages: Pages a sentence must repeat on to be boilerplate
+                   (default RAG_BOILERPLATE_MIN_PAGES)
+
+    Returns:
+        (section -> chunks with compressed 'text', report); chunks that
+        compress to nothing are removed
+    """
+    target_ratio = target_ratio if target_ratio is not None else float(os.getenv("RAG_COMPRESSION_RATIO", "0.5"))
+    min_pages = min_pages if min_pages is not None else int(os.getenv("RAG_BOILERPLATE_MIN_PAGES", "3"))
+
+    retrieved = [c for results in section_results.values() for c in results]
+    boilerplate = company_boilerplate(company_id, min_pages) | repeated_fingerprints(retrieved, min_pages)
+
+    report = CompressionReport()
+    emitted: Set[str] = set()
+    compressed: Dict[str, List[Dict]] = {}
+    for section, results in section_results.items():
+        query_keys = term_keys(queries.get(section, ""))
+        compressed[section] = []
+        for chunk in results:
+            text = compress_chunk(chunk.get("text", ""), query_keys, boilerplate, target_ratio, report, emitted, model)
+            if text:
+                compressed[section].append({**chunk, "text": text})
+
+    RAG_TOKENS_SAVED.labels("compression").inc(report.tokens_saved)
+    return compressed, report
@@ -0,0 +1,275 @@
+"""
+Token-Budgeted Context Builder
+
+Assembles LLM prompt context from named sections under a fixed token budget.
+
+Each section is a list of items ordered most-valuable-first (e.g. funding
+rounds newest first, RAG chunks by score) plus a weight. The budget is split
+across sections by weighted water-filling: sections that need less than
+their share keep everything and donate the surplus to the rest. Sections
+over their allocation drop items from the end, and an item that alone
+exceeds the allocation is truncated.
+
+Tokens are counted with tiktoken when its encoding is available locally,
+otherwise with a ~4 characters/token estimate.
+"""
+
+import math
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+DEFAULT_PROMPT_TOKEN_BUDGET = 8000
+CHARS_PER_TOKEN = 4
+
+
+# ============================================================================
+# Token Counting
+# ============================================================================
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """tiktoken encoding for a model, or None if tiktoken / its files are unavailable"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+    except Exception:
+        # Encoding files are downloaded on first use; offline hosts fall back
+        return None
+
+
+def tokenizer_name(model: str = "gpt-4o-mini") -> str:
+    """Name of the tokenizer used for a model ('heuristic' when estimating)"""
+    encoding = _get_encoding(model)
+    return encoding.name if encoding is not None else "heuristic"
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count tokens in text for the given model"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Truncate text to at most max_tokens tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+def prompt_token_budget() -> int:
+    """Total prompt budget (system + instructions + context), from PROMPT_TOKEN_BUDGET"""
+    return int(os.getenv("PROMPT_TOKEN_BUDGET", str(DEFAULT_PROMPT_TOKEN_BUDGET)))
+
+
+# ============================================================================
+# Sections & Report
+# ============================================================================
+
+class ContextSection(BaseModel):
+    """A named block of prompt context"""
+    name: str = Field(..., description="Section identifier (used in the report)")
+    header: str = Field("", description="Text rendered before the items (always kept)")
+    items: List[str] = Field(default_factory=list, description="Content units, most valuable first")
+    weight: float = Field(1.0, description="Relative share of the budget")
+    joiner: str = Field("\n", description="Separator between items")
+    empty_text: str = Field("", description="Rendered in place of items when none are kept")
+
+
+class SectionUsage(BaseModel):
+    """Per-section token accounting"""
+    tokens: int = Field(..., description="Tokens used by the rendered section")
+    requested_tokens: int = Field(..., description="Tokens the untrimmed section would use")
+    budget: int = Field(..., description="Tokens allocated to the section")
+    items_kept: int = Field(..., description="Items kept in full or truncated")
+    items_dropped: int = Field(..., description="Items dropped to fit the budget")
+    truncated: bool = Field(False, description="Whether the last kept item was truncated")
+
+
+class ContextReport(BaseModel):
+    """Token accounting for one assembled context"""
+    budget: int
+    total_tokens: int
+    requested_tokens: int
+    tokenizer: str
+    sections: Dict[str, SectionUsage] = Field(default_factory=dict)
+
+    @property
+    def trimmed(self) -> bool:
+        """Whether any section lost content to fit the budget"""
+        return any(u.items_dropped or u.truncated for u in self.sections.values())
+
+    def summary(self) -> str:
+        """One-line summary for console logs"""
+        parts = ", ".join(f"{name}={usage.tokens}" for name, usage in self.sections.items())
+        return (
+            f"{self.total_tokens}/{self.budget} tokens "
+            f"(requested {self.requested_tokens}, {self.tokenizer}) [{parts}]"
+        )
+
+
+# ============================================================================
+# Builder
+# ============================================================================
+
+def allocate_budget(demands: Dict[str, int], weights: Dict[str, float], budget: int) -> Dict[str, int]:
+    """
+    Weighted water-filling allocation
+
+    Sections whose demand fits in their weighted share are fully satisfied;
+    the leftover is re-shared among the remaining sections.
+    """
+    allocation: Dict[str, int] = {}
+    active = {name for name, demand in demands.items() if demand > 0}
+    remaining = max(budget, 0)
+
+    for name in demands:
+        if name not in active:
+            allocation[name] = 0
+
+    while active:
+        total_weight = sum(max(weights[name], 1e-9) for name in active)
+        share = remaining / total_weight
+        satisfied = [name for name in active if demands[name] <= share * max(weights[name], 1e-9)]
+
+        if not satisfied:
+            for name in active:
+                allocation[name] = int(share * max(weights[name], 1e-9))
+            break
+
+        for name in satisfied:
+            allocation[name] = demands[name]
+            remaining -= demands[name]
+            active.remove(name)
+
+    return allocation
+
+
+def _render(section: ContextSection, items: List[str]) -> str:
+    body = section.joiner.join(items) if items else section.empty_text
+    if section.header and body:
+        return f"{section.header}\n{body}"
+    return section.header or body
+
+
+def _fit_section(
+    section: ContextSection,
+    budget: int,
+    model: str
+) -> Tuple[str, int, int, bool]:
+    """Trim a section's items to fit its budget; returns (text, tokens, kept, truncated)"""
+    text = _render(section, section.items)
+    tokens = count_tokens(text, model)
+    if tokens <= budget:
+        return text, tokens, len(section.items), False
+
+    # Drop items from the end (lowest value) until the section fits
+    kept = list(section.items)
+    while kept:
+        kept.pop()
+        text = _render(section, kept)
+        tokens = count_tokens(text, model)
+        if tokens <= budget:
+            break
+
+    truncated = False
+    next_index = len(kept)
+    if next_index < len(section.items):
+        # Use leftover room for a truncated copy of the next item
+        room = budget - tokens - count_tokens(section.joiner, model) - 1
+        if room >= 16:
+            partial = truncate_to_tokens(section.items[next_index], room, model).rstrip() + " …"
+            candidate = _render(section, kept + [partial])
+            candidate_tokens = count_tokens(candidate, model)
+            if candidate_tokens <= budget:
+                kept.append(partial)
+                text, tokens, truncated = candidate, candidate_tokens, True
+
+    if tokens > budget or (section.items and not kept and not section.empty_text):
+        # Nothing useful fits: drop the section entirely
+        return "", 0, 0, False
+
+    return text, tokens, len(kept), truncated
+
+
+def build_context(
+    sections: List[ContextSection],
+    budget: int,
+    model: str = "gpt-4o-mini",
+    separator: str = "\n\n"
+) -> Tuple[str, ContextReport]:
+    """
+    Assemble sections into a context string within a token budget
+
+    Args:
+        sections: Sections in render order
+        budget: Maximum tokens for the assembled context
+        model: Model whose tokenizer is used for counting
+        separator: Text placed between rendered sections
+
+    Returns:
+        (context string, ContextReport with per-section token usage)
+    """
+    full_texts = {s.name: _render(s, s.items) for s in sections}
+    demands = {name: count_tokens(text, model) for name, text in full_texts.items()}
+    requested = sum(demands.values())
+
+    # Separators are charged up front so sections can use the rest
+    separator_cost = count_tokens(separator, model) * max(len(sections) - 1, 0)
+    allocation = allocate_budget(
+        demands,
+        {s.name: s.weight for s in sections},
+        budget - separator_cost
+    )
+
+    rendered: List[str] = []
+    usage: Dict[str, SectionUsage] = {}
+    for section in sections:
+        text, tokens, kept, truncated = _fit_section(section, allocation[section.name], model)
+        if text:
+            rendered.append(text)
+        usage[section.name] = SectionUsage(
+            tokens=tokens,
+            requested_tokens=demands[section.name],
+            budget=allocation[section.name],
+            items_kept=kept,
+            items_dropped=len(section.items) - kept,
+            truncated=truncated
+        )
+
+    context = separator.join(rendered)
+    report = ContextReport(
+        budget=budget,
+        total_tokens=count_tokens(context, model),
+        requested_tokens=requested + separator_cost,
+        tokenizer=tokenizer_name(model),
+        sections=usage
+    )
+    return context, report
+
+
+def context_budget_for(fixed_prompt_parts: List[str], model: str = "gpt-4o-mini",
+                       total_budget: Optional[int] = None) -> int:
+    """Tokens left for context after the fixed system/instruction text"""
+    total = total_budget if total_budget is not None else prompt_token_budget()
+    fixed = sum(count_tokens(part, model) for part in fixed_prompt_parts)
+    return max(total - fixed, 0)
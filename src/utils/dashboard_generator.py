@@ -4,28 +4,51 @@ Dashboard Generation Utilities with LLM Synthesis
 Generates 8-section PE dashboards using:
 1. Structured extraction (from payloads) → LLM synthesis
 2. RAG-based generation (from vector DB) → LLM synthesis
+3. Structured extraction (from payloads) → deterministic template (no LLM),
+   optionally enriched with a short LLM-written executive summary
+4. Structured extraction (from payloads) → one smaller LLM completion per
+   section, run concurrently and stitched in template order ('sectioned')
 
 UPDATED: Now includes OpenAI LLM calls for professional narrative generation
 """
 
 import os
+import re
 import asyncio
+import contextvars
+import functools
+import hashlib
 import json
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
+from pydantic import BaseModel, Field
 
 from src.tools.payload_tool import get_latest_structured_payload
 from src.tools.rag_tool import rag_search_company
+from src.tools.payload_catalog import get_payload_catalog
 from src.models import CompanyPayload
+from src.utils.context_builder import ContextSection, build_context, context_budget_for
+from src.utils.retrieval_postprocess import dedup_enabled, postprocess_sections
+from src.utils.chunk_compression import compress_sections, compression_enabled
+from src.utils.template_renderer import PE_DASHBOARD_SECTIONS, render_template_dashboard
+from src.utils.metrics import DASHBOARD_SECTION_ATTEMPTS, STAGE, record_llm_error, record_llm_response
+from src.utils.tracing import span
+from src.utils.usage import record_usage
+from src.utils.singleflight import SingleFlight
+from src.utils.rate_limiter import estimate_chat_tokens, get_openai_limiter, openai_http_client
+from src.utils.lazy import LazyObject, lazy_callable
 
 # Load environment
 load_dotenv()
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# OpenAI client (the SDK is imported and the client built on first use); its
+# HTTP client reports rate-limit headers to the shared limiter
+OpenAI = lazy_callable("openai", "OpenAI")
+openai_client = LazyObject(lambda: OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=openai_http_client()))
 
 
 # ============================================================================
@@ -106,6 +129,224 @@ List: Specific information NOT publicly disclosed (e.g., "Revenue details", "Cus
 """
 
 
+ENRICHMENT_PROMPT = """Below is a PE due diligence dashboard for **{company_name}** rendered directly from verified company data.
+
+Write a 2-paragraph executive summary for investors that synthesizes it: positioning, funding and growth signals, key risks and the most important disclosure gaps.
+
+Rules:
+- Use ONLY facts stated in the dashboard
+- NEVER invent metrics, valuations, or customer counts
+- Return plain paragraphs only (no headings, no bullet points)
+
+---
+
+{dashboard}"""
+
+
+SECTION_SYSTEM_PROMPT = """You are an expert private equity analyst writing ONE section of a due diligence dashboard for institutional investors.
+
+- Use ONLY information provided in the context; for missing information, write "Not disclosed."
+- NEVER invent metrics, valuations, or customer counts
+- Include specific numbers and dates when available
+- Professional, analytical tone; synthesize, don't copy-paste
+- Return only the section body in markdown: no section heading, no title, no preamble"""
+
+
+SECTION_PROMPT = """Write the **{section}** section of the PE due diligence dashboard for **{company_name}**.
+
+{instruction}
+
+**CONTEXT PROVIDED BELOW:**
+"""
+
+
+# Per-section instructions, taken from the full-dashboard prompt so both modes ask for the same content
+SECTION_INSTRUCTIONS = dict(re.findall(r"^## (\d\. [^\n]+)\n([^\n]+)$", DASHBOARD_GENERATION_PROMPT, re.MULTILINE))
+
+# Structured context sections each dashboard section is written from
+SECTION_CONTEXT = {
+    "1. Company Overview": ("company", "leadership"),
+    "2. Business Model and GTM": ("company", "business_model", "products", "competitors"),
+    "3. Funding & Investor Profile": ("snapshot", "funding_history", "investors"),
+    "4. Growth Momentum": ("growth", "snapshot", "timeline"),
+    "5. Visibility & Market Sentiment": ("visibility", "timeline"),
+    "6. Risks and Challenges": ("risks", "competitors", "timeline"),
+    "7. Outlook": ("risks", "growth", "products", "timeline"),
+    "8. Disclosure Gaps": ("disclosure_gaps", "snapshot", "data_sources"),
+}
+
+
+# Structured dashboard generation modes
+#   llm:       payload context → LLM writes the full dashboard
+#   sectioned: payload context → one concurrent LLM completion per section, stitched
+#   template:  payload → deterministic template render (no LLM)
+#   enriched:  template render + LLM executive summary
+GENERATION_MODES = ("llm", "sectioned", "template", "enriched")
+
+
+class DashboardPrompt(BaseModel):
+    """A fully assembled dashboard LLM request (or a fallback needing no LLM call)"""
+    company_id: str
+    method: str = Field(..., description="'structured' or 'rag'")
+    model: str
+    messages: List[dict] = Field(default_factory=list)
+    temperature: float = 0.3
+    max_tokens: int = 3000
+    section: Optional[str] = Field(None, description="Dashboard section (sectioned generation only)")
+    fallback: Optional[str] = Field(None, description="Markdown returned as-is (e.g. payload unavailable)")
+
+    def request_body(self) -> dict:
+        """Chat completions request body (also used for batch job lines)"""
+        return {
+            "model": self.model,
+            "messages": self.messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+
+
+# Retrieval queries, headings and budget weights for the RAG context sections
+RAG_SECTION_QUERIES = {
+    "overview": "company overview founding mission vision description headquarters",
+    "business_model": "business model revenue pricing customers products services GTM strategy",
+    "funding": "funding rounds investors venture capital series A B C valuation",
+    "growth": "growth hiring headcount expansion employees partnerships",
+    "visibility": "news media coverage press mentions awards recognition",
+    "risks": "layoffs challenges issues controversies problems concerns",
+    "outlook": "future plans roadmap strategy opportunities initiatives"
+}
+
+RAG_SECTION_TITLES = {
+    "overview": "Company Overview & Description",
+    "business_model": "Business Model, Products & GTM",
+    "funding": "Funding, Investors & Valuation",
+    "growth": "Growth, Hiring & Expansion",
+    "visibility": "Visibility, News & Market Sentiment",
+    "risks": "Risks, Challenges & Issues",
+    "outlook": "Future Plans, Strategy & Outlook",
+}
+
+RAG_SECTION_WEIGHTS = {
+    "overview": 1.5,
+    "business_model": 1.5,
+    "funding": 1.5,
+    "growth": 1.0,
+    "visibility": 0.75,
+    "risks": 1.5,
+    "outlook": 1.0,
+}
+
+# Retrieval backend per section (see rag_search_company): keyword-heavy queries
+# (risk terms, round names) use hybrid BM25 + dense search; RAG_SEARCH_MODE
+# overrides every section
+RAG_SECTION_SEARCH = {
+    "overview": "dense",
+    "business_model": "dense",
+    "funding": "hybrid",
+    "growth": "dense",
+    "visibility": "dense",
+    "risks": "hybrid",
+    "outlook": "dense",
+}
+
+
+def section_search_mode(section: str) -> str:
+    return os.getenv("RAG_SEARCH_MODE") or RAG_SECTION_SEARCH.get(section, "dense")
+
+
+# Concurrent identical generations (same company, method, model and inputs)
+# share one in-flight call; DASHBOARD_SINGLEFLIGHT=false disables coalescing
+GENERATION_FLIGHT = SingleFlight("dashboard")
+
+# Prompts and retrieval settings that shape every generation
+PROMPT_FINGERPRINT = hashlib.sha256(json.dumps([
+    PE_ANALYST_SYSTEM_PROMPT, DASHBOARD_GENERATION_PROMPT, ENRICHMENT_PROMPT,
+    SECTION_SYSTEM_PROMPT, SECTION_PROMPT, SECTION_CONTEXT, RAG_SECTION_QUERIES, RAG_SECTION_WEIGHTS, RAG_SECTION_SEARCH
+]).encode("utf-8")).hexdigest()[:16]
+
+
+def payload_stamp(company_id: str) -> Optional[tuple]:
+    """(size, mtime_ns) of the company's payload file, if it can be located cheaply"""
+    catalog = get_payload_catalog()
+    path = catalog.files.get(company_id) if catalog is not None else None
+    path = path or Path(f"data/payloads/{company_id}.json")
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def generation_key(method: str, company_id: str, model: str, mode: Optional[str] = None) -> tuple:
+    """
+    Single-flight key: (company_id, method, model, input fingerprint)
+
+    The fingerprint covers the prompts, the prompt token budget and, for
+    structured dashboards, the payload file, so requests that would produce
+    different dashboards never share a result.
+    """
+    inputs = [PROMPT_FINGERPRINT, mode, os.getenv("PROMPT_TOKEN_BUDGET")]
+    if method == "structured":
+        inputs.append(payload_stamp(company_id))
+    fingerprint = hashlib.sha256(json.dumps(inputs).encode("utf-8")).hexdigest()[:16]
+    return company_id, method, model, fingerprint
+
+
+# The SDK client is synchronous; completions run on their own I/O thread pool so
+# concurrent calls (e.g. the sections of one dashboard) overlap. The default
+# executor is sized by CPU count, which would queue sections on small hosts.
+_llm_pool: Optional[ThreadPoolExecutor] = None
+_llm_pool_lock = threading.Lock()
+
+
+def llm_executor() -> ThreadPoolExecutor:
+    global _llm_pool
+    if _llm_pool is None:
+        with _llm_pool_lock:
+            if _llm_pool is None:
+                _llm_pool = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("LLM_CALL_THREADS", "32")), thread_name_prefix="llm-call"
+                )
+    return _llm_pool
+
+
+async def run_llm_call(fn, **kwargs):
+    """Run a blocking SDK call on the LLM thread pool (context variables carried over)"""
+    call = functools.partial(contextvars.copy_context().run, fn, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(llm_executor(), call)
+
+
+def section_max_tokens() -> int:
+    return int(os.getenv("SECTION_MAX_TOKENS", "600"))
+
+
+def section_retries() -> int:
+    return int(os.getenv("SECTION_RETRIES", "2"))
+
+
+def singleflight_enabled() -> bool:
+    return os.getenv("DASHBOARD_SINGLEFLIGHT", "true").lower() == "true"
+
+
+async def reserve_completion(messages: List[dict], max_tokens: int, model: str) -> int:
+    """Wait for RPM/TPM capacity for a chat completion; returns the token estimate reserved"""
+    estimate = estimate_chat_tokens(messages, max_tokens, model)
+    await get_openai_limiter().acquire(estimate)
+    return estimate
+
+
+def record_completion(model: str, response, llm_span, estimate: int = 0) -> None:
+    """Count a chat completion in metrics / usage accounting and tag its span with token usage"""
+    record_llm_response(model, response)
+    usage = getattr(response, "usage", None)
+    record_usage(model, usage)
+    get_openai_limiter().settle(estimate, getattr(usage, "total_tokens", None))
+    llm_span.set_attributes(
+        prompt_tokens=getattr(usage, "prompt_tokens", None),
+        completion_tokens=getattr(usage, "completion_tokens", None)
+    )
+
+
 # ============================================================================
 # Dashboard Generator Class
 # ============================================================================
@@ -121,24 +362,165 @@ class DashboardGenerator:
         return "\n".join([f"{prefix}{item}" for item in items])
 
     @staticmethod
-    async def generate_structured_dashboard(company_id: str, model: str = "gpt-4o-mini") -> str:
+    def structured_context_sections(payload: CompanyPayload) -> List[ContextSection]:
         """
-        Generate dashboard from structured payload using LLM synthesis
-
-        Args:
-            company_id: Company identifier
-            model: OpenAI model to use
+        Break a payload into weighted context sections for the token budget
 
-        Returns:
-            Markdown dashboard string
+        Items inside each section are ordered most-valuable-first (e.g. newest
+        funding rounds and events first), so trimming drops the least useful
+        content. Weights favour the facts every dashboard section depends on.
         """
-        try:
-            # Step 1: Load structured payload
-            payload = await get_latest_structured_payload(company_id)
+        c = payload.company
+        snap = payload.snapshot
+        inv = payload.investor_profile
+        gm = payload.growth_metrics
+        vis = payload.visibility
+
+        def nd(value):
+            return value or "Not disclosed"
+
+        def joined(items, limit=None):
+            items = items[:limit] if limit else items
+            return ", ".join(items) if items else "Not disclosed"
+
+        def newest_first(records):
+            return sorted(records, key=lambda r: r.date or "", reverse=True)
+
+        return [
+            ContextSection(name="company", joiner="\n\n", weight=3, header="## COMPANY INFORMATION", items=[
+                f"""**Basic Info:**
+- Company Name: {c.company_name}
+- Company ID: {c.company_id}
+- Website: {c.website}
+- LinkedIn: {nd(c.linkedin)}
+- Founded: {nd(c.founded_year)}
+- Headquarters: {nd(c.hq_city)}, {nd(c.hq_country)}
+- Category: {nd(c.category)}
+- Subcategory: {nd(c.subcategory)}""",
+                f"**Description:**\n{c.description}",
+                f"**Tagline:**\n{nd(c.tagline)}",
+            ]),
+            ContextSection(
+                name="leadership", weight=1.5, header="**Leadership Team:**",
+                items=[f"- {m.name} - {m.title}" for m in payload.leadership],
+                empty_text="Leadership information not disclosed"
+            ),
+            ContextSection(name="business_model", weight=2, header="**Business Model:**", items=[
+                f"- Type: {nd(c.business_model)}",
+                f"- Target Customers: {nd(c.target_customers)}",
+                f"- Pricing Model: {nd(c.pricing_model)}",
+            ]),
+            ContextSection(
+                name="products", weight=1.5, header="**Products/Services:**",
+                items=[f"- {p.name}: {p.description or 'Description not available'}" for p in payload.products],
+                empty_text="Product information not disclosed"
+            ),
+            ContextSection(
+                name="competitors", weight=0.5, header="**Known Competitors:**",
+                items=[joined(c.competitors)]
+            ),
+            ContextSection(name="snapshot", joiner="\n\n", weight=3, header=f"## SNAPSHOT (as of {snap.snapshot_date})", items=[
+                f"""**Funding:**
+- Total Funding: {nd(snap.total_funding)}
+- Total Funding (Numeric): {f"${snap.total_funding_numeric}M" if snap.total_funding_numeric else "Not disclosed"}
+- Last Funding Date: {nd(snap.last_funding_date)}
+- Last Funding Stage: {nd(snap.last_funding_stage)}
+- Current Valuation: {nd(snap.valuation)}""",
+                f"""**Team:**
+- Headcount: {nd(snap.headcount)}
+- Leadership Count: {nd(snap.leadership_count)}""",
+                f"""**Traction:**
+- Customer Count: {nd(snap.customer_count)}
+- Revenue Range: {nd(snap.revenue_range)}""",
+            ]),
+            ContextSection(
+                name="funding_history", weight=2.5,
+                header=f"""## FUNDING HISTORY
+
+**Total Raised:** {nd(inv.total_raised)}
+**Number of Rounds:** {len(inv.funding_rounds)}
+
+**Funding Rounds:**""",
+                items=[
+                    f"- {r.date or 'Date unknown'}: {r.stage or 'Unknown stage'}, Amount: {nd(r.amount)}, "
+                    f"Lead: {nd(r.lead_investor)}, Valuation: {nd(r.valuation)}"
+                    for r in newest_first(inv.funding_rounds)
+                ],
+                empty_text="No funding rounds disclosed"
+            ),
+            ContextSection(name="investors", joiner="\n\n", weight=1, items=[
+                f"**Lead Investors:**\n{joined(inv.lead_investors, 10)}",
+                f"**Last Round Date:** {nd(inv.last_round_date)}",
+                f"**All Investors ({len(inv.all_investors)} total):**\n{joined(inv.all_investors, 15)}",
+            ]),
+            ContextSection(name="growth", joiner="\n\n", weight=2.5, header="## GROWTH METRICS", items=[
+                f"""**Headcount & Hiring:**
+- Current Headcount: {nd(gm.headcount)}
+- YoY Growth: {f"{gm.headcount_growth_yoy}%" if gm.headcount_growth_yoy else "Not disclosed"}
+- Open Roles: {nd(gm.open_roles)}
+- Recent Hires (6m): {nd(gm.recent_hires)}""",
+                f"""**Revenue & Customers:**
+- Revenue Info: {nd(gm.revenue_info)}
+- Customer Growth: {nd(gm.customer_growth)}""",
+                f"""**Product Momentum:**
+- Product Launches (12m): {nd(gm.product_launches_12m)}
+- Recent Products: {joined(gm.recent_products)}""",
+                f"""**Partnerships:**
+- Total Partnerships: {nd(gm.partnerships_count)}
+- Recent Partnerships: {joined(gm.recent_partnerships)}""",
+                f"""**Geographic Presence:**
+- Office Locations: {joined(gm.office_locations)}
+- Geographic Expansion: {nd(gm.geographic_expansion)}""",
+                f"""**Market Presence:**
+- Press Mentions (12m): {nd(gm.press_mentions_12m)}
+- Website Traffic Trend: {nd(gm.website_traffic_trend)}""",
+            ]),
+            ContextSection(name="visibility", joiner="\n\n", weight=1.5, header="## VISIBILITY & MARKET SENTIMENT", items=[
+                f"""- News Mentions (30d): {nd(vis.news_mentions_30d)}
+- Sentiment Score: {f"{vis.sentiment_score:.2f}" if vis.sentiment_score else "Not disclosed"}
+- GitHub Stars: {nd(vis.github_stars)}
+- GitHub URL: {nd(vis.github_url)}
+- Glassdoor Rating: {nd(vis.glassdoor_rating)}
+- Glassdoor Reviews: {nd(vis.glassdoor_reviews)}""",
+                f"**Awards & Recognition:**\n"
+                f"{DashboardGenerator.format_list(vis.awards, default='No awards information available')}",
+                f"**Notable Media Coverage:**\n"
+                f"{DashboardGenerator.format_list(vis.media_coverage, default='No media coverage tracked')}",
+            ]),
+            ContextSection(
+                name="timeline", weight=1.5, header="## COMPANY TIMELINE\n\n**Major Events:**",
+                items=[
+                    f"- {e.date or 'Date unknown'} ({e.event_type}): {e.title}"
+                    for e in newest_first(payload.events)
+                ],
+                empty_text="No major events disclosed"
+            ),
+            ContextSection(name="risks", joiner="\n\n", weight=3, header="## RISK ASSESSMENT", items=[
+                f"**Identified Risks:**\n"
+                f"{DashboardGenerator.format_list(payload.risks, default='No major risks identified in available data')}",
+                f"**Opportunities:**\n"
+                f"{DashboardGenerator.format_list(payload.opportunities, default='Standard market opportunities')}",
+                f"**Analyst Notes:**\n{payload.analyst_notes or 'No additional analyst notes'}",
+            ]),
+            ContextSection(
+                name="disclosure_gaps", weight=2,
+                header="## DISCLOSURE GAPS\n\nThe following information was not publicly disclosed:",
+                items=[f"- {field}" for field in payload.disclosure_gaps.missing_fields] + (
+                    [f"**Confidence Notes:**\n{json.dumps(payload.disclosure_gaps.confidence_notes, indent=2)}"]
+                    if payload.disclosure_gaps.confidence_notes else []
+                ),
+                empty_text="All key information disclosed"
+            ),
+            ContextSection(name="data_sources", weight=0.5, header="## DATA SOURCES", items=[
+                ", ".join(payload.data_sources),
+                f"**Extracted At:** {payload.extracted_at}",
+            ]),
+        ]
 
-        except FileNotFoundError as e:
-            # Return informative message when payload doesn't exist
-            return f"""# {company_id.title()} - PE Due Diligence Dashboard (Structured)
+    @staticmethod
+    def payload_unavailable_notice(company_id: str) -> str:
+        """Informative dashboard returned when a company has no payload"""
+        return f"""# {company_id.title()} - PE Due Diligence Dashboard (Structured)
 
 **Generated**: {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")}
 **Status**: ⚠️ Payload Not Available
@@ -157,266 +539,385 @@ Please ensure the company has been scraped and extracted before generating dashb
 **Alternative:** Use the RAG-based dashboard which retrieves data from the vector database.
 """
 
-        try:
-            # Step 2: Format payload data as rich context for LLM
-            
-            # Helper functions
-            def fmt_funding_rounds(rounds):
-                if not rounds:
-                    return "No funding rounds disclosed"
-                lines = []
-                for r in rounds[:5]:
-                    date = r.date or "Date unknown"
-                    stage = r.stage or "Unknown stage"
-                    amount = r.amount or "Not disclosed"
-                    lead = r.lead_investor or "Not disclosed"
-                    valuation = r.valuation or "Not disclosed"
-                    lines.append(f"- {date}: {stage}, Amount: {amount}, Lead: {lead}, Valuation: {valuation}")
-                return "\n".join(lines)
-            
-            def fmt_events(events):
-                if not events:
-                    return "No major events disclosed"
-                lines = []
-                for e in events[:8]:
-                    date = e.date or "Date unknown"
-                    title = e.title
-                    etype = e.event_type
-                    lines.append(f"- {date} ({etype}): {title}")
-                return "\n".join(lines)
-            
-            # Build comprehensive context
-            context = f"""
-## COMPANY INFORMATION
-
-**Basic Info:**
-- Company Name: {payload.company.company_name}
-- Company ID: {payload.company.company_id}
-- Website: {payload.company.website}
-- LinkedIn: {payload.company.linkedin or "Not disclosed"}
-- Founded: {payload.company.founded_year or "Not disclosed"}
-- Headquarters: {payload.company.hq_city or "Not disclosed"}, {payload.company.hq_country or "Not disclosed"}
-- Category: {payload.company.category or "Not disclosed"}
-- Subcategory: {payload.company.subcategory or "Not disclosed"}
-
-**Description:**
-{payload.company.description}
-
-**Tagline:**
-{payload.company.tagline or "Not disclosed"}
-
-**Leadership Team:**
-{DashboardGenerator.format_list([f"{m.name} - {m.title}" for m in payload.leadership], default="Leadership information not disclosed")}
-
-**Business Model:**
-- Type: {payload.company.business_model or "Not disclosed"}
-- Target Customers: {payload.company.target_customers or "Not disclosed"}
-- Pricing Model: {payload.company.pricing_model or "Not disclosed"}
-
-**Products/Services:**
-{DashboardGenerator.format_list([f"{p.name}: {p.description or 'Description not available'}" for p in payload.products], default="Product information not disclosed")}
-
-**Known Competitors:**
-{", ".join(payload.company.competitors) if payload.company.competitors else "Not disclosed"}
-
----
-
-## SNAPSHOT (as of {payload.snapshot.snapshot_date})
-
-**Funding:**
-- Total Funding: {payload.snapshot.total_funding or "Not disclosed"}
-- Total Funding (Numeric): {f"${payload.snapshot.total_funding_numeric}M" if payload.snapshot.total_funding_numeric else "Not disclosed"}
-- Last Funding Date: {payload.snapshot.last_funding_date or "Not disclosed"}
-- Last Funding Stage: {payload.snapshot.last_funding_stage or "Not disclosed"}
-- Current Valuation: {payload.snapshot.valuation or "Not disclosed"}
+    @staticmethod
+    async def generate_template_dashboard(company_id: str) -> str:
+        """
+        Render the structured dashboard straight from the payload (no LLM)
 
-**Team:**
-- Headcount: {payload.snapshot.headcount or "Not disclosed"}
-- Leadership Count: {payload.snapshot.leadership_count or "Not disclosed"}
+        Args:
+            company_id: Company identifier
 
-**Traction:**
-- Customer Count: {payload.snapshot.customer_count or "Not disclosed"}
-- Revenue Range: {payload.snapshot.revenue_range or "Not disclosed"}
+        Returns:
+            Markdown dashboard string
+        """
+        try:
+            with STAGE["payload"].time(), span("payload.load", company_id=company_id):
+                payload = await get_latest_structured_payload(company_id)
+        except FileNotFoundError:
+            return DashboardGenerator.payload_unavailable_notice(company_id)
 
----
+        with STAGE["render"].time(), span("template.render"):
+            return render_template_dashboard(payload)
 
-## FUNDING HISTORY
+    @staticmethod
+    async def generate_enriched_dashboard(company_id: str, model: str = "gpt-4o-mini") -> str:
+        """
+        Template-rendered dashboard plus an LLM-written executive summary
 
-**Total Raised:** {payload.investor_profile.total_raised or "Not disclosed"}
-**Number of Rounds:** {len(payload.investor_profile.funding_rounds)}
+        All facts come from the template; the LLM only adds narrative on top.
+        If the LLM call fails the plain template dashboard is returned.
 
-**Funding Rounds:**
-{fmt_funding_rounds(payload.investor_profile.funding_rounds)}
+        Args:
+            company_id: Company identifier
+            model: OpenAI model to use
 
-**Lead Investors:**
-{", ".join(payload.investor_profile.lead_investors[:10]) if payload.investor_profile.lead_investors else "Not disclosed"}
+        Returns:
+            Markdown dashboard string
+        """
+        try:
+            with STAGE["payload"].time(), span("payload.load", company_id=company_id):
+                payload = await get_latest_structured_payload(company_id)
+        except FileNotFoundError:
+            return DashboardGenerator.payload_unavailable_notice(company_id)
+
+        with STAGE["render"].time(), span("template.render"):
+            dashboard = render_template_dashboard(payload)
+
+        prompt = DashboardPrompt(
+            company_id=company_id,
+            method="structured",
+            model=model,
+            messages=[
+                {"role": "system", "content": PE_ANALYST_SYSTEM_PROMPT},
+                {"role": "user", "content": ENRICHMENT_PROMPT.format(
+                    company_name=payload.company.company_name,
+                    dashboard=dashboard
+                )}
+            ],
+            max_tokens=600
+        )
+        try:
+            summary = (await DashboardGenerator.complete_prompt(prompt) or "").strip()
+        except Exception as e:
+            print(f"⚠️  Enrichment failed for {company_id}, returning template dashboard: {e}")
+            return dashboard
 
-**All Investors ({len(payload.investor_profile.all_investors)} total):**
-{", ".join(payload.investor_profile.all_investors[:15]) if payload.investor_profile.all_investors else "Not disclosed"}
+        if not summary:
+            return dashboard
 
-**Last Round Date:** {payload.investor_profile.last_round_date or "Not disclosed"}
+        # Executive summary goes under the title, ahead of Section 1
+        title, _, body = dashboard.partition("\n\n")
+        return f"{title}\n\n**Executive Summary**\n\n{summary}\n\n{body}"
 
----
+    @staticmethod
+    async def generate_structured_dashboard(
+        company_id: str,
+        model: str = "gpt-4o-mini",
+        mode: str = "llm"
+    ) -> str:
+        """
+        Generate dashboard from structured payload
 
-## GROWTH METRICS
+        Concurrent identical requests are coalesced into one generation.
 
-**Headcount & Hiring:**
-- Current Headcount: {payload.growth_metrics.headcount or "Not disclosed"}
-- YoY Growth: {f"{payload.growth_metrics.headcount_growth_yoy}%" if payload.growth_metrics.headcount_growth_yoy else "Not disclosed"}
-- Open Roles: {payload.growth_metrics.open_roles or "Not disclosed"}
-- Recent Hires (6m): {payload.growth_metrics.recent_hires or "Not disclosed"}
+        Args:
+            company_id: Company identifier
+            model: OpenAI model to use
+            mode: 'llm' (LLM synthesis), 'sectioned' (one concurrent LLM call
+                  per section), 'template' (no LLM) or 'enriched'
+                  (template + LLM executive summary)
 
-**Geographic Presence:**
-- Office Locations: {", ".join(payload.growth_metrics.office_locations) if payload.growth_metrics.office_locations else "Not disclosed"}
-- Geographic Expansion: {payload.growth_metrics.geographic_expansion or "Not disclosed"}
+        Returns:
+            Markdown dashboard string
+        """
+        if mode not in GENERATION_MODES:
+            raise ValueError(f"Unknown generation mode '{mode}' (expected one of {GENERATION_MODES})")
+        if not singleflight_enabled():
+            return await DashboardGenerator._generate_structured_dashboard(company_id, model, mode)
+        return await GENERATION_FLIGHT.do(
+            generation_key("structured", company_id, model, mode),
+            lambda: DashboardGenerator._generate_structured_dashboard(company_id, model, mode)
+        )
 
-**Partnerships:**
-- Total Partnerships: {payload.growth_metrics.partnerships_count or "Not disclosed"}
-- Recent Partnerships: {", ".join(payload.growth_metrics.recent_partnerships) if payload.growth_metrics.recent_partnerships else "Not disclosed"}
+    @staticmethod
+    async def _generate_structured_dashboard(company_id: str, model: str, mode: str) -> str:
+        if mode == "template":
+            return await DashboardGenerator.generate_template_dashboard(company_id)
+        if mode == "enriched":
+            return await DashboardGenerator.generate_enriched_dashboard(company_id, model)
+        if mode == "sectioned":
+            return await DashboardGenerator.generate_sectioned_dashboard(company_id, model)
 
-**Product Momentum:**
-- Product Launches (12m): {payload.growth_metrics.product_launches_12m or "Not disclosed"}
-- Recent Products: {", ".join(payload.growth_metrics.recent_products) if payload.growth_metrics.recent_products else "Not disclosed"}
+        try:
+            prompt = await DashboardGenerator.prepare_structured_prompt(company_id, model)
+            if prompt.fallback is not None:
+                return prompt.fallback
+            return await DashboardGenerator.complete_prompt(prompt)
 
-**Revenue & Customers:**
-- Revenue Info: {payload.growth_metrics.revenue_info or "Not disclosed"}
-- Customer Growth: {payload.growth_metrics.customer_growth or "Not disclosed"}
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return f"# Error Generating Dashboard\n\n**Company**: {company_id}\n**Error**: {str(e)}"
 
-**Market Presence:**
-- Press Mentions (12m): {payload.growth_metrics.press_mentions_12m or "Not disclosed"}
-- Website Traffic Trend: {payload.growth_metrics.website_traffic_trend or "Not disclosed"}
+    @staticmethod
+    async def prepare_structured_prompt(company_id: str, model: str = "gpt-4o-mini") -> DashboardPrompt:
+        """
+        Build the LLM request for a structured dashboard (no LLM call)
 
----
+        Returns:
+            DashboardPrompt; its fallback is set when the payload is missing
+        """
+        try:
+            # Step 1: Load structured payload
+            with STAGE["payload"].time(), span("payload.load", company_id=company_id):
+                payload = await get_latest_structured_payload(company_id)
 
-## VISIBILITY & MARKET SENTIMENT
+        except FileNotFoundError:
+            # Return informative message when payload doesn't exist
+            return DashboardPrompt(
+                company_id=company_id, method="structured", model=model,
+                fallback=DashboardGenerator.payload_unavailable_notice(company_id)
+            )
 
-- News Mentions (30d): {payload.visibility.news_mentions_30d or "Not disclosed"}
-- Sentiment Score: {f"{payload.visibility.sentiment_score:.2f}" if payload.visibility.sentiment_score else "Not disclosed"}
-- GitHub Stars: {payload.visibility.github_stars or "Not disclosed"}
-- GitHub URL: {payload.visibility.github_url or "Not disclosed"}
-- Glassdoor Rating: {payload.visibility.glassdoor_rating or "Not disclosed"}
-- Glassdoor Reviews: {payload.visibility.glassdoor_reviews or "Not disclosed"}
+        # Step 2: Format payload data as token-budgeted context for LLM
+        prompt = DASHBOARD_GENERATION_PROMPT.format(
+            company_name=payload.company.company_name,
+            timestamp=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+        )
+        closing = "Generate the complete 8-section dashboard now."
+
+        with STAGE["context"].time(), span("context.build"):
+            context, report = build_context(
+                DashboardGenerator.structured_context_sections(payload),
+                budget=context_budget_for([PE_ANALYST_SYSTEM_PROMPT, prompt, closing], model),
+                model=model
+            )
+        print(f"🧮 Structured prompt context for {company_id}: {report.summary()}")
 
-**Awards & Recognition:**
-{DashboardGenerator.format_list(payload.visibility.awards, default="No awards information available")}
+        # Step 3: Full prompt for the LLM
+        full_prompt = f"{prompt}\n\n{context}\n\n{closing}"
 
-**Notable Media Coverage:**
-{DashboardGenerator.format_list(payload.visibility.media_coverage, default="No media coverage tracked")}
+        return DashboardPrompt(
+            company_id=company_id, method="structured", model=model,
+            messages=[
+                {"role": "system", "content": PE_ANALYST_SYSTEM_PROMPT},
+                {"role": "user", "content": full_prompt}
+            ],
+            temperature=0.3  # Slightly creative but mostly factual
+        )
 
----
+    @staticmethod
+    async def prepare_section_prompts(
+        company_id: str,
+        model: str = "gpt-4o-mini"
+    ) -> Tuple[Optional[str], List[DashboardPrompt]]:
+        """
+        Build one LLM request per dashboard section (no LLM call)
 
-## COMPANY TIMELINE
+        Each request carries only the context sections its dashboard section
+        is written from (SECTION_CONTEXT), under its own token budget.
 
-**Major Events:**
-{fmt_events(payload.events)}
+        Returns:
+            (dashboard header, prompts in template order); when the payload is
+            missing the header is None and the single prompt has a fallback
+        """
+        try:
+            with STAGE["payload"].time(), span("payload.load", company_id=company_id):
+                payload = await get_latest_structured_payload(company_id)
+        except FileNotFoundError:
+            return None, [DashboardPrompt(
+                company_id=company_id, method="structured", model=model,
+                fallback=DashboardGenerator.payload_unavailable_notice(company_id)
+            )]
+
+        company_name = payload.company.company_name
+        context_sections = {s.name: s for s in DashboardGenerator.structured_context_sections(payload)}
+        prompts = []
+        with STAGE["context"].time(), span("context.build", sections=len(PE_DASHBOARD_SECTIONS)):
+            for section in PE_DASHBOARD_SECTIONS:
+                prompt = SECTION_PROMPT.format(
+                    section=section, company_name=company_name, instruction=SECTION_INSTRUCTIONS[section]
+                )
+                context, _ = build_context(
+                    [context_sections[name] for name in SECTION_CONTEXT[section]],
+                    budget=context_budget_for([SECTION_SYSTEM_PROMPT, prompt], model),
+                    model=model
+                )
+                prompts.append(DashboardPrompt(
+                    company_id=company_id, method="structured", model=model, section=section,
+                    messages=[
+                        {"role": "system", "content": SECTION_SYSTEM_PROMPT},
+                        {"role": "user", "content": f"{prompt}\n{context}"}
+                    ],
+                    max_tokens=section_max_tokens()
+                ))
+
+        header = (
+            f"# {company_name} - PE Due Diligence Dashboard\n\n"
+            f"**Generated**: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}\n\n---"
+        )
+        return header, prompts
 
----
+    @staticmethod
+    async def complete_section(prompt: DashboardPrompt, retries: Optional[int] = None) -> str:
+        """
+        Complete one section prompt, retrying only this section on failure
 
-## RISK ASSESSMENT
+        An empty completion counts as a failure. When every attempt fails the
+        section body is a short notice, so the rest of the dashboard survives.
+        """
+        retries = retries if retries is not None else section_retries()
+        error = None
+        for attempt in range(retries + 1):
+            try:
+                with span("dashboard.section", section=prompt.section, attempt=attempt):
+                    body = (await DashboardGenerator.complete_prompt(prompt) or "").strip()
+                if body:
+                    DASHBOARD_SECTION_ATTEMPTS.labels("ok").inc()
+                    return body
+                error = "empty completion"
+            except Exception as e:
+                error = str(e)
+            DASHBOARD_SECTION_ATTEMPTS.labels("failed").inc()
+            print(f"⚠️  Section '{prompt.section}' for {prompt.company_id} failed "
+                  f"(attempt {attempt + 1}/{retries + 1}): {error}")
+
+        return f"*Section unavailable: generation failed ({error}).*"
 
-**Identified Risks:**
-{DashboardGenerator.format_list(payload.risks, default="No major risks identified in available data")}
+    @staticmethod
+    def stitch_sections(header: str, sections: List[Tuple[str, str]]) -> str:
+        """Join section bodies under their headings, dropping any heading the model repeated"""
+        parts = [header]
+        for section, body in sections:
+            body = re.sub(r"\A(\s*#{1,6} [^\n]*(\n|\Z))+", "", body).strip()
+            parts.append(f"## {section}\n\n{body}")
+        return "\n\n".join(parts) + "\n"
 
-**Opportunities:**
-{DashboardGenerator.format_list(payload.opportunities, default="Standard market opportunities")}
+    @staticmethod
+    async def generate_sectioned_dashboard(company_id: str, model: str = "gpt-4o-mini") -> str:
+        """
+        Generate the structured dashboard as one concurrent completion per section
 
-**Analyst Notes:**
-{payload.analyst_notes or "No additional analyst notes"}
+        Sections share the rate limiter like any other completion; wall time
+        is roughly that of the slowest section instead of the whole dashboard.
 
----
+        Args:
+            company_id: Company identifier
+            model: OpenAI model to use
 
-## DATA SOURCES
+        Returns:
+            Markdown dashboard string (sections in template order)
+        """
+        try:
+            header, prompts = await DashboardGenerator.prepare_section_prompts(company_id, model)
+            if header is None:
+                return prompts[0].fallback
 
-{", ".join(payload.data_sources)}
+            with span("dashboard.sectioned", company_id=company_id, sections=len(prompts)):
+                bodies = await asyncio.gather(*(DashboardGenerator.complete_section(p) for p in prompts))
+            return DashboardGenerator.stitch_sections(header, [(p.section, b) for p, b in zip(prompts, bodies)])
 
-**Extracted At:** {payload.extracted_at}
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return f"# Error Generating Dashboard\n\n**Company**: {company_id}\n**Error**: {str(e)}"
 
----
+    @staticmethod
+    async def complete_prompt(prompt: DashboardPrompt) -> str:
+        """Run a prepared prompt as one chat completion (after waiting for rate-limit capacity)"""
+        model = prompt.model
+        estimate = await reserve_completion(prompt.messages, prompt.max_tokens, model)
+        try:
+            with STAGE["llm"].time(), span("llm.completion", model=model) as llm_span:
+                response = await run_llm_call(openai_client.chat.completions.create, **prompt.request_body())
+                record_completion(model, response, llm_span, estimate)
+        except Exception:
+            record_llm_error(model)
+            raise
 
-## DISCLOSURE GAPS
+        return response.choices[0].message.content
 
-The following information was not publicly disclosed:
-{DashboardGenerator.format_list(payload.disclosure_gaps.missing_fields, default="All key information disclosed")}
+    @staticmethod
+    async def generate_rag_dashboard(company_id: str, model: str = "gpt-4o-mini") -> str:
+        """
+        Generate dashboard using RAG (retrieval-augmented generation) with LLM synthesis
 
-**Confidence Notes:**
-{json.dumps(payload.disclosure_gaps.confidence_notes, indent=2) if payload.disclosure_gaps.confidence_notes else "No confidence notes"}
-"""
+        Concurrent identical requests are coalesced into one generation.
 
-            # Step 3: Generate dashboard using LLM
-            prompt = DASHBOARD_GENERATION_PROMPT.format(
-                company_name=payload.company.company_name,
-                timestamp=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-            )
+        Args:
+            company_id: Company identifier
+            model: OpenAI model to use
 
-            full_prompt = f"{prompt}\n\n{context}\n\nGenerate the complete 8-section dashboard now."
+        Returns:
+            Markdown dashboard string with LLM-synthesized content
+        """
+        if not singleflight_enabled():
+            return await DashboardGenerator._generate_rag_dashboard(company_id, model)
+        return await GENERATION_FLIGHT.do(
+            generation_key("rag", company_id, model),
+            lambda: DashboardGenerator._generate_rag_dashboard(company_id, model)
+        )
 
-            # Call OpenAI
-            response = openai_client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": PE_ANALYST_SYSTEM_PROMPT},
-                    {"role": "user", "content": full_prompt}
-                ],
-                temperature=0.3,  # Slightly creative but mostly factual
-                max_tokens=3000
-            )
+    @staticmethod
+    async def _generate_rag_dashboard(company_id: str, model: str) -> str:
+        try:
+            prompt = await DashboardGenerator.prepare_rag_prompt(company_id, model)
+            if prompt.fallback is not None:
+                return prompt.fallback
 
-            dashboard = response.choices[0].message.content
+            print(f"🤖 Calling OpenAI {model} to synthesize dashboard...")
+            dashboard = await DashboardGenerator.complete_prompt(prompt)
+            print(f"✅ Generated RAG dashboard ({len(dashboard)} chars)")
 
             return dashboard
 
         except Exception as e:
             import traceback
             traceback.print_exc()
-            return f"# Error Generating Dashboard\n\n**Company**: {company_id}\n**Error**: {str(e)}"
+            return f"# Error Generating RAG Dashboard\n\n**Company**: {company_id}\n**Error**: {str(e)}"
 
     @staticmethod
-    async def generate_rag_dashboard(company_id: str, model: str = "gpt-4o-mini") -> str:
+    async def prepare_rag_prompt(company_id: str, model: str = "gpt-4o-mini") -> DashboardPrompt:
         """
-        Generate dashboard using RAG (retrieval-augmented generation) with LLM synthesis
-
-        Args:
-            company_id: Company identifier
-            model: OpenAI model to use
+        Retrieve chunks and build the LLM request for a RAG dashboard (no LLM call)
 
         Returns:
-            Markdown dashboard string with LLM-synthesized content
+            DashboardPrompt; its fallback is set when nothing was retrieved
         """
-        try:
-            # Step 1: Retrieve relevant chunks from vector DB for each section
-            print(f"🔍 Retrieving information for {company_id} from Pinecone...")
-
-            queries = {
-                "overview": "company overview founding mission vision description headquarters",
-                "business_model": "business model revenue pricing customers products services GTM strategy",
-                "funding": "funding rounds investors venture capital series A B C valuation",
-                "growth": "growth hiring headcount expansion employees partnerships",
-                "visibility": "news media coverage press mentions awards recognition",
-                "risks": "layoffs challenges issues controversies problems concerns",
-                "outlook": "future plans roadmap strategy opportunities initiatives"
-            }
-
-            all_chunks = []
-            section_contexts = {}
+        # Step 1: Retrieve relevant chunks from vector DB for each section
+        print(f"🔍 Retrieving information for {company_id} from Pinecone...")
+
+        queries = RAG_SECTION_QUERIES
+        top_k = int(os.getenv("RAG_TOP_K", "5"))
+
+        all_chunks = []
+        section_results = {}
 
+        with STAGE["retrieval"].time(), span("retrieval", queries=len(queries)):
             for section, query in queries.items():
-                results = await rag_search_company(company_id, query, k=5)
-                
-                if results:
-                    # Combine chunks with source attribution
-                    section_text = []
-                    for r in results:
-                        page_type = r['metadata'].get('page_type', 'unknown')
-                        text = r['text']
-                        section_text.append(f"[Source: {page_type}] {text}")
-                    
-                    section_contexts[section] = "\n\n".join(section_text)
-                    all_chunks.extend(results)
-                else:
-                    section_contexts[section] = f"No information found in vector database for {section}."
-
-            if not all_chunks:
-                return f"""# {company_id.title()} - PE Due Diligence Dashboard (RAG)
+                results = await rag_search_company(company_id, query, k=top_k, mode=section_search_mode(section))
+                section_results[section] = results
+                all_chunks.extend(results)
+
+        # Drop passages repeated across sections before paying for them in the prompt
+        if all_chunks and dedup_enabled():
+            with span("retrieval.postprocess") as post_span:
+                section_results, dedup = postprocess_sections(section_results, model=model)
+                post_span.set_attributes(duplicates=dedup.duplicates, redundant=dedup.redundant,
+                                         tokens_saved=dedup.tokens_saved)
+            all_chunks = [chunk for results in section_results.values() for chunk in results]
+            print(f"🧹 Retrieval dedup for {company_id}: {dedup.summary()}")
+
+        # Keep only the query-relevant, non-boilerplate sentences of each chunk
+        if all_chunks and compression_enabled():
+            with span("retrieval.compress") as compress_span:
+                section_results, compression = compress_sections(section_results, queries, company_id, model=model)
+                compress_span.set_attributes(tokens_in=compression.tokens_in, tokens_out=compression.tokens_out)
+            all_chunks = [chunk for results in section_results.values() for chunk in results]
+            print(f"🗜️  Chunk compression for {company_id}: {compression.summary()}")
+
+        if not all_chunks:
+            return DashboardPrompt(company_id=company_id, method="rag", model=model, fallback=f"""# {company_id.title()} - PE Due Diligence Dashboard (RAG)
 
 **Generated**: {datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")}
 **Status**: ⚠️ No Data Available
@@ -433,72 +934,57 @@ This may be because:
 3. The company_id may be incorrect
 
 Please ensure the company data exists in Pinecone before generating RAG dashboards.
-"""
-
-            print(f"✅ Retrieved {len(all_chunks)} total chunks from vector DB")
-
-            # Step 2: Build comprehensive context
-            context = f"""
-## RETRIEVED INFORMATION FOR {company_id.upper()}
-
-### Company Overview & Description
-{section_contexts.get('overview', 'Not disclosed.')}
-
-### Business Model, Products & GTM
-{section_contexts.get('business_model', 'Not disclosed.')}
+""")
 
-### Funding, Investors & Valuation
-{section_contexts.get('funding', 'Not disclosed.')}
+        print(f"✅ Retrieved {len(all_chunks)} total chunks from vector DB")
 
-### Growth, Hiring & Expansion
-{section_contexts.get('growth', 'Not disclosed.')}
-
-### Visibility, News & Market Sentiment
-{section_contexts.get('visibility', 'Not disclosed.')}
-
-### Risks, Challenges & Issues
-{section_contexts.get('risks', 'No major risks identified in available data.')}
-
-### Future Plans, Strategy & Outlook
-{section_contexts.get('outlook', 'Not disclosed.')}
-
----
+        # Step 2: Build token-budgeted context (chunks arrive best-score first)
+        prompt = DASHBOARD_GENERATION_PROMPT.format(
+            company_name=company_id.title(),
+            timestamp=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+        )
+        closing = "Synthesize the above information into a professional 8-section PE dashboard."
+        heading = f"## RETRIEVED INFORMATION FOR {company_id.upper()}"
+        footer = f"""---
 
 **Total Chunks Retrieved:** {len(all_chunks)}
-**Unique Sources:** {len(set(c['metadata'].get('page_type') for c in all_chunks if c.get('metadata')))}
-"""
-
-            # Step 3: Generate dashboard using LLM
-            prompt = DASHBOARD_GENERATION_PROMPT.format(
-                company_name=company_id.title(),
-                timestamp=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-            )
-
-            full_prompt = f"{prompt}\n\n{context}\n\nSynthesize the above information into a professional 8-section PE dashboard."
-
-            print(f"🤖 Calling OpenAI {model} to synthesize dashboard...")
-
-            # Call OpenAI
-            response = openai_client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": PE_ANALYST_SYSTEM_PROMPT},
-                    {"role": "user", "content": full_prompt}
+**Unique Sources:** {len(set(c['metadata'].get('page_type') for c in all_chunks if c.get('metadata')))}"""
+
+        sections = [
+            ContextSection(
+                name=section,
+                header=f"### {RAG_SECTION_TITLES[section]}",
+                items=[
+                    f"[Source: {r['metadata'].get('page_type', 'unknown')}] {r['text']}"
+                    for r in section_results.get(section, [])
                 ],
-                temperature=0.3,
-                max_tokens=3000
+                weight=RAG_SECTION_WEIGHTS.get(section, 1.0),
+                joiner="\n\n",
+                empty_text=f"No information found in vector database for {section}."
             )
+            for section in queries
+        ]
+
+        with STAGE["context"].time(), span("context.build"):
+            context, report = build_context(
+                sections,
+                budget=context_budget_for([PE_ANALYST_SYSTEM_PROMPT, prompt, closing, heading, footer], model),
+                model=model
+            )
+        print(f"🧮 RAG prompt context for {company_id}: {report.summary()}")
 
-            dashboard = response.choices[0].message.content
-
-            print(f"✅ Generated RAG dashboard ({len(dashboard)} chars)")
+        context = f"{heading}\n\n{context}\n\n{footer}"
 
-            return dashboard
+        # Step 3: Full prompt for the LLM
+        full_prompt = f"{prompt}\n\n{context}\n\n{closing}"
 
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return f"# Error Generating RAG Dashboard\n\n**Company**: {company_id}\n**Error**: {str(e)}"
+        return DashboardPrompt(
+            company_id=company_id, method="rag", model=model,
+            messages=[
+                {"role": "system", "content": PE_ANALYST_SYSTEM_PROMPT},
+                {"role": "user", "content": full_prompt}
+            ]
+        )
 
     @staticmethod
     def save_dashboard(company_id: str, dashboard_content: str, method: str, run_id: str = None) -> Path:
@@ -514,8 +1000,8 @@ Please ensure the company data exists in Pinecone before generating RAG dashboar
         Returns:
             Path to saved dashboard file
         """
-        # Create dashboards directory
-        dashboards_dir = Path("data/dashboards")
+        # Create dashboards directory (DASHBOARDS_DIR overrides the default)
+        dashboards_dir = Path(os.getenv("DASHBOARDS_DIR", "data/dashboards"))
         dashboards_dir.mkdir(parents=True, exist_ok=True)
 
         # Generate filename with timestamp
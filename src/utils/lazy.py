@@ -0,0 +1,83 @@
+"""
+Lazy Imports and Clients
+
+Defers heavy third-party imports (openai, pinecone, ...) and client
+construction to first use, so importing a module - e.g. when the Airflow
+scheduler parses the DAG or a test collects - stays cheap.
+
+    OpenAI = lazy_callable("openai", "OpenAI")        # imported on first call
+    openai_client = LazyObject(lambda: OpenAI(...))   # built on first attribute access
+
+Both are plain module attributes, so unittest.mock.patch works on them as
+it did on the eager originals. Introspection (dunder / underscore lookups
+such as patch()'s `__func__` probe) does not build an unresolved object,
+so patching needs no credentials.
+"""
+
+import importlib
+import threading
+from typing import Any, Callable
+
+
+class LazyCallable:
+    """Callable that imports `module.attribute` on first call and delegates to it"""
+
+    __slots__ = ("_module", "_attribute", "_target")
+
+    def __init__(self, module: str, attribute: str):
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+
+    def resolve(self) -> Callable:
+        if self._target is None:
+            self._target = getattr(importlib.import_module(self._module), self._attribute)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<lazy {self._module}.{self._attribute}>"
+
+
+def lazy_callable(module: str, attribute: str) -> LazyCallable:
+    return LazyCallable(module, attribute)
+
+
+class LazyObject:
+    """
+    Proxy that builds its target with `factory()` on first public attribute access
+
+    Until then, underscore attributes (dunders, `_is_coroutine` and similar
+    introspection probes) raise AttributeError instead of building it.
+    """
+
+    __slots__ = ("_factory", "_target", "_lock")
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_target", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def resolve(self) -> Any:
+        target = object.__getattribute__(self, "_target")
+        if target is None:
+            with object.__getattribute__(self, "_lock"):
+                target = object.__getattribute__(self, "_target")
+                if target is None:
+                    target = object.__getattribute__(self, "_factory")()
+                    object.__setattr__(self, "_target", target)
+        return target
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_") and object.__getattribute__(self, "_target") is None:
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.resolve(), name, value)
+
+    def __repr__(self) -> str:
+        target = object.__getattribute__(self, "_target")
+        return f"<lazy {target!r}>" if target is not None else "<lazy (unresolved)>"
@@ -0,0 +1,406 @@
+"""
+Prometheus-style Metrics
+
+Minimal in-process counters, gauges and histograms rendered in the
+Prometheus text exposition format (served by the MCP server at /metrics).
+
+Label children are created once and can be bound at import time, so the
+hot path is a lock plus a few integer / float updates:
+
+    LLM_SECONDS = STAGE_SECONDS.labels("llm")
+
+    with LLM_SECONDS.time():
+        response = client.chat.completions.create(...)
+
+Metrics exported:
+- mcp_request_duration_seconds{endpoint}      request latency per tool / endpoint
+- mcp_requests_in_flight{endpoint}            requests currently being served
+- mcp_request_errors_total{endpoint}          responses with status >= 500
+- dashboard_stage_duration_seconds{stage}     payload / retrieval / context / llm / render
+- llm_requests_total{model, outcome}          chat completion calls
+- llm_prompt_tokens_total{model}              prompt tokens reported by the API
+- llm_completion_tokens_total{model}          completion tokens reported by the API
+- payload_cache_lookups_total{cache, result}  catalog / snapshot hits and misses
+- payload_cache_hit_ratio{cache}              hits / lookups (computed at scrape)
+- rag_chunks_retrieved                        chunks returned per vector query
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# ============================================================================
+# Metric children (one per label combination)
+# ============================================================================
+
+class CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class GaugeChild:
+    __slots__ = ("_value", "_lock", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the value at scrape time instead of storing it"""
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return float(self._function()) if self._function is not None else self._value
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: "HistogramChild"):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+
+class HistogramChild:
+    __slots__ = ("_bounds", "_counts", "_sum", "_count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # Per-bucket (non-cumulative) counts; the last slot is +Inf
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self) -> _Timer:
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """Cumulative (upper bound, count) pairs including +Inf"""
+        with self._lock:
+            counts = list(self._counts)
+        cumulative, out = 0, []
+        for bound, n in zip(self._bounds + (float("inf"),), counts):
+            cumulative += n
+            out.append((bound, cumulative))
+        return out
+
+
+# ============================================================================
+# Metric families
+# ============================================================================
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh child for one label combination"""
+
+    def labels(self, *values: str):
+        """Child for one label combination (bind it once for hot paths)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_label_str(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in sorted(self._children.items())
+        ]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"] + self._samples()
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return CounterChild()
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return GaugeChild()
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(float(b) for b in buckets))
+
+    def _new_child(self):
+        return HistogramChild(self.bounds)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for values, child in sorted(self._children.items()):
+            for bound, cumulative in child.buckets():
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_str(self.labelnames, values, le)} {cumulative}")
+            labels = _label_str(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Ordered collection of metric families"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def render_metrics() -> str:
+    """All registered metrics in Prometheus text format"""
+    return REGISTRY.render()
+
+
+# ============================================================================
+# Pipeline metrics
+# ============================================================================
+
+DASHBOARD_STAGES = ("payload", "retrieval", "context", "llm", "render")
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "mcp_request_duration_seconds", "MCP server request latency by endpoint", ["endpoint"]
+))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "mcp_requests_in_flight", "MCP server requests currently being served", ["endpoint"]
+))
+REQUEST_ERRORS = REGISTRY.register(Counter(
+    "mcp_request_errors_total", "MCP server responses with status >= 500", ["endpoint"]
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "dashboard_stage_duration_seconds", "Dashboard generation stage latency", ["stage"]
+))
+LLM_REQUESTS = REGISTRY.register(Counter(
+    "llm_requests_total", "Chat completion calls by outcome", ["model", "outcome"]
+))
+LLM_PROMPT_TOKENS = REGISTRY.register(Counter(
+    "llm_prompt_tokens_total", "Prompt tokens reported by the LLM API", ["model"]
+))
+LLM_COMPLETION_TOKENS = REGISTRY.register(Counter(
+    "llm_completion_tokens_total", "Completion tokens reported by the LLM API", ["model"]
+))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "payload_cache_lookups_total", "Payload cache lookups by cache and result", ["cache", "result"]
+))
+CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "payload_cache_hit_ratio", "Payload cache hits / lookups", ["cache"]
+))
+RAG_CHUNKS = REGISTRY.register(Histogram(
+    "rag_chunks_retrieved", "Chunks returned per vector query", buckets=(0, 1, 2, 3, 5, 10, 20, 50)
+))
+RATE_LIMIT_WAIT = REGISTRY.register(Histogram(
+    "llm_rate_limit_wait_seconds", "Time calls spent queued by the client-side rate limiter", ["limiter"],
+    buckets=(0, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "llm_rate_limited_total", "429 responses seen by the client-side rate limiter", ["limiter"]
+))
+SINGLEFLIGHT_CALLS = REGISTRY.register(Counter(
+    "singleflight_calls_total", "Coalesced calls: leaders run the work, followers share it", ["group", "role"]
+))
+RAG_POSTPROCESS_CHUNKS = REGISTRY.register(Counter(
+    "rag_postprocess_chunks_total", "Retrieved chunks by post-processing outcome", ["outcome"]
+))
+RAG_TOKENS_SAVED = REGISTRY.register(Counter(
+    "rag_prompt_tokens_saved_total", "Retrieved-chunk tokens removed before prompting", ["stage"]
+))
+DASHBOARD_SECTION_ATTEMPTS = REGISTRY.register(Counter(
+    "dashboard_section_attempts_total", "Per-section completions in sectioned generation", ["outcome"]
+))
+RISK_TRIAGE_RESULTS = REGISTRY.register(Counter(
+    "risk_triage_total", "Pre-generation risk triage results", ["result"]
+))
+
+# Pre-bound children for the hot paths
+STAGE = {stage: STAGE_SECONDS.labels(stage) for stage in DASHBOARD_STAGES}
+RAG_CHUNKS_PER_QUERY = RAG_CHUNKS.labels()
+
+
+def _bind_cache(cache: str) -> Tuple[CounterChild, CounterChild]:
+    hits = CACHE_LOOKUPS.labels(cache, "hit")
+    misses = CACHE_LOOKUPS.labels(cache, "miss")
+
+    def ratio() -> float:
+        lookups = hits.value + misses.value
+        return hits.value / lookups if lookups else 0.0
+
+    CACHE_HIT_RATIO.labels(cache).set_function(ratio)
+    return hits, misses
+
+
+CATALOG_HITS, CATALOG_MISSES = _bind_cache("catalog")
+SNAPSHOT_HITS, SNAPSHOT_MISSES = _bind_cache("snapshot")
+
+
+def record_llm_response(model: str, response) -> None:
+    """Count a successful chat completion and its reported token usage"""
+    LLM_REQUESTS.labels(model, "ok").inc()
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if isinstance(prompt_tokens, int):
+        LLM_PROMPT_TOKENS.labels(model).inc(prompt_tokens)
+    if isinstance(completion_tokens, int):
+        LLM_COMPLETION_TOKENS.labels(model).inc(completion_tokens)
+
+
+def record_llm_error(model: str) -> None:
+    LLM_REQUESTS.labels(model, "error").inc()
+
+
+# ============================================================================
+# ASGI middleware
+# ============================================================================
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, in-flight and 5xx counts
+
+    Only the given paths get their own label; everything else is reported
+    as endpoint="other" to keep label cardinality bounded.
+    """
+
+    def __init__(self, app, paths: Sequence[str] = ()):
+        self.app = app
+        self._bound = {path: self._bind(path) for path in paths}
+        self._other = self._bind("other")
+
+    @staticmethod
+    def _bind(endpoint: str):
+        return (
+            REQUEST_SECONDS.labels(endpoint),
+            REQUESTS_IN_FLIGHT.labels(endpoint),
+            REQUEST_ERRORS.labels(endpoint),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        latency, in_flight, errors = self._bound.get(scope["path"], self._other)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency.observe(time.perf_counter() - start)
+            in_flight.dec()
+            if status >= 500:
+                errors.inc()
@@ -0,0 +1,415 @@
+"""
+Opt-in Profiling Hooks
+
+Profiles run_workflow, individual graph nodes and MCP tool handlers in
+place, so a slow company can be investigated without reproducing it.
+
+Modes:
+- cprofile: deterministic (cProfile); writes .prof files (pstats / snakeviz)
+- sample:   wall-clock stack sampler on the profiled thread; writes
+            .collapsed files ("frame;frame;frame count", for flamegraph.pl
+            or speedscope). For async tool handlers the event-loop thread
+            is sampled, so concurrent requests share the samples.
+
+Configuration (environment, read when hooks are installed):
+    PROFILE_MODE=off                       off | cprofile | sample
+    PROFILE_TARGETS=workflow,nodes,tools   Which hooks to install
+    PROFILE_COMPANIES=                     Only profile these company_ids
+    PROFILE_DIR=logs/profiles
+    PROFILE_SAMPLE_INTERVAL_MS=5
+
+Files are named {company_id}_{run_id[:8]}_{scope}_{timestamp}.{prof|collapsed}.
+A workflow profile covers every thread the run uses: nodes that LangGraph
+runs on its worker threads (the parallel evaluator / risk_detector
+branches) are profiled there and merged into the workflow's file. cProfile
+scopes do not nest on one thread: while run_workflow is being profiled,
+per-node files are only written for the nodes on worker threads (use
+PROFILE_TARGETS=nodes for every node). Sampled scopes nest freely.
+When PROFILE_MODE=off nodes and handlers are returned unwrapped, so there
+is no per-call overhead.
+
+CLI (hot functions aggregated across many runs):
+    python -m src.utils.profiling summarize --top 25
+    python -m src.utils.profiling summarize --company anthropic --sort tottime
+"""
+
+import cProfile
+import inspect
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.utils.tracing import current_span
+
+PROFILE_MODES = ("off", "cprofile", "sample")
+PROFILE_TARGETS = ("workflow", "nodes", "tools")
+
+_NULL_SCOPE = nullcontext()
+
+# cProfile hooks are per thread: one active profiler per thread
+_cprofile_thread = threading.local()
+
+# The workflow scope being profiled (LangGraph copies it into its worker threads)
+_workflow_scope: ContextVar[Optional["_ProfileScope"]] = ContextVar("profile_workflow_scope", default=None)
+
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+def profile_mode() -> str:
+    mode = os.getenv("PROFILE_MODE", "off").lower()
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown PROFILE_MODE '{mode}' (expected one of {PROFILE_MODES})")
+    return mode
+
+
+def profiling_enabled(target: str) -> bool:
+    """True if PROFILE_MODE is on and `target` is in PROFILE_TARGETS"""
+    if profile_mode() == "off":
+        return False
+    targets = {t.strip() for t in os.getenv("PROFILE_TARGETS", ",".join(PROFILE_TARGETS)).split(",")}
+    return target in targets
+
+
+def profile_dir() -> Path:
+    return Path(os.getenv("PROFILE_DIR", "logs/profiles"))
+
+
+def _company_selected(company_id: Optional[str]) -> bool:
+    companies = os.getenv("PROFILE_COMPANIES", "").strip()
+    return not companies or company_id in {c.strip() for c in companies.split(",")}
+
+
+def profile_path(scope: str, company_id: Optional[str], run_id: Optional[str], suffix: str) -> Path:
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
+    run = (run_id or "adhoc")[:8]
+    safe_scope = "".join(c if c.isalnum() or c in "-_" else "-" for c in scope)
+    return profile_dir() / f"{company_id or 'unknown'}_{run}_{safe_scope}_{timestamp}.{suffix}"
+
+
+# ============================================================================
+# Profilers
+# ============================================================================
+
+class StackSampler:
+    """Samples one thread's Python stack on a background thread"""
+
+    def __init__(self, thread_id: int, interval_s: float = 0.005):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{frame.f_globals.get('__name__', '?')}:{code.co_name}"
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+
+class _ProfileScope:
+    """
+    Profiles the enclosed block and writes the result on exit
+
+    Args:
+        write: Write this scope's own file (False for a worker-thread node
+               profiled only for the enclosing workflow)
+        workflow: Collect the profiles of worker threads running under it
+        parent: Enclosing workflow scope on another thread; this scope's
+                profile is merged into it
+    """
+
+    def __init__(self, mode: str, scope: str, company_id: Optional[str], run_id: Optional[str],
+                 write: bool = True, workflow: bool = False, parent: Optional["_ProfileScope"] = None):
+        self.mode = mode
+        self.scope = scope
+        self.company_id = company_id
+        self.run_id = run_id
+        self.write = write
+        self.workflow = workflow
+        self.parent = parent
+        self.path: Optional[Path] = None
+        self._profiler = None
+        self._sampler: Optional[StackSampler] = None
+        self._thread_profiles: List = []
+        self._threads_lock = threading.Lock()
+        self._closed = False
+        self._token = None
+        self._thread_id: Optional[int] = None
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        if self.mode == "cprofile":
+            # Nested scopes on one thread are skipped rather than corrupting the active profile
+            if not getattr(_cprofile_thread, "active", False):
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:  # Python 3.12+: another profiler is active process-wide
+                    profiler = None
+                if profiler is not None:
+                    _cprofile_thread.active = True
+                    self._profiler = profiler
+        else:
+            interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+            self._sampler = StackSampler(self._thread_id, interval)
+            self._sampler.start()
+        if self.workflow:
+            self._token = _workflow_scope.set(self)
+        return self
+
+    def attach(self, profile) -> None:
+        """Merge a worker thread's profile (cProfile.Profile or sample Counter) into this scope"""
+        with self._threads_lock:
+            if not self._closed:
+                self._thread_profiles.append(profile)
+
+    def _write_cprofile(self) -> None:
+        import pstats
+
+        stats = pstats.Stats(self._profiler)
+        for profile in self._thread_profiles:
+            stats.add(profile)
+        self.path = profile_path(self.scope, self.company_id, self.run_id, "prof")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(self.path)
+
+    def _write_samples(self, samples: Counter) -> None:
+        self.path = profile_path(self.scope, self.company_id, self.run_id, "collapsed")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def __exit__(self, *exc):
+        if self._token is not None:
+            _workflow_scope.reset(self._token)
+        with self._threads_lock:
+            self._closed = True
+        try:
+            if self._profiler is not None:
+                self._profiler.disable()
+                _cprofile_thread.active = False
+                if self.parent is not None:
+                    self.parent.attach(self._profiler)
+                if self.write:
+                    self._write_cprofile()
+            elif self._sampler is not None:
+                samples = self._sampler.stop()
+                if self.parent is not None:
+                    self.parent.attach(samples)
+                if self.write:
+                    for thread_samples in self._thread_profiles:
+                        samples = samples + thread_samples
+                    self._write_samples(samples)
+            if self.path is not None:
+                print(f"🔬 Profile written: {self.path}")
+        except Exception as e:
+            print(f"⚠️  Could not write profile for {self.scope}: {e}")
+        return False
+
+
+def profile_scope(target: str, scope: str, company_id: Optional[str] = None, run_id: Optional[str] = None):
+    """
+    Context manager profiling a block when `target` profiling is enabled
+
+    Returns a shared no-op context manager when disabled or when the
+    company is not in PROFILE_COMPANIES.
+    """
+    if not profiling_enabled(target) or not _company_selected(company_id):
+        return _NULL_SCOPE
+    return _ProfileScope(profile_mode(), scope, company_id, run_id, workflow=target == "workflow")
+
+
+# ============================================================================
+# Hooks
+# ============================================================================
+
+def node_profile_scope(name: str, company_id: Optional[str] = None, run_id: Optional[str] = None):
+    """
+    Context manager profiling one node call
+
+    Writes a per-node file when 'nodes' profiling is enabled. A node running
+    on a worker thread under a profiled workflow is also profiled for that
+    workflow, whose own profiler only sees the thread that started the run.
+    """
+    workflow = _workflow_scope.get()
+    if workflow is not None and workflow._thread_id == threading.get_ident():
+        workflow = None  # same thread: already in the workflow's profile
+    write = profiling_enabled("nodes") and _company_selected(company_id)
+    if not write and workflow is None:
+        return _NULL_SCOPE
+    return _ProfileScope(workflow.mode if workflow is not None else profile_mode(), f"node-{name}",
+                         company_id, run_id, write=write, parent=workflow)
+
+
+def profile_node(name: str, fn: Callable[[dict], dict]) -> Callable[[dict], dict]:
+    """Wrap a graph node in a profiler (returns `fn` unchanged when disabled)"""
+    if not (profiling_enabled("nodes") or profiling_enabled("workflow")):
+        return fn
+
+    @wraps(fn)
+    def node(state):
+        with node_profile_scope(name, state.get("company_id"), state.get("run_id")):
+            return fn(state)
+    return node
+
+
+def _request_ids(args, kwargs) -> Tuple[Optional[str], Optional[str]]:
+    """company_id from a request model / dict argument; run_id from the active trace"""
+    company_id = None
+    for value in list(args) + list(kwargs.values()):
+        company_id = getattr(value, "company_id", None) or (value.get("company_id") if isinstance(value, dict) else None)
+        if company_id:
+            break
+
+    span = current_span()
+    run_id = span.attributes.get("run_id") if span is not None else None
+    return company_id, run_id
+
+
+def profile_tool(fn: Callable) -> Callable:
+    """Decorator for MCP tool handlers (returns `fn` unchanged when disabled)"""
+    if not profiling_enabled("tools"):
+        return fn
+
+    if inspect.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def async_handler(*args, **kwargs):
+            company_id, run_id = _request_ids(args, kwargs)
+            with profile_scope("tools", f"tool-{fn.__name__}", company_id, run_id):
+                return await fn(*args, **kwargs)
+        return async_handler
+
+    @wraps(fn)
+    def handler(*args, **kwargs):
+        company_id, run_id = _request_ids(args, kwargs)
+        with profile_scope("tools", f"tool-{fn.__name__}", company_id, run_id):
+            return fn(*args, **kwargs)
+    return handler
+
+
+# ============================================================================
+# Summaries
+# ============================================================================
+
+def find_profiles(directory: Path, company_id: Optional[str] = None,
+                  scope: Optional[str] = None) -> Tuple[List[Path], List[Path]]:
+    """
+    (.prof files, .collapsed files) under a directory
+
+    Args:
+        company_id: Only profiles for this company
+        scope: Only profiles whose scope contains this (e.g. 'workflow', 'node-evaluator')
+    """
+    prefix = f"{company_id}_" if company_id else ""
+    pattern = f"{prefix}*{scope}*" if scope else f"{prefix}*"
+    prof = sorted(directory.glob(f"{pattern}.prof"))
+    collapsed = sorted(directory.glob(f"{pattern}.collapsed"))
+    return prof, collapsed
+
+
+def summarize_collapsed(paths: List[Path], top: int = 25) -> List[Dict]:
+    """Hot frames across sampled profiles: self and inclusive sample counts"""
+    self_counts: Counter = Counter()
+    inclusive: Counter = Counter()
+    total = 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if not stack:
+                    continue
+                n = int(count)
+                frames = stack.split(";")
+                total += n
+                self_counts[frames[-1]] += n
+                for frame in set(frames):
+                    inclusive[frame] += n
+
+    return [
+        {
+            "frame": frame,
+            "self_samples": n,
+            "self_pct": round(100 * n / total, 2),
+            "inclusive_pct": round(100 * inclusive[frame] / total, 2),
+        }
+        for frame, n in self_counts.most_common(top)
+    ]
+
+
+def summarize_cprofile(paths: List[Path], top: int = 25, sort: str = "cumulative") -> str:
+    """pstats report over all .prof files combined"""
+    import io
+    import pstats
+
+    out = io.StringIO()
+    stats = pstats.Stats(*[str(p) for p in paths], stream=out)
+    stats.files = []  # skip the per-file header lines
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+    return out.getvalue()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize profiles under PROFILE_DIR")
+    sub = parser.add_subparsers(dest="command", required=True)
+    summarize = sub.add_parser("summarize", help="Top hot functions across profiles")
+    summarize.add_argument("--dir", default=str(profile_dir()))
+    summarize.add_argument("--company", help="Only profiles for this company_id")
+    summarize.add_argument("--scope", help="Only profiles whose scope contains this (nested scopes overlap)")
+    summarize.add_argument("--top", type=int, default=25)
+    summarize.add_argument("--sort", default="cumulative", choices=["cumulative", "tottime", "ncalls"])
+    args = parser.parse_args()
+
+    prof, collapsed = find_profiles(Path(args.dir), args.company, args.scope)
+    if not prof and not collapsed:
+        print(f"No profiles found in {args.dir}")
+        return
+
+    if prof:
+        print(f"\n{'='*60}")
+        print(f"🔬 cProfile: {len(prof)} profiles (sorted by {args.sort})")
+        print(f"{'='*60}")
+        print(summarize_cprofile(prof, args.top, args.sort))
+
+    if collapsed:
+        print(f"\n{'='*60}")
+        print(f"🔬 Sampled: {len(collapsed)} profiles")
+        print(f"{'='*60}")
+        print(f"{'self %':>8} {'incl %':>8} {'samples':>8}  frame")
+        for row in summarize_collapsed(collapsed, args.top):
+            print(f"{row['self_pct']:>8.2f} {row['inclusive_pct']:>8.2f} {row['self_samples']:>8}  {row['frame']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Client-side Rate Limiting for OpenAI Calls
+
+A process-wide token-bucket scheduler enforcing requests-per-minute and
+tokens-per-minute budgets across every caller (dashboard generation, RAG
+embeddings, the supervisor agent), so raising concurrency queues requests
+instead of triggering a 429 retry storm.
+
+- Callers reserve capacity before each call with an estimate (prompt
+  tokens + max_tokens) and wait their turn: reservations are granted in
+  arrival order and may put the buckets into debt, so the computed wait is
+  exact and nobody polls. After the call the unused part of the estimate
+  is refunded from the reported usage.
+- Adaptive: every OpenAI HTTP response passes through an httpx hook
+  (openai_http_client). x-ratelimit-limit-* headers cap the local limits
+  (and set them when none are configured), x-ratelimit-remaining-* keep
+  the buckets from believing in capacity the provider no longer has, and
+  a 429 pauses all callers for retry-after / x-ratelimit-reset-* and
+  scales the rate down; successes scale it back up.
+- Thread-safe and independent of any event loop, so callers running under
+  separate asyncio.run() loops share one budget.
+
+Configuration (environment):
+    OPENAI_RPM=0    Requests per minute (0 = learn from response headers)
+    OPENAI_TPM=0    Tokens per minute   (0 = learn from response headers)
+
+Queue wait is exported as llm_rate_limit_wait_seconds on /metrics.
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Mapping, Optional
+
+from src.utils.context_builder import count_tokens
+from src.utils.metrics import RATE_LIMIT_WAIT, RATE_LIMITED
+
+# Per-message framing tokens in the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds from an x-ratelimit-reset-* value such as '20ms', '1s' or '6m0s'"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in parts)
+
+
+def estimate_chat_tokens(messages: List[Dict], max_tokens: int, model: str = "gpt-4o-mini") -> int:
+    """Tokens a chat completion may consume: prompt + max_tokens"""
+    prompt = sum(count_tokens(str(m.get("content") or ""), model) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+    return prompt + max_tokens
+
+
+# ============================================================================
+# Token bucket
+# ============================================================================
+
+class _Bucket:
+    """Token bucket refilled continuously at limit/60 per second; may go into debt"""
+
+    def __init__(self, per_minute: float):
+        self.limit = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def refill(self, now: float, scale: float) -> None:
+        rate = self.limit * scale / 60.0
+        self.level = min(self.limit, self.level + (now - self.updated) * rate)
+        self.updated = now
+
+    def take(self, amount: float, scale: float) -> float:
+        """Reserve `amount`; returns seconds until the reservation is covered"""
+        amount = min(amount, self.limit)  # a single oversized call must still be schedulable
+        self.level -= amount
+        if self.level >= 0:
+            return 0.0
+        return -self.level / (self.limit * scale / 60.0)
+
+
+class RateLimiter:
+    """RPM / TPM token-bucket scheduler shared by all callers in a process"""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, name: str = "openai",
+                 min_scale: float = 0.1, decrease: float = 0.7, increase: float = 0.02):
+        """
+        Args:
+            rpm: Requests per minute (0 = unlimited until learned from headers)
+            tpm: Tokens per minute (0 = unlimited until learned from headers)
+            min_scale: Lowest fraction of the limits adaptive backoff goes to
+            decrease: Multiplier applied to the rate on a 429
+            increase: Fraction of the limits recovered per successful response
+        """
+        self.name = name
+        self.requests = _Bucket(rpm)
+        self.tokens = _Bucket(tpm)
+        self.scale = 1.0
+        self.min_scale = min_scale
+        self.decrease = decrease
+        self.increase = increase
+        self.paused_until = 0.0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+        self._wait = RATE_LIMIT_WAIT.labels(name)
+        self._limited = RATE_LIMITED.labels(name)
+
+    @classmethod
+    def from_env(cls, name: str = "openai") -> "RateLimiter":
+        return cls(
+            rpm=float(os.getenv("OPENAI_RPM", "0")),
+            tpm=float(os.getenv("OPENAI_TPM", "0")),
+            name=name
+        )
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request and `tokens` tokens; returns seconds to wait before calling"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket.enabled:
+                    bucket.refill(now, self.scale)
+                    wait = max(wait, bucket.take(amount, self.scale))
+            return wait
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait for capacity (async); returns the time spent queued"""
+        wait = self.reserve(tokens)
+        self._wait.observe(wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def acquire_sync(self, tokens: int = 0) -> float:
+        """Blocking variant of acquire() for synchronous callers"""
+        wait = self.reserve(tokens)
+        self._wait.observe(wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Refund the part of a token reservation the call did not use"""
+        if not isinstance(actual, int) or actual >= estimated or not self.tokens.enabled:
+            return
+        with self._lock:
+            self.tokens.level = min(self.tokens.limit, self.tokens.level + (estimated - actual))
+
+    def observe_headers(self, status: int, headers: Mapping[str, str]) -> None:
+        """Adapt to an OpenAI response: provider limits, remaining capacity and 429s"""
+        with self._lock:
+            now = time.monotonic()
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                limit = _number(headers.get(f"x-ratelimit-limit-{kind}"))
+                if limit and (not bucket.enabled or limit < bucket.limit):
+                    if not bucket.enabled:
+                        bucket.level, bucket.updated = limit, now
+                    bucket.limit = limit
+                remaining = _number(headers.get(f"x-ratelimit-remaining-{kind}"))
+                if remaining is not None and bucket.enabled:
+                    bucket.refill(now, self.scale)
+                    bucket.level = min(bucket.level, remaining)
+
+            if status == 429:
+                self.rate_limited += 1
+                self._limited.inc()
+                self.scale = max(self.min_scale, self.scale * self.decrease)
+                retry_after = (
+                    _number(headers.get("retry-after-ms"), 0.001)
+                    or _number(headers.get("retry-after"))
+                    or max(
+                        parse_reset(headers.get("x-ratelimit-reset-requests")) or 0.0,
+                        parse_reset(headers.get("x-ratelimit-reset-tokens")) or 0.0
+                    )
+                    or 1.0
+                )
+                self.paused_until = max(self.paused_until, now + retry_after)
+            elif status < 400:
+                self.scale = min(1.0, self.scale + self.increase)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "rpm": self.requests.limit,
+                "tpm": self.tokens.limit,
+                "scale": round(self.scale, 3),
+                "paused_s": round(max(0.0, self.paused_until - time.monotonic()), 3),
+                "rate_limited": self.rate_limited,
+            }
+
+
+def _number(value: Optional[str], unit: float = 1.0) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value) * unit
+    except ValueError:
+        return None
+
+
+# ============================================================================
+# Process-wide limiter and HTTP client
+# ============================================================================
+
+_limiter: Optional[RateLimiter] = None
+_http_client = None
+_init_lock = threading.Lock()
+
+
+def get_openai_limiter() -> RateLimiter:
+    """Process-wide limiter for OpenAI calls (configured from the environment on first use)"""
+    global _limiter
+    if _limiter is None:
+        with _init_lock:
+            if _limiter is None:
+                _limiter = RateLimiter.from_env()
+    return _limiter
+
+
+def set_openai_limiter(limiter: Optional[RateLimiter]) -> None:
+    global _limiter
+    _limiter = limiter
+
+
+def build_openai_http_client(limiter: Optional[RateLimiter] = None, **kwargs):
+    """
+    httpx.Client with the OpenAI SDK's defaults that feeds every response's
+    headers to `limiter` (default: the process-wide limiter)
+    """
+    from openai import DefaultHttpxClient
+
+    def observe(response):
+        (limiter or get_openai_limiter()).observe_headers(response.status_code, response.headers)
+
+    return DefaultHttpxClient(event_hooks={"response": [observe]}, **kwargs)
+
+
+def openai_http_client():
+    """Shared HTTP client for OpenAI clients (rate-limit headers go to the process-wide limiter)"""
+    global _http_client
+    if _http_client is None:
+        with _init_lock:
+            if _http_client is None:
+                _http_client = build_openai_http_client()
+    return _http_client
@@ -0,0 +1,167 @@
+"""
+Per-company Result Journal for DAG Runs
+
+The agentic DAG used to collect results in memory and write
+data/agentic_dag_results.json only once every company had finished, so a
+task that died at company 48 was retried from company 1. The journal is an
+append-only JSONL file, one per DAG and execution date:
+
+- a line is written and fsync'd as each company finishes (success or failure)
+- on start (including Airflow retries) the task skips companies whose latest
+  entry for this execution date is a success; failures are retried and runs
+  pending HITL review are re-checked (resumed once decided)
+- the final summary is assembled from the journal, so it covers companies
+  completed by earlier attempts too
+
+A line torn by a crash mid-write is ignored when reading and terminated
+before the next append. The latest entry per company wins.
+
+Configuration (environment):
+    RESULT_JOURNAL_DIR=data/journal
+"""
+
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+from pydantic import BaseModel, Field
+
+from src.utils.usage import UsageSummary
+
+
+def journal_dir() -> Path:
+    return Path(os.getenv("RESULT_JOURNAL_DIR", "data/journal"))
+
+
+class JournalEntry(BaseModel):
+    """One finished company attempt"""
+    company_id: str
+    status: str = Field(..., description="'success', 'failed' or 'pending_review' (paused for HITL)")
+    execution_date: str
+    recorded_at: str
+    result: dict = Field(default_factory=dict, description="Per-company result as reported in the summary")
+
+
+class ResultJournal:
+    """Append-only, fsync'd JSONL journal of per-company results for one execution date"""
+
+    def __init__(self, path: Path, execution_date: str):
+        self.path = Path(path)
+        self.execution_date = execution_date
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_run(cls, dag_id: str, execution_date: Union[datetime, date, str],
+                directory: Optional[Path] = None) -> "ResultJournal":
+        """Journal for a DAG's execution date (<dir>/<dag_id>/<execution date>.jsonl)"""
+        stamp = execution_date.isoformat() if isinstance(execution_date, (datetime, date)) else str(execution_date)
+        filename = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in stamp) + ".jsonl"
+        return cls((directory or journal_dir()) / dag_id / filename, stamp)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, company_id: str, status: str, result: Optional[dict] = None) -> JournalEntry:
+        """Record a finished company; the line is on disk when this returns"""
+        entry = JournalEntry(
+            company_id=company_id,
+            status=status,
+            execution_date=self.execution_date,
+            recorded_at=datetime.utcnow().isoformat(),
+            result=result or {},
+        )
+        line = entry.model_dump_json() + "\n"
+
+        with self._lock:
+            created = not self.path.exists()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                if not created and f.tell() > 0 and not self._ends_with_newline():
+                    line = "\n" + line  # terminate a line torn by a crash
+                f.write(line.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            if created:
+                self._fsync_dir()
+        return entry
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _fsync_dir(self) -> None:
+        """Persist the new file's directory entry (POSIX; a no-op where unsupported)"""
+        try:
+            fd = os.open(self.path.parent, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def entries(self) -> List[JournalEntry]:
+        """All entries for this execution date, in write order (torn / invalid lines skipped)"""
+        if not self.path.exists():
+            return []
+        entries = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = JournalEntry.model_validate_json(line)
+                except ValueError:
+                    continue
+                if entry.execution_date == self.execution_date:
+                    entries.append(entry)
+        return entries
+
+    def latest(self) -> Dict[str, JournalEntry]:
+        """Latest entry per company"""
+        return {entry.company_id: entry for entry in self.entries()}
+
+    def succeeded(self) -> Set[str]:
+        return {company_id for company_id, entry in self.latest().items() if entry.status == "success"}
+
+    def summary(self, company_ids: Iterable[str]) -> dict:
+        """
+        Results for `company_ids` assembled from the journal
+
+        Returns:
+            successful / failed / pending_review / hitl_triggered counts,
+            per-company results (in `company_ids` order), companies not yet
+            journaled ('pending') and usage summed over every journaled company
+            that reports some (a run paused for review has already generated
+            its dashboards)
+        """
+        latest = self.latest()
+        companies, pending = [], []
+        usage = UsageSummary()
+        for company_id in company_ids:
+            entry = latest.get(company_id)
+            if entry is None:
+                pending.append(company_id)
+                continue
+            companies.append({"company_id": company_id, "status": entry.status, **entry.result})
+            usage.merge(entry.result.get("usage"))
+
+        succeeded = [c for c in companies if c["status"] == "success"]
+        return {
+            "successful": len(succeeded),
+            "failed": sum(1 for c in companies if c["status"] == "failed"),
+            "pending_review": sum(1 for c in companies if c["status"] == "pending_review"),
+            "hitl_triggered": sum(1 for c in succeeded if c.get("hitl_required")),
+            "companies": companies,
+            "pending": pending,
+            "usage": usage.model_dump(),
+            "journal": str(self.path),
+        }
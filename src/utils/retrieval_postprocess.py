@@ -0,0 +1,159 @@
+"""
+Retrieval Post-processing: Cross-section Dedup and MMR
+
+The RAG dashboard retrieves k chunks for each of its seven section queries,
+and the same passage often comes back for several sections (overview,
+business_model and outlook in particular), so it would be sent to the LLM
+several times. Before the context is built:
+
+1. Dedup: chunks are identified by vector id, or by a hash of their
+   normalized text, and each unique chunk is kept once
+2. Assignment: a chunk goes to the section where it ranked most relevant
+   (score relative to that section's best score)
+3. MMR: each section's chunks are re-ranked by maximal marginal relevance
+   against everything already selected (all sections), and a chunk nearly
+   identical to a selected one (similarity >= RAG_DEDUP_SIMILARITY) is
+   dropped
+
+Similarity is the cosine of BM25-tokenized term vectors: the retrieval
+results carry no embeddings, and lexical overlap is what makes two
+passages redundant in the prompt.
+
+Configuration (environment):
+    RAG_DEDUP=true               Enable post-processing
+    RAG_MMR_LAMBDA=0.7           Relevance vs diversity (1.0 = relevance only)
+    RAG_DEDUP_SIMILARITY=0.9     Near-duplicate threshold
+"""
+
+import hashlib
+import math
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.tools.sparse_index import tokenize
+from src.utils.context_builder import count_tokens
+from src.utils.metrics import RAG_POSTPROCESS_CHUNKS, RAG_TOKENS_SAVED
+
+
+def dedup_enabled() -> bool:
+    return os.getenv("RAG_DEDUP", "true").lower() == "true"
+
+
+def chunk_fingerprint(chunk: Dict) -> str:
+    """Vector id if present, else a hash of the whitespace / case normalized text"""
+    if chunk.get("id"):
+        return f"id:{chunk['id']}"
+    normalized = " ".join(chunk.get("text", "").lower().split())
+    return "sha1:" + hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def cosine(a: Counter, b: Counter, norm_a: float, norm_b: float) -> float:
+    if not norm_a or not norm_b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(count * b.get(term, 0) for term, count in a.items()) / (norm_a * norm_b)
+
+
+class PostprocessReport(BaseModel):
+    """What dedup / MMR removed from one company's retrieval results"""
+    chunks_in: int = 0
+    chunks_out: int = 0
+    duplicates: int = Field(0, description="Exact repeats (same id / text) across sections")
+    redundant: int = Field(0, description="Near-duplicates dropped by MMR")
+    tokens_in: int = 0
+    tokens_out: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+    def summary(self) -> str:
+        return (
+            f"{self.chunks_in} → {self.chunks_out} chunks "
+            f"({self.duplicates} duplicate, {self.redundant} redundant), "
+            f"{self.tokens_saved} tokens saved"
+        )
+
+
+class _Candidate:
+    __slots__ = ("chunk", "section", "relevance", "terms", "norm")
+
+    def __init__(self, chunk: Dict, section: str, relevance: float):
+        self.chunk = chunk
+        self.section = section
+        self.relevance = relevance
+        self.terms = Counter(tokenize(chunk.get("text", "")))
+        self.norm = math.sqrt(sum(c * c for c in self.terms.values()))
+
+
+def postprocess_sections(
+    section_results: Dict[str, List[Dict]],
+    lambda_mult: Optional[float] = None,
+    duplicate_similarity: Optional[float] = None,
+    model: str = "gpt-4o-mini"
+) -> Tuple[Dict[str, List[Dict]], PostprocessReport]:
+    """
+    Dedup chunks across sections, assign each to its best section and MMR re-rank
+
+    Args:
+        section_results: section -> chunks in retrieval order
+        lambda_mult: MMR trade-off (default RAG_MMR_LAMBDA)
+        duplicate_similarity: Near-duplicate threshold (default RAG_DEDUP_SIMILARITY)
+        model: Tokenizer for the token report
+
+    Returns:
+        (section -> kept chunks, report); a section keeps at most as many
+        chunks as it retrieved
+    """
+    lambda_mult = lambda_mult if lambda_mult is not None else float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+    if duplicate_similarity is None:
+        duplicate_similarity = float(os.getenv("RAG_DEDUP_SIMILARITY", "0.9"))
+
+    report = PostprocessReport()
+    candidates: Dict[str, _Candidate] = {}
+
+    # 1-2. Dedup and best-section assignment
+    for section, results in section_results.items():
+        top = max((r.get("score") or 0.0 for r in results), default=0.0)
+        for rank, chunk in enumerate(results):
+            report.chunks_in += 1
+            report.tokens_in += count_tokens(chunk.get("text", ""), model)
+            relevance = (chunk.get("score") or 0.0) / top if top > 0 else 1.0 / (rank + 1)
+            key = chunk_fingerprint(chunk)
+            existing = candidates.get(key)
+            if existing is None:
+                candidates[key] = _Candidate(chunk, section, relevance)
+                continue
+            report.duplicates += 1
+            if relevance > existing.relevance:
+                existing.chunk, existing.section, existing.relevance = chunk, section, relevance
+
+    # 3. MMR per section against everything selected so far
+    selected: List[_Candidate] = []
+    kept: Dict[str, List[Dict]] = {section: [] for section in section_results}
+    for section, results in section_results.items():
+        pool = [c for c in candidates.values() if c.section == section]
+        while pool and len(kept[section]) < len(results):
+            scored = [
+                (c, max((cosine(c.terms, s.terms, c.norm, s.norm) for s in selected), default=0.0))
+                for c in pool
+            ]
+            best, similarity = max(scored, key=lambda item: lambda_mult * item[0].relevance - (1 - lambda_mult) * item[1])
+            pool.remove(best)
+            if similarity >= duplicate_similarity:
+                report.redundant += 1
+                continue
+            selected.append(best)
+            kept[section].append(best.chunk)
+            report.chunks_out += 1
+            report.tokens_out += count_tokens(best.chunk.get("text", ""), model)
+
+    RAG_POSTPROCESS_CHUNKS.labels("kept").inc(report.chunks_out)
+    RAG_POSTPROCESS_CHUNKS.labels("duplicate").inc(report.duplicates)
+    RAG_POSTPROCESS_CHUNKS.labels("redundant").inc(report.redundant)
+    RAG_TOKENS_SAVED.labels("dedup").inc(report.tokens_saved)
+    return kept, report
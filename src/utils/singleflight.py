@@ -0,0 +1,93 @@
+"""
+Single-flight Request Coalescing
+
+Concurrent callers asking for the same expensive result (e.g. the DAG, an
+analyst and the supervisor agent all generating one company's dashboard)
+share a single in-flight call instead of each paying for it:
+
+    flight = SingleFlight("dashboard")
+    markdown = await flight.do(key, lambda: generate(...))
+
+- The first caller for a key (the leader) starts the call as a task; later
+  callers (followers) await the same task.
+- Every waiter gets the result, or the same exception. Nothing is cached:
+  the key is released when the call finishes, so a failed call is retried
+  by the next request.
+- Each waiter awaits through asyncio.shield, so a cancelled waiter (e.g. a
+  client disconnect) does not cancel the shared call. The call itself is
+  only cancelled when every waiter has gone.
+- Calls are scoped to the running event loop, so callers that use
+  asyncio.run() on separate loops never share a task across loops.
+
+The call runs in the leader's context (tracing span, usage scope), so its
+token usage is attributed to the leader; followers report none.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from src.utils.metrics import SINGLEFLIGHT_CALLS
+from src.utils.tracing import span
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent async calls with the same key"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Tuple[int, Hashable], _Call] = {}
+        self._leader = SINGLEFLIGHT_CALLS.labels(name, "leader")
+        self._follower = SINGLEFLIGHT_CALLS.labels(name, "follower")
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _forget(self, key: Tuple[int, Hashable], call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() once for all concurrent callers with the same key
+
+        Args:
+            key: Hashable identity of the call
+            fn: Zero-argument coroutine factory (only called by the leader)
+
+        Returns:
+            The shared result (exceptions propagate to every waiter)
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+
+        call = self._calls.get(flight_key)
+        if call is None:
+            call = _Call(loop.create_task(fn()))
+            self._calls[flight_key] = call
+            call.task.add_done_callback(lambda _: self._forget(flight_key, call))
+            self._leader.inc()
+            follower = False
+        else:
+            self._follower.inc()
+            follower = True
+
+        call.waiters += 1
+        try:
+            if follower:
+                with span("singleflight.wait", group=self.name):
+                    return await asyncio.shield(call.task)
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Last waiter cancelled: stop the call and let the next request start afresh
+                self._forget(flight_key, call)
+                call.task.cancel()
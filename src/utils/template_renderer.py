@@ -0,0 +1,286 @@
+"""
+Deterministic Template Dashboard Renderer
+
+Fills the 8-section PE dashboard template (served at /prompt/pe-dashboard)
+straight from a CompanyPayload in pure Python - no LLM call, no network,
+a few milliseconds per company.
+
+Template rules applied here:
+- Missing fields render as the literal "Not disclosed."
+- Only values present in the payload are used (nothing is estimated)
+- Section 8 (Disclosure Gaps) is always present
+"""
+
+from datetime import datetime
+from typing import Any, Iterable, List, Optional
+
+from src.models import CompanyPayload, create_disclosure_gaps
+
+NOT_DISCLOSED = "Not disclosed."
+
+# Placeholder values the extraction pipeline writes for missing data
+_MISSING_MARKERS = {"", "not disclosed", "not disclosed.", "unknown", "n/a", "none", "null"}
+
+
+# ============================================================================
+# Template
+# ============================================================================
+
+PE_DASHBOARD_SECTIONS = [
+    "1. Company Overview",
+    "2. Business Model and GTM",
+    "3. Funding & Investor Profile",
+    "4. Growth Momentum",
+    "5. Visibility & Market Sentiment",
+    "6. Risks and Challenges",
+    "7. Outlook",
+    "8. Disclosure Gaps"
+]
+
+PE_DASHBOARD_TEMPLATE = """# {company_name} - PE Due Diligence Dashboard
+
+## 1. Company Overview
+- Founded: {founded_year}
+- Headquarters: {location}
+- Website: {website}
+- Description: {description}
+- Leadership: {leadership}
+
+## 2. Business Model and GTM
+- Business Model: {business_model}
+- Target Customers: {target_customers}
+- Pricing: {pricing_model}
+- Products/Services: {products}
+
+## 3. Funding & Investor Profile
+- Total Funding: {total_funding}
+- Last Round: {last_round}
+- Valuation: {valuation}
+- Key Investors: {investors}
+
+## 4. Growth Momentum
+- Headcount: {headcount} (Growth: {growth_rate})
+- Office Locations: {locations}
+- Partnerships: {partnerships}
+- Product Launches: {launches}
+
+## 5. Visibility & Market Sentiment
+- News Mentions: {news_mentions}
+- Sentiment: {sentiment}
+- Awards: {awards}
+
+## 6. Risks and Challenges
+{identified_risks}
+
+## 7. Outlook
+- Opportunities: {opportunities}
+- Strategic Initiatives: {initiatives}
+
+## 8. Disclosure Gaps
+List of information not publicly disclosed:
+{disclosure_gaps}
+"""
+
+PE_DASHBOARD_RULES = """**Rules**:
+- Use literal "Not disclosed." for missing fields
+- Never invent ARR/MRR/valuation/customer counts
+- Always include Disclosure Gaps section
+"""
+
+# Full template as published by the MCP prompt endpoint
+PE_DASHBOARD_PROMPT_TEMPLATE = f"{PE_DASHBOARD_TEMPLATE}\n---\n{PE_DASHBOARD_RULES}"
+
+
+# ============================================================================
+# Value Formatting
+# ============================================================================
+
+def is_disclosed(value: Any) -> bool:
+    """Whether a payload value carries real information"""
+    if value is None:
+        return False
+    if isinstance(value, str):
+        return value.strip().lower() not in _MISSING_MARKERS
+    if isinstance(value, (list, tuple)):
+        return any(is_disclosed(v) for v in value)
+    return True
+
+
+def _text(value: Any) -> str:
+    """Scalar value or 'Not disclosed.'"""
+    return str(value).strip() if is_disclosed(value) else NOT_DISCLOSED
+
+
+def _inline(items: Iterable[Any], limit: Optional[int] = None) -> str:
+    """Comma-separated list of disclosed items or 'Not disclosed.'"""
+    values = [str(item).strip() for item in items if is_disclosed(item)]
+    if limit and len(values) > limit:
+        values = values[:limit] + [f"and {len(values) - limit} more"]
+    return ", ".join(values) if values else NOT_DISCLOSED
+
+
+def _bullets(items: Iterable[Any], default: str = NOT_DISCLOSED) -> str:
+    """Markdown bullet list of disclosed items"""
+    values = [str(item).strip() for item in items if is_disclosed(item)]
+    return "\n".join(f"- {value}" for value in values) if values else default
+
+
+def _stage_label(stage: Optional[str]) -> Optional[str]:
+    """'series_d_plus' -> 'Series D+'"""
+    if not is_disclosed(stage):
+        return None
+    return str(stage).replace("_plus", "+").replace("_", " ").title()
+
+
+def _newest_first(records):
+    return sorted(records, key=lambda r: r.date or "", reverse=True)
+
+
+# ============================================================================
+# Field Extraction
+# ============================================================================
+
+def _last_round(payload: CompanyPayload) -> str:
+    rounds = _newest_first(payload.funding_rounds or payload.investor_profile.funding_rounds)
+    if not rounds:
+        snap = payload.snapshot
+        parts = [p for p in (_stage_label(snap.last_funding_stage), snap.last_funding_date) if is_disclosed(p)]
+        return " - ".join(parts) if parts else NOT_DISCLOSED
+
+    latest = rounds[0]
+    parts = [p for p in (_stage_label(latest.stage), latest.amount if is_disclosed(latest.amount) else None) if p]
+    text = " ".join(parts) if parts else "Round"
+    if is_disclosed(latest.date):
+        text += f" ({latest.date})"
+    if is_disclosed(latest.lead_investor):
+        text += f", led by {latest.lead_investor}"
+    return text
+
+
+def _valuation(payload: CompanyPayload) -> str:
+    if is_disclosed(payload.snapshot.valuation):
+        return payload.snapshot.valuation
+    for funding_round in _newest_first(payload.funding_rounds):
+        if is_disclosed(funding_round.valuation):
+            return f"{funding_round.valuation} (as of {funding_round.date or 'last round'})"
+    return NOT_DISCLOSED
+
+
+def _investors(payload: CompanyPayload) -> str:
+    inv = payload.investor_profile
+    names: List[str] = list(inv.lead_investors)
+    for funding_round in _newest_first(payload.funding_rounds):
+        names.append(funding_round.lead_investor)
+    names.extend(inv.all_investors)
+    # De-duplicate, keeping lead investors first
+    return _inline(dict.fromkeys(n for n in names if is_disclosed(n)), limit=8)
+
+
+def _event_titles(payload: CompanyPayload, event_type: str, limit: int = 3) -> List[str]:
+    return [e.title for e in _newest_first(payload.events) if e.event_type == event_type][:limit]
+
+
+def _headcount(payload: CompanyPayload) -> str:
+    headcount = payload.snapshot.headcount or payload.growth_metrics.headcount
+    return f"{headcount:,}" if headcount else NOT_DISCLOSED
+
+
+def _growth_rate(payload: CompanyPayload) -> str:
+    growth = payload.growth_metrics.headcount_growth_yoy
+    return f"{growth:+.0f}% YoY" if growth is not None else NOT_DISCLOSED
+
+
+def _news_mentions(payload: CompanyPayload) -> str:
+    parts = []
+    if payload.visibility.news_mentions_30d is not None:
+        parts.append(f"{payload.visibility.news_mentions_30d} (last 30 days)")
+    if payload.growth_metrics.press_mentions_12m is not None:
+        parts.append(f"{payload.growth_metrics.press_mentions_12m} (last 12 months)")
+    return ", ".join(parts) if parts else NOT_DISCLOSED
+
+
+def _sentiment(payload: CompanyPayload) -> str:
+    score = payload.visibility.sentiment_score
+    if score is None:
+        return NOT_DISCLOSED
+    label = "positive" if score >= 0.6 else "negative" if score < 0.4 else "neutral"
+    return f"{score:.2f} ({label})"
+
+
+def _initiatives(payload: CompanyPayload) -> str:
+    items = [payload.growth_metrics.geographic_expansion]
+    items += _event_titles(payload, "acquisition", limit=2)
+    items += _event_titles(payload, "milestone", limit=2)
+    items = [item.strip().rstrip(".") for item in items if is_disclosed(item)]
+    return "; ".join(items) if items else NOT_DISCLOSED
+
+
+def _disclosure_gaps(payload: CompanyPayload) -> str:
+    missing = payload.disclosure_gaps.missing_fields or create_disclosure_gaps(payload).missing_fields
+    return _bullets(missing, default="- No key disclosure gaps identified")
+
+
+def template_fields(payload: CompanyPayload) -> dict:
+    """Map a payload onto the PE dashboard template placeholders"""
+    c = payload.company
+    gm = payload.growth_metrics
+
+    location = _inline([c.hq_city, c.hq_country])
+    total_funding = payload.snapshot.total_funding
+    if not is_disclosed(total_funding):
+        total_funding = payload.investor_profile.total_raised
+
+    return {
+        "company_name": c.company_name,
+        "founded_year": _text(c.founded_year),
+        "location": location,
+        "website": _text(c.website),
+        "description": _text(c.description),
+        "leadership": _inline(f"{m.name} ({m.title})" for m in payload.leadership),
+        "business_model": _text(c.business_model),
+        "target_customers": _text(c.target_customers),
+        "pricing_model": _text(c.pricing_model),
+        "products": _inline([p.name for p in payload.products] or gm.recent_products),
+        "total_funding": _text(total_funding),
+        "last_round": _last_round(payload),
+        "valuation": _valuation(payload),
+        "investors": _investors(payload),
+        "headcount": _headcount(payload),
+        "growth_rate": _growth_rate(payload),
+        "locations": _inline(gm.office_locations),
+        "partnerships": _inline(gm.recent_partnerships or _event_titles(payload, "partnership")),
+        "launches": _inline(gm.recent_products or _event_titles(payload, "product_launch"), limit=6),
+        "news_mentions": _news_mentions(payload),
+        "sentiment": _sentiment(payload),
+        "awards": _inline(payload.visibility.awards),
+        "identified_risks": _bullets(payload.risks),
+        "opportunities": _inline(payload.opportunities),
+        "initiatives": _initiatives(payload),
+        "disclosure_gaps": _disclosure_gaps(payload),
+    }
+
+
+# ============================================================================
+# Rendering
+# ============================================================================
+
+def render_template_dashboard(payload: CompanyPayload, generated_at: Optional[str] = None) -> str:
+    """
+    Render the 8-section PE dashboard for a payload without an LLM
+
+    Args:
+        payload: Validated company payload
+        generated_at: Timestamp for the footer (default: now, UTC)
+
+    Returns:
+        Markdown dashboard string
+    """
+    generated_at = generated_at or datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+    body = PE_DASHBOARD_TEMPLATE.format(**template_fields(payload))
+
+    sources = _bullets(payload.data_sources, default="- Not disclosed.")
+    return (
+        f"{body}\n---\n"
+        f"**Generated**: {generated_at} (template, payload extracted {payload.extracted_at})\n\n"
+        f"**Sources**:\n{sources}\n"
+    )
@@ -0,0 +1,583 @@
+"""
+Lightweight In-Process Tracing
+
+Nested spans for workflow nodes, MCP calls, retrieval, embeddings and LLM
+completions, so a run's wall time can be broken down into a flame chart.
+
+- The current span lives in a contextvar, so nesting follows the call
+  stack and carries into asyncio tasks (including asyncio.run).
+- run_id / company_id set on a span are inherited by its children.
+- Context crosses HTTP via W3C `traceparent` and `baggage` headers
+  (MCPClient injects them; the MCP server middleware extracts them).
+- Finished spans go to a JSONL file and, optionally, to an OTLP/HTTP
+  collector (e.g. Jaeger on :4318) as OTLP JSON, posted in batches from a
+  background thread.
+
+Configuration (environment):
+    TRACING_ENABLED=false            Turn tracing on
+    TRACE_FILE=logs/traces.jsonl     JSONL span export
+    TRACE_OTLP_ENDPOINT=             Optional OTLP/HTTP base URL
+
+When tracing is disabled span() returns a shared no-op object.
+
+CLI (convert spans to Chrome trace format for chrome://tracing / Perfetto):
+    python -m src.utils.tracing chrome logs/traces.jsonl -o trace.json
+"""
+
+import inspect
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+# Attributes copied from a parent span to its children (and sent as baggage)
+INHERITED_ATTRIBUTES = ("run_id", "company_id")
+
+SPAN_KINDS = ("internal", "server", "client")
+
+
+# ============================================================================
+# Spans
+# ============================================================================
+
+class SpanContext:
+    """Identifies a (possibly remote) parent span"""
+    __slots__ = ("trace_id", "span_id", "baggage")
+
+    def __init__(self, trace_id: str, span_id: str, baggage: Optional[Dict[str, str]] = None):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.baggage = baggage or {}
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id",
+                 "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span | SpanContext"], attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.span_id = secrets.token_hex(8)
+        self.attributes = {}
+
+        if parent is not None:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            inherited = parent.attributes if isinstance(parent, Span) else parent.baggage
+            for key in INHERITED_ATTRIBUTES:
+                if key in inherited:
+                    self.attributes[key] = inherited[key]
+        else:
+            self.trace_id = secrets.token_hex(16)
+            self.parent_id = None
+
+        # None never overrides an inherited value
+        self.attributes.update((k, v) for k, v in attributes.items() if v is not None)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": datetime.fromtimestamp(self.start_ns / 1e9, tz=timezone.utc).isoformat(),
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3) if self.end_ns is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "pid": os.getpid(),
+            "thread": threading.get_ident(),
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned when tracing is disabled"""
+    __slots__ = ()
+    trace_id = span_id = parent_id = None
+    attributes: Dict[str, Any] = {}
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class _SpanScope:
+    __slots__ = ("_span", "_token")
+
+    def __init__(self, span: Span):
+        self._span = span
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self._span
+        span.end_ns = time.time_ns()
+        if exc is not None:
+            span.record_error(exc)
+        _current_span.reset(self._token)
+        _export(span)
+        return False
+
+
+def span(name: str, kind: str = "internal", parent: Optional[SpanContext] = None, **attributes):
+    """
+    Context manager for a span nested under the current one
+
+        with span("llm.completion", model=model) as s:
+            response = client.chat.completions.create(...)
+            s.set_attribute("completion_tokens", response.usage.completion_tokens)
+
+    Args:
+        name: Span name (dotted, e.g. 'node.evaluator', 'mcp.call_tool')
+        kind: internal | server | client
+        parent: Explicit (e.g. remote) parent; defaults to the current span
+        **attributes: Span attributes
+    """
+    if not _config.enabled:
+        return NOOP_SPAN
+    return _SpanScope(Span(name, kind, parent or _current_span.get(), attributes))
+
+
+def traced(name: Optional[str] = None, **attributes):
+    """Decorator wrapping a sync or async function in a span"""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_node(name: str, fn: Callable[[dict], dict]) -> Callable[[dict], dict]:
+    """Wrap a LangGraph node so each invocation is a span tagged with run_id / company_id"""
+
+    @wraps(fn)
+    def node(state):
+        with span(f"node.{name}", run_id=state.get("run_id"), company_id=state.get("company_id")) as s:
+            result = fn(state)
+            errors = result.get("errors") if isinstance(result, dict) else None
+            if errors:
+                s.set_attribute("errors", len(errors))
+            return result
+    return node
+
+
+# ============================================================================
+# W3C trace context propagation
+# ============================================================================
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Add traceparent / baggage for the current span to outgoing headers"""
+    headers = headers if headers is not None else {}
+    current = _current_span.get()
+    if current is None:
+        return headers
+
+    headers["traceparent"] = current.traceparent
+    baggage = [
+        f"{key}={quote(str(current.attributes[key]), safe='')}"
+        for key in INHERITED_ATTRIBUTES
+        if current.attributes.get(key) is not None
+    ]
+    if baggage:
+        headers["baggage"] = ",".join(baggage)
+    return headers
+
+
+def extract_context(traceparent: Optional[str], baggage: Optional[str] = None) -> Optional[SpanContext]:
+    """Parse W3C traceparent / baggage headers into a remote SpanContext"""
+    if not traceparent:
+        return None
+    parts = traceparent.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+
+    items = {}
+    for item in (baggage or "").split(","):
+        key, sep, value = item.partition("=")
+        if sep and key.strip() in INHERITED_ATTRIBUTES:
+            items[key.strip()] = unquote(value.split(";")[0].strip())
+    return SpanContext(parts[1], parts[2], items)
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a server span per HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _config.enabled:
+            return await self.app(scope, receive, send)
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        parent = extract_context(headers.get("traceparent"), headers.get("baggage"))
+
+        with span(f"{scope['method']} {scope['path']}", kind="server", parent=parent,
+                  http_method=scope["method"], http_path=scope["path"]) as server_span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    server_span.set_attribute("http_status", message["status"])
+                    if message["status"] >= 500:
+                        server_span.status = "error"
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+# ============================================================================
+# Exporters
+# ============================================================================
+
+class JsonlSpanExporter:
+    """Appends one JSON object per finished span"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+    def flush(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _FlushRequest:
+    """Queued behind pending spans; set once they have been posted"""
+    __slots__ = ("done", "stop")
+
+    def __init__(self, stop: bool = False):
+        self.done = threading.Event()
+        self.stop = stop
+
+
+class OtlpHttpSpanExporter:
+    """
+    Batches spans and posts them as OTLP JSON to {endpoint}/v1/traces
+
+    export() only enqueues: a daemon thread posts a batch once batch_size
+    spans are queued or flush_interval seconds have passed, so a slow
+    collector never blocks the thread (or the server's event loop) that
+    closed the span. When max_queue spans are waiting, new ones are dropped
+    (counted in `dropped`).
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "pe-dashboard", batch_size: int = 64,
+                 flush_interval: float = 2.0, max_queue: int = 2048):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="otlp-span-exporter", daemon=True)
+                    self._worker.start()
+
+    def _run(self) -> None:
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if isinstance(item, Span):
+                batch.append(item)
+                if len(batch) < self.batch_size:
+                    continue
+            if batch:
+                self._post(batch)
+                batch = []
+            deadline = time.monotonic() + self.flush_interval
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+                if item.stop:
+                    return
+
+    @staticmethod
+    def _attribute(key: str, value: Any) -> dict:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def encode(self, spans: List[Span]) -> dict:
+        kinds = {"internal": 1, "server": 2, "client": 3}
+        return {"resourceSpans": [{
+            "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": "src.utils.tracing"},
+                "spans": [{
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    "parentSpanId": s.parent_id or "",
+                    "name": s.name,
+                    "kind": kinds.get(s.kind, 1),
+                    "startTimeUnixNano": str(s.start_ns),
+                    "endTimeUnixNano": str(s.end_ns),
+                    "attributes": [self._attribute(k, v) for k, v in s.attributes.items() if v is not None],
+                    "status": {"code": 2, "message": s.error or ""} if s.status == "error" else {"code": 1},
+                } for s in spans],
+            }],
+        }]}
+
+    def _post(self, spans: List[Span]) -> None:
+        try:
+            import httpx
+            httpx.post(self.url, json=self.encode(spans), timeout=5).raise_for_status()
+        except Exception as e:
+            print(f"⚠️  OTLP export of {len(spans)} spans failed: {e}")
+
+    def _request_flush(self, stop: bool, timeout: float) -> None:
+        if self._worker is None:
+            return
+        request = _FlushRequest(stop)
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return
+        request.done.wait(timeout)
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Post every span queued so far (waits for the exporter thread, up to `timeout`)"""
+        self._request_flush(False, timeout)
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            worker, stop = self._worker, self._worker is not None
+        if stop:
+            self._request_flush(True, timeout)
+            worker.join(timeout)
+            self._worker = None
+
+
+# ============================================================================
+# Configuration
+# ============================================================================
+
+class _TracingConfig:
+    def __init__(self):
+        self.enabled = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+        self.exporters: Optional[list] = None
+        self._lock = threading.Lock()
+
+    def get_exporters(self) -> list:
+        if self.exporters is None:
+            with self._lock:
+                if self.exporters is None:
+                    exporters = [JsonlSpanExporter(Path(os.getenv("TRACE_FILE", "logs/traces.jsonl")))]
+                    otlp_endpoint = os.getenv("TRACE_OTLP_ENDPOINT")
+                    if otlp_endpoint:
+                        exporters.append(OtlpHttpSpanExporter(otlp_endpoint))
+                    self.exporters = exporters
+        return self.exporters
+
+
+_config = _TracingConfig()
+
+
+def tracing_enabled() -> bool:
+    return _config.enabled
+
+
+def configure_tracing(enabled: bool = True, path: Optional[Path] = None,
+                      otlp_endpoint: Optional[str] = None, exporters: Optional[list] = None) -> None:
+    """
+    Override the environment configuration (tests, benchmarks, CLIs)
+
+    Args:
+        enabled: Turn tracing on or off
+        path: JSONL export file (default TRACE_FILE)
+        otlp_endpoint: OTLP/HTTP base URL (default TRACE_OTLP_ENDPOINT)
+        exporters: Explicit exporter list (replaces path / otlp_endpoint)
+    """
+    shutdown_tracing()
+    _config.enabled = enabled
+    if exporters is None and (path is not None or otlp_endpoint is not None):
+        exporters = [JsonlSpanExporter(Path(path or os.getenv("TRACE_FILE", "logs/traces.jsonl")))]
+        if otlp_endpoint:
+            exporters.append(OtlpHttpSpanExporter(otlp_endpoint))
+    _config.exporters = exporters
+
+
+def _export(span: Span) -> None:
+    for exporter in _config.get_exporters():
+        try:
+            exporter.export(span)
+        except Exception as e:
+            print(f"⚠️  Span export failed ({type(exporter).__name__}): {e}")
+
+
+def flush_traces() -> None:
+    """Push buffered spans (OTLP batches) out; waits for the OTLP exporter thread to post them"""
+    for exporter in _config.exporters or []:
+        exporter.flush()
+
+
+def shutdown_tracing() -> None:
+    for exporter in _config.exporters or []:
+        exporter.shutdown()
+    _config.exporters = None
+
+
+# ============================================================================
+# Flame chart export
+# ============================================================================
+
+def load_spans(path: Path) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+def to_chrome_trace(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert spans to Chrome trace-event JSON (complete 'X' events)
+
+    Each company run becomes a process row and each thread a track, so the
+    nesting of node / MCP / LLM spans renders as a flame chart.
+    """
+    rows: Dict[Tuple[str, str], int] = {}
+    events = []
+    for s in sorted(spans, key=lambda s: s["start_ns"]):
+        attributes = s.get("attributes", {})
+        row = (attributes.get("company_id") or "unknown", attributes.get("run_id") or s["trace_id"])
+        pid = rows.setdefault(row, len(rows) + 1)
+        events.append({
+            "name": s["name"],
+            "cat": s.get("kind", "internal"),
+            "ph": "X",
+            "ts": s["start_ns"] / 1000,
+            "dur": ((s.get("end_ns") or s["start_ns"]) - s["start_ns"]) / 1000,
+            "pid": pid,
+            "tid": s.get("thread", 0),
+            "args": {**attributes, "status": s.get("status"), "error": s.get("error")},
+        })
+    for (company_id, run_id), pid in rows.items():
+        events.append({"name": "process_name", "ph": "M", "pid": pid,
+                       "args": {"name": f"{company_id} ({run_id[:8]})"}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Trace utilities")
+    sub = parser.add_subparsers(dest="command", required=True)
+    chrome = sub.add_parser("chrome", help="Convert a span JSONL file to Chrome trace format")
+    chrome.add_argument("trace_file", nargs="?", default=os.getenv("TRACE_FILE", "logs/traces.jsonl"))
+    chrome.add_argument("-o", "--output", default="trace.json")
+    args = parser.parse_args()
+
+    spans = load_spans(Path(args.trace_file))
+    Path(args.output).write_text(json.dumps(to_chrome_trace(spans)))
+    print(f"✅ Wrote {len(spans)} spans to {args.output} (open in chrome://tracing or ui.perfetto.dev)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Token Usage, Cost Accounting and Budgets
+
+Captures `response.usage` from every chat completion and embedding call
+and rolls it up per request, per workflow run and per day.
+
+- track_usage(): collects usage recorded in the enclosed block (an MCP tool
+  request, a supervisor run). Each scope is isolated; callers that need a
+  roll-up merge summaries explicitly (e.g. DashboardResponse.usage into the
+  workflow state), so nothing is counted twice.
+- Usage ledger: one JSONL line per finished workflow run; per-day totals
+  are summed from it.
+- BudgetPolicy: per-run and per-day token budgets. Near a budget the
+  workflow degrades to a cheaper model and template-first generation; at
+  the budget it stops making LLM calls (template mode, no RAG synthesis).
+
+Configuration (environment):
+    TOKEN_BUDGET_PER_RUN=0           Tokens per workflow run (0 = unlimited)
+    TOKEN_BUDGET_PER_DAY=0           Tokens per UTC day across runs (0 = unlimited)
+    BUDGET_DEGRADE_AT=0.8            Fraction of a budget at which to degrade
+    BUDGET_FALLBACK_MODEL=gpt-4o-mini
+    USAGE_LEDGER=logs/usage_ledger.jsonl
+
+Prices are USD per 1M tokens (input, output) and only used for estimates.
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+# USD per 1M tokens: (input, output)
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int = 0) -> float:
+    """Estimated USD cost; dated model names (gpt-4o-mini-2024-07-18) use their base price"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        base = max((name for name in MODEL_PRICES if model.startswith(name)), key=len, default=None)
+        prices = MODEL_PRICES.get(base, (0.0, 0.0))
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+# ============================================================================
+# Usage Models
+# ============================================================================
+
+class ModelUsage(BaseModel):
+    """Usage for one model"""
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+class UsageSummary(BaseModel):
+    """Token usage and estimated cost, broken down by model"""
+    calls: int = Field(0, description="Completion and embedding calls")
+    prompt_tokens: int = Field(0, description="Input tokens (including embeddings)")
+    completion_tokens: int = Field(0, description="Output tokens")
+    total_tokens: int = Field(0, description="prompt_tokens + completion_tokens")
+    cost_usd: float = Field(0.0, description="Estimated cost in USD")
+    by_model: Dict[str, ModelUsage] = Field(default_factory=dict)
+
+    def add(self, model: str, prompt_tokens: int = 0, completion_tokens: int = 0, calls: int = 1,
+            cost_usd: Optional[float] = None) -> None:
+        if cost_usd is None:
+            cost_usd = estimate_cost(model, prompt_tokens, completion_tokens)
+
+        entry = self.by_model.setdefault(model, ModelUsage())
+        entry.calls += calls
+        entry.prompt_tokens += prompt_tokens
+        entry.completion_tokens += completion_tokens
+        entry.cost_usd += cost_usd
+
+        self.calls += calls
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.total_tokens += prompt_tokens + completion_tokens
+        self.cost_usd += cost_usd
+
+    def merge(self, other: "UsageSummary | dict | None") -> "UsageSummary":
+        """Add another summary (or its dict form, e.g. from an MCP response) into this one"""
+        if not other:
+            return self
+        if isinstance(other, dict):
+            other = UsageSummary.model_validate(other)
+        for model, entry in other.by_model.items():
+            self.add(model, entry.prompt_tokens, entry.completion_tokens, entry.calls, entry.cost_usd)
+        return self
+
+
+# ============================================================================
+# Collection
+# ============================================================================
+
+_active_usage: ContextVar[Optional[UsageSummary]] = ContextVar("active_usage", default=None)
+
+
+@contextmanager
+def track_usage():
+    """Collect usage recorded in the enclosed block (isolated from any outer scope)"""
+    usage = UsageSummary()
+    token = _active_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _active_usage.reset(token)
+
+
+def current_usage() -> Optional[UsageSummary]:
+    return _active_usage.get()
+
+
+def record_usage(model: str, usage) -> None:
+    """
+    Record `response.usage` from a completion or embedding call
+
+    Embedding usage has no completion_tokens. Non-integer fields (e.g.
+    mocks) are ignored.
+    """
+    collector = _active_usage.get()
+    if collector is None or usage is None:
+        return
+
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    prompt_tokens = prompt_tokens if isinstance(prompt_tokens, int) else 0
+    completion_tokens = completion_tokens if isinstance(completion_tokens, int) else 0
+    if prompt_tokens or completion_tokens:
+        collector.add(model, prompt_tokens, completion_tokens)
+
+
+def merge_usage(usage) -> None:
+    """Merge a summary returned by another process (MCP tool response) into the active scope"""
+    collector = _active_usage.get()
+    if collector is not None:
+        collector.merge(usage)
+
+
+# ============================================================================
+# Ledger
+# ============================================================================
+
+def ledger_path() -> Path:
+    return Path(os.getenv("USAGE_LEDGER", "logs/usage_ledger.jsonl"))
+
+
+def append_ledger(company_id: str, run_id: str, usage: UsageSummary | dict,
+                  path: Optional[Path] = None) -> None:
+    """Append one finished run to the usage ledger"""
+    path = path or ledger_path()
+    usage = usage if isinstance(usage, UsageSummary) else UsageSummary.model_validate(usage or {})
+    now = datetime.utcnow()
+    entry = {
+        "date": now.strftime("%Y-%m-%d"),
+        "timestamp": now.isoformat(),
+        "company_id": company_id,
+        "run_id": run_id,
+        "usage": usage.model_dump(),
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except Exception as e:
+        print(f"⚠️  Could not write usage ledger {path}: {e}")
+
+
+def daily_usage(day: Optional[str] = None, path: Optional[Path] = None) -> UsageSummary:
+    """Usage summed over ledger entries for a UTC day (YYYY-MM-DD, default today)"""
+    path = path or ledger_path()
+    day = day or datetime.utcnow().strftime("%Y-%m-%d")
+    total = UsageSummary()
+    if not path.exists():
+        return total
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("date") == day:
+                total.merge(entry.get("usage"))
+    return total
+
+
+# ============================================================================
+# Budgets
+# ============================================================================
+
+class BudgetDecision(BaseModel):
+    """Generation settings chosen for the remaining budget"""
+    mode: str
+    model: Optional[str] = None
+    rag: bool = True
+    reason: Optional[str] = Field(None, description="Why generation was degraded (None if not)")
+
+
+class BudgetPolicy(BaseModel):
+    """Per-run / per-day token budgets (0 = unlimited)"""
+    run_tokens: int = 0
+    day_tokens: int = 0
+    degrade_at: float = 0.8
+    fallback_model: str = "gpt-4o-mini"
+
+    @classmethod
+    def from_env(cls) -> "BudgetPolicy":
+        return cls(
+            run_tokens=int(os.getenv("TOKEN_BUDGET_PER_RUN", "0")),
+            day_tokens=int(os.getenv("TOKEN_BUDGET_PER_DAY", "0")),
+            degrade_at=float(os.getenv("BUDGET_DEGRADE_AT", "0.8")),
+            fallback_model=os.getenv("BUDGET_FALLBACK_MODEL", "gpt-4o-mini"),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.run_tokens > 0 or self.day_tokens > 0
+
+    def _fractions(self, run_used: int, day_used: int) -> List[Tuple[str, float]]:
+        fractions = []
+        if self.run_tokens > 0:
+            fractions.append((f"run {run_used}/{self.run_tokens} tokens", run_used / self.run_tokens))
+        if self.day_tokens > 0:
+            fractions.append((f"day {day_used}/{self.day_tokens} tokens", day_used / self.day_tokens))
+        return fractions
+
+    def decide(self, mode: str, run_used: int = 0, day_used: int = 0,
+               model: Optional[str] = None) -> BudgetDecision:
+        """
+        Degrade generation as budgets are consumed
+
+        - below degrade_at:  unchanged
+        - near a budget:     fallback model; 'llm' / 'sectioned' become 'enriched'
+                             (template facts + a short LLM summary)
+        - at/over a budget:  'template' mode, RAG synthesis skipped
+        """
+        fractions = self._fractions(run_used, day_used)
+        if not fractions:
+            return BudgetDecision(mode=mode, model=model)
+
+        label, used = max(fractions, key=lambda f: f[1])
+        if used >= 1.0:
+            return BudgetDecision(mode="template", model=self.fallback_model, rag=False,
+                                  reason=f"budget exhausted ({label})")
+        if used >= self.degrade_at:
+            return BudgetDecision(mode="enriched" if mode in ("llm", "sectioned") else mode, model=self.fallback_model,
+                                  reason=f"budget nearly exhausted ({label})")
+        return BudgetDecision(mode=mode, model=model)
@@ -0,0 +1,366 @@
+"""
+Durable Workflow Checkpointing
+
+compile_workflow() used LangGraph's in-memory MemorySaver, so a crash or an
+Airflow retry mid-company threw away every completed node, including the
+generated dashboards. CHECKPOINT_STORAGE selects the checkpointer:
+
+    memory   MemorySaver (nothing survives the process)
+    sqlite   SqliteCheckpointSaver: one local SQLite file in WAL mode,
+             shared by every workflow compiled in the process
+
+With a durable store, run_workflow() re-run with the same run_id (the
+LangGraph thread_id) resumes after the last completed node, and a run that
+already finished returns its saved final state without running anything.
+
+The saver implements LangGraph's BaseCheckpointSaver on the stdlib sqlite3
+module (no langgraph-checkpoint-sqlite dependency). Each checkpoint row
+holds the full serialized checkpoint, channel values included, so any row
+can be restored on its own.
+
+Retention: threads whose newest checkpoint is older than
+CHECKPOINT_RETENTION_DAYS are deleted when the store is opened, and by
+
+    python -m src.workflows.checkpointing prune [--days 7]
+
+Configuration (environment):
+    CHECKPOINT_STORAGE=memory                   memory | sqlite
+    CHECKPOINT_DB=data/checkpoints/workflow.sqlite
+    CHECKPOINT_RETENTION_DAYS=7                 0 keeps every thread
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+CHECKPOINT_STORAGES = ("memory", "sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE INDEX IF NOT EXISTS checkpoints_created ON checkpoints (thread_id, created_at);
+"""
+
+
+def checkpoint_storage() -> str:
+    storage = os.getenv("CHECKPOINT_STORAGE", "memory").lower()
+    if storage not in CHECKPOINT_STORAGES:
+        raise ValueError(f"Unknown CHECKPOINT_STORAGE '{storage}' (expected one of {CHECKPOINT_STORAGES})")
+    return storage
+
+
+def checkpoint_db_path() -> Path:
+    return Path(os.getenv("CHECKPOINT_DB", "data/checkpoints/workflow.sqlite"))
+
+
+def retention_days() -> float:
+    return float(os.getenv("CHECKPOINT_RETENTION_DAYS", "7"))
+
+
+def _thread_config(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+# ============================================================================
+# SQLite Saver
+# ============================================================================
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer backed by one SQLite file (WAL journal)
+
+    WAL lets readers (e.g. `get_state` from another process) run alongside
+    the writer; synchronous=NORMAL fsyncs at WAL checkpoints, so a process
+    crash loses nothing and a power loss at most the last node. One
+    connection is shared across threads behind a lock.
+    """
+
+    def __init__(self, path: Path, *, serde=None):
+        super().__init__(serde=serde)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _pending_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        rows = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, channel, type_, value in rows]
+
+    def _tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        return CheckpointTuple(
+            config=_thread_config(thread_id, checkpoint_ns, checkpoint_id),
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=_thread_config(thread_id, checkpoint_ns, parent_id) if parent_id else None,
+            pending_writes=self._pending_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """The requested checkpoint, or the thread's latest when no checkpoint_id is given"""
+        configurable = config["configurable"]
+        thread_id, checkpoint_ns = configurable["thread_id"], configurable.get("checkpoint_ns", "")
+        columns = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                   "metadata_type, metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?")
+        with self.lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(f"{columns} AND checkpoint_id = ?",
+                                        (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+            else:
+                row = self.conn.execute(f"{columns} ORDER BY checkpoint_id DESC LIMIT 1",
+                                        (thread_id, checkpoint_ns)).fetchone()
+            return self._tuple(row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """Checkpoints newest first, filtered by thread / namespace / id, metadata and `before`"""
+        where, params = [], []
+        if config:
+            configurable = config["configurable"]
+            where.append("thread_id = ?")
+            params.append(configurable["thread_id"])
+            if configurable.get("checkpoint_ns") is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(configurable["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                 "metadata_type, metadata FROM checkpoints")
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+            tuples = []
+            for row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                item = self._tuple(row)
+                if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                tuples.append(item)
+        yield from tuples
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint (with its channel values) under the thread / namespace"""
+        configurable = config["configurable"]
+        thread_id, checkpoint_ns = configurable["thread_id"], configurable.get("checkpoint_ns", "")
+        type_, blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], configurable.get("checkpoint_id"),
+                 type_, blob, metadata_type, metadata_blob, time.time())
+            )
+        return _thread_config(thread_id, checkpoint_ns, checkpoint["id"])
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store a task's intermediate writes (special channels replace, others are written once)"""
+        configurable = config["configurable"]
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = [
+            (configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"],
+             task_id, WRITES_IDX_MAP.get(channel, idx), channel, *self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def prune_expired(self, days: Optional[float] = None) -> int:
+        """Delete threads whose newest checkpoint is older than `days`; returns threads removed"""
+        days = days if days is not None else retention_days()
+        if days <= 0:
+            return 0
+        cutoff = time.time() - days * 86400
+        with self.lock, self.conn:
+            expired = [row[0] for row in self.conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?", (cutoff,)
+            )]
+            for thread_id in expired:
+                self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+        return len(expired)
+
+    # Async variants: SQLite calls are short, local and serialized by the lock
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+
+# ============================================================================
+# Checkpointer Selection
+# ============================================================================
+
+_savers: Dict[Path, SqliteCheckpointSaver] = {}
+_savers_lock = threading.Lock()
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """
+    Checkpointer for compile_workflow() per CHECKPOINT_STORAGE
+
+    'memory' returns a fresh MemorySaver; 'sqlite' returns the process-wide
+    saver for CHECKPOINT_DB, pruning expired threads when it is first opened.
+    """
+    if checkpoint_storage() == "memory":
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver()
+
+    path = checkpoint_db_path().resolve()
+    saver = _savers.get(path)
+    if saver is None:
+        with _savers_lock:
+            saver = _savers.get(path)
+            if saver is None:
+                saver = SqliteCheckpointSaver(path)
+                pruned = saver.prune_expired()
+                if pruned:
+                    print(f"🧹 Pruned {pruned} expired workflow thread(s) from {path}")
+                _savers[path] = saver
+    return saver
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Workflow checkpoint store maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    prune = sub.add_parser("prune", help="Delete threads older than the retention period")
+    prune.add_argument("--db", default=str(checkpoint_db_path()), help="SQLite checkpoint file")
+    prune.add_argument("--days", type=float, default=None, help="Retention (default CHECKPOINT_RETENTION_DAYS)")
+
+    threads = sub.add_parser("threads", help="List stored threads (run ids)")
+    threads.add_argument("--db", default=str(checkpoint_db_path()), help="SQLite checkpoint file")
+
+    args = parser.parse_args()
+    saver = SqliteCheckpointSaver(Path(args.db))
+    try:
+        if args.command == "prune":
+            print(f"🧹 Pruned {saver.prune_expired(args.days)} expired thread(s) from {args.db}")
+        else:
+            rows = saver.conn.execute(
+                "SELECT thread_id, COUNT(*), MAX(created_at) FROM checkpoints GROUP BY thread_id ORDER BY 3 DESC"
+            ).fetchall()
+            for thread_id, count, updated in rows:
+                print(f"{thread_id:<48} {count:>4} checkpoints   "
+                      f"last {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(updated))}")
+    finally:
+        saver.close()
+
+
+if __name__ == "__main__":
+    main()
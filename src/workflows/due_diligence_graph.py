@@ -3,26 +3,42 @@ Lab 17 — Graph-based Supervisory Workflow using LangGraph
 
 Implements a due diligence workflow with the following nodes:
 1. Planner: Constructs plan of actions
-2. Data Generator: Invokes MCP dashboard tools
-3. Evaluator: Scores dashboards per rubric
-4. Risk Detector: Branches to HITL if keywords found
+2. Risk Triage: Scans payload risk fields and retrieved risk chunks before
+   generation; flagged companies are queued for review right away
+3. Data Generator: Invokes MCP dashboard tools
+4. Evaluator: Scores dashboards per rubric
+5. Risk Detector: Branches to HITL if keywords found (runs in parallel with
+   the evaluator; both only read the dashboards)
+6. HITL: Queues flagged companies for review and pauses the run (interrupt)
 
 Uses LangGraph StateGraph for orchestration.
 """
 
 import asyncio
-from typing import TypedDict, Annotated, Literal
+import copy
+import operator
+import os
+from functools import wraps
+from typing import TYPE_CHECKING, TypedDict, Annotated, Literal
 from datetime import datetime
+from pathlib import Path
 import json
 
-from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
-
 from src.agents.planner_agent import plan_due_diligence
-from src.agents.evaluation_agent import evaluate_dashboards
-from src.agents.supervisor_agent import MCPClient, get_mcp_client
+from src.agents.mcp_client import MCPClient, get_mcp_client
+from src.tools.payload_tool import get_latest_structured_payload
 from src.utils.react_logger import ReActLogger
 from src.utils.dashboard_generator import DashboardGenerator
+from src.utils.tracing import flush_traces, span, trace_node
+from src.utils.profiling import profile_node, profile_scope
+from src.utils.usage import BudgetDecision, BudgetPolicy, UsageSummary, append_ledger, daily_usage
+from src.workflows.hitl_queue import ReviewItem, get_review_queue, hitl_mode
+from src.workflows.risk_triage import RiskTriage, get_risk_matcher, queue_for_review, triage_company, triage_enabled
+
+# langgraph (~1s) and the evaluator's numpy are imported on first use so that
+# importing this module (Airflow DAG parsing, test collection) stays cheap
+if TYPE_CHECKING:
+    from langgraph.graph import StateGraph
 
 
 # ============================================================
@@ -34,12 +50,19 @@ class DueDiligenceState(TypedDict):
     company_id: str
     run_id: str
 
+    # Structured dashboard generation mode (llm | sectioned | template | enriched)
+    generation_mode: str
+
     # Plan
     plan: dict | None
 
-    # Generated dashboards
+    # Pre-generation risk triage (RiskTriage dict; may be passed in precomputed)
+    risk_triage: dict | None
+
+    # Generated dashboards (and the files they were saved to, by method)
     structured_dashboard: str | None
     rag_dashboard: str | None
+    dashboard_paths: dict | None
 
     # Evaluation
     evaluation_result: dict | None
@@ -48,16 +71,25 @@ class DueDiligenceState(TypedDict):
     risk_detected: bool
     risk_keywords: list[str]
 
-    # HITL
+    # HITL (hitl_pending: run paused in the review queue, set on run_workflow's result)
     hitl_required: bool
     hitl_approved: bool | None
+    hitl_pending: bool
 
     # Final output
     final_decision: str | None
 
-    # Metadata
-    execution_path: list[str]
-    errors: list[str]
+    # Token usage / cost for this run (UsageSummary dict) and budget degradations
+    usage: dict | None
+    budget_notes: list[str]
+
+    # Dashboards produced by offline batch generation ({"structured", "rag", "usage"})
+    batch_dashboards: dict | None
+
+    # Metadata (appended to by the parallel evaluator / risk_detector branches:
+    # the reducer concatenates each node's new entries instead of overwriting)
+    execution_path: Annotated[list[str], operator.add]
+    errors: Annotated[list[str], operator.add]
 
 
 # ============================================================
@@ -92,10 +124,116 @@ def planner_node(state: DueDiligenceState) -> DueDiligenceState:
     return state
 
 
+def risk_triage_node(state: DueDiligenceState) -> DueDiligenceState:
+    """
+    Node 2: Risk Triage
+    Scans the payload's risk fields and the retrieved risk chunks before any
+    dashboard is generated (src.workflows.risk_triage)
+
+    A flagged company gets hitl_required immediately and, in HITL queue
+    mode, a review item, so reviewers can start during generation. A triage
+    result computed by the batch runner (state["risk_triage"]) is reused;
+    the runner has usually queued its review already (enqueue is idempotent).
+    """
+    if not triage_enabled():
+        return state
+
+    logger = ReActLogger(run_id=state["run_id"])
+    logger.log_thought(
+        "Triaging risk signals in payload and retrieved chunks before generation",
+        company_id=state["company_id"]
+    )
+
+    try:
+        triage = state.get("risk_triage")
+        if triage is None:
+            triage = asyncio.run(triage_company(state["company_id"])).model_dump()
+        state["risk_triage"] = triage
+
+        if triage["keywords"]:
+            state["hitl_required"] = True
+            logger.log_observation(
+                f"⚠️  TRIAGE FLAGGED: {triage['keywords']} ({len(triage['signals'])} signals) - HITL required",
+                company_id=state["company_id"],
+                metadata={"keywords": triage["keywords"], "chunks_scanned": triage["chunks_scanned"]}
+            )
+            if hitl_mode() == "queue":
+                queue_for_review(state["run_id"], RiskTriage.model_validate(triage))
+                print(f"📥 Queued for early review (generation continues): /hitl/reviews/{state['run_id']}")
+        else:
+            logger.log_observation(
+                f"Triage clear ({triage['chunks_scanned']} chunks scanned)",
+                company_id=state["company_id"]
+            )
+        state["execution_path"].append("risk_triage")
+
+    except Exception as e:
+        state["errors"].append(f"Risk triage error: {str(e)}")
+        logger.log_observation(f"Error in risk triage: {str(e)}", company_id=state["company_id"])
+
+    return state
+
+
+def budget_decision(state: DueDiligenceState, run_usage: UsageSummary, policy: BudgetPolicy,
+                    logger: ReActLogger) -> BudgetDecision:
+    """Pick generation mode / model for the tokens used so far this run and today"""
+    day_used = daily_usage().total_tokens if policy.day_tokens else 0
+    decision = policy.decide(
+        state.get("generation_mode") or "llm",
+        run_used=run_usage.total_tokens,
+        day_used=day_used + run_usage.total_tokens
+    )
+    if decision.reason and decision.reason not in state.setdefault("budget_notes", []):
+        state["budget_notes"].append(decision.reason)
+        logger.log_thought(
+            f"Degrading generation: {decision.reason} → mode={decision.mode}, model={decision.model}, "
+            f"rag={'on' if decision.rag else 'off'}",
+            company_id=state["company_id"]
+        )
+    return decision
+
+
+def save_dashboards(state: DueDiligenceState, include_rag: bool, logger: ReActLogger) -> None:
+    """Save the generated dashboards to disk (failures are logged, not raised)"""
+    try:
+        structured_path = DashboardGenerator.save_dashboard(
+            state["company_id"],
+            state["structured_dashboard"],
+            "structured",
+            state["run_id"]
+        )
+        paths = {"structured": str(structured_path)}
+        if include_rag:
+            rag_path = DashboardGenerator.save_dashboard(
+                state["company_id"],
+                state["rag_dashboard"],
+                "rag",
+                state["run_id"]
+            )
+            paths["rag"] = str(rag_path)
+        state["dashboard_paths"] = paths
+        logger.log_observation(
+            f"Dashboards saved: {', '.join(Path(p).name for p in paths.values())}",
+            company_id=state["company_id"]
+        )
+    except Exception as e:
+        logger.log_observation(
+            f"Warning: Could not save dashboards to disk: {str(e)}",
+            company_id=state["company_id"]
+        )
+
+
 def data_generator_node(state: DueDiligenceState) -> DueDiligenceState:
     """
-    Node 2: Data Generator
+    Node 3: Data Generator
     Invokes MCP dashboard tools to generate dashboards
+
+    Token usage reported by each tool is added to state["usage"]; when
+    TOKEN_BUDGET_PER_RUN / TOKEN_BUDGET_PER_DAY are set, generation
+    degrades (cheaper model, template mode, no RAG synthesis) near the budget.
+
+    When the nightly batch run already produced both dashboards
+    (state["batch_dashboards"]), they are used as-is.
     """
     logger = ReActLogger(run_id=state["run_id"])
     logger.log_thought(
@@ -103,69 +241,91 @@ def data_generator_node(state: DueDiligenceState) -> DueDiligenceState:
         company_id=state["company_id"]
     )
 
+    policy = BudgetPolicy.from_env()
+    run_usage = UsageSummary.model_validate(state.get("usage") or {})
+
+    # Nightly batch run: dashboards were generated offline, no MCP calls needed
+    batch = state.get("batch_dashboards") or {}
+    if batch.get("structured") is not None and batch.get("rag") is not None:
+        state["structured_dashboard"] = batch["structured"]
+        state["rag_dashboard"] = batch["rag"]
+        run_usage.merge(batch.get("usage"))
+        state["usage"] = run_usage.model_dump()
+        logger.log_observation(
+            "Dashboards taken from batch generation",
+            company_id=state["company_id"],
+            metadata={"usage": batch.get("usage") or {}}
+        )
+        save_dashboards(state, True, logger)
+        state["execution_path"].append("data_generator")
+        return state
+
     try:
         mcp = get_mcp_client()
+        decision = budget_decision(state, run_usage, policy, logger)
+        structured_params = {
+            "company_id": state["company_id"],
+            "mode": decision.mode
+        }
+        if decision.model:
+            structured_params["model"] = decision.model
 
         # Generate structured dashboard
         logger.log_action(
             "generate_structured_dashboard",
-            {"company_id": state["company_id"]},
+            structured_params,
             company_id=state["company_id"]
         )
 
         structured_result = asyncio.run(mcp.call_tool(
             "generate_structured_dashboard",
-            {"company_id": state["company_id"]}
+            structured_params
         ))
 
         state["structured_dashboard"] = structured_result.get("markdown", "")
+        run_usage.merge(structured_result.get("usage"))
+        state["usage"] = run_usage.model_dump()
         logger.log_observation(
             f"Structured dashboard generated ({len(state['structured_dashboard'])} chars)",
-            company_id=state["company_id"]
+            company_id=state["company_id"],
+            metadata={"usage": structured_result.get("usage") or {}}
         )
 
-        # Generate RAG dashboard
-        logger.log_action(
-            "generate_rag_dashboard",
-            {"company_id": state["company_id"]},
-            company_id=state["company_id"]
-        )
+        # Generate RAG dashboard (LLM synthesis only; skipped once the budget is exhausted)
+        decision = budget_decision(state, run_usage, policy, logger)
+        rag_params = {"company_id": state["company_id"]}
+        if decision.model:
+            rag_params["model"] = decision.model
 
-        rag_result = asyncio.run(mcp.call_tool(
-            "generate_rag_dashboard",
-            {"company_id": state["company_id"]}
-        ))
+        if decision.rag:
+            logger.log_action(
+                "generate_rag_dashboard",
+                rag_params,
+                company_id=state["company_id"]
+            )
 
-        state["rag_dashboard"] = rag_result.get("markdown", "")
-        logger.log_observation(
-            f"RAG dashboard generated ({len(state['rag_dashboard'])} chars)",
-            company_id=state["company_id"]
-        )
+            rag_result = asyncio.run(mcp.call_tool(
+                "generate_rag_dashboard",
+                rag_params
+            ))
 
-        # Save dashboards to disk
-        try:
-            structured_path = DashboardGenerator.save_dashboard(
-                state["company_id"],
-                state["structured_dashboard"],
-                "structured",
-                state["run_id"]
-            )
-            rag_path = DashboardGenerator.save_dashboard(
-                state["company_id"],
-                state["rag_dashboard"],
-                "rag",
-                state["run_id"]
-            )
+            state["rag_dashboard"] = rag_result.get("markdown", "")
+            run_usage.merge(rag_result.get("usage"))
+            state["usage"] = run_usage.model_dump()
             logger.log_observation(
-                f"Dashboards saved: {structured_path.name}, {rag_path.name}",
-                company_id=state["company_id"]
+                f"RAG dashboard generated ({len(state['rag_dashboard'])} chars)",
+                company_id=state["company_id"],
+                metadata={"usage": rag_result.get("usage") or {}}
             )
-        except Exception as e:
+        else:
+            state["rag_dashboard"] = f"# RAG Dashboard (skipped - {decision.reason})"
             logger.log_observation(
-                f"Warning: Could not save dashboards to disk: {str(e)}",
+                f"RAG dashboard skipped: {decision.reason}",
                 company_id=state["company_id"]
             )
 
+        save_dashboards(state, decision.rag, logger)
+
         state["execution_path"].append("data_generator")
 
     except Exception as e:
@@ -184,15 +344,13 @@ def data_generator_node(state: DueDiligenceState) -> DueDiligenceState:
 
 def evaluator_node(state: DueDiligenceState) -> DueDiligenceState:
     """
-    Node 3: Evaluator
+    Node 4: Evaluator
     Scores dashboards per rubric
 
-    Rubric dimensions:
-    - factual: Factual accuracy
-    - schema: Schema compliance
+    Rubric dimensions (0-3, rule-based):
+    - schema: 8-section structure compliance
     - provenance: Source attribution
-    - hallucination: Hallucination risk
-    - readability: Readability score
+    - hallucination: Numeric claims supported by the company payload
     """
     logger = ReActLogger(run_id=state["run_id"])
     logger.log_thought(
@@ -201,9 +359,18 @@ def evaluator_node(state: DueDiligenceState) -> DueDiligenceState:
     )
 
     try:
+        from src.agents.evaluation_agent import evaluate_dashboards
+
+        # Payload numbers are used to check numeric claims; skipped if unavailable
+        try:
+            payload = asyncio.run(get_latest_structured_payload(state["company_id"]))
+        except Exception:
+            payload = None
+
         evaluation = evaluate_dashboards(
-            state.get("rag_dashboard", ""),
-            state.get("structured_dashboard", "")
+            state.get("rag_dashboard") or "",
+            state.get("structured_dashboard") or "",
+            payload=payload
         )
 
         state["evaluation_result"] = evaluation
@@ -225,10 +392,13 @@ def evaluator_node(state: DueDiligenceState) -> DueDiligenceState:
 
 def risk_detector_node(state: DueDiligenceState) -> DueDiligenceState:
     """
-    Node 4: Risk Detector
-    Scans dashboards for risk keywords and determines if HITL is needed
+    Node 5: Risk Detector
+    Scans dashboards for risk keywords and determines if HITL is needed;
+    keywords flagged by risk triage (before generation) count as well, in
+    case the dashboards paraphrased them away
 
     Risk keywords: layoff, breach, lawsuit, fraud, bankruptcy, controversy
+    (src.workflows.risk_triage.RISK_KEYWORDS, one compiled pattern)
     """
     logger = ReActLogger(run_id=state["run_id"])
     logger.log_thought(
@@ -236,24 +406,10 @@ def risk_detector_node(state: DueDiligenceState) -> DueDiligenceState:
         company_id=state["company_id"]
     )
 
-    risk_keywords = [
-        "layoff", "layoffs", "workforce reduction",
-        "breach", "data breach", "security breach",
-        "lawsuit", "litigation",
-        "fraud", "fraudulent",
-        "bankruptcy", "chapter 11",
-        "controversy", "controversial"
-    ]
-
     # Check both dashboards for risk keywords
-    structured_text = state.get("structured_dashboard", "").lower()
-    rag_text = state.get("rag_dashboard", "").lower()
-    combined_text = structured_text + " " + rag_text
-
-    detected_keywords = []
-    for keyword in risk_keywords:
-        if keyword in combined_text:
-            detected_keywords.append(keyword)
+    detected_keywords = get_risk_matcher().find(state.get("structured_dashboard"), state.get("rag_dashboard"))
+    triage_keywords = (state.get("risk_triage") or {}).get("keywords") or []
+    detected_keywords += [k for k in triage_keywords if k not in detected_keywords]
 
     state["risk_detected"] = len(detected_keywords) > 0
     state["risk_keywords"] = detected_keywords
@@ -278,13 +434,16 @@ def risk_detector_node(state: DueDiligenceState) -> DueDiligenceState:
 
 def hitl_node(state: DueDiligenceState) -> DueDiligenceState:
     """
-    Node 5: Human-in-the-Loop (HITL)
-    Pauses workflow for human approval when risks are detected
-
-    Lab 18: Implements actual CLI pause with input() prompt
+    Node 6: Human-in-the-Loop (HITL)
+    Gets a human decision when risks are detected
+
+    - queue (default with sqlite checkpoints): the company is written to the
+      HITL review queue and the run pauses (LangGraph interrupt) until a
+      reviewer decides; the process is not blocked, run_workflow() returns
+      with hitl_pending
+    - cli: blocking input() prompt (Lab 18)
+    - HITL_AUTO_APPROVE=true: approved without review
     """
-    import os
-
     logger = ReActLogger(run_id=state["run_id"])
     logger.log_thought(
         "⏸️  HITL checkpoint - Human approval required",
@@ -299,53 +458,41 @@ def hitl_node(state: DueDiligenceState) -> DueDiligenceState:
     print(f"Risk Keywords Detected: {', '.join(state['risk_keywords'])}")
     print("="*60)
 
-    # Check if we should use interactive mode
-    # Set HITL_AUTO_APPROVE=true to skip interactive input (for testing)
-    auto_approve = os.getenv("HITL_AUTO_APPROVE", "false").lower() == "true"
+    mode = hitl_mode()
+    review = {}
 
-    if auto_approve:
+    if mode == "auto":
         print("\n[AUTO-APPROVE MODE] Automatically approving for testing...")
-        print("(Set HITL_AUTO_APPROVE=false for interactive mode)\n")
+        print("(Set HITL_AUTO_APPROVE=false for review)\n")
         state["hitl_approved"] = True
+    elif mode == "cli":
+        state["hitl_approved"] = cli_hitl_decision(state)
     else:
-        # Lab 18: Actual CLI pause implementation
-        print("\n⏸️  WORKFLOW PAUSED - Awaiting human decision...")
-        print("\nRisk Summary:")
-        for idx, keyword in enumerate(state['risk_keywords'], 1):
-            print(f"  {idx}. {keyword.upper()}")
-
-        print("\nPlease review the dashboard content and decide:")
-        while True:
-            response = input("\n👤 Approve this company? (yes/no/details): ").strip().lower()
-
-            if response in ['yes', 'y']:
-                state["hitl_approved"] = True
-                print("\n✅ APPROVED - Workflow will continue")
-                break
-            elif response in ['no', 'n']:
-                state["hitl_approved"] = False
-                print("\n❌ REJECTED - Workflow will mark as rejected")
-                break
-            elif response in ['details', 'd']:
-                print("\n📊 Dashboard Preview:")
-                print("-" * 60)
-                structured = state.get("structured_dashboard", "")
-                if structured:
-                    # Show first 500 chars of structured dashboard
-                    preview = structured[:500]
-                    print(preview)
-                    if len(structured) > 500:
-                        print(f"\n... ({len(structured) - 500} more characters)")
-                else:
-                    print("No dashboard available")
-                print("-" * 60)
-            else:
-                print("⚠️  Invalid input. Please enter 'yes', 'no', or 'details'")
+        from langgraph.types import interrupt
+
+        # Merges into the item risk triage may have queued before generation
+        item = get_review_queue().enqueue(ReviewItem(
+            run_id=state["run_id"],
+            company_id=state["company_id"],
+            risk_keywords=state["risk_keywords"],
+            dashboards=state.get("dashboard_paths") or {},
+            evaluation_winner=(state.get("evaluation_result") or {}).get("winner")
+        ))
+        if item.status == "pending":
+            print(f"\n📥 Queued for review: POST /hitl/reviews/{state['run_id']}/approve (or /reject)")
+            # Pauses the run here (state is in the checkpointer); on resume the
+            # node runs again and finds the decision on the item
+            interrupt(item.model_dump(mode="json"))
+        else:
+            print(f"\n📋 Review decision: {item.status.upper()}")
+        review = item.decision()
+        state["hitl_approved"] = bool(review.get("approved"))
 
     logger.log_observation(
         f"HITL decision: {'APPROVED' if state['hitl_approved'] else 'REJECTED'}",
         company_id=state["company_id"],
-        metadata={"approved": state["hitl_approved"], "risk_keywords": state["risk_keywords"]}
+        metadata={"approved": state["hitl_approved"], "risk_keywords": state["risk_keywords"],
+                  "mode": mode, "reviewer": review.get("reviewer"), "note": review.get("note")}
     )
 
     state["execution_path"].append("hitl")
@@ -353,9 +500,43 @@ def hitl_node(state: DueDiligenceState) -> DueDiligenceState:
     return state
 
 
+def cli_hitl_decision(state: DueDiligenceState) -> bool:
+    """Lab 18: blocking CLI prompt for an approve / reject decision"""
+    print("\n⏸️  WORKFLOW PAUSED - Awaiting human decision...")
+    print("\nRisk Summary:")
+    for idx, keyword in enumerate(state['risk_keywords'], 1):
+        print(f"  {idx}. {keyword.upper()}")
+
+    print("\nPlease review the dashboard content and decide:")
+    while True:
+        response = input("\n👤 Approve this company? (yes/no/details): ").strip().lower()
+
+        if response in ['yes', 'y']:
+            print("\n✅ APPROVED - Workflow will continue")
+            return True
+        elif response in ['no', 'n']:
+            print("\n❌ REJECTED - Workflow will mark as rejected")
+            return False
+        elif response in ['details', 'd']:
+            print("\n📊 Dashboard Preview:")
+            print("-" * 60)
+            structured = state.get("structured_dashboard", "")
+            if structured:
+                # Show first 500 chars of structured dashboard
+                preview = structured[:500]
+                print(preview)
+                if len(structured) > 500:
+                    print(f"\n... ({len(structured) - 500} more characters)")
+            else:
+                print("No dashboard available")
+            print("-" * 60)
+        else:
+            print("⚠️  Invalid input. Please enter 'yes', 'no', or 'details'")
+
+
 def auto_approve_node(state: DueDiligenceState) -> DueDiligenceState:
     """
-    Node 6: Auto-Approve
+    Node 7: Auto-Approve
     Automatically approves when no risks detected
     """
     logger = ReActLogger(run_id=state["run_id"])
@@ -372,7 +553,7 @@ def auto_approve_node(state: DueDiligenceState) -> DueDiligenceState:
 
 def final_decision_node(state: DueDiligenceState) -> DueDiligenceState:
     """
-    Node 7: Final Decision
+    Node 8: Final Decision
     Summarizes workflow results and makes final recommendation
     """
     logger = ReActLogger(run_id=state["run_id"])
@@ -389,6 +570,8 @@ def final_decision_node(state: DueDiligenceState) -> DueDiligenceState:
         "hitl_approved": state["hitl_approved"],
         "evaluation_winner": evaluation_result.get("winner", "unknown"),
         "recommendation": "APPROVED" if state["hitl_approved"] else "REJECTED",
+        "usage": state.get("usage") or UsageSummary().model_dump(),
+        "budget_notes": state.get("budget_notes") or [],
         "errors": state["errors"]
     }
 
@@ -424,39 +607,94 @@ def route_after_risk_detection(state: DueDiligenceState) -> Literal["hitl", "aut
 # Graph Construction
 # ============================================================
 
-def create_due_diligence_graph() -> StateGraph:
+# State fields merged with a reducer (Annotated[..., operator.add]): a node's
+# update carries only the entries it appended
+APPEND_FIELDS = ("execution_path", "errors")
+
+
+def state_update(fn):
+    """
+    Adapt a node that mutates and returns the whole state to LangGraph's
+    partial updates
+
+    The node works on its own copy of the state (parallel branches never share
+    a list), and only the fields it changed are returned: the new entries of
+    APPEND_FIELDS, every other field that differs from the input. Branches in
+    the same step may therefore write disjoint fields and append to
+    execution_path / errors without overwriting each other.
+    """
+
+    @wraps(fn)
+    def node(state):
+        result = fn({key: copy.copy(value) for key, value in state.items()})
+        update = {}
+        for key, value in result.items():
+            if key in APPEND_FIELDS:
+                added = value[len(state.get(key) or []):]
+                if added:
+                    update[key] = added
+            elif key not in state or value != state[key]:
+                update[key] = value
+        return update
+    return node
+
+
+def instrument_node(name: str, fn):
+    """Trace (TRACING_ENABLED) and profile (PROFILE_MODE) each invocation of a node"""
+    return trace_node(name, profile_node(name, state_update(fn)))
+
+
+def join_branches_node(state: DueDiligenceState) -> DueDiligenceState:
+    """Join: waits for both the evaluator and risk_detector branches before routing"""
+    return state
+
+
+def create_due_diligence_graph() -> "StateGraph":
     """
     Construct the LangGraph workflow
 
     Flow:
-    START → Planner → Data Generator → Evaluator → Risk Detector
-                                                          ↓
+                                                   ↗ Evaluator     ↘
+    START → Planner → Risk Triage → Data Generator                   Join
+                                                   ↘ Risk Detector ↗   ↓
                                               [Risk Detected?]
                                               ↙                ↘
                                           HITL              Auto-Approve
                                               ↘                ↙
                                               Final Decision → END
+
+    The evaluator and risk detector only read the dashboards, so they run
+    in the same step (concurrently); each writes its own fields and appends
+    to execution_path / errors through the state reducers.
     """
+    from langgraph.graph import StateGraph, END
+
     workflow = StateGraph(DueDiligenceState)
 
     # Add nodes
-    workflow.add_node("planner", planner_node)
-    workflow.add_node("data_generator", data_generator_node)
-    workflow.add_node("evaluator", evaluator_node)
-    workflow.add_node("risk_detector", risk_detector_node)
-    workflow.add_node("hitl", hitl_node)
-    workflow.add_node("auto_approve", auto_approve_node)
-    workflow.add_node("final_decision", final_decision_node)
-
-    # Define edges (linear flow until risk detection)
+    workflow.add_node("planner", instrument_node("planner", planner_node))
+    workflow.add_node("risk_triage", instrument_node("risk_triage", risk_triage_node))
+    workflow.add_node("data_generator", instrument_node("data_generator", data_generator_node))
+    workflow.add_node("evaluator", instrument_node("evaluator", evaluator_node))
+    workflow.add_node("risk_detector", instrument_node("risk_detector", risk_detector_node))
+    workflow.add_node("join", instrument_node("join", join_branches_node))
+    workflow.add_node("hitl", instrument_node("hitl", hitl_node))
+    workflow.add_node("auto_approve", instrument_node("auto_approve", auto_approve_node))
+    workflow.add_node("final_decision", instrument_node("final_decision", final_decision_node))
+
+    # Define edges (linear flow until the dashboards exist)
     workflow.set_entry_point("planner")
-    workflow.add_edge("planner", "data_generator")
+    workflow.add_edge("planner", "risk_triage")
+    workflow.add_edge("risk_triage", "data_generator")
+
+    # Fan out to evaluation and risk detection, join once both have finished
     workflow.add_edge("data_generator", "evaluator")
-    workflow.add_edge("evaluator", "risk_detector")
+    workflow.add_edge("data_generator", "risk_detector")
+    workflow.add_edge(["evaluator", "risk_detector"], "join")
 
     # Conditional branching after risk detection
     workflow.add_conditional_edges(
-        "risk_detector",
+        "join",
         route_after_risk_detection,
         {
             "hitl": "hitl",
@@ -473,51 +711,78 @@ def create_due_diligence_graph() -> StateGraph:
 
 
 def compile_workflow():
-    """Compile the workflow with memory checkpointing"""
+    """Compile the workflow with the configured checkpointer (CHECKPOINT_STORAGE: memory | sqlite)"""
+    from src.workflows.checkpointing import get_checkpointer
+
     graph = create_due_diligence_graph()
-    memory = MemorySaver()
-    return graph.compile(checkpointer=memory)
+    return graph.compile(checkpointer=get_checkpointer())
 
 
 # ============================================================
 # CLI Interface
 # ============================================================
 
-def run_workflow(company_id: str, run_id: str | None = None):
+def run_workflow(company_id: str, run_id: str | None = None, generation_mode: str | None = None,
+                 batch_dashboards: dict | None = None, risk_triage: dict | None = None):
     """
     Execute the due diligence workflow for a company
 
+    With a durable checkpointer (CHECKPOINT_STORAGE=sqlite), re-running an
+    existing run_id resumes after its last completed node; a finished run
+    returns its saved final state.
+
+    A flagged company in HITL queue mode pauses at the hitl node: the state
+    is returned with hitl_pending=True (no final decision yet). Once the
+    review is decided, calling run_workflow again with the run_id resumes
+    the run with that decision.
+
     Args:
         company_id: Company identifier
-        run_id: Optional run ID for correlation
+        run_id: Optional run ID for correlation (also the checkpoint thread id)
+        generation_mode: Structured dashboard mode (llm | sectioned | template | enriched);
+                         defaults to DASHBOARD_GENERATION_MODE or 'llm'
+        batch_dashboards: Dashboards from offline batch generation
+                          (BatchResult.for_company); skips generation
+        risk_triage: Triage already computed by the batch runner (RiskTriage
+                     dict, see triage_companies); skips the triage scan
 
     Returns:
-        Final state with decision
+        Final state with decision (or the paused state, hitl_pending=True)
     """
     from uuid import uuid4
 
     run_id = run_id or str(uuid4())
+    generation_mode = generation_mode or os.getenv("DASHBOARD_GENERATION_MODE", "llm")
+    hitl_mode()  # fail fast on an unusable HITL configuration (queue mode without durable checkpoints)
 
     print("\n" + "="*60)
     print(f"🚀 STARTING DUE DILIGENCE WORKFLOW")
     print("="*60)
     print(f"Company ID: {company_id}")
     print(f"Run ID: {run_id}")
+    print(f"Generation Mode: {generation_mode}")
     print("="*60 + "\n")
 
     # Initialize state
     initial_state: DueDiligenceState = {
         "company_id": company_id,
         "run_id": run_id,
+        "generation_mode": generation_mode,
         "plan": None,
+        "risk_triage": risk_triage,
         "structured_dashboard": None,
         "rag_dashboard": None,
+        "dashboard_paths": None,
         "evaluation_result": None,
         "risk_detected": False,
         "risk_keywords": [],
         "hitl_required": False,
         "hitl_approved": None,
+        "hitl_pending": False,
         "final_decision": None,
+        "usage": UsageSummary().model_dump(),
+        "budget_notes": [],
+        "batch_dashboards": batch_dashboards,
         "execution_path": [],
         "errors": []
     }
@@ -527,18 +792,76 @@ def run_workflow(company_id: str, run_id: str | None = None):
 
     config = {"configurable": {"thread_id": run_id}}
 
+    # Checkpointed state for this run_id: resume an interrupted run, skip a finished one
+    saved = app.get_state(config)
+    if saved.values and not saved.next:
+        print(f"♻️  Run {run_id} already completed (checkpoint found); returning saved state")
+        return saved.values
+
+    stream_input, review = initial_state, None
+    if saved.next:
+        stream_input = None
+        if "hitl" in saved.next:
+            # Paused for review: resume only once the reviewer has decided
+            review = get_review_queue().get(run_id)
+            if review is not None and review.status == "pending":
+                print(f"⏸️  Run {run_id} is still awaiting HITL review; nothing to resume")
+                return {**saved.values, "hitl_pending": True}
+            if review is not None:
+                from langgraph.types import Command
+                stream_input = Command(resume=review.decision())
+        print(f"♻️  Resuming run {run_id} at: {', '.join(saved.next)}"
+              + (f" (review: {review.status})" if review is not None else ""))
+
     final_state = None
-    for state in app.stream(initial_state, config):
-        # Print intermediate state transitions
-        node_name = list(state.keys())[0]
-        print(f"\n📍 Completed node: {node_name}")
-        final_state = state[node_name]
+    try:
+        with span("workflow.run", run_id=run_id, company_id=company_id, generation_mode=generation_mode,
+                  resumed=bool(saved.next)) as run_span, \
+                profile_scope("workflow", "workflow", company_id, run_id):
+            for state in app.stream(stream_input, config):
+                # Print intermediate state transitions
+                node_name = list(state.keys())[0]
+                if node_name == "__interrupt__":
+                    print("\n⏸️  Paused for HITL review")
+                    continue
+                print(f"\n📍 Completed node: {node_name}")
+
+            snapshot = app.get_state(config)
+            final_state = {**snapshot.values, "hitl_pending": bool(snapshot.next)}
+            usage = UsageSummary.model_validate(final_state.get("usage") or {})
+            run_span.set_attributes(
+                execution_path=" > ".join(final_state["execution_path"]),
+                errors=len(final_state["errors"]),
+                total_tokens=usage.total_tokens,
+                cost_usd=usage.cost_usd,
+                hitl_pending=final_state["hitl_pending"]
+            )
+    finally:
+        flush_traces()
+
+    if final_state["hitl_pending"]:
+        print("\n" + "="*60)
+        print("⏸️  WORKFLOW PAUSED - AWAITING HITL REVIEW")
+        print("="*60)
+        print(f"Execution Path: {' → '.join(final_state['execution_path'])}")
+        print(f"Review: POST /hitl/reviews/{run_id}/approve (or /reject), then re-run this run_id")
+        print("="*60 + "\n")
+        return final_state
+
+    # Per-day budgets are summed from the ledger (once, when the run finishes)
+    append_ledger(company_id, run_id, usage)
+    # Reviewed runs (resumed, or decided before reaching HITL) are marked done
+    if review is not None or ("hitl" in final_state["execution_path"] and hitl_mode() == "queue"):
+        get_review_queue().mark_resumed(run_id)
 
     print("\n" + "="*60)
     print("✅ WORKFLOW COMPLETE")
     print("="*60)
     print(f"Execution Path: {' → '.join(final_state['execution_path'])}")
     print(f"Branch Taken: {'HITL' if final_state['hitl_required'] else 'Auto-Approve'}")
+    print(f"Token Usage: {usage.total_tokens} tokens (~${usage.cost_usd:.4f})")
+    if final_state.get("budget_notes"):
+        print(f"Budget: {'; '.join(final_state['budget_notes'])}")
     print("="*60 + "\n")
 
     if final_state["final_decision"]:
@@ -556,4 +879,7 @@ if __name__ == "__main__":
 
     final_state = run_workflow(company_id, run_id)
 
-    print(f"\n✅ Lab 17 Checkpoint: Workflow executed, branch taken = {'HITL' if final_state['hitl_required'] else 'Auto-Approve'}")
+    if final_state.get("hitl_pending"):
+        print(f"\n⏸️  Awaiting review: python -m src.workflows.hitl_queue approve {final_state['run_id']}")
+    else:
+        print(f"\n✅ Lab 17 Checkpoint: Workflow executed, branch taken = {'HITL' if final_state['hitl_required'] else 'Auto-Approve'}")
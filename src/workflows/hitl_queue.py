@@ -0,0 +1,273 @@
+"""
+HITL Review Queue
+
+hitl_node used to block the whole process on input() when a company was
+flagged, so one risky company in a batch run stalled every company behind
+it. In 'queue' mode (the default with CHECKPOINT_STORAGE=sqlite) the node
+instead:
+
+1. writes a review item (company, risk keywords, dashboard files, evaluation
+   winner) to this queue, one JSON file per run under HITL_QUEUE_DIR
+2. raises a LangGraph interrupt: the run stops at the hitl node with its
+   state in the checkpointer and run_workflow() returns immediately, so the
+   batch runner moves on to the next company
+
+Companies flagged by pre-generation risk triage (src.workflows.risk_triage)
+are queued when their run starts, before the dashboards exist; the hitl
+node later adds the dashboards to the same item, and a decision made in
+the meantime is applied without pausing.
+
+A reviewer approves or rejects the item (MCP server: POST
+/hitl/reviews/{run_id}/approve|reject, or the CLI below). The decision is
+recorded here, and run_workflow() with the same run_id resumes the run from
+its checkpoint with that decision; the MCP server does this in the
+background when the checkpointer is durable (CHECKPOINT_STORAGE=sqlite).
+
+Modes (environment):
+    HITL_MODE=queue          queue (requires CHECKPOINT_STORAGE=sqlite) | cli (blocking
+                             input(), the lab behaviour); default: queue with sqlite
+                             checkpoints, else cli
+    HITL_AUTO_APPROVE=false  true approves every flagged company (tests, demos)
+    HITL_QUEUE_DIR=data/hitl_queue
+
+CLI:
+    python -m src.workflows.hitl_queue list [--status pending]
+    python -m src.workflows.hitl_queue approve <run_id> [--reviewer NAME] [--note TEXT]
+    python -m src.workflows.hitl_queue reject <run_id> [--reviewer NAME] [--note TEXT]
+    python -m src.workflows.hitl_queue resume <run_id>
+"""
+
+import argparse
+import fcntl
+import os
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+HITL_MODES = ("queue", "cli")
+REVIEW_STATUSES = ("pending", "approved", "rejected")
+
+
+def hitl_mode() -> str:
+    """
+    'auto' when HITL_AUTO_APPROVE=true, else HITL_MODE
+
+    A queued run waits in the checkpointer, so queue mode needs durable
+    checkpoints: it is the default only with CHECKPOINT_STORAGE=sqlite (cli
+    otherwise), and HITL_MODE=queue with in-memory checkpoints is rejected.
+
+    Raises:
+        ValueError: unknown HITL_MODE, or queue mode without durable checkpoints
+    """
+    if os.getenv("HITL_AUTO_APPROVE", "false").lower() == "true":
+        return "auto"
+    durable = os.getenv("CHECKPOINT_STORAGE", "memory").lower() == "sqlite"
+    mode = os.getenv("HITL_MODE", "queue" if durable else "cli").lower()
+    if mode not in HITL_MODES:
+        raise ValueError(f"Unknown HITL_MODE '{mode}' (expected one of {HITL_MODES})")
+    if mode == "queue" and not durable:
+        raise ValueError("HITL_MODE=queue needs CHECKPOINT_STORAGE=sqlite: a run paused in "
+                         "in-memory checkpoints could never be resumed")
+    return mode
+
+
+def queue_dir() -> Path:
+    return Path(os.getenv("HITL_QUEUE_DIR", "data/hitl_queue"))
+
+
+class ReviewItem(BaseModel):
+    """A flagged company awaiting (or given) a human decision"""
+    run_id: str
+    company_id: str
+    risk_keywords: List[str] = Field(default_factory=list)
+    evidence: List[str] = Field(default_factory=list, description="Risk triage signals (payload fields, retrieved chunks)")
+    dashboards: Dict[str, str] = Field(default_factory=dict, description="method -> saved dashboard file")
+    evaluation_winner: Optional[str] = None
+    status: str = Field("pending", description="pending | approved | rejected")
+    created_at: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+    decided_at: Optional[str] = None
+    reviewer: Optional[str] = None
+    note: Optional[str] = None
+    resumed_at: Optional[str] = Field(None, description="When the workflow finished with this decision")
+
+    def decision(self) -> dict:
+        """Value the interrupted hitl node resumes with"""
+        return {"approved": self.status == "approved", "reviewer": self.reviewer, "note": self.note}
+
+
+class ReviewQueue:
+    """
+    File-backed review queue: one JSON document per run, replaced atomically
+
+    Writers live in different processes (the DAG worker enqueues, the MCP
+    server decides), so every read-modify-write holds an exclusive flock on
+    the item's lock file; it excludes other processes, threads and
+    ReviewQueue instances alike.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def _path(self, run_id: str) -> Path:
+        return self.directory / (re.sub(r"[^A-Za-z0-9._-]", "_", run_id) + ".json")
+
+    @contextmanager
+    def _locked(self, run_id: str):
+        """Exclusive lock on one item across processes (released when the block exits)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._path(run_id).with_suffix(".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, item: ReviewItem) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(item.run_id)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(item.model_dump_json(indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def get(self, run_id: str) -> Optional[ReviewItem]:
+        path = self._path(run_id)
+        if not path.exists():
+            return None
+        return ReviewItem.model_validate_json(path.read_text(encoding="utf-8"))
+
+    def list(self, status: Optional[str] = None) -> List[ReviewItem]:
+        """Items oldest first, optionally filtered by status"""
+        if not self.directory.exists():
+            return []
+        items = [ReviewItem.model_validate_json(p.read_text(encoding="utf-8"))
+                 for p in self.directory.glob("*.json")]
+        return sorted((i for i in items if status is None or i.status == status), key=lambda i: i.created_at)
+
+    def enqueue(self, item: ReviewItem) -> ReviewItem:
+        """
+        Add a pending item; idempotent per run
+
+        An item queued earlier for the run (e.g. by risk triage, before the
+        dashboards existed) keeps its status and decision (status,
+        decided_at, reviewer, note are never rewritten here); new keywords,
+        evidence, dashboards and the evaluation winner are merged into it.
+        """
+        with self._locked(item.run_id):
+            existing = self.get(item.run_id)
+            if existing is None:
+                self._write(item.model_copy(update={
+                    "status": "pending", "decided_at": None, "reviewer": None, "note": None
+                }))
+                return self.get(item.run_id)
+            merged = existing.model_copy(update={
+                "risk_keywords": list(dict.fromkeys(existing.risk_keywords + item.risk_keywords)),
+                "evidence": list(dict.fromkeys(existing.evidence + item.evidence)),
+                "dashboards": {**existing.dashboards, **item.dashboards},
+                "evaluation_winner": item.evaluation_winner or existing.evaluation_winner,
+            })
+            if merged != existing:
+                self._write(merged)
+            return merged
+
+    def decide(self, run_id: str, approved: bool, reviewer: Optional[str] = None,
+               note: Optional[str] = None) -> ReviewItem:
+        """
+        Record a decision for a pending item
+
+        Raises:
+            KeyError: no item for run_id
+            ValueError: the item was already decided
+        """
+        with self._locked(run_id):
+            item = self.get(run_id)
+            if item is None:
+                raise KeyError(run_id)
+            if item.status != "pending":
+                raise ValueError(f"Review for run {run_id} already {item.status}")
+            item = item.model_copy(update={
+                "status": "approved" if approved else "rejected",
+                "decided_at": datetime.utcnow().isoformat(),
+                "reviewer": reviewer,
+                "note": note,
+            })
+            self._write(item)
+            return item
+
+    def mark_resumed(self, run_id: str) -> None:
+        with self._locked(run_id):
+            item = self.get(run_id)
+            if item is not None:
+                self._write(item.model_copy(update={"resumed_at": datetime.utcnow().isoformat()}))
+
+
+def get_review_queue() -> ReviewQueue:
+    return ReviewQueue(queue_dir())
+
+
+def resume_run(run_id: str) -> Optional[dict]:
+    """
+    Resume a decided run from its checkpoint (runs the rest of the workflow)
+
+    Returns None when the run is not paused at the hitl node: a company
+    queued early by risk triage may still be generating, and picks the
+    decision up itself when it reaches the node.
+    """
+    item = get_review_queue().get(run_id)
+    if item is None:
+        raise KeyError(run_id)
+    from src.workflows.due_diligence_graph import compile_workflow, run_workflow
+    snapshot = compile_workflow().get_state({"configurable": {"thread_id": run_id}})
+    if "hitl" not in snapshot.next:
+        print(f"ℹ️  Run {run_id} is not paused for review; the decision applies when it reaches HITL")
+        return None
+    return run_workflow(item.company_id, run_id=run_id)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="HITL review queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = sub.add_parser("list", help="List review items")
+    list_cmd.add_argument("--status", choices=REVIEW_STATUSES, default=None)
+
+    for name in ("approve", "reject"):
+        cmd = sub.add_parser(name, help=f"{name.title()} a pending review")
+        cmd.add_argument("run_id")
+        cmd.add_argument("--reviewer", default=os.getenv("USER"))
+        cmd.add_argument("--note", default=None)
+        cmd.add_argument("--no-resume", action="store_true", help="Only record the decision")
+
+    resume_cmd = sub.add_parser("resume", help="Resume a decided run from its checkpoint")
+    resume_cmd.add_argument("run_id")
+
+    args = parser.parse_args()
+    queue = get_review_queue()
+
+    if args.command == "list":
+        for item in queue.list(args.status):
+            print(f"{item.status:<9} {item.company_id:<24} {item.run_id}   "
+                  f"risks: {', '.join(item.risk_keywords) or '-'}")
+        return
+
+    if args.command in ("approve", "reject"):
+        item = queue.decide(args.run_id, args.command == "approve", args.reviewer, args.note)
+        print(f"{'✅' if item.status == 'approved' else '❌'} {item.company_id} ({item.run_id}): {item.status}")
+        if args.no_resume:
+            return
+
+    final_state = resume_run(args.run_id)
+    if final_state is not None:
+        print(f"▶️  Resumed {args.run_id}: {final_state.get('final_decision') or 'still pending'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Pre-generation Risk Triage
+
+Risk detection used to run only after both dashboards were generated, on
+LLM prose that may paraphrase the risk terms away ("reduced headcount"
+for "layoffs"). Triage is a cheap pass that runs before generation, on the
+raw inputs:
+
+- the payload's structured risk fields (CompanyPayload.risks and the
+  events timeline)
+- the chunks retrieved for the dashboards' risk section (same query and
+  search mode as RAG generation; no LLM call)
+
+Both are scanned with the compiled risk matcher that the risk_detector
+node also uses. A flagged company:
+
+- has hitl_required set from the start of its run; its triage keywords
+  also count for the HITL branch after generation
+- is queued for review immediately (HITL queue mode, queue_for_review), so
+  reviewers can start while its dashboards are still being generated; a
+  decision made before the run reaches the hitl node is applied there
+  without pausing
+- is processed first by the agentic DAG, which triages the whole batch
+  (triage_companies) and queues every flagged company before generating
+  any dashboard
+
+Retrieval failures never fail triage; the payload fields are still scanned.
+
+Configuration (environment):
+    RISK_TRIAGE=true                 false skips triage
+    RISK_TRIAGE_RETRIEVAL=true       false scans the payload only (no embedding / vector query)
+    RISK_TRIAGE_CONCURRENCY=8        companies triaged at once by triage_companies()
+"""
+
+import asyncio
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.tools.payload_tool import get_latest_structured_payload
+from src.tools.rag_tool import rag_search_company
+from src.utils.dashboard_generator import RAG_SECTION_QUERIES, section_search_mode
+from src.utils.metrics import RISK_TRIAGE_RESULTS
+from src.workflows.hitl_queue import ReviewItem, get_review_queue
+
+RISK_KEYWORDS = (
+    "layoff", "layoffs", "workforce reduction",
+    "breach", "data breach", "security breach",
+    "lawsuit", "litigation",
+    "fraud", "fraudulent",
+    "bankruptcy", "chapter 11",
+    "controversy", "controversial",
+)
+
+# Characters of context kept around the first match of a signal
+EXCERPT_CHARS = 160
+
+
+def triage_enabled() -> bool:
+    return os.getenv("RISK_TRIAGE", "true").lower() == "true"
+
+
+def triage_retrieval_enabled() -> bool:
+    return os.getenv("RISK_TRIAGE_RETRIEVAL", "true").lower() == "true"
+
+
+# ============================================================================
+# Matcher
+# ============================================================================
+
+class RiskMatcher:
+    """
+    Every risk keyword in one compiled, case-insensitive pattern
+
+    One regex pass per text instead of a substring scan per keyword.
+    Keywords match anywhere, inside words too ("antifraud", "cyberbreach"),
+    as the per-keyword substring scan did. The pattern is a lookahead, so
+    it reports the longest keyword starting at every position and matches
+    may overlap ("layoffraud" → "layoff", "fraud"). A match also reports
+    the keywords it contains ("data breach" → "breach"), so results equal
+    that scan.
+    """
+
+    def __init__(self, keywords: Iterable[str] = RISK_KEYWORDS):
+        self.keywords = tuple(dict.fromkeys(k.lower() for k in keywords))
+        alternatives = sorted(self.keywords, key=len, reverse=True)  # longest match wins
+        self.pattern = re.compile(
+            "(?=(" + "|".join(re.escape(k) for k in alternatives) + "))", re.IGNORECASE
+        )
+        self._implied = {k: {other for other in self.keywords if other in k} for k in self.keywords}
+
+    def find(self, *texts: Optional[str]) -> List[str]:
+        """Keywords found in any of `texts`, in keyword order"""
+        found = set()
+        for text in texts:
+            if text:
+                for match in self.pattern.finditer(text):
+                    found |= self._implied[match.group(1).lower()]
+        return [k for k in self.keywords if k in found]
+
+    def excerpt(self, text: str, width: int = EXCERPT_CHARS) -> str:
+        """Text around the first match (whole text when short)"""
+        match = self.pattern.search(text)
+        if match is None or len(text) <= width:
+            return text[:width]
+        start = max(0, match.start() - width // 2)
+        return ("…" if start else "") + text[start:start + width].strip() + "…"
+
+
+@lru_cache(maxsize=1)
+def get_risk_matcher() -> RiskMatcher:
+    return RiskMatcher(RISK_KEYWORDS)
+
+
+# ============================================================================
+# Triage
+# ============================================================================
+
+class RiskSignal(BaseModel):
+    """One payload field or retrieved chunk that matched risk keywords"""
+    source: str = Field(..., description="'payload.risks', 'payload.events' or the chunk's source URL")
+    keywords: List[str]
+    excerpt: str
+
+
+class RiskTriage(BaseModel):
+    """Pre-generation risk scan of one company"""
+    company_id: str
+    keywords: List[str] = Field(default_factory=list, description="Risk keywords found, in keyword order")
+    signals: List[RiskSignal] = Field(default_factory=list)
+    chunks_scanned: int = 0
+    retrieval_error: Optional[str] = None
+
+    @property
+    def flagged(self) -> bool:
+        return bool(self.keywords)
+
+    def evidence(self) -> List[str]:
+        """One line per signal, for reviewers"""
+        return [f"[{s.source}] {', '.join(s.keywords)}: {s.excerpt}" for s in self.signals]
+
+
+async def triage_company(company_id: str, retrieval: Optional[bool] = None) -> RiskTriage:
+    """
+    Scan a company's structured risk fields and retrieved risk chunks
+
+    Args:
+        company_id: Company identifier
+        retrieval: Scan retrieved chunks (default: RISK_TRIAGE_RETRIEVAL)
+    """
+    matcher = get_risk_matcher()
+    triage = RiskTriage(company_id=company_id)
+
+    def scan(source: str, text: Optional[str]) -> None:
+        keywords = matcher.find(text)
+        if keywords:
+            triage.signals.append(RiskSignal(source=source, keywords=keywords, excerpt=matcher.excerpt(text)))
+
+    try:
+        payload = await get_latest_structured_payload(company_id)
+    except Exception:
+        payload = None
+    if payload is not None:
+        for risk in payload.risks:
+            scan("payload.risks", risk)
+        for event in payload.events:
+            scan("payload.events", f"{event.title}. {event.description or ''}".strip())
+
+    if triage_retrieval_enabled() if retrieval is None else retrieval:
+        try:
+            chunks = await rag_search_company(
+                company_id, RAG_SECTION_QUERIES["risks"],
+                k=int(os.getenv("RAG_TOP_K", "5")), mode=section_search_mode("risks")
+            )
+        except Exception as e:
+            chunks = []
+            triage.retrieval_error = str(e)[:200]
+        triage.chunks_scanned = len(chunks)
+        for chunk in chunks:
+            scan(chunk.get("source_url") or "retrieval", chunk.get("text"))
+
+    found = {k for signal in triage.signals for k in signal.keywords}
+    triage.keywords = [k for k in matcher.keywords if k in found]
+    RISK_TRIAGE_RESULTS.labels("flagged" if triage.flagged else "clear").inc()
+    return triage
+
+
+async def triage_companies(company_ids: Iterable[str], concurrency: Optional[int] = None) -> Dict[str, RiskTriage]:
+    """Triage a batch of companies (RISK_TRIAGE_CONCURRENCY at a time); results keep input order"""
+    company_ids = list(company_ids)
+    semaphore = asyncio.Semaphore(concurrency or int(os.getenv("RISK_TRIAGE_CONCURRENCY", "8")))
+
+    async def one(company_id: str) -> RiskTriage:
+        async with semaphore:
+            return await triage_company(company_id)
+
+    results = await asyncio.gather(*(one(c) for c in company_ids))
+    return dict(zip(company_ids, results))
+
+
+def queue_for_review(run_id: str, triage: RiskTriage) -> ReviewItem:
+    """Queue a flagged company's review before its dashboards exist (the hitl node adds them later)"""
+    return get_review_queue().enqueue(ReviewItem(
+        run_id=run_id,
+        company_id=triage.company_id,
+        risk_keywords=triage.keywords,
+        evidence=triage.evidence()
+    ))
+
+
+def prioritize(company_ids: Iterable[str], triage: Dict[str, RiskTriage]) -> List[str]:
+    """Flagged companies first (so their reviews start earliest), original order otherwise"""
+    return sorted(company_ids, key=lambda c: not (c in triage and triage[c].flagged))
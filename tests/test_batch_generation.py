@@ -0,0 +1,197 @@
+"""
+Unit tests for offline batch dashboard generation
+
+Tests:
+1. Prompts are written as a Batch API job (fallbacks need no request)
+2. The local processor runs the job and collects dashboards, usage and saves; processors must implement the interface
+3. Failed batch requests are reported, not saved
+4. The workflow uses batch dashboards without calling the MCP tools
+5. A batch still running at the timeout is cancelled; its partial output is kept, the rest reported failed
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from src.utils.batch_generation import (
+    BATCH_ENDPOINT,
+    BATCH_PRICE_FACTOR,
+    BatchProcessor,
+    LocalBatchProcessor,
+    parse_result_line,
+    prepare_prompts,
+    run_batch,
+    write_job,
+)
+from src.utils.usage import estimate_cost
+from src.workflows.due_diligence_graph import data_generator_node
+
+CHUNKS = [{"text": "Anthropic raised a Series E.", "metadata": {"page_type": "news"}}]
+
+
+class FakeChatClient:
+    """Stands in for the OpenAI client: answers with dicts in the chat.completions format"""
+
+    def __init__(self, fail_for: str = None):
+        self.fail_for = fail_for
+        self.calls = []
+        self.chat = self
+        self.completions = self
+
+    def create(self, **body):
+        self.calls.append(body)
+        if self.fail_for and self.fail_for in body["messages"][-1]["content"]:
+            raise RuntimeError("model overloaded")
+        return {
+            "id": f"cmpl-{len(self.calls)}", "object": "chat.completion", "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"# Dashboard {len(self.calls)}"}}],
+            "usage": {"prompt_tokens": 1000, "completion_tokens": 200, "total_tokens": 1200},
+        }
+
+
+async def fake_search(company_id, query, k=5, mode=None):
+    return CHUNKS if company_id == "anthropic" else []
+
+
+@pytest.mark.asyncio
+async def test_job_file_in_batch_format(tmp_path):
+    with patch("src.utils.dashboard_generator.rag_search_company", side_effect=fake_search):
+        prompts, failed = await prepare_prompts(["anthropic", "no_such_company"], model="gpt-4o-mini")
+
+    assert failed == []
+    fallbacks = {(p.company_id, p.method) for p in prompts if p.fallback is not None}
+    assert fallbacks == {("no_such_company", "structured"), ("no_such_company", "rag")}
+
+    count = write_job(prompts, tmp_path / "job.jsonl")
+    lines = [json.loads(line) for line in (tmp_path / "job.jsonl").read_text().splitlines()]
+    assert count == len(lines) == 2
+    assert {line["custom_id"] for line in lines} == {"anthropic:structured", "anthropic:rag"}
+    assert all(line["method"] == "POST" and line["url"] == BATCH_ENDPOINT for line in lines)
+    assert lines[0]["body"]["model"] == "gpt-4o-mini" and lines[0]["body"]["messages"][0]["role"] == "system"
+
+
+@pytest.mark.asyncio
+async def test_local_batch_run_collects_and_saves(tmp_path):
+    client = FakeChatClient()
+    saved = []
+
+    with patch("src.utils.dashboard_generator.rag_search_company", side_effect=fake_search), \
+            patch("src.utils.batch_generation.DashboardGenerator.save_dashboard",
+                  side_effect=lambda c, md, method, run_id=None: saved.append((c, method)) or tmp_path / f"{c}_{method}.md"):
+        result = await run_batch(
+            ["anthropic", "no_such_company"], processor=LocalBatchProcessor(client=client),
+            batch_dir=tmp_path, poll_interval_s=0, timeout_s=1, run_id="nightly"
+        )
+
+    assert result.status == "completed" and result.requests == 2 and len(client.calls) == 2
+    assert set(result.dashboards["anthropic"].values()) == {"# Dashboard 1", "# Dashboard 2"}
+    assert "Payload Not Available" in result.dashboards["no_such_company"]["structured"]
+    assert "No Data Available" in result.dashboards["no_such_company"]["rag"]
+    assert sorted(saved) == [("anthropic", "rag"), ("anthropic", "structured"),
+                             ("no_such_company", "rag"), ("no_such_company", "structured")]
+
+    usage = result.usage["anthropic"]
+    assert usage.total_tokens == 2400 and "no_such_company" not in result.usage
+    assert usage.cost_usd == pytest.approx(2 * estimate_cost("gpt-4o-mini", 1000, 200) * BATCH_PRICE_FACTOR)
+
+    manifest = json.loads(next(tmp_path.glob("*/manifest.json")).read_text())
+    assert manifest["batch_id"] == result.batch_id and manifest["status"] == "completed"
+    assert result.for_company("anthropic")["usage"]["total_tokens"] == 2400
+
+    class SubmitOnly(BatchProcessor):
+        def submit(self, job_path):
+            return "batch-1"
+
+    with pytest.raises(TypeError, match="status"):
+        SubmitOnly()  # missing methods fail at construction, not mid-run
+
+
+@pytest.mark.asyncio
+async def test_failed_requests_are_reported(tmp_path):
+    client = FakeChatClient(fail_for="RETRIEVED INFORMATION")  # the RAG prompt
+
+    with patch("src.utils.dashboard_generator.rag_search_company", side_effect=fake_search):
+        result = await run_batch(
+            ["anthropic"], processor=LocalBatchProcessor(client=client),
+            batch_dir=tmp_path, poll_interval_s=0, timeout_s=1, save=False
+        )
+
+    assert result.failed == ["anthropic:rag"]
+    assert list(result.dashboards["anthropic"]) == ["structured"]
+    assert result.saved == []
+
+    markdown, usage, error = parse_result_line({"custom_id": "x:rag", "response": None,
+                                                "error": {"code": "RuntimeError", "message": "boom"}})
+    assert markdown is None and usage is None and "boom" in error
+
+
+def test_workflow_uses_batch_dashboards(tmp_path):
+    state = {
+        "company_id": "anthropic",
+        "run_id": "batch-test",
+        "generation_mode": "llm",
+        "usage": None,
+        "budget_notes": [],
+        "batch_dashboards": {
+            "structured": "# Structured (batch)",
+            "rag": "# RAG (batch)",
+            "usage": {"by_model": {"gpt-4o-mini": {"calls": 2, "prompt_tokens": 2000,
+                                                   "completion_tokens": 400, "cost_usd": 0.0003}}},
+        },
+        "execution_path": [],
+        "errors": [],
+    }
+
+    with patch("src.workflows.due_diligence_graph.get_mcp_client") as get_client, \
+            patch("src.workflows.due_diligence_graph.DashboardGenerator.save_dashboard",
+                  return_value=tmp_path / "dashboard.md") as save:
+        result = data_generator_node(state)
+
+    get_client.assert_not_called()
+    assert result["structured_dashboard"] == "# Structured (batch)"
+    assert result["rag_dashboard"] == "# RAG (batch)"
+    assert result["usage"]["total_tokens"] == 2400
+    assert save.call_count == 2 and result["execution_path"] == ["data_generator"]
+
+    # Partial batch output (a failed request) falls back to synchronous generation
+    state.update(batch_dashboards={"structured": "# Structured (batch)"}, execution_path=[])
+    with patch("src.workflows.due_diligence_graph.get_mcp_client") as get_client:
+        get_client.side_effect = RuntimeError("MCP down")
+        data_generator_node(state)
+    get_client.assert_called_once()
+
+
+class StuckBatchProcessor(LocalBatchProcessor):
+    """Runs like the local processor but stays in progress until cancelled, with only the first result"""
+
+    def __init__(self, client):
+        super().__init__(client=client)
+        self.cancelled = []
+
+    def status(self, batch_id):
+        return "cancelled" if batch_id in self.cancelled else "in_progress"
+
+    def cancel(self, batch_id):
+        self.cancelled.append(batch_id)
+        return "cancelling"
+
+    def results(self, batch_id):
+        return super().results(batch_id)[:1]
+
+
+@pytest.mark.asyncio
+async def test_timed_out_batch_is_cancelled_and_partial_output_kept(tmp_path):
+    processor = StuckBatchProcessor(FakeChatClient())
+
+    with patch("src.utils.dashboard_generator.rag_search_company", side_effect=fake_search):
+        result = await run_batch(
+            ["anthropic"], processor=processor,
+            batch_dir=tmp_path, poll_interval_s=0, timeout_s=0, save=False
+        )
+
+    assert processor.cancelled == [result.batch_id] and result.status == "cancelled"
+    assert len(result.dashboards["anthropic"]) == 1 and len(result.failed) == 1
+    assert result.failed[0] not in {f"anthropic:{m}" for m in result.dashboards["anthropic"]}
+    assert result.usage["anthropic"].total_tokens == 1200
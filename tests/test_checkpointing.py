@@ -0,0 +1,120 @@
+"""
+Unit tests for durable (SQLite) workflow checkpointing
+
+Tests:
+1. The SQLite store runs in WAL mode and round-trips the workflow's checkpoints
+2. A run that crashed mid-graph resumes after its last completed node (no regeneration)
+3. Re-running a finished run returns its saved state without running any node
+4. Expired threads are pruned by the retention policy; storage is selected by config
+"""
+
+import os
+import sqlite3
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+os.environ["HITL_AUTO_APPROVE"] = "true"
+
+from src.workflows import checkpointing, due_diligence_graph
+from src.workflows.checkpointing import SqliteCheckpointSaver, get_checkpointer
+
+
+@pytest.fixture
+def sqlite_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_STORAGE", "sqlite")
+    monkeypatch.setenv("CHECKPOINT_DB", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setenv("DASHBOARDS_DIR", str(tmp_path / "dashboards"))
+    monkeypatch.setenv("USAGE_LEDGER", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(checkpointing, "_savers", {})
+    yield tmp_path / "checkpoints.sqlite"
+    for saver in checkpointing._savers.values():
+        saver.close()
+
+
+@pytest.fixture
+def mcp_calls():
+    calls = []
+
+    async def call_tool(tool_name, params):
+        calls.append(tool_name)
+        return {"markdown": "# Dashboard\nSteady growth, no issues."}
+
+    client = MagicMock()
+    client.call_tool = call_tool
+    with patch.object(due_diligence_graph, "get_mcp_client", return_value=client):
+        yield calls
+
+
+def test_sqlite_store_round_trips_checkpoints(sqlite_store, mcp_calls):
+    final_state = due_diligence_graph.run_workflow("anthropic", run_id="run-1")
+
+    saver = get_checkpointer()
+    assert isinstance(saver, SqliteCheckpointSaver)
+    assert saver.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    config = {"configurable": {"thread_id": "run-1"}}
+    latest = saver.get_tuple(config)
+    assert latest.checkpoint["channel_values"]["final_decision"] == final_state["final_decision"]
+    history = list(saver.list(config))
+    assert len(history) > 5 and history[0].config == latest.config
+    assert [t.config for t in saver.list(config, before=latest.config, limit=2)] == [t.config for t in history[1:3]]
+
+    # A fresh connection (another process) sees the same state
+    reopened = SqliteCheckpointSaver(sqlite_store)
+    assert reopened.get_tuple(config).checkpoint["id"] == latest.checkpoint["id"]
+    reopened.close()
+
+
+def test_crashed_run_resumes_after_last_completed_node(sqlite_store, mcp_calls):
+    evaluator = due_diligence_graph.evaluator_node
+
+    def crashing_evaluator(state):
+        raise RuntimeError("worker killed")
+
+    with patch.object(due_diligence_graph, "evaluator_node", crashing_evaluator):
+        with pytest.raises(RuntimeError, match="worker killed"):
+            due_diligence_graph.run_workflow("anthropic", run_id="run-2")
+    generated = len(mcp_calls)
+    assert generated > 0
+
+    with patch.object(due_diligence_graph, "evaluator_node", side_effect=evaluator) as resumed_evaluator:
+        final_state = due_diligence_graph.run_workflow("anthropic", run_id="run-2")
+
+    assert len(mcp_calls) == generated  # dashboards were not regenerated
+    resumed_evaluator.assert_called_once()
+    assert final_state["execution_path"].count("data_generator") == 1
+    assert final_state["execution_path"][-1] == "final_decision"
+
+
+def test_finished_run_is_not_rerun(sqlite_store, mcp_calls, tmp_path):
+    first = due_diligence_graph.run_workflow("anthropic", run_id="run-3")
+    calls, ledger = len(mcp_calls), (tmp_path / "ledger.jsonl").read_text()
+
+    again = due_diligence_graph.run_workflow("anthropic", run_id="run-3")
+
+    assert again["final_decision"] == first["final_decision"]
+    assert len(mcp_calls) == calls
+    assert (tmp_path / "ledger.jsonl").read_text() == ledger  # usage is not counted twice
+
+
+def test_retention_prunes_expired_threads(sqlite_store, mcp_calls, monkeypatch):
+    for run_id in ("old-run", "new-run"):
+        due_diligence_graph.run_workflow("anthropic", run_id=run_id)
+    saver = get_checkpointer()
+    with saver.conn:
+        saver.conn.execute("UPDATE checkpoints SET created_at = ? WHERE thread_id = 'old-run'",
+                           (time.time() - 10 * 86400,))
+
+    assert saver.prune_expired(0) == 0  # 0 keeps everything
+    assert saver.prune_expired(7) == 1
+    threads = {row[0] for row in sqlite3.connect(sqlite_store).execute("SELECT DISTINCT thread_id FROM checkpoints")}
+    assert threads == {"new-run"}
+    assert saver.get_tuple({"configurable": {"thread_id": "old-run"}}) is None
+
+    monkeypatch.setenv("CHECKPOINT_STORAGE", "memory")
+    assert not isinstance(get_checkpointer(), SqliteCheckpointSaver)
+    monkeypatch.setenv("CHECKPOINT_STORAGE", "redis")
+    with pytest.raises(ValueError, match="CHECKPOINT_STORAGE"):
+        get_checkpointer()
@@ -0,0 +1,119 @@
+"""
+Unit tests for extractive chunk compression
+
+Tests:
+1. Sentence segmentation keeps amounts and abbreviations intact
+2. Banner and repeated template text is dropped; a repeated fact is kept once
+3. Unrelated sentences are dropped, numeric sentences survive the size cut
+4. The RAG prompt shrinks by half or more and keeps every numeric fact; compression is opt-in
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.utils import dashboard_generator
+from src.utils.chunk_compression import (
+    CompressionReport,
+    compress_chunk,
+    compress_sections,
+    compression_enabled,
+    split_sentences,
+    term_keys,
+)
+from src.utils.dashboard_generator import RAG_SECTION_QUERIES, DashboardGenerator
+from src.utils.metrics import RAG_TOKENS_SAVED
+
+NAV = "Home\nProducts\nPricing\nCareers"
+COOKIES = "We use cookies to improve your experience. Accept all"
+TAGLINE = "Building the future of AI together with our community."
+
+
+def page(url, body):
+    return {"id": url, "source_url": url, "text": f"{NAV}\n{body}\n{TAGLINE}\n{COOKIES}", "score": 0.9,
+            "metadata": {"page_type": "blog"}}
+
+
+def test_sentence_segmentation():
+    text = "Anthropic raised $7.6B from U.S. investors. It was founded in 2021!\nCareers\n\"Claude\" launched in 2023."
+
+    assert split_sentences(text) == [
+        "Anthropic raised $7.6B from U.S. investors.",
+        "It was founded in 2021!",
+        "Careers",
+        "\"Claude\" launched in 2023.",
+    ]
+    assert term_keys("founded headquarters") == term_keys("founding headquartered")
+
+
+def test_boilerplate_removed_and_repeated_facts_kept_once():
+    fact = "Anthropic was founded in 2021 in San Francisco."
+    sections = {
+        "overview": [page(f"https://anthropic.com/{p}", f"{fact} Page {p} describes our mission.") for p in ("a", "b", "c")],
+    }
+
+    compressed, report = compress_sections(sections, RAG_SECTION_QUERIES, "anthropic", target_ratio=1.0, min_pages=3)
+    texts = [c["text"] for c in compressed["overview"]]
+    joined = " ".join(texts)
+
+    assert "cookies" not in joined and TAGLINE not in joined and "Pricing" not in joined
+    assert joined.count(fact) == 1
+    assert all("describes our mission" in text for text in texts)
+    assert report.boilerplate > 0 and report.tokens_out < report.tokens_in
+
+
+def test_unrelated_sentences_dropped_numbers_kept():
+    query = term_keys(RAG_SECTION_QUERIES["funding"])
+    text = ("The office has a great coffee machine. Anthropic closed a Series F round led by ICONIQ. "
+            "The round totalled $13 billion at a $183 billion valuation. Employees enjoy hiking on weekends.")
+    report = CompressionReport()
+
+    compressed = compress_chunk(text, query, set(), 0.8, report, set())
+    assert compressed == ("Anthropic closed a Series F round led by ICONIQ. "
+                          "The round totalled $13 billion at a $183 billion valuation.")
+    assert report.unrelated == 2 and report.sentences_kept == 2
+
+    # Tight budget: the numeric sentence stays, the rest is cut
+    compressed = compress_chunk(text, query, set(), 0.1, report, set())
+    assert compressed == "The round totalled $13 billion at a $183 billion valuation."
+
+    # No lexical match at all: the opening sentence is kept rather than the whole passage lost
+    assert compress_chunk("Lovely weather. Great views.", query, set(), 0.5, CompressionReport(), set()) == "Lovely weather."
+
+
+@pytest.mark.asyncio
+async def test_rag_prompt_compressed_without_losing_facts(monkeypatch):
+    monkeypatch.setenv("RAG_COMPRESSION_RATIO", "0.5")
+    facts = {
+        "funding": "Anthropic raised $13 billion in a Series F round at a $183 billion valuation.",
+        "growth": "Headcount grew to 1,300 employees with hiring in Tokyo and Seoul.",
+        "risks": "Regulators raised concerns about model safety in 2024.",
+    }
+    filler = "Our people care deeply about the work and each other, every single day of the week."
+
+    async def fake_rag_search(company_id, query, k=5, mode=None):
+        section = next(s for s, q in RAG_SECTION_QUERIES.items() if q == query)
+        body = " ".join([filler, facts.get(section, "Anthropic builds Claude for enterprise customers."), filler])
+        return [page(f"https://anthropic.com/{section}/{i}", f"{body} Section {section} page {i}.") for i in range(2)]
+
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content="# Dashboard"))]
+    prompts = {}
+    saved_before = RAG_TOKENS_SAVED.labels("compression").value
+
+    # Off unless enabled: non-numeric facts without query overlap can be dropped
+    monkeypatch.delenv("RAG_COMPRESSION", raising=False)
+    assert not compression_enabled()
+
+    for enabled in ("false", "true"):
+        monkeypatch.setenv("RAG_COMPRESSION", enabled)
+        with patch.object(dashboard_generator, "rag_search_company", fake_rag_search), \
+                patch.object(dashboard_generator.openai_client.chat.completions, "create", return_value=response) as create:
+            await DashboardGenerator._generate_rag_dashboard("anthropic", "gpt-4o-mini")
+        prompts[enabled] = create.call_args.kwargs["messages"][1]["content"]
+
+    context = {k: p.split("## RETRIEVED INFORMATION")[1] for k, p in prompts.items()}
+    assert len(context["true"]) <= 0.5 * len(context["false"])
+    assert all(fact in context["true"] for fact in facts.values())
+    assert COOKIES not in context["true"] and filler not in context["true"]
+    assert RAG_TOKENS_SAVED.labels("compression").value > saved_before
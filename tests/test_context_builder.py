@@ -0,0 +1,93 @@
+"""
+Unit tests for token-budgeted prompt assembly
+
+Tests:
+1. Weighted budget allocation
+2. Context assembly keeps everything under budget and trims over budget
+3. Dashboard generators respect PROMPT_TOKEN_BUDGET
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.utils.context_builder import (
+    ContextSection,
+    allocate_budget,
+    build_context,
+    count_tokens,
+)
+from src.utils import dashboard_generator
+from src.utils.dashboard_generator import DashboardGenerator
+
+
+def test_allocate_budget_water_filling():
+    """Small sections are fully satisfied, the rest share by weight"""
+    allocation = allocate_budget(
+        demands={"small": 50, "big_a": 1000, "big_b": 1000},
+        weights={"small": 1, "big_a": 3, "big_b": 1},
+        budget=850
+    )
+
+    assert allocation["small"] == 50
+    assert allocation["big_a"] == 600
+    assert allocation["big_b"] == 200
+
+
+def test_build_context_under_budget_keeps_everything():
+    """No trimming when the sections fit"""
+    sections = [
+        ContextSection(name="a", header="## A", items=["one", "two"]),
+        ContextSection(name="b", header="## B", items=[], empty_text="Not disclosed."),
+    ]
+
+    context, report = build_context(sections, budget=1000)
+
+    assert "one" in context and "two" in context
+    assert "Not disclosed." in context
+    assert not report.trimmed
+    assert report.sections["a"].items_dropped == 0
+
+
+def test_build_context_trims_lowest_value_items_first():
+    """Over budget, items are dropped from the end and the budget holds"""
+    chunks = [f"chunk {i} " + "word " * 80 for i in range(6)]
+    sections = [
+        ContextSection(name="important", header="## Important", items=chunks, weight=3),
+        ContextSection(name="filler", header="## Filler", items=list(chunks), weight=1),
+    ]
+
+    context, report = build_context(sections, budget=400)
+
+    assert report.total_tokens <= 400
+    assert count_tokens(context) == report.total_tokens
+    assert report.trimmed
+    assert "chunk 0" in context
+    assert report.sections["important"].tokens > report.sections["filler"].tokens
+    assert report.sections["important"].items_dropped < len(chunks)
+
+
+@pytest.mark.asyncio
+async def test_rag_dashboard_prompt_respects_budget(monkeypatch):
+    """RAG prompt stays within PROMPT_TOKEN_BUDGET even with 35 long chunks"""
+    monkeypatch.setenv("PROMPT_TOKEN_BUDGET", "3000")
+
+    async def fake_rag_search(company_id, query, k=5, mode=None):
+        return [
+            {"text": f"{query} passage {i} " + "detail " * 150, "source_url": "https://example.com",
+             "score": 1 - i / 10, "metadata": {"page_type": "blog"}}
+            for i in range(k)
+        ]
+
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content="# Dashboard"))]
+
+    with patch.object(dashboard_generator, "rag_search_company", fake_rag_search), \
+         patch.object(dashboard_generator.openai_client.chat.completions, "create",
+                      return_value=response) as mock_create:
+        result = await DashboardGenerator.generate_rag_dashboard("anthropic")
+
+    assert result == "# Dashboard"
+    messages = mock_create.call_args.kwargs["messages"]
+    prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+    assert prompt_tokens <= 3000
+    assert "passage 0" in messages[1]["content"]
@@ -0,0 +1,88 @@
+"""
+Unit tests for the rule-based dashboard evaluator
+
+Tests:
+1. Schema scoring from section presence and order
+2. Numeric claims checked against the payload
+3. Provenance and winner selection
+4. Directory scoring in one pass
+"""
+
+import numpy as np
+import pytest
+
+from src.agents.evaluation_agent import (
+    count_unsupported,
+    evaluate_dashboards,
+    extract_features,
+    payload_numbers,
+    score_dashboard_dir,
+    score_features,
+    FEATURES,
+)
+from src.tools.payload_catalog import load_payload_file
+from src.utils.template_renderer import render_template_dashboard, PE_DASHBOARD_SECTIONS
+
+
+def full_dashboard(body: str = "Details.") -> str:
+    return "\n\n".join(f"## {section}\n{body}" for section in PE_DASHBOARD_SECTIONS)
+
+
+def test_schema_score_reflects_sections():
+    """All sections in order scores 3; missing / misplaced sections lose points"""
+    complete = extract_features(full_dashboard())
+    partial = extract_features("## 1. Company Overview\n## 8. Disclosure Gaps\n## 3. Funding and Investor Profile")
+
+    schema = score_features(np.vstack([complete, partial]))["schema"]
+
+    assert schema[0] == pytest.approx(3.0)
+    assert partial[FEATURES.index("sections_present")] == 3
+    assert partial[FEATURES.index("gaps_last")] == 0
+    assert schema[1] < 1.0
+
+
+def test_numeric_claims_checked_against_payload():
+    """Claims matching payload numbers (any unit spelling) are supported"""
+    payload = load_payload_file("data/payloads/anthropic.json")
+    supported = payload_numbers(payload)
+
+    claims = np.array([13e9, 183e9, 200.0, 42e9])  # $13B, $183B, 200 staff, invented $42B
+    assert count_unsupported(claims, supported) == 1
+
+    text = "## 3. Funding & Investor Profile\nRaised $13 billion at a $183B valuation with 200 employees."
+    row = extract_features(text, supported)
+    assert row[FEATURES.index("numeric_claims")] == 3
+    assert row[FEATURES.index("unsupported_claims")] == 0
+
+
+def test_evaluate_dashboards_prefers_grounded_sourced_dashboard():
+    """Template dashboard (sourced, grounded) beats an unsourced one with invented numbers"""
+    payload = load_payload_file("data/payloads/anthropic.json")
+    structured = render_template_dashboard(payload)
+    rag = full_dashboard("Revenue reached $4.2B with 91% gross margin.")
+
+    result = evaluate_dashboards(rag, structured, payload=payload)
+
+    assert result["winner"] == "structured"
+    assert result["scores"]["structured"]["provenance"] > 0
+    assert result["scores"]["rag"]["hallucination"] == pytest.approx(0.0)
+    assert result["scores"]["structured"]["hallucination"] == pytest.approx(3.0)
+
+    unchecked = evaluate_dashboards(rag, structured)
+    assert unchecked["scores"]["rag"]["hallucination"] is None
+
+
+def test_score_dashboard_dir(tmp_path):
+    """A directory is scored in one pass and summarized per method"""
+    payload = load_payload_file("data/payloads/anthropic.json")
+    (tmp_path / "anthropic_structured_20250101_000000.md").write_text(render_template_dashboard(payload))
+    (tmp_path / "anthropic_rag_20250101_000000.md").write_text(full_dashboard())
+    (tmp_path / "unknownco_rag_20250101_000000.md").write_text("# Nothing")
+
+    report = score_dashboard_dir(str(tmp_path), "data/payloads")
+
+    assert report["count"] == 3
+    assert report["summary"]["rag"]["count"] == 2
+    assert report["summary"]["structured"]["mean_schema"] == pytest.approx(3.0)
+    unknown = next(d for d in report["dashboards"] if d["company_id"] == "unknownco")
+    assert unknown["scores"]["hallucination"] is None
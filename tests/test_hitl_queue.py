@@ -0,0 +1,168 @@
+"""
+Unit tests for the non-blocking HITL review queue
+
+Tests:
+1. A flagged company pauses at the hitl node: the review is queued with its dashboards, no decision or ledger entry
+2. Approve / reject decisions resume the paused run from its checkpoint with that decision
+3. MCP review endpoints: list / get / approve, 404 for unknown runs, 409 for a second decision, background resume
+4. A pending review does not block other companies; re-running a still-pending run does not re-run nodes
+5. Queue mode is the default only with durable checkpoints; queue mode on in-memory checkpoints fails up front
+6. A decision racing an enqueue (another queue instance / process) is never overwritten back to pending
+"""
+
+import json
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ["HITL_AUTO_APPROVE"] = "true"
+
+from src.server.mcp_server import app
+from src.workflows import checkpointing, due_diligence_graph
+from src.workflows.hitl_queue import ReviewItem, ReviewQueue, get_review_queue, hitl_mode
+
+
+@pytest.fixture
+def review_queue(tmp_path, monkeypatch):
+    monkeypatch.delenv("HITL_AUTO_APPROVE", raising=False)
+    monkeypatch.setenv("HITL_MODE", "queue")
+    monkeypatch.setenv("HITL_QUEUE_DIR", str(tmp_path / "hitl_queue"))
+    monkeypatch.setenv("CHECKPOINT_STORAGE", "sqlite")
+    monkeypatch.setenv("CHECKPOINT_DB", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setenv("DASHBOARDS_DIR", str(tmp_path / "dashboards"))
+    monkeypatch.setenv("USAGE_LEDGER", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(checkpointing, "_savers", {})
+    yield get_review_queue()
+    for saver in checkpointing._savers.values():
+        saver.close()
+
+
+@pytest.fixture
+def mcp_calls():
+    """Dashboards for 'risky' mention a lawsuit; other companies are clean"""
+    calls = []
+
+    async def call_tool(tool_name, params):
+        calls.append((tool_name, params["company_id"]))
+        if params["company_id"] == "risky":
+            return {"markdown": "# Dashboard\nOngoing lawsuit over a data breach."}
+        return {"markdown": "# Dashboard\nSteady growth, no issues."}
+
+    client = MagicMock()
+    client.call_tool = call_tool
+    with patch.object(due_diligence_graph, "get_mcp_client", return_value=client):
+        yield calls
+
+
+def test_flagged_company_pauses_in_review_queue(review_queue, mcp_calls, tmp_path):
+    state = due_diligence_graph.run_workflow("risky", run_id="run-1")
+
+    assert state["hitl_pending"] is True
+    assert state["final_decision"] is None
+    assert state["execution_path"][-1] == "risk_detector"
+    assert not (tmp_path / "ledger.jsonl").exists()
+
+    item = review_queue.get("run-1")
+    assert (item.company_id, item.status) == ("risky", "pending")
+    assert {"lawsuit", "breach", "data breach"} <= set(item.risk_keywords)
+    assert set(item.dashboards) == {"structured", "rag"}
+    assert all(os.path.exists(path) for path in item.dashboards.values())
+    assert [i.run_id for i in review_queue.list("pending")] == ["run-1"]
+
+
+@pytest.mark.parametrize("approved, recommendation", [(True, "APPROVED"), (False, "REJECTED")])
+def test_decision_resumes_paused_run(review_queue, mcp_calls, tmp_path, approved, recommendation):
+    due_diligence_graph.run_workflow("risky", run_id="run-2")
+    generated = len(mcp_calls)
+    review_queue.decide("run-2", approved, reviewer="ic-analyst", note="checked filings")
+
+    state = due_diligence_graph.run_workflow("risky", run_id="run-2")
+
+    assert state["hitl_pending"] is False
+    assert len(mcp_calls) == generated  # resumed from the checkpoint, nothing regenerated
+    assert state["execution_path"][-2:] == ["hitl", "final_decision"]
+    assert json.loads(state["final_decision"])["recommendation"] == recommendation
+    assert review_queue.get("run-2").resumed_at is not None
+    assert (tmp_path / "ledger.jsonl").read_text().count("\n") == 1
+
+
+def test_mcp_review_endpoints(review_queue, mcp_calls):
+    due_diligence_graph.run_workflow("risky", run_id="run-3")
+    client = TestClient(app)
+
+    assert [r["run_id"] for r in client.get("/hitl/reviews", params={"status": "pending"}).json()] == ["run-3"]
+    assert client.get("/hitl/reviews/run-3").json()["company_id"] == "risky"
+    assert client.get("/hitl/reviews/missing").status_code == 404
+    assert client.post("/hitl/reviews/missing/approve", json={}).status_code == 404
+
+    response = client.post("/hitl/reviews/run-3/approve", json={"reviewer": "ic-analyst"})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["review"]["status"], body["review"]["reviewer"], body["resuming"]) == ("approved", "ic-analyst", True)
+    assert client.post("/hitl/reviews/run-3/reject", json={}).status_code == 409
+
+    # The server resumes the run in the background (sqlite checkpoints)
+    deadline = time.time() + 30
+    while review_queue.get("run-3").resumed_at is None and time.time() < deadline:
+        time.sleep(0.05)
+    assert review_queue.get("run-3").resumed_at is not None
+    assert client.get("/hitl/reviews", params={"status": "pending"}).json() == []
+
+
+def test_pending_review_does_not_block_other_companies(review_queue, mcp_calls):
+    paused = due_diligence_graph.run_workflow("risky", run_id="run-4")
+    clean = due_diligence_graph.run_workflow("clean", run_id="run-5")
+
+    assert paused["hitl_pending"] is True
+    assert clean["hitl_pending"] is False
+    assert json.loads(clean["final_decision"])["recommendation"] == "APPROVED"
+
+    calls = len(mcp_calls)
+    with patch.object(due_diligence_graph, "hitl_node") as hitl:
+        again = due_diligence_graph.run_workflow("risky", run_id="run-4")
+    assert again["hitl_pending"] is True
+    assert len(mcp_calls) == calls
+    hitl.assert_not_called()
+
+
+def test_queue_mode_requires_durable_checkpoints(monkeypatch, mcp_calls):
+    monkeypatch.delenv("HITL_AUTO_APPROVE", raising=False)
+    monkeypatch.delenv("HITL_MODE", raising=False)
+    monkeypatch.setenv("CHECKPOINT_STORAGE", "sqlite")
+    assert hitl_mode() == "queue"
+    monkeypatch.setenv("CHECKPOINT_STORAGE", "memory")
+    assert hitl_mode() == "cli"
+
+    monkeypatch.setenv("HITL_MODE", "queue")
+    with pytest.raises(ValueError, match="CHECKPOINT_STORAGE=sqlite"):
+        due_diligence_graph.run_workflow("risky", run_id="run-6")
+    assert mcp_calls == []  # rejected before anything ran
+
+
+def test_enqueue_and_decide_are_atomic(tmp_path):
+    worker, server = ReviewQueue(tmp_path), ReviewQueue(tmp_path)  # e.g. DAG worker and MCP server
+    worker.enqueue(ReviewItem(run_id="run-7", company_id="risky", risk_keywords=["lawsuit"]))
+
+    read = worker.get
+    decider = threading.Thread(target=server.decide, args=("run-7", True, "ic-analyst"))
+
+    def racing_get(run_id):
+        item = read(run_id)
+        if not decider.is_alive() and decider.ident is None:
+            decider.start()  # reviewer decides between enqueue's read and its write
+            decider.join(timeout=0.3)
+            assert decider.is_alive()  # blocked on the item lock
+        return item
+
+    with patch.object(worker, "get", racing_get):
+        worker.enqueue(ReviewItem(run_id="run-7", company_id="risky", dashboards={"structured": "s.md"},
+                                  status="approved", reviewer="spoofed"))
+    decider.join(timeout=5)
+
+    item = server.get("run-7")
+    assert (item.status, item.reviewer) == ("approved", "ic-analyst")
+    assert item.dashboards == {"structured": "s.md"} and item.risk_keywords == ["lawsuit"]
@@ -0,0 +1,130 @@
+"""
+Unit tests for lazy imports of heavy dependencies
+
+Tests:
+1. Entry points (modules and the Airflow DAG file) import without langgraph / langchain / openai / pinecone
+2. Each entry point imports within a generous time budget
+3. Lazy clients resolve on first use and stay patchable
+4. The Airflow DAG has no top-level project imports
+5. Patching a lazy client does not build it (no credentials needed)
+"""
+
+import ast
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from src.utils.lazy import LazyObject, lazy_callable
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("langgraph", "langchain", "langchain_openai", "openai", "pinecone", "numpy")
+
+# The DAG file is what the Airflow scheduler re-parses every few seconds
+DAG_FILE = "airflow/dags/orbit_agentic_dashboard_dag.py"
+
+ENTRY_POINTS = [
+    "src.workflows.due_diligence_graph",
+    "src.server.mcp_server",
+    "src.utils.dashboard_generator",
+    "src.tools.rag_tool",
+    "src.agents.mcp_client",
+    DAG_FILE,
+]
+
+# Already loaded in the process that imports the entry point (not timed)
+PRELOADED = {
+    DAG_FILE: ("airflow.models.dag", "airflow.operators.python", "airflow.utils.dates"),
+}
+
+# Generous: well above the measured cold import (~0.4s) but far below the
+# eager imports this guards against (~2.4s for the workflow)
+IMPORT_BUDGET_S = float(os.getenv("IMPORT_BUDGET_S", "1.5"))
+
+
+def import_in_subprocess(entry: str) -> dict:
+    """Time importing a module (or running a .py file) in a fresh interpreter"""
+    statement = f"runpy.run_path({entry!r})" if entry.endswith(".py") else f"import {entry}"
+    code = (
+        "import json, runpy, sys, time\n"
+        "try:\n"
+        f"    for name in {PRELOADED.get(entry, ())!r}:\n"
+        "        __import__(name)\n"
+        "except ImportError as e:\n"
+        "    print(json.dumps({'missing': e.name or str(e)}))\n"
+        "    sys.exit(0)\n"
+        "loaded = set(sys.modules)\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules and m not in loaded]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "test")}
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    if "missing" in measured:
+        pytest.skip(f"{entry} needs {measured['missing']} (not installed)")
+    return measured
+
+
+@pytest.mark.parametrize("entry", ENTRY_POINTS)
+def test_entry_points_skip_heavy_imports(entry):
+    assert import_in_subprocess(entry)["heavy"] == []
+
+
+@pytest.mark.parametrize("entry", ENTRY_POINTS)
+def test_entry_point_import_budget(entry):
+    elapsed = min(import_in_subprocess(entry)["elapsed"] for _ in range(2))
+    assert elapsed < IMPORT_BUDGET_S
+
+
+def test_lazy_clients_resolve_and_patch():
+    dumps = lazy_callable("json", "dumps")
+    assert dumps({"a": 1}) == '{"a": 1}'
+
+    built = []
+    client = LazyObject(lambda: built.append(1) or {"k": "v"})
+    assert built == []
+    assert client.get("k") == "v" and client.get("k") == "v"
+    assert built == [1]
+
+    # Introspection does not build the target (patch() probes __func__ etc.)
+    probed = LazyObject(lambda: built.append(2))
+    assert not hasattr(probed, "__func__") and not hasattr(probed, "_is_coroutine")
+    assert built == [1]
+
+
+def test_patching_lazy_client_needs_no_credentials(monkeypatch):
+    from src.utils import dashboard_generator
+
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    unresolved = LazyObject(dashboard_generator.openai_client._factory)
+    monkeypatch.setattr(dashboard_generator, "openai_client", unresolved)
+
+    with patch("src.utils.dashboard_generator.openai_client") as fake:
+        assert dashboard_generator.openai_client is fake
+    assert dashboard_generator.openai_client is unresolved
+    assert repr(unresolved) == "<lazy (unresolved)>"  # OpenAI() was never constructed
+
+
+def test_dag_has_no_top_level_project_imports():
+    dag = PROJECT_ROOT / "airflow" / "dags" / "orbit_agentic_dashboard_dag.py"
+    tree = ast.parse(dag.read_text(encoding="utf-8"))
+
+    top_level = []
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module:
+            top_level.append(node.module)
+        elif isinstance(node, ast.Import):
+            top_level.extend(alias.name for alias in node.names)
+
+    assert not [m for m in top_level if m.split(".")[0] == "src"]
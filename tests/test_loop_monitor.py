@@ -0,0 +1,64 @@
+"""
+Unit tests for the event-loop lag monitor
+
+Tests:
+1. Snapshot before any samples
+2. Blocking work on the loop shows up as lag
+3. Start / stop lifecycle
+4. /health reports event-loop lag
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.server.loop_monitor import EventLoopLagMonitor
+from src.server.mcp_server import app
+
+
+def test_snapshot_without_samples():
+    monitor = EventLoopLagMonitor()
+    assert monitor.snapshot() == {"running": False, "samples": 0}
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_reported_as_lag():
+    monitor = EventLoopLagMonitor(interval_s=0.01)
+    monitor.start()
+    await asyncio.sleep(0.05)
+
+    # Blocks the loop the way a synchronous LLM call in an async endpoint does
+    time.sleep(0.2)
+    await asyncio.sleep(0.05)
+
+    snapshot = monitor.snapshot()
+    await monitor.stop()
+
+    assert snapshot["samples"] > 1
+    assert snapshot["max_ms"] >= 150
+    assert snapshot["p50_ms"] < 150
+
+
+@pytest.mark.asyncio
+async def test_start_stop_lifecycle():
+    monitor = EventLoopLagMonitor(interval_s=0.01)
+    monitor.start()
+    monitor.start()  # idempotent
+    assert monitor.running
+
+    await asyncio.sleep(0.03)
+    await monitor.stop()
+    assert not monitor.running
+    assert monitor.snapshot()["running"] is False
+
+
+def test_health_reports_event_loop_lag():
+    with TestClient(app) as client:
+        response = client.get("/health")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "healthy"
+    assert "running" in data["event_loop_lag"]
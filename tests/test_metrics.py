@@ -0,0 +1,111 @@
+"""
+Unit tests for Prometheus-style metrics
+
+Tests:
+1. Histogram buckets are cumulative in the text exposition
+2. Label validation and counter / gauge children; metric types must define their child
+3. Cache hit ratio is computed at scrape time
+4. /metrics exposes request, stage and LLM token metrics
+"""
+
+import re
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.server.mcp_server import app
+from src.utils import dashboard_generator
+from src.utils.metrics import CONTENT_TYPE, Counter, Gauge, Histogram, MetricsRegistry, _Metric
+
+
+def sample(text: str, series: str) -> float:
+    match = re.search(rf"^{re.escape(series)} (\S+)$", text, re.MULTILINE)
+    assert match, f"{series} not found"
+    return float(match.group(1))
+
+
+def test_histogram_exposition_is_cumulative():
+    registry = MetricsRegistry()
+    hist = registry.register(Histogram("op_seconds", "Op latency", ["op"], buckets=[0.1, 1.0]))
+    child = hist.labels("read")
+    for value in (0.05, 0.5, 0.5, 3.0):
+        child.observe(value)
+
+    text = registry.render()
+    assert "# TYPE op_seconds histogram" in text
+    assert sample(text, 'op_seconds_bucket{op="read",le="0.1"}') == 1
+    assert sample(text, 'op_seconds_bucket{op="read",le="1"}') == 3
+    assert sample(text, 'op_seconds_bucket{op="read",le="+Inf"}') == 4
+    assert sample(text, 'op_seconds_count{op="read"}') == 4
+    assert sample(text, 'op_seconds_sum{op="read"}') == pytest.approx(4.05)
+
+
+def test_labels_and_children():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("calls_total", "Calls", ["outcome"]))
+    gauge = registry.register(Gauge("in_flight", "In flight"))
+
+    assert counter.labels("ok") is counter.labels("ok")
+    counter.labels("ok").inc()
+    counter.labels("ok").inc(2)
+    gauge.labels().inc()
+    gauge.labels().inc()
+    gauge.labels().dec()
+
+    with pytest.raises(ValueError):
+        counter.labels("ok", "extra")
+    with pytest.raises(ValueError):
+        registry.register(Counter("calls_total", "Duplicate"))
+
+    class Summary(_Metric):
+        type_name = "summary"
+
+    with pytest.raises(TypeError, match="_new_child"):
+        Summary("latency", "Latency")  # fails at construction, not on the first labels() call
+
+    text = registry.render()
+    assert sample(text, 'calls_total{outcome="ok"}') == 3
+    assert sample(text, "in_flight") == 1
+
+
+def test_gauge_function_computed_at_scrape():
+    registry = MetricsRegistry()
+    lookups = registry.register(Counter("lookups_total", "Lookups", ["result"]))
+    ratio = registry.register(Gauge("hit_ratio", "Hit ratio"))
+    hits, misses = lookups.labels("hit"), lookups.labels("miss")
+    ratio.labels().set_function(lambda: hits.value / ((hits.value + misses.value) or 1))
+
+    assert sample(registry.render(), "hit_ratio") == 0
+    hits.inc(3)
+    misses.inc()
+    assert sample(registry.render(), "hit_ratio") == 0.75
+
+
+def test_metrics_endpoint_reports_tools_stages_and_tokens():
+    client = TestClient(app)
+    before = client.get("/metrics").text
+
+    fake_openai = MagicMock()
+    fake_openai.chat.completions.create.return_value = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="# Dashboard"))],
+        usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30),
+    )
+    with patch.object(dashboard_generator, "openai_client", fake_openai):
+        response = client.post("/tool/generate_structured_dashboard", json={"company_id": "anthropic"})
+    assert response.status_code == 200
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"] == CONTENT_TYPE
+    text = metrics.text
+
+    def delta(series):
+        return sample(text, series) - (sample(before, series) if series in before else 0)
+
+    assert delta('mcp_request_duration_seconds_count{endpoint="/tool/generate_structured_dashboard"}') == 1
+    assert delta('dashboard_stage_duration_seconds_count{stage="payload"}') == 1
+    assert delta('dashboard_stage_duration_seconds_count{stage="llm"}') == 1
+    assert delta('llm_prompt_tokens_total{model="gpt-4o-mini"}') == 120
+    assert delta('llm_completion_tokens_total{model="gpt-4o-mini"}') == 30
+    assert sample(text, 'mcp_requests_in_flight{endpoint="/tool/generate_structured_dashboard"}') == 0
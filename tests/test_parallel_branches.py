@@ -0,0 +1,135 @@
+"""
+Unit tests for the parallel evaluator / risk-detector branches
+
+Tests:
+1. Evaluator and risk detector run concurrently after data generation and join before routing
+2. Concurrent branches append to execution_path / errors without losing or duplicating entries
+3. state_update returns only a node's changes and never mutates the input state
+4. A crash in one branch keeps the other branch's writes; the resume re-runs only the failed branch
+"""
+
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+os.environ["HITL_AUTO_APPROVE"] = "true"
+
+from src.workflows import checkpointing, due_diligence_graph
+from src.workflows.due_diligence_graph import state_update
+
+
+@pytest.fixture
+def workflow_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("DASHBOARDS_DIR", str(tmp_path / "dashboards"))
+    monkeypatch.setenv("USAGE_LEDGER", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setenv("CHECKPOINT_STORAGE", "memory")
+
+    async def call_tool(tool_name, params):
+        return {"markdown": "# Dashboard\nLawsuit filed by a former partner."}
+
+    client = MagicMock()
+    client.call_tool = call_tool
+    with patch.object(due_diligence_graph, "get_mcp_client", return_value=client):
+        yield tmp_path
+
+
+def rendezvous_branches(barrier: threading.Barrier, threads: dict):
+    """Evaluator / risk detector that only finish once both are running at the same time"""
+    evaluator, risk_detector = due_diligence_graph.evaluator_node, due_diligence_graph.risk_detector_node
+
+    def branch(name, node):
+        def run(state):
+            threads[name] = threading.get_ident()
+            barrier.wait(timeout=10)  # BrokenBarrierError if the branches ran one after the other
+            state["errors"].append(f"{name} warning")
+            return node(state)
+        return run
+
+    return (patch.object(due_diligence_graph, "evaluator_node", branch("evaluator", evaluator)),
+            patch.object(due_diligence_graph, "risk_detector_node", branch("risk_detector", risk_detector)))
+
+
+def test_branches_run_concurrently_and_join(workflow_env):
+    threads = {}
+    patch_evaluator, patch_risk = rendezvous_branches(threading.Barrier(2), threads)
+    with patch_evaluator, patch_risk:
+        final_state = due_diligence_graph.run_workflow("anthropic", run_id="parallel-1")
+
+    assert threads["evaluator"] != threads["risk_detector"]
+    path = final_state["execution_path"]
+    assert path[:3] == ["planner", "risk_triage", "data_generator"]
+    assert set(path[3:5]) == {"evaluator", "risk_detector"}
+    assert path[5:] == ["hitl", "final_decision"]  # routed after the join, on the risk detector's result
+    assert final_state["evaluation_result"]["winner"]
+    assert "lawsuit" in final_state["risk_keywords"]
+
+    graph = due_diligence_graph.create_due_diligence_graph()
+    assert {("data_generator", "evaluator"), ("data_generator", "risk_detector")} <= graph.edges
+    assert (("evaluator", "risk_detector"), "join") in graph.waiting_edges
+
+
+def test_concurrent_branches_do_not_corrupt_logs(workflow_env):
+    for attempt in range(5):
+        patch_evaluator, patch_risk = rendezvous_branches(threading.Barrier(2), {})
+        with patch_evaluator, patch_risk:
+            final_state = due_diligence_graph.run_workflow("anthropic", run_id=f"parallel-logs-{attempt}")
+
+        assert sorted(final_state["execution_path"]) == sorted(
+            ["planner", "risk_triage", "data_generator", "evaluator", "risk_detector", "hitl", "final_decision"]
+        )
+        assert sorted(final_state["errors"]) == ["evaluator warning", "risk_detector warning"]
+
+
+def test_state_update_returns_only_changes():
+    state = {"company_id": "anthropic", "risk_detected": False, "risk_keywords": [],
+             "execution_path": ["planner"], "errors": []}
+
+    def node(s):
+        s["risk_detected"] = True
+        s["risk_keywords"].append("fraud")
+        s["execution_path"].append("risk_detector")
+        return s
+
+    update = state_update(node)(state)
+
+    assert update == {"risk_detected": True, "risk_keywords": ["fraud"], "execution_path": ["risk_detector"]}
+    assert state == {"company_id": "anthropic", "risk_detected": False, "risk_keywords": [],
+                     "execution_path": ["planner"], "errors": []}
+    assert state_update(lambda s: s)(state) == {}
+
+
+def test_failed_branch_resumes_alone(workflow_env, monkeypatch):
+    monkeypatch.setenv("CHECKPOINT_STORAGE", "sqlite")
+    monkeypatch.setenv("CHECKPOINT_DB", str(workflow_env / "checkpoints.sqlite"))
+    monkeypatch.setattr(checkpointing, "_savers", {})
+    risk_detector = due_diligence_graph.risk_detector_node
+    risk_saved = threading.Event()
+    put_writes = checkpointing.SqliteCheckpointSaver.put_writes
+
+    def saving_writes(saver, config, writes, task_id, task_path=""):
+        put_writes(saver, config, writes, task_id, task_path)
+        if ("execution_path", ["risk_detector"]) in writes:
+            risk_saved.set()
+
+    def crashing_evaluator(state):
+        risk_saved.wait(timeout=10)  # crash once the other branch's writes are checkpointed
+        raise RuntimeError("judge timed out")
+
+    with patch.object(due_diligence_graph, "evaluator_node", crashing_evaluator), \
+            patch.object(checkpointing.SqliteCheckpointSaver, "put_writes", saving_writes), \
+            patch.object(due_diligence_graph, "risk_detector_node", side_effect=risk_detector) as first_risk:
+        with pytest.raises(RuntimeError, match="judge timed out"):
+            due_diligence_graph.run_workflow("anthropic", run_id="parallel-crash")
+    first_risk.assert_called_once()
+
+    with patch.object(due_diligence_graph, "risk_detector_node", side_effect=risk_detector) as resumed_risk:
+        final_state = due_diligence_graph.run_workflow("anthropic", run_id="parallel-crash")
+
+    resumed_risk.assert_not_called()  # its writes were checkpointed with the failed step
+    assert final_state["execution_path"].count("risk_detector") == 1
+    assert final_state["execution_path"].count("evaluator") == 1
+    assert final_state["execution_path"][-1] == "final_decision"
+    for saver in checkpointing._savers.values():
+        saver.close()
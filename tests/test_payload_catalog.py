@@ -0,0 +1,132 @@
+"""
+Unit tests for the in-memory payload catalog
+
+Tests:
+1. Eager preload validates every payload up front
+2. Lazy mode indexes files and loads on first access
+3. Payload tool reads from the installed catalog
+4. Callers get their own copies: mutating a payload never reaches the catalog
+5. Lazy cold loads of different companies run in parallel, one load per company
+"""
+
+import threading
+import time
+
+import pytest
+from unittest.mock import patch
+
+from src.models import CompanyPayload
+from src.tools import payload_catalog
+from src.tools.payload_catalog import (
+    build_payload_catalog,
+    preload_payload_catalog,
+    get_payload_catalog,
+    set_payload_catalog,
+)
+from src.tools.payload_tool import get_latest_structured_payload
+
+
+@pytest.fixture(autouse=True)
+def clear_catalog():
+    """Never leak a process-wide catalog into other tests"""
+    set_payload_catalog(None)
+    yield
+    set_payload_catalog(None)
+
+
+def test_eager_catalog_loads_all_payloads():
+    """Eager mode loads and validates all payloads with stats"""
+    catalog = build_payload_catalog("data/payloads", mode="eager", max_workers=4)
+
+    assert len(catalog) == 50
+    assert catalog.stats["loaded"] == 50
+    assert catalog.stats["failed"] == {}
+    assert catalog.stats["load_seconds"] >= 0
+    assert catalog.stats["rss_mb"] > 0
+    assert isinstance(catalog.get("anthropic"), CompanyPayload)
+
+    # Index is read-only
+    with pytest.raises(TypeError):
+        catalog.files["new_company"] = None
+    with pytest.raises(TypeError):
+        catalog.payloads["anthropic"] = None
+
+
+def test_lazy_catalog_loads_on_first_access():
+    """Lazy mode only indexes files until a payload is requested"""
+    catalog = build_payload_catalog("data/payloads", mode="lazy")
+
+    assert len(catalog) == 50
+    assert len(catalog.payloads) == 0
+
+    payload = catalog.get("openai")
+    assert payload.company.company_id == "openai"
+    assert len(catalog.payloads) == 1
+    assert catalog.get("openai") == payload
+    assert catalog.get("not-a-company") is None
+
+
+def test_preload_off_by_default(monkeypatch):
+    """Preloading is opt-in through PAYLOAD_PRELOAD"""
+    monkeypatch.delenv("PAYLOAD_PRELOAD", raising=False)
+
+    assert preload_payload_catalog() is None
+    assert get_payload_catalog() is None
+
+
+@pytest.mark.asyncio
+async def test_payload_tool_reads_from_catalog(monkeypatch):
+    """Installed catalog serves payloads without touching the filesystem"""
+    monkeypatch.setenv("PAYLOAD_PRELOAD", "eager")
+    catalog = preload_payload_catalog("data/payloads")
+    assert get_payload_catalog() is catalog
+
+    with patch("builtins.open", side_effect=AssertionError("file read")):
+        payload = await get_latest_structured_payload("anthropic")
+
+    assert payload == catalog.get("anthropic")
+
+
+def test_payloads_are_copied_per_caller():
+    """Mutating a returned payload is invisible to later callers"""
+    catalog = build_payload_catalog("data/payloads", mode="eager", max_workers=4)
+    name = catalog.get("abridge").company.company_name
+
+    mutated = catalog.get("abridge")
+    mutated.company.company_name = "MUTATED"
+    mutated.risks.append("injected")
+    catalog.payloads["abridge"].company.company_name = "MUTATED"
+
+    fresh = catalog.get("abridge")
+    assert fresh.company.company_name == name
+    assert "injected" not in fresh.risks
+    assert catalog.payloads["abridge"].company.company_name == name
+
+
+def test_lazy_cold_loads_run_per_company():
+    """Different companies load concurrently; one company loads once"""
+    catalog = build_payload_catalog("data/payloads", mode="lazy")
+    load = payload_catalog.load_payload_file
+    loads, running, overlap = [], [], threading.Event()
+
+    def slow_load(path):
+        running.append(path.stem)
+        if len(running) > 1:
+            overlap.set()
+        overlap.wait(timeout=2)  # only returns early if another load is in flight
+        loads.append(path.stem)
+        result = load(path)
+        running.remove(path.stem)
+        return result
+
+    company_ids = ["anthropic", "openai", "anthropic", "openai"]
+    with patch.object(payload_catalog, "load_payload_file", slow_load):
+        started = time.perf_counter()
+        threads = [threading.Thread(target=catalog.get, args=(cid,)) for cid in company_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert overlap.is_set() and time.perf_counter() - started < 2
+    assert sorted(loads) == ["anthropic", "openai"]
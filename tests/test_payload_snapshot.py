@@ -0,0 +1,81 @@
+"""
+Unit tests for validated payload snapshots
+
+Tests:
+1. Snapshot round trip restores an identical CompanyPayload
+2. Schema or source changes invalidate a snapshot
+3. Payload tool serves snapshots without re-validating
+"""
+
+import shutil
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.models import CompanyPayload
+from src.tools import payload_snapshot
+from src.tools.payload_snapshot import load_snapshot, write_snapshot, snapshot_path_for
+from src.tools.payload_tool import get_latest_structured_payload
+
+
+SOURCE_PAYLOAD = Path("data/payloads/anthropic.json")
+
+
+@pytest.fixture
+def payload_file(tmp_path):
+    """Copy a real payload into a temp data/payloads tree"""
+    payload_dir = tmp_path / "data" / "payloads"
+    payload_dir.mkdir(parents=True)
+    target = payload_dir / "anthropic.json"
+    shutil.copy(SOURCE_PAYLOAD, target)
+    return target
+
+
+def _validate(path: Path) -> CompanyPayload:
+    return CompanyPayload.model_validate_json(path.read_text(encoding="utf-8"))
+
+
+def test_snapshot_round_trip(payload_file):
+    """Snapshot load returns an equal payload with nested models intact"""
+    payload = _validate(payload_file)
+
+    snapshot = write_snapshot(payload_file, payload)
+    assert snapshot == snapshot_path_for(payload_file)
+    assert snapshot.exists()
+
+    restored = load_snapshot(payload_file)
+    assert restored == payload
+    assert restored.model_dump() == payload.model_dump()
+    assert restored.model_fields_set == payload.model_fields_set
+    assert all(type(r).__name__ == "FundingRound" for r in restored.investor_profile.funding_rounds)
+
+
+def test_snapshot_invalidated_by_schema_change(payload_file):
+    """A different schema fingerprint rejects the snapshot"""
+    write_snapshot(payload_file, _validate(payload_file))
+
+    with patch.object(payload_snapshot, "schema_fingerprint", return_value="changed-schema"):
+        assert load_snapshot(payload_file) is None
+
+
+def test_snapshot_invalidated_by_source_change(payload_file):
+    """Rewriting the source JSON rejects the snapshot"""
+    write_snapshot(payload_file, _validate(payload_file))
+
+    payload_file.write_text(payload_file.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+    assert load_snapshot(payload_file) is None
+
+
+@pytest.mark.asyncio
+async def test_payload_tool_uses_snapshot(payload_file, monkeypatch):
+    """Second load comes from the snapshot and skips validation"""
+    monkeypatch.chdir(payload_file.parent.parent.parent)
+    monkeypatch.setenv("PAYLOAD_SNAPSHOTS", "true")
+
+    first = await get_latest_structured_payload("anthropic")
+    assert snapshot_path_for(Path("data/payloads/anthropic.json")).exists()
+
+    with patch.object(CompanyPayload, "model_validate_json", side_effect=AssertionError("validated")):
+        second = await get_latest_structured_payload("anthropic")
+
+    assert second == first
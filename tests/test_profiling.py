@@ -0,0 +1,128 @@
+"""
+Unit tests for opt-in profiling hooks
+
+Tests:
+1. Disabled profiling leaves nodes and handlers unwrapped
+2. cProfile node hook writes a .prof named by company / run
+3. Sampling scope writes collapsed stacks that summarize across runs
+4. Tool hook takes company_id from the request and honours PROFILE_COMPANIES
+5. A workflow profile includes nodes run on worker threads (parallel branches)
+"""
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.server.mcp_server import DashboardRequest
+from src.utils.profiling import (
+    find_profiles,
+    profile_node,
+    profile_scope,
+    profile_tool,
+    summarize_collapsed,
+    summarize_cprofile,
+)
+
+
+@pytest.fixture
+def profile_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.delenv("PROFILE_TARGETS", raising=False)
+    monkeypatch.delenv("PROFILE_COMPANIES", raising=False)
+    return tmp_path
+
+
+def busy_node(state):
+    sum(i * i for i in range(20000))
+    return state
+
+
+def test_disabled_profiling_is_unwrapped(profile_env, monkeypatch):
+    monkeypatch.setenv("PROFILE_MODE", "off")
+
+    async def handler(request):
+        return request
+
+    assert profile_node("planner", busy_node) is busy_node
+    assert profile_tool(handler) is handler
+    with profile_scope("workflow", "workflow", "anthropic", "run-1"):
+        pass
+    assert list(profile_env.iterdir()) == []
+
+
+def test_cprofile_node_hook(profile_env, monkeypatch):
+    monkeypatch.setenv("PROFILE_MODE", "cprofile")
+    node = profile_node("evaluator", busy_node)
+    assert node is not busy_node
+
+    state = {"company_id": "anthropic", "run_id": "0123456789abcdef"}
+    assert node(state) is state
+
+    prof, collapsed = find_profiles(profile_env, "anthropic")
+    assert len(prof) == 1 and not collapsed
+    assert prof[0].name.startswith("anthropic_01234567_node-evaluator_")
+    assert "busy_node" in summarize_cprofile(prof, top=10)
+
+
+def test_sampled_scope_summary(profile_env, monkeypatch):
+    monkeypatch.setenv("PROFILE_MODE", "sample")
+    monkeypatch.setenv("PROFILE_SAMPLE_INTERVAL_MS", "1")
+
+    for run_id in ("run-a", "run-b"):
+        with profile_scope("workflow", "workflow", "cohere", run_id):
+            time.sleep(0.05)
+
+    prof, collapsed = find_profiles(profile_env, scope="workflow")
+    assert len(collapsed) == 2 and not prof
+
+    rows = summarize_collapsed(collapsed, top=5)
+    assert rows[0]["frame"].endswith(":test_sampled_scope_summary")
+    assert rows[0]["self_samples"] > 10
+    assert sum(row["self_pct"] for row in rows) <= 100.01
+
+
+@pytest.mark.asyncio
+async def test_tool_hook_uses_request_company(profile_env, monkeypatch):
+    monkeypatch.setenv("PROFILE_MODE", "cprofile")
+    monkeypatch.setenv("PROFILE_TARGETS", "tools")
+    monkeypatch.setenv("PROFILE_COMPANIES", "openai")
+
+    @profile_tool
+    async def generate(request: DashboardRequest):
+        return busy_node({"company_id": request.company_id})
+
+    await generate(DashboardRequest(company_id="anthropic"))
+    await generate(request=DashboardRequest(company_id="openai"))
+
+    prof, _ = find_profiles(profile_env)
+    assert [p.name.split("_")[:3] for p in prof] == [["openai", "adhoc", "tool-generate"]]
+    assert profile_node("planner", busy_node) is busy_node  # nodes not targeted
+
+
+def branch_node(state):
+    time.sleep(0.03)
+    return state
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sample"])
+def test_workflow_profile_includes_worker_threads(profile_env, monkeypatch, mode):
+    monkeypatch.setenv("PROFILE_MODE", mode)
+    monkeypatch.setenv("PROFILE_TARGETS", "workflow")
+    monkeypatch.setenv("PROFILE_SAMPLE_INTERVAL_MS", "1")
+    planner, branch = profile_node("planner", busy_node), profile_node("evaluator", branch_node)
+    state = {"company_id": "anthropic", "run_id": "run-par"}
+
+    with profile_scope("workflow", "workflow", "anthropic", "run-par"), ThreadPoolExecutor(1) as pool:
+        planner(state)
+        # LangGraph runs parallel branches on worker threads, in a copy of the caller's context
+        pool.submit(contextvars.copy_context().run, branch, state).result()
+
+    prof, collapsed = find_profiles(profile_env, "anthropic")
+    assert [p.name.split("_")[2] for p in prof + collapsed] == ["workflow"]  # no per-node files
+    if mode == "cprofile":
+        report = summarize_cprofile(prof, top=50)
+        assert "busy_node" in report and "branch_node" in report
+    else:
+        assert ":branch_node " in collapsed[0].read_text()
@@ -0,0 +1,114 @@
+"""
+Unit tests for the client-side OpenAI rate limiter
+
+Tests:
+1. RPM / TPM reservations queue callers and refund unused tokens
+2. Rate-limit headers set limits, clamp capacity and pause on 429
+3. Concurrent async callers are spaced out and queue wait is recorded
+4. A 429 from the OpenAI API is seen by the limiter through the HTTP client
+"""
+
+import asyncio
+import importlib
+import json
+import time
+
+import pytest
+
+from src.utils.metrics import RATE_LIMIT_WAIT
+from src.utils.rate_limiter import (
+    RateLimiter,
+    build_openai_http_client,
+    estimate_chat_tokens,
+    parse_reset,
+)
+
+
+def test_reservations_queue_and_refund():
+    limiter = RateLimiter(rpm=2, tpm=600)
+
+    assert limiter.reserve(100) == 0.0
+    assert limiter.reserve(100) == 0.0
+    assert limiter.reserve(100) == pytest.approx(30.0, rel=0.01)  # third request waits for an RPM slot
+
+    tokens = RateLimiter(tpm=600)  # 10 tokens/s
+    assert tokens.reserve(600) == 0.0
+    assert tokens.reserve(100) == pytest.approx(10.0, rel=0.01)
+    tokens.settle(estimated=600, actual=150)  # unused estimate goes back to the bucket
+    assert tokens.reserve(0) == 0.0
+
+    assert RateLimiter().reserve(10**9) == 0.0  # no limits configured
+    assert estimate_chat_tokens([{"role": "user", "content": "hello world"}], max_tokens=100) > 100
+
+
+def test_headers_adapt_limits_and_pause():
+    limiter = RateLimiter()
+    limiter.observe_headers(200, {
+        "x-ratelimit-limit-requests": "500",
+        "x-ratelimit-limit-tokens": "200000",
+        "x-ratelimit-remaining-tokens": "1000",
+    })
+    assert (limiter.requests.limit, limiter.tokens.limit) == (500, 200000)
+    assert limiter.reserve(1000) == 0.0
+    assert limiter.reserve(1000) > 0  # provider said only 1000 tokens were left
+
+    throttled = RateLimiter(rpm=600)
+    throttled.observe_headers(429, {"retry-after-ms": "1500"})
+    assert throttled.rate_limited == 1 and throttled.scale == pytest.approx(0.7)
+    assert throttled.reserve() == pytest.approx(1.5, abs=0.05)
+    throttled.observe_headers(429, {"x-ratelimit-reset-requests": "2s", "x-ratelimit-reset-tokens": "6m0s"})
+    assert throttled.snapshot()["paused_s"] == pytest.approx(360, abs=1)
+    throttled.observe_headers(200, {})
+    assert throttled.scale == pytest.approx(0.49 + 0.02)
+
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset("1h2m3.5s") == pytest.approx(3723.5)
+    assert parse_reset("garbage") is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_are_spaced():
+    limiter = RateLimiter(tpm=60_000, name="test-async")  # 1000 tokens/s
+    limiter.reserve(60_000)  # drain the burst capacity
+    waits_before = RATE_LIMIT_WAIT.labels("test-async").count
+
+    start = time.monotonic()
+    waits = await asyncio.gather(*[limiter.acquire(50) for _ in range(4)])
+    elapsed = time.monotonic() - start
+
+    assert waits == sorted(waits)
+    assert waits[0] == pytest.approx(0.05, abs=0.02) and waits[-1] == pytest.approx(0.2, abs=0.02)
+    assert 0.18 <= elapsed < 0.5
+    assert RATE_LIMIT_WAIT.labels("test-async").count == waits_before + 4
+
+
+def test_openai_client_reports_429_to_limiter():
+    from openai import DefaultHttpxClient, OpenAI
+
+    # The HTTP library the installed SDK is built on (httpx, or its httpx2 fork in newer releases)
+    httpx = importlib.import_module(DefaultHttpxClient.__bases__[0].__module__.split(".")[0])
+
+    limiter = RateLimiter(rpm=1000, name="test-http")
+    attempts = []
+
+    def handler(request):
+        attempts.append(request.url.path)
+        if len(attempts) == 1:
+            return httpx.Response(429, headers={"retry-after-ms": "10"}, json={"error": {"message": "slow down"}})
+        return httpx.Response(200, headers={"x-ratelimit-limit-requests": "500"}, json={
+            "id": "cmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+        })
+
+    client = OpenAI(
+        api_key="test", base_url="http://openai.test/v1",
+        http_client=build_openai_http_client(limiter, transport=httpx.MockTransport(handler))
+    )
+    response = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+
+    assert response.choices[0].message.content == "ok"
+    assert len(attempts) == 2
+    assert limiter.rate_limited == 1
+    assert limiter.requests.limit == 500  # provider limit below the configured 1000
+    assert json.loads(json.dumps(limiter.snapshot()))["rate_limited"] == 1
@@ -0,0 +1,88 @@
+"""
+Unit tests for the per-company DAG result journal
+
+Tests:
+1. Each append is one fsync'd JSONL line, readable back in order
+2. A line torn by a crash is skipped and terminated before the next append
+3. Only companies whose latest entry for this execution date succeeded are skipped
+4. The summary is assembled from the journal (counts, order, pending, usage)
+"""
+
+import os
+from datetime import datetime
+from unittest.mock import patch
+
+from src.utils.result_journal import ResultJournal
+from src.utils.usage import UsageSummary
+
+EXECUTION_DATE = datetime(2026, 10, 19, 4, 0)
+
+
+def usage(tokens: int) -> dict:
+    summary = UsageSummary()
+    summary.add("gpt-4o-mini", tokens, 0)
+    return summary.model_dump()
+
+
+def test_appends_are_fsynced_lines(tmp_path):
+    journal = ResultJournal.for_run("orbit_agentic_dashboard", EXECUTION_DATE, directory=tmp_path)
+    assert journal.path == tmp_path / "orbit_agentic_dashboard" / "2026-10-19T04_00_00.jsonl"
+
+    with patch("src.utils.result_journal.os.fsync", wraps=os.fsync) as fsync:
+        journal.append("anthropic", "success", {"hitl_required": False})
+        journal.append("cohere", "failed", {"error": "timeout"})
+
+    assert fsync.call_count >= 2
+    assert journal.path.read_text().count("\n") == 2
+    assert [(e.company_id, e.status) for e in journal.entries()] == [("anthropic", "success"), ("cohere", "failed")]
+    assert journal.entries()[1].result == {"error": "timeout"}
+
+
+def test_torn_line_is_skipped_and_terminated(tmp_path):
+    journal = ResultJournal.for_run("dag", EXECUTION_DATE, directory=tmp_path)
+    journal.append("anthropic", "success")
+    with open(journal.path, "a") as f:
+        f.write('{"company_id": "cohere", "status": "succ')  # process killed mid-write
+
+    assert [e.company_id for e in journal.entries()] == ["anthropic"]
+
+    journal.append("cohere", "success")
+    assert [e.company_id for e in journal.entries()] == ["anthropic", "cohere"]
+
+
+def test_only_latest_successes_are_skipped(tmp_path):
+    journal = ResultJournal.for_run("dag", EXECUTION_DATE, directory=tmp_path)
+    journal.append("anthropic", "failed", {"error": "rate limited"})
+    journal.append("anthropic", "success")  # retried and succeeded
+    journal.append("cohere", "success")
+    journal.append("cohere", "failed", {"error": "regression"})
+    journal.append("databricks", "failed")
+
+    assert journal.succeeded() == {"anthropic"}
+
+    # Another execution date has its own journal; a foreign line in this file is ignored
+    other = ResultJournal.for_run("dag", datetime(2026, 10, 20, 4, 0), directory=tmp_path)
+    assert other.succeeded() == set()
+    ResultJournal(journal.path, "2026-10-20T04:00:00").append("databricks", "success")
+    assert journal.succeeded() == {"anthropic"}
+
+
+def test_summary_assembled_from_journal(tmp_path):
+    journal = ResultJournal.for_run("dag", EXECUTION_DATE, directory=tmp_path)
+    journal.append("cohere", "success", {"hitl_required": True, "usage": usage(200)})
+    journal.append("anthropic", "success", {"hitl_required": False, "usage": usage(100)})
+    journal.append("baseten", "failed", {"error": "boom"})
+    journal.append("suno", "pending_review", {"risk_keywords": ["lawsuit"], "usage": usage(50)})
+
+    # A new attempt (fresh object) sees the earlier attempt's results
+    summary = ResultJournal.for_run("dag", EXECUTION_DATE, directory=tmp_path).summary(
+        ["anthropic", "baseten", "clay", "cohere", "suno"]
+    )
+
+    assert (summary["successful"], summary["failed"], summary["hitl_triggered"]) == (2, 1, 1)
+    assert summary["pending_review"] == 1
+    assert [c["company_id"] for c in summary["companies"]] == ["anthropic", "baseten", "cohere", "suno"]
+    assert summary["companies"][1] == {"company_id": "baseten", "status": "failed", "error": "boom"}
+    assert summary["pending"] == ["clay"]
+    # Paused companies already spent tokens on their dashboards
+    assert UsageSummary.model_validate(summary["usage"]).prompt_tokens == 350
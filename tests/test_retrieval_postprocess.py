@@ -0,0 +1,90 @@
+"""
+Unit tests for cross-section dedup and MMR of retrieved chunks
+
+Tests:
+1. Repeated chunks (by id or text) are kept once, in their best section
+2. MMR drops near-duplicates and prefers diverse passages
+3. The report counts chunks and prompt tokens saved
+4. The RAG prompt contains a passage retrieved for every section only once
+"""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.utils import dashboard_generator
+from src.utils.context_builder import count_tokens
+from src.utils.dashboard_generator import RAG_SECTION_QUERIES, DashboardGenerator
+from src.utils.metrics import RAG_TOKENS_SAVED
+from src.utils.retrieval_postprocess import chunk_fingerprint, postprocess_sections
+
+
+def chunk(text, score, chunk_id=None):
+    return {"id": chunk_id, "text": text, "score": score, "metadata": {"page_type": "blog"}}
+
+
+SHARED = "Anthropic is an AI safety company founded in 2021 and headquartered in San Francisco."
+
+
+def test_duplicates_kept_once_in_best_section():
+    sections = {
+        "overview": [chunk(SHARED, 0.70, "c1"), chunk("Mission: reliable, interpretable AI systems.", 0.90, "c2")],
+        "business_model": [chunk(SHARED, 0.95, "c1"), chunk("Claude is sold via API and subscriptions.", 0.80, "c3")],
+        # Same text without an id (e.g. from another backend) is still a duplicate
+        "outlook": [chunk("  anthropic is an AI safety company founded in 2021 and headquartered in San Francisco.", 0.99)],
+    }
+
+    kept, report = postprocess_sections(sections, lambda_mult=1.0)
+
+    assert [c["id"] for c in kept["overview"]] == ["c2"]
+    assert [c["id"] for c in kept["business_model"]] == ["c1", "c3"]  # relative score 1.0 there
+    assert kept["outlook"] == []
+    assert report.duplicates == 1 and report.redundant == 1  # the id-less copy is a near-duplicate
+    assert chunk_fingerprint({"text": "A  b"}) == chunk_fingerprint({"text": "a b"})
+
+
+def test_mmr_prefers_diverse_passages():
+    near_copy = SHARED.replace("2021", "2021,")
+    funding = "Series E led by Lightspeed valued the company at 61.5 billion dollars."
+    sections = {"overview": [chunk(SHARED, 0.90, "a"), chunk(near_copy, 0.89, "b"), chunk(funding, 0.60, "c")]}
+
+    kept, report = postprocess_sections(sections)
+    assert [c["id"] for c in kept["overview"]] == ["a", "c"]
+    assert report.redundant == 1
+
+    # Relevance only (lambda=1) and no near-duplicate cut keeps retrieval order
+    kept, _ = postprocess_sections(sections, lambda_mult=1.0, duplicate_similarity=1.01)
+    assert [c["id"] for c in kept["overview"]] == ["a", "b", "c"]
+
+
+def test_report_counts_tokens_saved():
+    sections = {name: [chunk(SHARED, 0.9, "same"), chunk(f"{name} specific detail", 0.8, name)] for name in ("a", "b", "c")}
+    saved_before = RAG_TOKENS_SAVED.labels("dedup").value
+
+    kept, report = postprocess_sections(sections)
+
+    assert report.chunks_in == 6 and report.chunks_out == 4 and report.duplicates == 2
+    assert report.tokens_in == sum(count_tokens(c["text"]) for results in sections.values() for c in results)
+    assert report.tokens_saved == 2 * count_tokens(SHARED)
+    assert RAG_TOKENS_SAVED.labels("dedup").value == saved_before + report.tokens_saved
+    assert "2 duplicate" in report.summary()
+
+
+@pytest.mark.asyncio
+async def test_rag_prompt_sends_shared_passage_once(monkeypatch):
+    async def fake_rag_search(company_id, query, k=5, mode=None):
+        return [chunk(SHARED, 0.9, "shared"), chunk(f"Passage about {query}.", 0.8, query)]
+
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content="# Dashboard"))]
+
+    for enabled, expected in (("true", 1), ("false", len(RAG_SECTION_QUERIES))):
+        monkeypatch.setenv("RAG_DEDUP", enabled)
+        monkeypatch.setenv("RAG_COMPRESSION", "false")
+        with patch.object(dashboard_generator, "rag_search_company", fake_rag_search), \
+                patch.object(dashboard_generator.openai_client.chat.completions, "create", return_value=response) as create:
+            await DashboardGenerator._generate_rag_dashboard("anthropic", "gpt-4o-mini")
+
+        prompt = create.call_args.kwargs["messages"][1]["content"]
+        assert prompt.count(SHARED) == expected
+        assert all(f"Passage about {query}." in prompt for query in RAG_SECTION_QUERIES.values())
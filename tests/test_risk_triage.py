@@ -0,0 +1,180 @@
+"""
+Unit tests for pre-generation risk triage
+
+Tests:
+1. The compiled matcher finds the same keywords as a per-keyword substring scan
+2. Triage scans payload risk fields, events and retrieved risk chunks; retrieval failures are tolerated
+3. A flagged company is queued for review before generation and takes the HITL branch on clean dashboards
+4. A decision made during generation is applied without pausing; flagged companies are processed first
+5. Batch triage queues flagged companies before any generation; their runs fill in the same review
+"""
+
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+os.environ["HITL_AUTO_APPROVE"] = "true"
+
+from src.workflows import checkpointing, due_diligence_graph, risk_triage
+from src.workflows.hitl_queue import get_review_queue
+from src.workflows.risk_triage import (
+    RISK_KEYWORDS,
+    RiskMatcher,
+    RiskTriage,
+    prioritize,
+    queue_for_review,
+    triage_companies,
+    triage_company,
+)
+
+RISKY_PAYLOAD = SimpleNamespace(
+    risks=["Pending copyright LAWSUIT from record labels", "Competitive market"],
+    events=[SimpleNamespace(title="Series C", description="Raised $125M"),
+            SimpleNamespace(title="Restructuring", description="Announced layoffs of 10% of staff")],
+)
+
+
+def fake_payloads(payloads: dict):
+    async def get_payload(company_id):
+        return payloads.get(company_id)
+    return patch.object(risk_triage, "get_latest_structured_payload", get_payload)
+
+
+def fake_retrieval(chunks: dict):
+    async def search(company_id, query, k=5, mode=None):
+        if company_id not in chunks:
+            raise ValueError("PINECONE_API_KEY not found in environment variables")
+        return chunks[company_id]
+    return patch.object(risk_triage, "rag_search_company", search)
+
+
+@pytest.fixture
+def review_queue(tmp_path, monkeypatch):
+    monkeypatch.delenv("HITL_AUTO_APPROVE", raising=False)
+    monkeypatch.setenv("HITL_MODE", "queue")
+    monkeypatch.setenv("HITL_QUEUE_DIR", str(tmp_path / "hitl_queue"))
+    monkeypatch.setenv("CHECKPOINT_STORAGE", "sqlite")
+    monkeypatch.setenv("CHECKPOINT_DB", str(tmp_path / "checkpoints.sqlite"))
+    monkeypatch.setenv("DASHBOARDS_DIR", str(tmp_path / "dashboards"))
+    monkeypatch.setenv("USAGE_LEDGER", str(tmp_path / "ledger.jsonl"))
+    monkeypatch.setattr(checkpointing, "_savers", {})
+    yield get_review_queue()
+    for saver in checkpointing._savers.values():
+        saver.close()
+
+
+def test_matcher_equals_substring_scan():
+    matcher = RiskMatcher()
+    texts = [
+        "Company announced LAYOFFS after a data breach; litigation pending.",
+        "Fraudulent accounting led to Chapter 11 bankruptcy.",
+        "A controversial workforce reduction and a security breach.",
+        "Steady growth, no issues.",
+        "Antifraud controls; nonbankruptcy remote; cyberbreach insurance; class-action lawsuits.",
+        "LAYOFFRAUD and securitybreaches; lawsuitigation; controversyfraudulent.",
+    ]
+    for text in texts:
+        assert matcher.find(text) == [k for k in RISK_KEYWORDS if k in text.lower()]
+
+    assert matcher.find("layoffs", None, "lawsuit") == ["layoff", "layoffs", "lawsuit"]
+    # Keywords inside words count, as with the substring scan, and matches may overlap
+    assert matcher.find("antifraud controls; nonbankruptcy; cyberbreach") == ["breach", "fraud", "bankruptcy"]
+    assert matcher.find("layoffraud") == ["layoff", "fraud"]
+    assert matcher.find("Data breachfraud") == ["breach", "data breach", "fraud"]
+    assert "data breach" in matcher.excerpt("x " * 200 + "a data breach was disclosed " + "y " * 200)
+
+
+def test_triage_scans_payload_and_retrieved_chunks():
+    chunks = {"suno": [{"text": "Labels filed a lawsuit over training data.", "source_url": "https://news/1"},
+                       {"text": "New model release.", "source_url": "https://blog/2"}]}
+    with fake_payloads({"suno": RISKY_PAYLOAD}), fake_retrieval(chunks):
+        triage = asyncio.run(triage_company("suno"))
+        no_retrieval = asyncio.run(triage_company("suno", retrieval=False))
+        clean = asyncio.run(triage_company("unknown"))
+
+    assert triage.flagged and triage.keywords == ["layoff", "layoffs", "lawsuit"]
+    assert [s.source for s in triage.signals] == ["payload.risks", "payload.events", "https://news/1"]
+    assert triage.chunks_scanned == 2
+    assert triage.evidence()[2] == "[https://news/1] lawsuit: Labels filed a lawsuit over training data."
+    assert no_retrieval.chunks_scanned == 0 and len(no_retrieval.signals) == 2
+
+    # No payload and retrieval down: triage still completes, unflagged
+    assert not clean.flagged and "PINECONE_API_KEY" in clean.retrieval_error
+
+
+def test_flagged_company_queued_before_generation(review_queue):
+    queued_at_generation = []
+
+    async def call_tool(tool_name, params):
+        queued_at_generation.append(review_queue.get("triage-1"))
+        return {"markdown": "# Dashboard\nHeadcount was adjusted this year."}  # paraphrased, no keyword
+
+    client = MagicMock()
+    client.call_tool = call_tool
+    with fake_payloads({"suno": RISKY_PAYLOAD}), fake_retrieval({}), \
+            patch.object(due_diligence_graph, "get_mcp_client", return_value=client):
+        state = due_diligence_graph.run_workflow("suno", run_id="triage-1")
+
+    early = queued_at_generation[0]
+    assert early is not None and early.status == "pending" and early.dashboards == {}
+    assert early.risk_keywords == ["layoff", "layoffs", "lawsuit"] and len(early.evidence) == 2
+
+    assert state["hitl_pending"] is True
+    assert state["risk_detected"] and state["risk_keywords"] == ["layoff", "layoffs", "lawsuit"]
+    assert state["execution_path"][:3] == ["planner", "risk_triage", "data_generator"]
+    item = review_queue.get("triage-1")  # the hitl node filled in the same item
+    assert set(item.dashboards) == {"structured", "rag"} and item.created_at == early.created_at
+
+
+def test_early_decision_applies_without_pause(review_queue):
+    async def call_tool(tool_name, params):
+        if review_queue.get("triage-2").status == "pending":
+            review_queue.decide("triage-2", False, reviewer="ic-analyst")  # reviewer acts mid-generation
+        return {"markdown": "# Dashboard\nSteady growth."}
+
+    client = MagicMock()
+    client.call_tool = call_tool
+    with fake_payloads({"suno": RISKY_PAYLOAD}), fake_retrieval({}), \
+            patch.object(due_diligence_graph, "get_mcp_client", return_value=client):
+        state = due_diligence_graph.run_workflow("suno", run_id="triage-2")
+
+    assert state["hitl_pending"] is False
+    assert json.loads(state["final_decision"])["recommendation"] == "REJECTED"
+    assert review_queue.get("triage-2").resumed_at is not None
+
+    triage = {"anthropic": RiskTriage(company_id="anthropic"),
+              "suno": RiskTriage(company_id="suno", keywords=["lawsuit"]),
+              "baseten": RiskTriage(company_id="baseten", keywords=["layoff"])}
+    assert prioritize(["anthropic", "suno", "cohere", "baseten"], triage) == ["suno", "baseten", "anthropic", "cohere"]
+
+
+def test_batch_triage_queues_before_generation(review_queue):
+    calls = []
+
+    async def call_tool(tool_name, params):
+        calls.append(params["company_id"])
+        return {"markdown": "# Dashboard\nSteady growth."}
+
+    client = MagicMock()
+    client.call_tool = call_tool
+    with fake_payloads({"suno": RISKY_PAYLOAD}), fake_retrieval({}), \
+            patch.object(due_diligence_graph, "get_mcp_client", return_value=client):
+        triage = asyncio.run(triage_companies(["anthropic", "suno"]))
+        for company_id, result in triage.items():
+            if result.flagged:
+                queue_for_review(f"dag-1:{company_id}", result)  # as the DAG does, up front
+
+        queued = review_queue.get("dag-1:suno")
+        assert calls == [] and review_queue.get("dag-1:anthropic") is None
+        assert queued.status == "pending" and queued.evidence == triage["suno"].evidence()
+
+        state = due_diligence_graph.run_workflow("suno", run_id="dag-1:suno",
+                                                 risk_triage=triage["suno"].model_dump())
+
+    assert state["hitl_pending"] is True and calls == ["suno", "suno"]
+    item = review_queue.get("dag-1:suno")
+    assert item.created_at == queued.created_at and set(item.dashboards) == {"structured", "rag"}
@@ -0,0 +1,128 @@
+"""
+Unit tests for sectioned (per-section, concurrent) dashboard generation
+
+Tests:
+1. Each section prompt carries only that section's context
+2. Sections run concurrently: wall time is close to one completion, not eight
+3. Sections are stitched in template order with repeated headings dropped (MCP mode=sectioned)
+4. A failed section is retried alone; if it keeps failing the rest survive
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.server.mcp_server import app
+from src.utils import dashboard_generator
+from src.utils.dashboard_generator import DashboardGenerator
+from src.utils.template_renderer import PE_DASHBOARD_SECTIONS
+
+client = TestClient(app)
+
+
+def section_of(messages) -> str:
+    prompt = messages[1]["content"]
+    return next(s for s in PE_DASHBOARD_SECTIONS if f"**{s}**" in prompt)
+
+
+def fake_create(delay=0.0, fail=None):
+    """Chat completion stand-in answering with the section's name; `fail(section, calls)` raises"""
+    calls = []
+    lock = threading.Lock()
+
+    def create(**kwargs):
+        section = section_of(kwargs["messages"])
+        with lock:
+            calls.append(section)
+            seen = calls.count(section)
+        time.sleep(delay)
+        if fail and fail(section, seen):
+            raise RuntimeError(f"{section} timed out")
+        response = MagicMock()
+        response.choices = [MagicMock(message=MagicMock(content=f"### {section}\n\nBody of {section}."))]
+        return response
+
+    return create, calls
+
+
+@pytest.fixture(autouse=True)
+def no_singleflight(monkeypatch):
+    monkeypatch.setenv("DASHBOARD_SINGLEFLIGHT", "false")
+
+
+@pytest.mark.asyncio
+async def test_section_prompts_carry_only_their_context():
+    header, prompts = await DashboardGenerator.prepare_section_prompts("anthropic")
+
+    assert header.startswith("# anthropic - PE Due Diligence Dashboard")
+    assert [p.section for p in prompts] == PE_DASHBOARD_SECTIONS
+    by_section = {p.section: p.messages[1]["content"] for p in prompts}
+
+    funding = by_section["3. Funding & Investor Profile"]
+    assert "## FUNDING HISTORY" in funding
+    assert "## RISK ASSESSMENT" not in funding and "## VISIBILITY" not in funding
+    assert "## RISK ASSESSMENT" in by_section["6. Risks and Challenges"]
+    assert all(p.max_tokens == 600 for p in prompts)
+
+    structured = await DashboardGenerator.prepare_structured_prompt("anthropic")
+    assert max(len(text) for text in by_section.values()) < len(structured.messages[1]["content"])
+
+    header, prompts = await DashboardGenerator.prepare_section_prompts("not-a-company")
+    assert header is None and "Payload Not Available" in prompts[0].fallback
+
+
+@pytest.mark.asyncio
+async def test_sections_generated_concurrently():
+    create, calls = fake_create(delay=0.2)
+
+    with patch.object(dashboard_generator.openai_client.chat.completions, "create", side_effect=create):
+        start = time.perf_counter()
+        dashboard = await DashboardGenerator.generate_structured_dashboard("anthropic", mode="sectioned")
+        elapsed = time.perf_counter() - start
+
+    assert sorted(calls) == sorted(PE_DASHBOARD_SECTIONS)
+    assert elapsed < 0.2 * len(PE_DASHBOARD_SECTIONS) / 2
+    assert "Body of 8. Disclosure Gaps." in dashboard
+
+
+def test_sections_stitched_in_template_order():
+    create, _ = fake_create()
+
+    with patch.object(dashboard_generator.openai_client.chat.completions, "create", side_effect=create):
+        response = client.post(
+            "/tool/generate_structured_dashboard",
+            json={"company_id": "anthropic", "mode": "sectioned"}
+        )
+
+    assert response.status_code == 200
+    markdown = response.json()["markdown"]
+    positions = [markdown.index(f"## {section}\n\nBody of {section}.") for section in PE_DASHBOARD_SECTIONS]
+    assert positions == sorted(positions)
+    assert "###" not in markdown  # the heading each completion repeated is dropped
+    assert markdown.startswith("# anthropic - PE Due Diligence Dashboard\n\n**Generated**:")
+
+
+@pytest.mark.asyncio
+async def test_failed_section_retried_alone(monkeypatch):
+    funding = "3. Funding & Investor Profile"
+    create, calls = fake_create(fail=lambda section, seen: section == funding and seen == 1)
+
+    with patch.object(dashboard_generator.openai_client.chat.completions, "create", side_effect=create):
+        dashboard = await DashboardGenerator.generate_structured_dashboard("anthropic", mode="sectioned")
+
+    assert calls.count(funding) == 2
+    assert all(calls.count(s) == 1 for s in PE_DASHBOARD_SECTIONS if s != funding)
+    assert f"Body of {funding}." in dashboard
+
+    # Retries exhausted: the section becomes a notice, the others are kept
+    monkeypatch.setenv("SECTION_RETRIES", "1")
+    create, calls = fake_create(fail=lambda section, seen: section == funding)
+    with patch.object(dashboard_generator.openai_client.chat.completions, "create", side_effect=create):
+        dashboard = await DashboardGenerator.generate_structured_dashboard("anthropic", mode="sectioned")
+
+    assert calls.count(funding) == 2
+    assert f"## {funding}\n\n*Section unavailable: generation failed ({funding} timed out).*" in dashboard
+    assert all(f"Body of {s}." in dashboard for s in PE_DASHBOARD_SECTIONS if s != funding)
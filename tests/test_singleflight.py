@@ -0,0 +1,122 @@
+"""
+Unit tests for single-flight request coalescing
+
+Tests:
+1. Concurrent calls with one key run once and share the result
+2. Errors reach every waiter and are not cached
+3. A cancelled waiter does not cancel the shared call; the last one does
+4. Concurrent identical MCP dashboard requests make one generation
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from src.server.mcp_server import app
+from src.utils.dashboard_generator import GENERATION_FLIGHT, DashboardGenerator
+from src.utils.singleflight import SingleFlight
+from src.utils.usage import record_usage
+
+
+class CountingCall:
+    def __init__(self, delay: float = 0.05, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def __call__(self, value="result"):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return value
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_flight():
+    flight = SingleFlight("test")
+    work = CountingCall()
+
+    results = await asyncio.gather(
+        *[flight.do("anthropic", lambda: work("a")) for _ in range(5)],
+        flight.do("openai", lambda: work("b"))
+    )
+
+    assert results == ["a"] * 5 + ["b"]
+    assert work.calls == 2
+    assert flight.in_flight() == 0
+
+    # Nothing is cached once the call has finished
+    assert await flight.do("anthropic", lambda: work("c")) == "c"
+    assert work.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight("test")
+    failing = CountingCall(error=RuntimeError("LLM unavailable"))
+
+    results = await asyncio.gather(*[flight.do("k", failing) for _ in range(3)], return_exceptions=True)
+    assert failing.calls == 1
+    assert all(isinstance(r, RuntimeError) and "unavailable" in str(r) for r in results)
+
+    # The failure is not remembered: the next request retries
+    assert await flight.do("k", CountingCall()) == "result"
+
+
+@pytest.mark.asyncio
+async def test_cancellation_is_per_waiter():
+    flight = SingleFlight("test")
+    work = CountingCall(delay=0.1)
+
+    first = asyncio.create_task(flight.do("k", work))
+    second = asyncio.create_task(flight.do("k", work))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "result"
+    assert first.cancelled() and not work.cancelled and work.calls == 1
+
+    # When every waiter goes away the call is cancelled and the key released
+    abandoned = CountingCall(delay=1)
+    waiters = [asyncio.create_task(flight.do("k2", abandoned)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert abandoned.cancelled and flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_mcp_requests_coalesce_generation():
+    calls = []
+
+    async def generate(company_id, model, mode):
+        calls.append((company_id, model, mode))
+        await asyncio.sleep(0.05)
+        record_usage(model, SimpleNamespace(prompt_tokens=2500, completion_tokens=500))
+        return f"# {company_id} ({mode})"
+
+    transport = httpx.ASGITransport(app=app)
+    with patch.object(DashboardGenerator, "_generate_structured_dashboard", side_effect=generate):
+        async with httpx.AsyncClient(transport=transport, base_url="http://mcp") as client:
+            responses = await asyncio.gather(
+                *[client.post("/tool/generate_structured_dashboard", json={"company_id": "anthropic"}) for _ in range(3)],
+                client.post("/tool/generate_structured_dashboard", json={"company_id": "anthropic", "mode": "enriched"})
+            )
+
+    assert [r.status_code for r in responses] == [200] * 4
+    assert sorted(calls) == [("anthropic", "gpt-4o-mini", "enriched"), ("anthropic", "gpt-4o-mini", "llm")]
+    assert {r.json()["markdown"] for r in responses[:3]} == {"# anthropic (llm)"}
+    # Only the leader is billed for the shared generation
+    assert sum(r.json()["usage"]["total_tokens"] for r in responses[:3]) == 3000
+    assert GENERATION_FLIGHT.in_flight() == 0
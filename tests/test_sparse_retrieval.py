@@ -0,0 +1,126 @@
+"""
+Unit tests for the BM25 index and hybrid retrieval
+
+Tests:
+1. BM25 ranks exact-term chunks first, per company, with plural stemming
+2. Reciprocal rank fusion rewards agreement and merges duplicates
+3. The chunk corpus round-trips through JSONL and a Pinecone export
+4. Hybrid search recovers keyword matches dense search missed at the same k
+"""
+
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.tools.rag_tool import rag_search_company
+from src.tools.sparse_index import (
+    SparseIndex,
+    export_pinecone_chunks,
+    get_sparse_index,
+    reciprocal_rank_fusion,
+    set_sparse_index,
+    tokenize,
+    write_chunks,
+)
+
+CHUNKS = [
+    {"id": "a1", "company_id": "anthropic", "text": "Anthropic announced a layoff affecting 20 staff amid concerns.", "page_type": "news"},
+    {"id": "a2", "company_id": "anthropic", "text": "Anthropic builds reliable, interpretable AI systems.", "page_type": "about"},
+    {"id": "a3", "company_id": "anthropic", "text": "The company is hiring engineers across research and product.", "page_type": "careers"},
+    {"id": "a4", "company_id": "anthropic", "text": "Claude is used by enterprise customers for coding.", "page_type": "product"},
+    {"id": "o1", "company_id": "openai", "text": "OpenAI layoffs rumors and controversies in the press.", "page_type": "news"},
+]
+
+
+@pytest.fixture
+def sparse_index():
+    index = SparseIndex.from_chunks(CHUNKS)
+    set_sparse_index(index)
+    yield index
+    set_sparse_index(None)
+
+
+def test_bm25_ranks_exact_terms_per_company(sparse_index):
+    results = sparse_index.search("anthropic", "layoffs challenges issues controversies problems concerns", k=3)
+
+    assert results[0]["id"] == "a1"  # 'layoffs' / 'concerns' match 'layoff' / 'concerns'
+    assert all(r["metadata"]["company_id"] == "anthropic" for r in results)
+    assert "o1" not in {r["id"] for r in results}
+    assert results == sorted(results, key=lambda r: -r["score"])
+
+    assert sparse_index.search("anthropic", "quarterly dividends", k=3) == []
+    assert sparse_index.search("unknown", "layoffs", k=3) == []
+    assert tokenize("The Companies' layoffs") == ["company", "layoff"]
+    assert len(sparse_index) == 5 and sparse_index.companies() == ["anthropic", "openai"]
+
+
+def test_reciprocal_rank_fusion():
+    dense = [{"id": "x", "text": "x", "score": 0.9}, {"id": "y", "text": "y", "score": 0.8}, {"id": "z", "text": "z", "score": 0.7}]
+    sparse = [{"id": "z", "text": "z", "score": 12.0}, {"id": "w", "text": "w", "score": 3.0}]
+
+    fused = reciprocal_rank_fusion([dense, sparse], k=3)
+
+    assert [c["id"] for c in fused] == ["z", "x", "y"]  # in both lists beats rank 1 in one
+    assert fused[0]["score"] == pytest.approx(1 / 63 + 1 / 61)
+    assert len({c["id"] for c in reciprocal_rank_fusion([dense, sparse], k=10)}) == 4
+
+    # Chunks without ids are merged by text
+    assert len(reciprocal_rank_fusion([[{"text": "same"}], [{"text": "same"}]], k=5)) == 1
+
+
+def test_corpus_round_trip_and_pinecone_export(tmp_path, monkeypatch):
+    path = tmp_path / "chunks.jsonl"
+    assert write_chunks(CHUNKS, path) == 5
+    monkeypatch.setenv("SPARSE_INDEX_PATH", str(path))
+    set_sparse_index(None)
+
+    loaded = get_sparse_index()
+    assert len(loaded) == 5 and get_sparse_index() is loaded
+    assert loaded.search("openai", "layoffs", k=1)[0]["id"] == "o1"
+
+    monkeypatch.setenv("SPARSE_INDEX_PATH", str(tmp_path / "missing.jsonl"))
+    assert get_sparse_index() is None
+    set_sparse_index(None)
+
+    pinecone_index = MagicMock()
+    pinecone_index.list.return_value = iter([["v1", "v2"]])
+    pinecone_index.fetch.return_value = SimpleNamespace(vectors={
+        "v1": SimpleNamespace(metadata={"company_id": "anthropic", "text": "Series F led by Lightspeed", "page_type": "blog"}),
+        "v2": SimpleNamespace(metadata={"company_id": "anthropic", "text": "Hiring", "source_file": "careers.txt"}),
+    })
+    exported = list(export_pinecone_chunks(pinecone_index))
+    assert [c["id"] for c in exported] == ["v1", "v2"]
+    assert exported[1]["source_url"] == "careers.txt"
+    assert SparseIndex.from_chunks(exported).search("anthropic", "series", k=1)[0]["id"] == "v1"
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_improves_recall(sparse_index):
+    # Dense search returns semantically "close" chunks but misses the layoff passage
+    matches = [
+        {"id": cid, "score": score, "metadata": {"company_id": "anthropic", "text": text, "page_type": "about"}}
+        for cid, score, text in [("a2", 0.81, CHUNKS[1]["text"]), ("a3", 0.79, CHUNKS[2]["text"]), ("a4", 0.75, CHUNKS[3]["text"])]
+    ]
+    query = "layoffs challenges issues controversies problems concerns"
+
+    with patch.dict(os.environ, {"PINECONE_API_KEY": "test", "OPENAI_API_KEY": "test"}), \
+            patch("src.tools.rag_tool.Pinecone") as pinecone_class, \
+            patch("src.tools.rag_tool.OpenAI") as openai_class:
+        index = MagicMock()
+        index.query.side_effect = lambda **kwargs: {"matches": matches[:kwargs["top_k"]]}
+        pinecone_class.return_value.Index.return_value = index
+        openai_class.return_value.embeddings.create.return_value = MagicMock(data=[MagicMock(embedding=[0.1] * 8)])
+
+        dense = await rag_search_company("anthropic", query, k=2, mode="dense")
+        hybrid = await rag_search_company("anthropic", query, k=2, mode="hybrid")
+        sparse = await rag_search_company("anthropic", query, k=2, mode="sparse")
+
+    assert "a1" not in {r["id"] for r in dense}
+    assert "a1" in {r["id"] for r in hybrid} and len(hybrid) == 2
+    assert index.query.call_args.kwargs["top_k"] == 6  # k * RAG_HYBRID_CANDIDATES candidates
+    assert sparse[0]["id"] == "a1" and index.query.call_count == 2  # sparse needs no Pinecone call
+
+    with pytest.raises(ValueError):
+        await rag_search_company("anthropic", query, mode="keyword")
@@ -0,0 +1,120 @@
+"""
+Unit tests for the deterministic template dashboard renderer
+
+Tests:
+1. Every payload renders all 8 sections with no unfilled placeholders
+2. Missing fields render as the literal "Not disclosed."
+3. MCP tool template / enriched modes; the enrichment call runs off the event loop
+"""
+
+import re
+import threading
+from pathlib import Path
+
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+
+from src.models import CompanyPayload
+from src.server.mcp_server import app
+from src.utils import dashboard_generator
+from src.utils.template_renderer import (
+    NOT_DISCLOSED,
+    PE_DASHBOARD_SECTIONS,
+    render_template_dashboard,
+)
+from src.tools.payload_catalog import discover_payload_files, load_payload_file
+
+client = TestClient(app)
+
+
+def minimal_payload() -> CompanyPayload:
+    return CompanyPayload(
+        company={"company_name": "Acme AI", "company_id": "acme", "website": "https://acme.ai",
+                 "description": "Acme builds agents.", "hq_city": "Not disclosed",
+                 "competitors": ["Not disclosed"]},
+        snapshot={"snapshot_date": "2025-01-01", "valuation": "Not disclosed"},
+        investor_profile={},
+        growth_metrics={},
+        visibility={},
+        extracted_at="2025-01-01T00:00:00Z"
+    )
+
+
+def test_all_payloads_render_every_section():
+    """Each payload renders the 8 sections in order with placeholders filled"""
+    files = discover_payload_files(Path("data/payloads"))
+    assert files
+
+    for company_id, path in files.items():
+        markdown = render_template_dashboard(load_payload_file(path))
+
+        positions = [markdown.index(f"## {section}") for section in PE_DASHBOARD_SECTIONS]
+        assert positions == sorted(positions), company_id
+        assert not re.search(r"\{[a-z_]+\}", markdown), company_id
+
+
+def test_missing_fields_render_not_disclosed():
+    """Placeholder values from extraction are normalized to 'Not disclosed.'"""
+    markdown = render_template_dashboard(minimal_payload(), generated_at="2025-01-02")
+
+    assert "# Acme AI - PE Due Diligence Dashboard" in markdown
+    assert f"- Headquarters: {NOT_DISCLOSED}" in markdown
+    assert f"- Valuation: {NOT_DISCLOSED}" in markdown
+    assert f"- Total Funding: {NOT_DISCLOSED}" in markdown
+    assert "Not disclosed\n" not in markdown
+    # Gaps are derived from the payload when extraction left them empty
+    gaps = markdown.split("## 8. Disclosure Gaps")[1]
+    assert "- Company valuation" in gaps
+    assert "- Revenue" in gaps
+
+
+def test_template_mode_skips_llm():
+    """mode=template renders from the payload without calling OpenAI"""
+    with patch.object(dashboard_generator.openai_client.chat.completions, "create") as mock_create:
+        response = client.post(
+            "/tool/generate_structured_dashboard",
+            json={"company_id": "anthropic", "mode": "template"}
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["mode"] == "template"
+    assert "## 8. Disclosure Gaps" in data["markdown"]
+    mock_create.assert_not_called()
+
+    response = client.post(
+        "/tool/generate_structured_dashboard",
+        json={"company_id": "anthropic", "mode": "poetry"}
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_enriched_mode_adds_summary_and_falls_back():
+    """Enriched mode inserts the LLM summary; LLM failure returns the template"""
+    llm_response = MagicMock()
+    llm_response.choices = [MagicMock(message=MagicMock(content="Anthropic is a frontier lab."))]
+    call_threads = []
+
+    def create(**kwargs):
+        call_threads.append(threading.get_ident())
+        return llm_response
+
+    with patch.object(dashboard_generator.openai_client.chat.completions, "create", side_effect=create):
+        enriched = await dashboard_generator.DashboardGenerator.generate_structured_dashboard(
+            "anthropic", mode="enriched"
+        )
+
+    assert call_threads and threading.get_ident() not in call_threads  # never blocks the event loop
+    assert enriched.index("**Executive Summary**") < enriched.index("## 1. Company Overview")
+    assert "Anthropic is a frontier lab." in enriched
+
+    with patch.object(dashboard_generator.openai_client.chat.completions, "create",
+                      side_effect=RuntimeError("rate limited")):
+        fallback = await dashboard_generator.DashboardGenerator.generate_structured_dashboard(
+            "anthropic", mode="enriched"
+        )
+
+    assert "**Executive Summary**" not in fallback
+    assert "## 8. Disclosure Gaps" in fallback
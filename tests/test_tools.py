@@ -167,6 +167,28 @@ async def test_rag_search_company_success():
         assert results[0]['metadata']['page_type'] == 'blog'
 
 
+@pytest.mark.asyncio
+async def test_rag_search_company_uses_index_host():
+    """PINECONE_INDEX_HOST targets the index host directly (e.g. a local stand-in)"""
+
+    with patch.dict(os.environ, {
+        'PINECONE_API_KEY': 'test-pinecone-key',
+        'OPENAI_API_KEY': 'test-openai-key',
+        'PINECONE_INDEX_HOST': 'http://localhost:9100'
+    }):
+        with patch('src.tools.rag_tool.Pinecone') as mock_pinecone_class:
+            with patch('src.tools.rag_tool.OpenAI') as mock_openai_class:
+                mock_pinecone_class.return_value.Index.return_value.query.return_value = {'matches': []}
+                mock_openai_class.return_value.embeddings.create.return_value.data = [MagicMock(embedding=[0.1] * 8)]
+
+                results = await rag_search_company("anthropic", "funding rounds", k=2)
+
+        assert results == []
+        mock_pinecone_class.return_value.Index.assert_called_once_with(
+            "pe-dashboard-ai50", host="http://localhost:9100"
+        )
+
+
 @pytest.mark.asyncio
 async def test_rag_search_company_missing_api_keys():
     """Test error handling when API keys are missing"""
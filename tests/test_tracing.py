@@ -0,0 +1,151 @@
+"""
+Unit tests for in-process tracing
+
+Tests:
+1. Nested spans share a trace and inherit run_id / company_id
+2. Disabled tracing is a no-op
+3. W3C traceparent / baggage round trip
+4. MCP client → server spans join one trace over HTTP
+5. Chrome trace export
+6. OTLP export never blocks the thread closing a span; batches are posted from a background thread
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from src.agents.mcp_client import MCPClient
+from src.server.mcp_server import app
+from src.utils.tracing import (
+    NOOP_SPAN,
+    OtlpHttpSpanExporter,
+    configure_tracing,
+    extract_context,
+    inject_headers,
+    span,
+    to_chrome_trace,
+)
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span.to_dict())
+
+    def flush(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+@pytest.fixture
+def exporter():
+    exporter = ListExporter()
+    configure_tracing(enabled=True, exporters=[exporter])
+    yield exporter
+    configure_tracing(enabled=False)
+
+
+def test_nested_spans_inherit_context(exporter):
+    with span("workflow.run", run_id="run-1", company_id="anthropic") as root:
+        with span("node.evaluator"):
+            with pytest.raises(RuntimeError):
+                with span("llm.completion", model="gpt-4o-mini"):
+                    raise RuntimeError("boom")
+
+    llm, node, run = exporter.spans
+    assert {s["trace_id"] for s in exporter.spans} == {root.trace_id}
+    assert run["parent_id"] is None
+    assert node["parent_id"] == run["span_id"]
+    assert llm["parent_id"] == node["span_id"]
+    assert llm["attributes"] == {"run_id": "run-1", "company_id": "anthropic", "model": "gpt-4o-mini"}
+    assert llm["status"] == "error" and "boom" in llm["error"]
+    assert run["status"] == "ok"
+    assert run["duration_ms"] >= node["duration_ms"] >= 0
+
+
+def test_disabled_tracing_is_noop():
+    configure_tracing(enabled=False)
+    with span("anything", company_id="x") as s:
+        s.set_attribute("key", "value")
+    assert s is NOOP_SPAN
+    assert inject_headers() == {}
+
+
+def test_traceparent_round_trip(exporter):
+    with span("mcp.call_tool", run_id="run 2", company_id="openai") as s:
+        headers = inject_headers()
+
+    assert headers["traceparent"] == f"00-{s.trace_id}-{s.span_id}-01"
+    remote = extract_context(headers["traceparent"], headers["baggage"])
+    assert (remote.trace_id, remote.span_id) == (s.trace_id, s.span_id)
+    assert remote.baggage == {"run_id": "run 2", "company_id": "openai"}
+
+    assert extract_context(None) is None
+    assert extract_context("00-not-a-trace-01") is None
+    assert extract_context(f"00-{'z' * 32}-{'0' * 16}-01") is None
+
+
+@pytest.mark.asyncio
+async def test_mcp_call_joins_server_trace(exporter):
+    client = MCPClient(transport=httpx.ASGITransport(app=app))
+
+    with span("workflow.run", run_id="run-3", company_id="anthropic"):
+        result = await client.call_tool("generate_structured_dashboard", {"company_id": "anthropic", "mode": "template"})
+    assert result["mode"] == "template"
+
+    by_name = {s["name"]: s for s in exporter.spans}
+    call = by_name["mcp.call_tool"]
+    server = by_name["POST /tool/generate_structured_dashboard"]
+    render = by_name["template.render"]
+
+    assert call["kind"] == "client" and server["kind"] == "server"
+    assert server["parent_id"] == call["span_id"]
+    assert render["trace_id"] == by_name["workflow.run"]["trace_id"]
+    assert server["attributes"]["http_status"] == 200
+    assert server["attributes"]["run_id"] == "run-3"
+
+
+def test_chrome_trace_export(exporter):
+    with span("workflow.run", run_id="run-4", company_id="cohere"):
+        with span("node.planner"):
+            pass
+
+    trace = to_chrome_trace(exporter.spans)
+    complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in complete] == ["workflow.run", "node.planner"]
+    assert complete[0]["dur"] >= complete[1]["dur"]
+    assert any(e["ph"] == "M" and "cohere" in e["args"]["name"] for e in trace["traceEvents"])
+
+
+def test_otlp_export_does_not_block_span_close():
+    posts = []
+
+    def slow_collector(url, json, timeout):
+        time.sleep(0.5)
+        posts.append((threading.current_thread().name, len(json["resourceSpans"][0]["scopeSpans"][0]["spans"])))
+        return httpx.Response(200, request=httpx.Request("POST", url))
+
+    otlp = OtlpHttpSpanExporter("http://collector:4318", batch_size=4, flush_interval=60)
+    configure_tracing(enabled=True, exporters=[otlp])
+    try:
+        with patch("httpx.post", slow_collector):
+            started = time.perf_counter()
+            for i in range(10):
+                with span(f"request-{i}"):
+                    pass
+            assert time.perf_counter() - started < 0.25  # two full batches queued, none posted inline
+
+            otlp.flush()
+            assert sum(n for _, n in posts) == 10
+            assert {name for name, _ in posts} == {"otlp-span-exporter"}
+            assert [n for _, n in posts] == [4, 4, 2]
+    finally:
+        configure_tracing(enabled=False)
+    assert otlp._worker is None  # shut down with the configuration
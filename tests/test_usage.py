@@ -0,0 +1,137 @@
+"""
+Unit tests for token usage accounting and budgets
+
+Tests:
+1. Usage is collected per scope, priced, and merged without double counting
+2. MCP dashboard tools report the usage of their completions
+3. Budget policy tiers and per-day totals from the ledger
+4. Data generator rolls up usage and degrades once the run budget is used
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.server.mcp_server import app
+from src.utils.usage import (
+    BudgetPolicy,
+    UsageSummary,
+    append_ledger,
+    daily_usage,
+    estimate_cost,
+    merge_usage,
+    record_usage,
+    track_usage,
+)
+from src.workflows.due_diligence_graph import data_generator_node, final_decision_node
+
+
+def completion(prompt_tokens: int, completion_tokens: int, content: str = "# Dashboard"):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    )
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    path = tmp_path / "usage_ledger.jsonl"
+    monkeypatch.setenv("USAGE_LEDGER", str(path))
+    for var in ("TOKEN_BUDGET_PER_RUN", "TOKEN_BUDGET_PER_DAY", "BUDGET_DEGRADE_AT"):
+        monkeypatch.delenv(var, raising=False)
+    return path
+
+
+def test_usage_scopes_and_merge():
+    record_usage("gpt-4o-mini", SimpleNamespace(prompt_tokens=5, completion_tokens=5))  # no scope: dropped
+
+    with track_usage() as outer:
+        record_usage("gpt-4o-mini", SimpleNamespace(prompt_tokens=1000, completion_tokens=500))
+        with track_usage() as inner:
+            record_usage("text-embedding-3-small", SimpleNamespace(prompt_tokens=8))
+            record_usage("gpt-4o-mini", MagicMock())  # mocked usage is ignored
+        merge_usage(inner.model_dump())
+
+    assert inner.calls == 1 and inner.total_tokens == 8
+    assert outer.calls == 2
+    assert outer.prompt_tokens == 1008 and outer.completion_tokens == 500
+    assert set(outer.by_model) == {"gpt-4o-mini", "text-embedding-3-small"}
+    assert outer.cost_usd == pytest.approx(estimate_cost("gpt-4o-mini", 1000, 500) + estimate_cost("text-embedding-3-small", 8))
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 1_000_000) == pytest.approx(0.15)
+
+
+def test_mcp_tool_reports_usage():
+    client = TestClient(app)
+    with patch("src.utils.dashboard_generator.openai_client") as openai_client:
+        openai_client.chat.completions.create.return_value = completion(1200, 300)
+        response = client.post(
+            "/tool/generate_structured_dashboard",
+            json={"company_id": "anthropic", "mode": "llm", "model": "gpt-4o"}
+        )
+
+    assert response.status_code == 200
+    assert openai_client.chat.completions.create.call_args.kwargs["model"] == "gpt-4o"
+    usage = response.json()["usage"]
+    assert usage["total_tokens"] == 1500 and usage["calls"] == 1
+    assert usage["by_model"]["gpt-4o"]["cost_usd"] == pytest.approx(estimate_cost("gpt-4o", 1200, 300))
+
+    response = client.post("/tool/generate_structured_dashboard", json={"company_id": "anthropic", "mode": "template"})
+    assert response.json()["usage"]["total_tokens"] == 0
+
+
+def test_budget_policy_and_daily_ledger(ledger):
+    policy = BudgetPolicy(run_tokens=10_000, day_tokens=100_000, degrade_at=0.8)
+
+    assert policy.decide("llm", run_used=1_000, day_used=1_000).reason is None
+    near = policy.decide("llm", run_used=8_500, day_used=8_500)
+    assert (near.mode, near.model, near.rag) == ("enriched", "gpt-4o-mini", True)
+    assert "run 8500/10000" in near.reason
+    spent = policy.decide("llm", run_used=100, day_used=120_000)
+    assert (spent.mode, spent.rag) == ("template", False) and "day" in spent.reason
+    assert BudgetPolicy().decide("llm", run_used=10**9).reason is None
+
+    usage = UsageSummary()
+    usage.add("gpt-4o-mini", 700, 300)
+    append_ledger("anthropic", "run-1", usage)
+    append_ledger("openai", "run-2", usage.model_dump())
+    assert daily_usage().total_tokens == 2_000
+    assert daily_usage(day="1999-01-01").total_tokens == 0
+
+
+def test_data_generator_rolls_up_and_degrades(ledger, monkeypatch, tmp_path):
+    monkeypatch.setenv("TOKEN_BUDGET_PER_RUN", "2000")
+    monkeypatch.setenv("DASHBOARDS_DIR", str(tmp_path / "dashboards"))
+
+    calls = []
+
+    async def call_tool(tool_name, params):
+        calls.append((tool_name, params))
+        usage = UsageSummary()
+        usage.add("gpt-4o-mini", 1800, 400)
+        return {"markdown": "# Dashboard", "usage": usage.model_dump()}
+
+    state = {
+        "company_id": "anthropic",
+        "run_id": str(uuid4()),
+        "generation_mode": "llm",
+        "risk_detected": False,
+        "risk_keywords": [],
+        "hitl_required": False,
+        "hitl_approved": True,
+        "execution_path": [],
+        "errors": []
+    }
+    with patch("src.workflows.due_diligence_graph.get_mcp_client") as get_client:
+        get_client.return_value = MagicMock(call_tool=call_tool)
+        state = data_generator_node(state)
+
+    assert calls == [("generate_structured_dashboard", {"company_id": "anthropic", "mode": "llm"})]
+    assert state["usage"]["total_tokens"] == 2200
+    assert state["rag_dashboard"].startswith("# RAG Dashboard (skipped")
+    assert state["budget_notes"] == ["budget exhausted (run 2200/2000 tokens)"]
+
+    decision = final_decision_node(state)["final_decision"]
+    assert '"total_tokens": 2200' in decision and "budget exhausted" in decision
@@ -209,10 +209,10 @@ def test_workflow_no_risk_branch(mock_mcp_client):
     app = compile_workflow()
     config = {"configurable": {"thread_id": initial_state["run_id"]}}
 
-    final_state = None
-    for state in app.stream(initial_state, config):
-        node_name = list(state.keys())[0]
-        final_state = state[node_name]
+    for _ in app.stream(initial_state, config):
+        pass
+    # Nodes stream partial updates; the merged state is in the checkpoint
+    final_state = app.get_state(config).values
 
     # Assertions
     assert final_state is not None
@@ -252,10 +252,10 @@ def test_workflow_risk_branch(mock_mcp_client):
     app = compile_workflow()
     config = {"configurable": {"thread_id": initial_state["run_id"]}}
 
-    final_state = None
-    for state in app.stream(initial_state, config):
-        node_name = list(state.keys())[0]
-        final_state = state[node_name]
+    for _ in app.stream(initial_state, config):
+        pass
+    # Nodes stream partial updates; the merged state is in the checkpoint
+    final_state = app.get_state(config).values
 
     # Assertions
     assert final_state is not None
@@ -287,10 +287,10 @@ def test_workflow_mcp_failure_fallback(mock_mcp_client):
     app = compile_workflow()
     config = {"configurable": {"thread_id": initial_state["run_id"]}}
 
-    final_state = None
-    for state in app.stream(initial_state, config):
-        node_name = list(state.keys())[0]
-        final_state = state[node_name]
+    for _ in app.stream(initial_state, config):
+        pass
+    # Nodes stream partial updates; the merged state is in the checkpoint
+    final_state = app.get_state(config).values
 
     # Should complete with fallback dashboards
     assert final_state is not None
@@ -350,9 +350,9 @@ def test_full_workflow_integration(mock_mcp_client):
     app = compile_workflow()
     config1 = {"configurable": {"thread_id": state1["run_id"]}}
 
-    final_state1 = None
-    for state in app.stream(state1, config1):
-        final_state1 = state[list(state.keys())[0]]
+    for _ in app.stream(state1, config1):
+        pass
+    final_state1 = app.get_state(config1).values
 
     assert "auto_approve" in final_state1["execution_path"]
 
@@ -365,9 +365,9 @@ def test_full_workflow_integration(mock_mcp_client):
     state2 = create_test_state("risky_company")
     config2 = {"configurable": {"thread_id": state2["run_id"]}}
 
-    final_state2 = None
-    for state in app.stream(state2, config2):
-        final_state2 = state[list(state.keys())[0]]
+    for _ in app.stream(state2, config2):
+        pass
+    final_state2 = app.get_state(config2).values
 
     assert "hitl" in final_state2["execution_path"]
 